@@ -16,6 +16,7 @@ from app.models import (
     AgentSkill,
     Conversation,
     ConversationFile,
+    ExecutionOutbox,
     McpServer,
     MessageLog,
     Model,
@@ -0,0 +1,66 @@
+"""add execution outbox
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2025-02-20 00:00:00.000000
+
+実行後処理（使用量記録、メッセージログ保存、削除した会話のS3ファイル削除）を
+トランザクショナルアウトボックスとして保持する execution_outbox テーブルを追加。
+完了したジョブは処理時に削除するため、残るのは pending / failed の行のみ。
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = "0006"
+down_revision = "0005"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "execution_outbox",
+        sa.Column("outbox_id", sa.BigInteger(), autoincrement=True, nullable=False),
+        sa.Column("kind", sa.String(50), nullable=False),
+        sa.Column("tenant_id", sa.String(100), nullable=False),
+        sa.Column("conversation_id", postgresql.UUID(as_uuid=False), nullable=False),
+        sa.Column("payload", postgresql.JSON(), nullable=False),
+        sa.Column("status", sa.String(20), nullable=False, server_default="pending"),
+        sa.Column("attempts", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("last_error", sa.Text(), nullable=True),
+        sa.Column(
+            "available_at",
+            sa.DateTime(timezone=True),
+            server_default=sa.func.now(),
+            nullable=False,
+        ),
+        sa.Column(
+            "created_at",
+            sa.DateTime(timezone=True),
+            server_default=sa.func.now(),
+            nullable=False,
+        ),
+        sa.Column("processed_at", sa.DateTime(timezone=True), nullable=True),
+        sa.PrimaryKeyConstraint("outbox_id"),
+    )
+    op.create_index(
+        "ix_execution_outbox_conversation_id",
+        "execution_outbox",
+        ["conversation_id"],
+    )
+    op.create_index(
+        "ix_execution_outbox_status_available_at",
+        "execution_outbox",
+        ["status", "available_at"],
+    )
+
+
+def downgrade() -> None:
+    op.drop_index(
+        "ix_execution_outbox_status_available_at", table_name="execution_outbox"
+    )
+    op.drop_index("ix_execution_outbox_conversation_id", table_name="execution_outbox")
+    op.drop_table("execution_outbox")
@@ -0,0 +1,34 @@
+"""add mcp response cache settings
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2025-03-01 00:00:00.000000
+
+MCPサーバー単位でGETレスポンスのキャッシュを有効化する設定カラムを追加。
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = "0007"
+down_revision = "0006"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "mcp_servers",
+        sa.Column("response_cache_ttl", sa.Integer(), nullable=True),
+    )
+    op.add_column(
+        "mcp_servers",
+        sa.Column("response_cache_vary_headers", postgresql.JSON, nullable=True),
+    )
+
+
+def downgrade() -> None:
+    op.drop_column("mcp_servers", "response_cache_vary_headers")
+    op.drop_column("mcp_servers", "response_cache_ttl")
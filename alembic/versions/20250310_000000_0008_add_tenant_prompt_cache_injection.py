@@ -0,0 +1,34 @@
+"""add tenant prompt cache injection setting
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2025-03-10 00:00:00.000000
+
+テナント単位で Bedrock リクエストへのプロンプトキャッシュチェックポイント自動追加を
+有効化する設定カラムを追加。
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "0008"
+down_revision = "0007"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "tenants",
+        sa.Column(
+            "prompt_cache_injection",
+            sa.Boolean(),
+            nullable=False,
+            server_default=sa.false(),
+        ),
+    )
+
+
+def downgrade() -> None:
+    op.drop_column("tenants", "prompt_cache_injection")
@@ -4,25 +4,36 @@
 from datetime import datetime
 from uuid import uuid4
 
+import structlog
 from fastapi import APIRouter, Depends, HTTPException, Query, status
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.api.dependencies import get_active_model, get_conversation_or_404, get_tenant_or_404
+from app.api.dependencies import (
+    get_active_model,
+    get_conversation_or_404,
+    get_optional_orchestrator,
+    get_orchestrator,
+    get_tenant_or_404,
+)
+from app.config import get_settings
 from app.database import get_db
 from app.models.conversation import Conversation
 from app.models.tenant import Tenant
 from app.schemas.conversation import (
     ConversationCreateRequest,
     ConversationListResponse,
+    ConversationPrepareResponse,
     ConversationResponse,
     ConversationUpdateRequest,
     MessageLogResponse,
 )
+from app.services.container.orchestrator import ContainerOrchestrator
 from app.services.conversation_service import ConversationService
 from app.services.message_log_service import MessageLogService
 from app.utils.error_handler import raise_not_found
 
 router = APIRouter()
+logger = structlog.get_logger(__name__)
 
 
 @router.get(
@@ -90,6 +101,7 @@ async def create_conversation(
     request: ConversationCreateRequest,
     tenant: Tenant = Depends(get_tenant_or_404),
     db: AsyncSession = Depends(get_db),
+    orchestrator: ContainerOrchestrator | None = Depends(get_optional_orchestrator),
 ):
     """
     新しい会話を作成します。
@@ -97,6 +109,8 @@ async def create_conversation(
     - **user_id**: ユーザーID（必須）
     - **model_id**: モデルID（オプション、省略時はテナントのデフォルト）
     - **workspace_enabled**: ワークスペースを有効にするか（オプション）
+
+    コンテナ先行確保が有効な場合、初回実行用のコンテナをバックグラウンドで確保します。
     """
     # モデルIDの決定
     model_id = request.model_id or tenant.model_id
@@ -111,7 +125,7 @@ async def create_conversation(
 
     # 会話作成
     service = ConversationService(db)
-    return await service.create_conversation(
+    conversation = await service.create_conversation(
         conversation_id=str(uuid4()),
         tenant_id=tenant_id,
         user_id=request.user_id,
@@ -119,6 +133,42 @@ async def create_conversation(
         workspace_enabled=request.workspace_enabled,
     )
 
+    # 初回実行用コンテナの先行確保（失敗しても会話作成は成功扱い）
+    if orchestrator and get_settings().container_reservation_enabled:
+        try:
+            await orchestrator.reserve(conversation.conversation_id)
+        except Exception as e:
+            logger.warning(
+                "コンテナ先行確保の開始に失敗",
+                conversation_id=conversation.conversation_id,
+                error=str(e),
+            )
+
+    return conversation
+
+
+@router.post(
+    "/{conversation_id}/prepare",
+    response_model=ConversationPrepareResponse,
+    status_code=status.HTTP_202_ACCEPTED,
+    summary="会話実行準備",
+)
+async def prepare_conversation(
+    conversation: Conversation = Depends(get_conversation_or_404),
+    orchestrator: ContainerOrchestrator = Depends(get_orchestrator),
+):
+    """
+    会話の実行用コンテナをバックグラウンドで確保します。
+
+    チャット画面を開いた時点で呼び出すことで、最初のメッセージ送信時の
+    コンテナ割り当て待ちを解消します。割り当て済みの場合は何もしません。
+    """
+    container_status = await orchestrator.reserve(conversation.conversation_id)
+    return ConversationPrepareResponse(
+        conversation_id=conversation.conversation_id,
+        container_status=container_status.value,
+    )
+
 
 @router.put(
     "/{conversation_id}",
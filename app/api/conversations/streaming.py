@@ -22,6 +22,7 @@ from app.services.container.orchestrator import ContainerOrchestrator
 from app.services.conversation_service import ConversationService
 from app.services.execute_service import ExecuteService
 from app.services.workspace_service import WorkspaceService
+from app.utils.event_queue import CoalescingEventQueue
 from app.utils.streaming import format_error_event, format_ping_event, to_sse_payload
 
 router = APIRouter()
@@ -35,7 +36,7 @@ async def _background_execution(
     request: ExecuteRequest,
     tenant: Tenant,
     model: Model,
-    event_queue: asyncio.Queue,
+    event_queue: CoalescingEventQueue,
     orchestrator: ContainerOrchestrator,
 ) -> None:
     """
@@ -93,7 +94,12 @@ async def _event_generator(
     settings = get_settings()
     event_timeout_seconds = settings.event_timeout
 
-    event_queue: asyncio.Queue = asyncio.Queue()
+    # 有界キュー: 送信が追いつかない間のテキスト差分は1フレームに結合される
+    event_queue = CoalescingEventQueue(
+        maxsize=settings.sse_event_queue_max_size,
+        coalesce_window=settings.sse_coalesce_window_ms / 1000,
+        coalesce_thinking=settings.sse_coalesce_thinking,
+    )
     start_time = time.time()
     last_event_time = start_time
 
@@ -195,6 +201,10 @@ async def _event_generator(
         except (asyncio.CancelledError, Exception):
             pass
         raise
+    finally:
+        # 送信を終えたキューを閉じ、クライアント切断後も継続する
+        # バックグラウンド実行が満杯のキューでブロックしないようにする
+        event_queue.close()
 
 
 @router.post(
@@ -30,6 +30,11 @@ def get_orchestrator(request: Request) -> ContainerOrchestrator:
     return request.app.state.orchestrator
 
 
+def get_optional_orchestrator(request: Request) -> ContainerOrchestrator | None:
+    """アプリケーション状態からオーケストレーターを取得（未初期化時はNone）"""
+    return getattr(request.app.state, "orchestrator", None)
+
+
 # --- テナント ---
 
 
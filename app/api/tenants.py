@@ -59,6 +59,7 @@ async def create_tenant(
         tenant_id=request.tenant_id,
         system_prompt=request.system_prompt,
         model_id=request.model_id,
+        prompt_cache_injection=request.prompt_cache_injection,
     )
 
 
@@ -99,6 +100,7 @@ async def update_tenant(
         tenant_id=tenant_id,
         system_prompt=request.system_prompt,
         model_id=request.model_id,
+        prompt_cache_injection=request.prompt_cache_injection,
         status=request.status,
     )
 
@@ -92,6 +92,23 @@ class Settings(BaseSettings):
     # S3チャンク設定（メモリ最適化）
     s3_chunk_size: int = 8 * 1024 * 1024  # 8MB
 
+    # S3転送設定（専用スレッドプール・接続プール、プロセス内で共有）
+    s3_transfer_workers: int = 32  # S3呼び出し専用スレッド数
+    s3_max_pool_connections: int = 64  # boto3 の接続プールサイズ（転送スレッド数以上）
+    # 操作別の同時実行数上限（JSON: {"upload_stream": 8, "list": 4}、未指定は s3_transfer_workers）
+    s3_operation_concurrency: dict[str, int] = {}
+
+    # ワークスペース同期設定（sync_to_local / sync_from_local）
+    s3_sync_concurrency: int = 16  # 1回の同期での同時転送数
+    s3_sync_small_file_size: int = 1024 * 1024  # 1MB未満はまとめて転送
+    s3_multipart_threshold: int = 16 * 1024 * 1024  # 16MB以上はマルチパート/Range GET（パートサイズは s3_chunk_size）
+    s3_multipart_concurrency: int = 8  # 1ファイルあたりの並列パート数
+
+    # S3オブジェクトのノードローカル読み取りキャッシュ（バケット・キー・ETag 単位のLRU）
+    s3_object_cache_enabled: bool = True
+    s3_object_cache_dir: str = "/var/lib/aiagent/s3-cache"
+    s3_object_cache_max_bytes: int = 5 * 1024 * 1024 * 1024  # ディスク使用量上限（5GB）
+
     # S3 Skillsバックアップ設定
     s3_skills_prefix: str = "skills/"
     s3_skills_backup_enabled: bool = True
@@ -145,6 +162,9 @@ class Settings(BaseSettings):
     event_timeout: int = 720  # 12分
     container_healthcheck_interval: int = 30  # 秒
     container_gc_interval: int = 60  # GCループ間隔（秒）
+    container_reservation_enabled: bool = True  # 会話作成時のコンテナ先行確保
+    container_reservation_ttl: int = 300  # 未使用の先行確保コンテナをWarmPoolに返却するまでの時間（秒）
+    lease_renew_interval: float = 30.0  # 会話ロック・実行中コンテナのTTLを延長する間隔（秒）
 
     # ============================================
     # WarmPool設定
@@ -157,7 +177,59 @@ class Settings(BaseSettings):
     # Proxy設定
     # ============================================
     proxy_domain_whitelist: str = "pypi.org,files.pythonhosted.org,registry.npmjs.org,api.anthropic.com,bedrock-runtime.us-east-1.amazonaws.com,bedrock-runtime.us-west-2.amazonaws.com,bedrock-runtime.ap-northeast-1.amazonaws.com"
+    # テナント別の追加許可ドメイン（JSON: {"tenant-id": ["mirror.example.com", "*.partner.io:443"]}）
+    proxy_tenant_domain_whitelist: dict[str, list[str]] = {}
     proxy_log_all_requests: bool = True
+    proxy_keepalive_timeout: float = 60.0  # コンテナ→Proxy接続のアイドルタイムアウト（秒）
+    proxy_max_request_body_size: int = 32 * 1024 * 1024  # Proxy経由のリクエストボディ上限（32MB）
+    # MCP・Forward Proxy のレスポンスボディ上限（OpenAPIMcpService.MAX_RESPONSE_SIZE と揃える）
+    proxy_max_response_size: int = 10 * 1024 * 1024
+    # CONNECT トンネル
+    proxy_tunnel_idle_timeout: float = 300.0  # 両方向とも無通信の場合に閉じるまでの時間（秒）
+    proxy_tunnel_splice: bool = True  # Linux では splice でカーネル内転送する（無効時はPythonで中継）
+    # 転送量の帯域制限（バイト/秒、両方向の合計、0で無制限）
+    proxy_egress_rate_limit: int = 0  # コンテナ単位
+    proxy_tenant_egress_rate_limit: int = 0  # テナント単位（同じホストの全コンテナの合計）
+    # DNSキャッシュ（全コンテナのProxyで共有）
+    proxy_dns_ttl: float = 300.0  # 解決結果の有効期間（秒）
+    proxy_dns_stale_ttl: float = 60.0  # 期限切れ後も古い結果を返しつつ再解決する期間（秒）
+    proxy_dns_negative_ttl: float = 5.0  # 解決失敗をキャッシュする期間（秒）
+    proxy_dns_max_entries: int = 1024  # キャッシュするホスト数の上限（超過分はLRUで削除）
+    # 上流接続プール（全コンテナのProxyで共有）
+    proxy_upstream_http2: bool = True
+    proxy_upstream_max_connections: int = 200
+    proxy_upstream_max_keepalive_connections: int = 50
+    proxy_upstream_keepalive_expiry: float = 60.0  # アイドル接続の保持時間（秒）
+    proxy_upstream_max_per_host: int = 64  # ホストごとの同時リクエスト上限（bedrock-runtime は対象外）
+    proxy_upstream_slot_timeout: float = 10.0  # ホストの同時リクエスト枠の待機上限（秒、超過で503）
+    # MCP GET レスポンスキャッシュのメモリ上限（McpServer.response_cache_ttl で有効化したサーバーのみ）
+    proxy_mcp_cache_max_bytes: int = 64 * 1024 * 1024
+    # Bedrock リージョンルーティング（AWS_REGION を主リージョンとし、追加リージョンへフェイルオーバー）
+    proxy_bedrock_regions: str = ""  # 追加の転送先リージョン（カンマ区切り、空なら AWS_REGION のみ）
+    # モデル別の許可リージョン（JSON: {"anthropic.claude-3-5-haiku-20241022-v1:0": ["us-west-2"]}）
+    proxy_bedrock_model_regions: dict[str, list[str]] = {}
+    proxy_bedrock_region_cooldown: float = 15.0  # スロットリング・障害時にリージョンを後回しにする時間（秒）
+    proxy_bedrock_max_attempts: int = 3  # 1リクエストで試行するリージョン数の上限
+    # Bedrock 同時実行制限（テナント×モデル単位、AIMD で上限を調整し Redis で全レプリカ共有）
+    proxy_bedrock_concurrency_enabled: bool = True
+    proxy_bedrock_concurrency_initial: float = 8.0  # 統計がない場合の同時実行上限
+    proxy_bedrock_concurrency_min: float = 1.0
+    proxy_bedrock_concurrency_max: float = 64.0
+    proxy_bedrock_concurrency_max_wait: float = 120.0  # 枠待ちの最大時間（秒、超過時は429）
+    # 同じリクエストサイズ区分の最小レイテンシの何倍で輻輳とみなすか（0で無効、スロットリングのみで調整）
+    proxy_bedrock_concurrency_latency_factor: float = 0.0
+    # Bedrock トークン予算（Proxyで呼び出しごとに計量し、UTC日単位で積算、0で無制限）
+    proxy_tenant_daily_token_budget: int = 0
+    # テナント別の1日あたりトークン予算（JSON: {"tenant-id": 5000000}、未指定のテナントは上記）
+    proxy_tenant_token_budgets: dict[str, int] = {}
+    # pip / npm 用パッケージキャッシュ（全コンテナのProxyで共有、/pkg/ で提供）
+    proxy_package_cache_enabled: bool = True
+    proxy_package_cache_dir: str = "/var/lib/aiagent/package-cache"
+    proxy_package_cache_max_bytes: int = 10 * 1024 * 1024 * 1024  # ディスク使用量上限（10GB）
+    proxy_package_cache_metadata_ttl: float = 600.0  # インデックス・メタデータの有効期間（秒）
+    proxy_package_cache_pypi_url: str = "https://pypi.org/simple/"
+    proxy_package_cache_pypi_files_url: str = "https://files.pythonhosted.org/"
+    proxy_package_cache_npm_url: str = "https://registry.npmjs.org/"
 
     # ============================================
     # セキュリティ強化設定 (Phase 2/5)
@@ -175,6 +247,21 @@ class Settings(BaseSettings):
     # 未設定時は workspace_socket_base_path と同じ値を使用
     workspace_socket_host_path: str = ""
 
+    # ============================================
+    # 実行後処理アウトボックス設定
+    # ============================================
+    execution_outbox_poll_interval: float = 2.0  # ワーカーのポーリング間隔（秒）
+    execution_outbox_batch_size: int = 50  # 1サイクルで処理する最大ジョブ数
+    execution_outbox_max_attempts: int = 5  # failed に遷移するまでの最大試行回数
+    execution_outbox_retry_backoff: float = 5.0  # リトライ初回待機（秒、指数バックオフ）
+
+    # ============================================
+    # SSEストリーミング設定
+    # ============================================
+    sse_event_queue_max_size: int = 256  # 実行とSSE送信の間のキュー上限（イベント数）
+    sse_coalesce_window_ms: int = 30  # テキスト差分を結合するために待機する時間（ミリ秒、0で無効）
+    sse_coalesce_thinking: bool = True  # thinking差分も結合対象にする
+
     # ============================================
     # メトリクス設定
     # ============================================
@@ -280,6 +367,11 @@ class Settings(BaseSettings):
         """Proxyドメインホワイトリストをリストとして取得"""
         return [d.strip() for d in self.proxy_domain_whitelist.split(",") if d.strip()]
 
+    @property
+    def proxy_bedrock_regions_list(self) -> list[str]:
+        """Bedrock の追加転送先リージョンをリストとして取得"""
+        return [r.strip() for r in self.proxy_bedrock_regions.split(",") if r.strip()]
+
     @property
     def resolved_socket_host_path(self) -> str:
         """コンテナBind mount用のホスト側ソケットパスを取得"""
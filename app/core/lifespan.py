@@ -12,12 +12,19 @@ from redis.asyncio import Redis
 
 from app.config import get_settings
 from app.database import close_db
+from app.infrastructure.lease_renewer import get_lease_renewer
 from app.infrastructure.redis import close_redis_pool, get_redis_pool
 from app.infrastructure.shutdown import get_shutdown_manager
 from app.services.container.gc import ContainerGarbageCollector
 from app.services.container.lifecycle import ContainerLifecycleManager
 from app.services.container.orchestrator import ContainerOrchestrator
 from app.services.container.warm_pool import WarmPoolManager
+from app.services.execution_outbox_service import (
+    ExecutionOutboxWorker,
+    set_execution_outbox_worker,
+)
+from app.services.proxy.upstream_pool import get_upstream_pool
+from app.services.workspace.s3_storage import close_s3_storage
 
 logger = structlog.get_logger(__name__)
 
@@ -107,7 +114,7 @@ async def _init_container_stack(app: FastAPI, settings) -> tuple:
     コンテナ隔離スタックを初期化
 
     Returns:
-        (docker_client, redis, orchestrator, gc)
+        (docker_client, redis, orchestrator, gc, outbox_worker)
     """
     docker_client = aiodocker.Docker(url=settings.docker_socket_path)
     logger.info("Dockerクライアント初期化完了", socket=settings.docker_socket_path)
@@ -128,6 +135,7 @@ async def _init_container_stack(app: FastAPI, settings) -> tuple:
         lifecycle,
         redis,
         proxy_stop_callback=orchestrator._stop_proxy,
+        reservation_release_callback=orchestrator.release_reservation,
     )
     app.state.gc = gc
 
@@ -146,6 +154,15 @@ async def _init_container_stack(app: FastAPI, settings) -> tuple:
     except Exception as e:
         logger.error("GC開始エラー", error=str(e))
 
+    # 実行後処理アウトボックスワーカー開始
+    outbox_worker = ExecutionOutboxWorker()
+    app.state.outbox_worker = outbox_worker
+    try:
+        await outbox_worker.start(interval=settings.execution_outbox_poll_interval)
+        set_execution_outbox_worker(outbox_worker)
+    except Exception as e:
+        logger.error("アウトボックスワーカー開始エラー", error=str(e))
+
     logger.info(
         "コンテナ隔離スタック初期化完了",
         warm_pool_min=settings.warm_pool_min_size,
@@ -153,7 +170,7 @@ async def _init_container_stack(app: FastAPI, settings) -> tuple:
         container_image=settings.container_image,
     )
 
-    return docker_client, redis, orchestrator, gc
+    return docker_client, redis, orchestrator, gc, outbox_worker
 
 
 def _log_security_status(settings) -> None:
@@ -178,9 +195,16 @@ def _log_security_status(settings) -> None:
 
 
 async def _shutdown_container_stack(
-    docker_client, redis, orchestrator, gc
+    docker_client, redis, orchestrator, gc, outbox_worker
 ) -> None:
     """コンテナスタックのシャットダウン"""
+    # アウトボックスワーカー停止（未処理ジョブはDBに残り次回起動時に処理）
+    try:
+        set_execution_outbox_worker(None)
+        await outbox_worker.stop()
+    except Exception as e:
+        logger.error("アウトボックスワーカー停止エラー", error=str(e))
+
     # GC停止
     try:
         await gc.stop()
@@ -221,6 +245,11 @@ async def _shutdown_resources() -> None:
     except Exception as e:
         logger.error("Redisクローズエラー", error=str(e))
 
+    try:
+        close_s3_storage()
+    except Exception as e:
+        logger.error("S3スレッドプール終了エラー", error=str(e))
+
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
@@ -232,6 +261,8 @@ async def lifespan(app: FastAPI):
       - WarmPoolManager（プレウォーム済みコンテナプール）
       - ContainerOrchestrator（会話→コンテナマッピング）
       - ContainerGarbageCollector（TTL超過コンテナ回収）
+      - ExecutionOutboxWorker（実行後処理アウトボックス）
+      - LeaseRenewer（会話ロック・コンテナメタデータのTTL延長）
     """
     from app import __version__
 
@@ -251,9 +282,13 @@ async def lifespan(app: FastAPI):
     except Exception as e:
         logger.warning("シグナルハンドラー設定エラー", error=str(e))
 
+    # リース更新機構開始（会話ロック・実行中コンテナのTTL延長）
+    lease_renewer = get_lease_renewer()
+    await lease_renewer.start()
+
     # コンテナ隔離スタック初期化
-    docker_client, redis, orchestrator, gc = await _init_container_stack(
-        app, settings
+    docker_client, redis, orchestrator, gc, outbox_worker = (
+        await _init_container_stack(app, settings)
     )
 
     _log_security_status(settings)
@@ -273,7 +308,17 @@ async def lifespan(app: FastAPI):
     logger.info("アプリケーション終了中...")
 
     await shutdown_manager.graceful_shutdown()
-    await _shutdown_container_stack(docker_client, redis, orchestrator, gc)
+    await _shutdown_container_stack(
+        docker_client, redis, orchestrator, gc, outbox_worker
+    )
+    try:
+        await lease_renewer.stop()
+    except Exception as e:
+        logger.error("リース更新停止エラー", error=str(e))
+    try:
+        await get_upstream_pool().close()
+    except Exception as e:
+        logger.error("上流クライアント終了エラー", error=str(e))
     await _shutdown_resources()
 
     logger.info("アプリケーション終了完了")
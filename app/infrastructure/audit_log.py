@@ -48,7 +48,9 @@ def audit_container_destroyed(
     conversation_id: str = "",
     tenant_id: str = "",
     reason: str = "",
+    egress: dict | None = None,
 ) -> None:
+    """egress: Proxy 経由の転送量（bytes_up / bytes_down / by_path）"""
     audit_logger.info(
         "container_destroyed",
         service=SERVICE_ORCHESTRATOR,
@@ -56,6 +58,7 @@ def audit_container_destroyed(
         conversation_id=conversation_id,
         tenant_id=tenant_id,
         reason=reason,
+        egress=egress or {},
     )
 
 
@@ -13,6 +13,7 @@ import structlog
 from redis.asyncio import Redis
 from redis.exceptions import RedisError
 
+from app.infrastructure.lease_renewer import get_lease_renewer
 from app.infrastructure.redis import redis_client
 
 logger = structlog.get_logger(__name__)
@@ -101,6 +102,7 @@ class DistributedLockManager:
         ttl: int = DEFAULT_LOCK_TTL,
         acquire_timeout: float = DEFAULT_ACQUIRE_TIMEOUT,
         retry_interval: float = DEFAULT_RETRY_INTERVAL,
+        renew: bool = False,
     ) -> str:
         """
         分散ロックを取得
@@ -110,6 +112,7 @@ class DistributedLockManager:
             ttl: ロックの有効期限（秒）
             acquire_timeout: ロック取得の最大待機時間（秒）
             retry_interval: リトライ間隔（秒）
+            renew: True の場合、解放までリース更新機構がTTLを自動延長する
 
         Returns:
             ロックトークン（解放時に必要）
@@ -142,6 +145,8 @@ class DistributedLockManager:
                             lock_key=lock_key,
                             ttl=ttl,
                         )
+                        if renew:
+                            get_lease_renewer().hold_lock(lock_key, token, ttl)
                         return token
 
                     # ロック取得失敗、リトライ
@@ -176,6 +181,7 @@ class DistributedLockManager:
             解放成功かどうか
         """
         lock_key = self._make_lock_key(resource_id)
+        get_lease_renewer().release_lock(lock_key, token)
 
         async with redis_client() as redis:
             try:
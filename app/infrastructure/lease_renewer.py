@@ -0,0 +1,201 @@
+"""
+リース更新機構
+
+プロセス内で保持している分散ロックとコンテナメタデータのTTLを
+バックグラウンドで定期的に延長する。
+イベント到着に依存しないため、出力のない長時間ツール実行中もリースが失効しない。
+"""
+import asyncio
+import time
+from dataclasses import dataclass
+
+import structlog
+from redis.exceptions import RedisError
+
+from app.config import get_settings
+from app.infrastructure.metrics import (
+    get_lease_held,
+    get_lease_renewal_lag,
+    get_lease_renewals,
+)
+from app.infrastructure.redis import redis_client
+
+logger = structlog.get_logger(__name__)
+
+# Luaスクリプト: トークン一致時のみロックを延長（DistributedLockManager.EXTEND_SCRIPT と同等）
+EXTEND_LOCK_SCRIPT = """
+if redis.call("get", KEYS[1]) == ARGV[1] then
+    return redis.call("pexpire", KEYS[1], ARGV[2])
+else
+    return 0
+end
+"""
+
+
+@dataclass
+class _LockLease:
+    """保持中のロック"""
+
+    token: str
+    ttl_ms: int
+
+
+@dataclass
+class _ExpiryLease:
+    """TTLを維持するキー群"""
+
+    keys: tuple[str, ...]
+    ttl: int
+
+
+class LeaseRenewer:
+    """
+    バックグラウンドリース更新
+
+    保持中の全リースを一定間隔で1回のパイプラインにまとめて延長する。
+    - ロック: トークンが一致する場合のみ取得時のTTLまで延長（失効・奪取済みなら追跡を外す）
+    - キー: EXPIRE でTTLをリセット（キーが消えていれば追跡を外す）
+    """
+
+    def __init__(self, interval: float = 30.0):
+        self._interval = interval
+        self._locks: dict[str, _LockLease] = {}
+        self._expiries: dict[str, _ExpiryLease] = {}
+        self._running = False
+        self._task: asyncio.Task | None = None
+
+    def hold_lock(self, lock_key: str, token: str, ttl: int) -> None:
+        """ロックを更新対象に追加"""
+        self._locks[lock_key] = _LockLease(token=token, ttl_ms=ttl * 1000)
+        get_lease_held().set(len(self._locks), kind="lock")
+
+    def release_lock(self, lock_key: str, token: str) -> None:
+        """ロックを更新対象から外す（トークン不一致時は何もしない）"""
+        lease = self._locks.get(lock_key)
+        if lease and lease.token == token:
+            del self._locks[lock_key]
+            get_lease_held().set(len(self._locks), kind="lock")
+
+    def hold_expiry(self, lease_id: str, keys: list[str], ttl: int) -> None:
+        """キー群をTTL維持対象に追加"""
+        self._expiries[lease_id] = _ExpiryLease(keys=tuple(keys), ttl=ttl)
+        get_lease_held().set(len(self._expiries), kind="expiry")
+
+    def release_expiry(self, lease_id: str) -> None:
+        """キー群をTTL維持対象から外す"""
+        if self._expiries.pop(lease_id, None) is not None:
+            get_lease_held().set(len(self._expiries), kind="expiry")
+
+    async def start(self) -> None:
+        """更新ループを開始"""
+        self._running = True
+        self._task = asyncio.create_task(self._renew_loop())
+        logger.info("リース更新開始", interval=self._interval)
+
+    async def stop(self) -> None:
+        """更新ループを停止"""
+        self._running = False
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        logger.info("リース更新停止")
+
+    async def _renew_loop(self) -> None:
+        """更新ループ本体"""
+        loop = asyncio.get_running_loop()
+        scheduled_at = loop.time() + self._interval
+        while self._running:
+            try:
+                await asyncio.sleep(max(0.0, scheduled_at - loop.time()))
+                await self.renew_once()
+                # 予定時刻から更新完了までの遅れ（イベントループ詰まり・Redis遅延）
+                get_lease_renewal_lag().observe(max(0.0, loop.time() - scheduled_at))
+            except asyncio.CancelledError:
+                break
+            except Exception as e:
+                logger.error("リース更新ループエラー", error=str(e))
+            scheduled_at = max(scheduled_at + self._interval, loop.time())
+
+    async def renew_once(self) -> None:
+        """保持中の全リースを1回のパイプラインで延長"""
+        locks = list(self._locks.items())
+        expiries = list(self._expiries.items())
+        if not locks and not expiries:
+            return
+
+        start = time.perf_counter()
+        try:
+            async with redis_client() as redis:
+                async with redis.pipeline(transaction=False) as pipe:
+                    for lock_key, lease in locks:
+                        pipe.eval(
+                            EXTEND_LOCK_SCRIPT,
+                            1,
+                            lock_key,
+                            lease.token,
+                            lease.ttl_ms,
+                        )
+                    for _, lease in expiries:
+                        for key in lease.keys:
+                            pipe.expire(key, lease.ttl)
+                    results = await pipe.execute()
+        except RedisError as e:
+            if locks:
+                get_lease_renewals().inc(kind="lock", result="error")
+            if expiries:
+                get_lease_renewals().inc(kind="expiry", result="error")
+            logger.warning(
+                "リース更新失敗（次回サイクルで再試行）",
+                locks=len(locks),
+                expiries=len(expiries),
+                error=str(e),
+            )
+            return
+
+        index = 0
+        for lock_key, lease in locks:
+            renewed = results[index] == 1
+            index += 1
+            get_lease_renewals().inc(kind="lock", result="renewed" if renewed else "lost")
+            if not renewed:
+                logger.warning(
+                    "ロック延長失敗（トークン不一致または期限切れ）",
+                    lock_key=lock_key,
+                )
+                self.release_lock(lock_key, lease.token)
+
+        for lease_id, lease in expiries:
+            key_results = results[index:index + len(lease.keys)]
+            index += len(lease.keys)
+            # 主キーが消えている場合はリソース破棄済みとみなす
+            alive = bool(key_results and key_results[0])
+            get_lease_renewals().inc(kind="expiry", result="renewed" if alive else "lost")
+            if not alive:
+                self.release_expiry(lease_id)
+
+        logger.debug(
+            "リース更新完了",
+            locks=len(locks),
+            expiries=len(expiries),
+            duration_ms=int((time.perf_counter() - start) * 1000),
+        )
+
+
+# プロセス内シングルトン
+_lease_renewer: LeaseRenewer | None = None
+
+
+def get_lease_renewer() -> LeaseRenewer:
+    """
+    リース更新機構を取得
+
+    Returns:
+        LeaseRenewer インスタンス
+    """
+    global _lease_renewer
+    if _lease_renewer is None:
+        _lease_renewer = LeaseRenewer(interval=get_settings().lease_renew_interval)
+    return _lease_renewer
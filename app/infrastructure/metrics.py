@@ -295,6 +295,61 @@ def get_s3_operations() -> Counter:
     )
 
 
+def get_s3_operation_duration() -> Histogram:
+    """S3操作の所要時間（同時実行数制限の待ち時間を含まない）"""
+    return get_metrics_registry().histogram(
+        "s3_operation_duration_seconds",
+        "S3 operation latency in seconds",
+        ["operation"],
+        buckets=[0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0],
+    )
+
+
+def get_s3_transfer_bytes() -> Counter:
+    """ワークスペース同期でS3と転送したバイト数"""
+    return get_metrics_registry().counter(
+        "s3_transfer_bytes_total",
+        "Total bytes transferred by S3 workspace sync",
+        ["operation"]
+    )
+
+
+def get_s3_object_cache_requests() -> Counter:
+    """S3オブジェクトキャッシュの参照数（result: hit / miss / coalesced / error）"""
+    return get_metrics_registry().counter(
+        "s3_object_cache_requests_total",
+        "Total S3 object cache lookups by result",
+        ["result"],
+    )
+
+
+def get_s3_object_cache_bytes_saved() -> Counter:
+    """S3オブジェクトキャッシュによって取得を省略したバイト数"""
+    return get_metrics_registry().counter(
+        "s3_object_cache_bytes_saved_total",
+        "Total bytes served from the S3 object cache instead of S3",
+        [],
+    )
+
+
+def get_s3_object_cache_bytes() -> Gauge:
+    """S3オブジェクトキャッシュのディスク使用量"""
+    return get_metrics_registry().gauge(
+        "s3_object_cache_bytes",
+        "Bytes stored in the S3 object cache",
+        [],
+    )
+
+
+def get_s3_object_cache_evictions() -> Counter:
+    """S3オブジェクトキャッシュから容量超過で削除したエントリ数"""
+    return get_metrics_registry().counter(
+        "s3_object_cache_evictions_total",
+        "Total S3 object cache entries evicted for exceeding the size limit",
+        [],
+    )
+
+
 def get_error_counter() -> Counter:
     """エラーカウンター"""
     return get_metrics_registry().counter(
@@ -378,6 +433,252 @@ def get_workspace_proxy_request_duration() -> Histogram:
     )
 
 
+def get_workspace_proxy_upstream_in_flight() -> Gauge:
+    """共有上流クライアントで処理中のリクエスト数（ホスト別）"""
+    return get_metrics_registry().gauge(
+        "workspace_proxy_upstream_in_flight",
+        "In-flight requests on the shared upstream client by host",
+        ["host"],
+    )
+
+
+def get_workspace_proxy_upstream_slot_wait() -> Histogram:
+    """上流ホストの同時リクエスト枠の待ち時間"""
+    return get_metrics_registry().histogram(
+        "workspace_proxy_upstream_slot_wait_seconds",
+        "Time spent waiting for a per-host upstream request slot",
+        [],
+        [0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0],
+    )
+
+
+def get_workspace_proxy_upstream_slot_timeouts() -> Counter:
+    """上流ホストの同時リクエスト枠を待機時間内に確保できず拒否した数"""
+    return get_metrics_registry().counter(
+        "workspace_proxy_upstream_slot_timeouts_total",
+        "Total requests rejected after waiting too long for a per-host upstream slot",
+        ["host"],
+    )
+
+
+def get_workspace_proxy_upstream_connections() -> Counter:
+    """共有上流クライアントの新規接続数（kind: tcp / tls）"""
+    return get_metrics_registry().counter(
+        "workspace_proxy_upstream_connections_total",
+        "Total new upstream connections (TCP connects and TLS handshakes) by host",
+        ["host", "kind"],
+    )
+
+
+def get_workspace_proxy_tunnels() -> Counter:
+    """終了したCONNECTトンネル数（mode: splice / stream、result: closed / idle_timeout）"""
+    return get_metrics_registry().counter(
+        "workspace_proxy_tunnels_total",
+        "Total finished CONNECT tunnels by relay mode and result",
+        ["mode", "result"],
+    )
+
+
+def get_workspace_proxy_tunnel_bytes() -> Counter:
+    """CONNECTトンネルの転送量（direction: upstream / downstream）"""
+    return get_metrics_registry().counter(
+        "workspace_proxy_tunnel_bytes_total",
+        "Total bytes relayed through CONNECT tunnels",
+        ["direction", "mode"],
+    )
+
+
+def get_workspace_proxy_egress_bytes() -> Counter:
+    """Proxy経由の転送量（path: bedrock / mcp / forward / connect / package、direction: upstream / downstream）"""
+    return get_metrics_registry().counter(
+        "workspace_proxy_egress_bytes_total",
+        "Total bytes relayed by the proxy per tenant and path",
+        ["tenant_id", "path", "direction"],
+    )
+
+
+def get_workspace_proxy_egress_throttled() -> Counter:
+    """帯域制限で転送を待たせた時間（秒）"""
+    return get_metrics_registry().counter(
+        "workspace_proxy_egress_throttled_seconds_total",
+        "Total seconds the proxy delayed transfers for egress bandwidth shaping",
+        ["tenant_id"],
+    )
+
+
+def get_workspace_bedrock_tokens() -> Counter:
+    """Proxyで計量したBedrockトークン数（type: input / output / cache_creation / cache_read）"""
+    return get_metrics_registry().counter(
+        "workspace_bedrock_tokens_total",
+        "Total Bedrock tokens metered by the proxy",
+        ["tenant_id", "model", "type"],
+    )
+
+
+def get_workspace_bedrock_budget_rejections() -> Counter:
+    """トークン予算超過で拒否したBedrock呼び出し数"""
+    return get_metrics_registry().counter(
+        "workspace_bedrock_budget_rejections_total",
+        "Total Bedrock calls rejected because the tenant token budget was exceeded",
+        ["tenant_id"],
+    )
+
+
+def get_workspace_bedrock_concurrency_limit() -> Gauge:
+    """Bedrock 同時実行上限（テナント×モデル、AIMD で調整）"""
+    return get_metrics_registry().gauge(
+        "workspace_bedrock_concurrency_limit",
+        "Adaptive Bedrock concurrency limit per tenant and model",
+        ["tenant_id", "model"],
+    )
+
+
+def get_workspace_bedrock_concurrency_in_flight() -> Gauge:
+    """枠確保時点の Bedrock 同時実行数（全レプリカ合計）"""
+    return get_metrics_registry().gauge(
+        "workspace_bedrock_concurrency_in_flight",
+        "Bedrock calls in flight across replicas when the last slot was acquired",
+        ["tenant_id", "model"],
+    )
+
+
+def get_workspace_bedrock_concurrency_wait() -> Histogram:
+    """Bedrock 同時実行枠の待ち時間"""
+    return get_metrics_registry().histogram(
+        "workspace_bedrock_concurrency_wait_seconds",
+        "Time Bedrock calls waited for a concurrency slot",
+        ["tenant_id", "model"],
+        [0.01, 0.05, 0.1, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0],
+    )
+
+
+def get_workspace_bedrock_concurrency_rejections() -> Counter:
+    """同時実行枠の待機時間超過で拒否した Bedrock 呼び出し数"""
+    return get_metrics_registry().counter(
+        "workspace_bedrock_concurrency_rejections_total",
+        "Total Bedrock calls rejected after waiting too long for a concurrency slot",
+        ["tenant_id", "model"],
+    )
+
+
+def get_workspace_bedrock_region_requests() -> Counter:
+    """Bedrock リージョン別の試行数（result: ok / throttled / error / transport_error）"""
+    return get_metrics_registry().counter(
+        "workspace_bedrock_region_requests_total",
+        "Total Bedrock reverse proxy attempts by region and result",
+        ["region", "result"],
+    )
+
+
+def get_workspace_bedrock_region_latency() -> Gauge:
+    """Bedrock リージョン×リクエストサイズ区分別のレスポンスヘッダー受信までの時間（EWMA、秒）"""
+    return get_metrics_registry().gauge(
+        "workspace_bedrock_region_latency_seconds",
+        "Smoothed time to response headers per Bedrock region and request size class",
+        ["region", "size_class"],
+    )
+
+
+def get_workspace_bedrock_region_failovers() -> Counter:
+    """レスポンス送信前に別リージョンへ切り替えた回数（region: 切り替え元）"""
+    return get_metrics_registry().counter(
+        "workspace_bedrock_region_failovers_total",
+        "Total Bedrock requests retried in another region before streaming",
+        ["region"],
+    )
+
+
+def get_workspace_bedrock_cache_checkpoints() -> Counter:
+    """Proxyが Bedrock リクエストに追加したプロンプトキャッシュのチェックポイント数"""
+    return get_metrics_registry().counter(
+        "workspace_bedrock_cache_checkpoints_total",
+        "Total prompt cache checkpoints injected into Bedrock requests by the proxy",
+        ["tenant_id"],
+    )
+
+
+def get_workspace_bedrock_time_to_first_token() -> Histogram:
+    """Bedrock ストリーミング応答の最初のテキスト差分までの時間（prompt_cache: injected / none）"""
+    return get_metrics_registry().histogram(
+        "workspace_bedrock_time_to_first_token_seconds",
+        "Time from proxy request start to the first streamed content delta",
+        ["prompt_cache"],
+        [0.25, 0.5, 1.0, 1.5, 2.0, 3.0, 5.0, 7.5, 10.0, 20.0, 30.0],
+    )
+
+
+def get_workspace_proxy_dns_lookups() -> Counter:
+    """Proxy DNSキャッシュの参照数（result: hit / stale / miss / negative）"""
+    return get_metrics_registry().counter(
+        "workspace_proxy_dns_lookups_total",
+        "Total proxy DNS cache lookups by result",
+        ["result"],
+    )
+
+
+def get_workspace_proxy_dns_evictions() -> Counter:
+    """Proxy DNSキャッシュのエントリ数上限による追い出し数"""
+    return get_metrics_registry().counter(
+        "workspace_proxy_dns_evictions_total",
+        "Total proxy DNS cache entries evicted by the entry limit",
+    )
+
+
+def get_workspace_proxy_dns_resolution_duration() -> Histogram:
+    """Proxy DNS解決（キャッシュミス・再解決）の所要時間"""
+    return get_metrics_registry().histogram(
+        "workspace_proxy_dns_resolution_duration_seconds",
+        "Proxy DNS resolution duration in seconds",
+        ["result"],
+        [0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 5.0],
+    )
+
+
+def get_workspace_proxy_mcp_cache_requests() -> Counter:
+    """MCPレスポンスキャッシュ対象の GET 数（result: hit / revalidated / miss / uncacheable）"""
+    return get_metrics_registry().counter(
+        "workspace_proxy_mcp_cache_requests_total",
+        "Total cacheable MCP GET requests by server and result",
+        ["server", "result"],
+    )
+
+
+def get_workspace_proxy_mcp_cache_bytes() -> Gauge:
+    """MCPレスポンスキャッシュのメモリ使用量"""
+    return get_metrics_registry().gauge(
+        "workspace_proxy_mcp_cache_bytes",
+        "Bytes stored in the MCP response cache",
+        [],
+    )
+
+
+def get_workspace_package_cache_requests() -> Counter:
+    """パッケージキャッシュのリクエスト数（result: hit / miss / stale / error / checksum_mismatch）"""
+    return get_metrics_registry().counter(
+        "workspace_package_cache_requests_total",
+        "Total package cache requests by ecosystem and result",
+        ["ecosystem", "result"],
+    )
+
+
+def get_workspace_package_cache_bytes() -> Gauge:
+    """パッケージキャッシュのディスク使用量"""
+    return get_metrics_registry().gauge(
+        "workspace_package_cache_bytes",
+        "Bytes stored in the package cache",
+        [],
+    )
+
+
+def get_workspace_package_cache_evictions() -> Counter:
+    """パッケージキャッシュから容量超過で削除したエントリ数"""
+    return get_metrics_registry().counter(
+        "workspace_package_cache_evictions_total",
+        "Total package cache entries evicted for exceeding the size limit",
+        [],
+    )
+
+
 def get_workspace_warm_pool_acquire() -> Histogram:
     """WarmPool取得時間"""
     return get_metrics_registry().histogram(
@@ -421,6 +722,24 @@ def get_workspace_proxy_blocked() -> Counter:
     )
 
 
+def get_workspace_proxy_connection_requests() -> Counter:
+    """Proxy接続上で処理したリクエスト数（new: 新規接続の初回 / reused: keep-alive再利用）"""
+    return get_metrics_registry().counter(
+        "workspace_proxy_connection_requests_total",
+        "Total proxy requests by client connection reuse",
+        ["connection"],
+    )
+
+
+def get_workspace_proxy_oversized_responses() -> Counter:
+    """サイズ上限超過で拒否・中断したProxyレスポンス数"""
+    return get_metrics_registry().counter(
+        "workspace_proxy_oversized_responses_total",
+        "Total proxy responses rejected for exceeding the size limit",
+        ["path"],
+    )
+
+
 def get_workspace_warm_pool_exhausted() -> Counter:
     """WarmPool枯渇回数"""
     return get_metrics_registry().counter(
@@ -437,6 +756,15 @@ def get_workspace_seccomp_violations() -> Counter:
     )
 
 
+def get_workspace_container_reservations() -> Counter:
+    """コンテナ先行確保数（reserved / claimed / released / skipped / failed）"""
+    return get_metrics_registry().counter(
+        "workspace_container_reservations_total",
+        "Total container reservations by result",
+        ["result"],
+    )
+
+
 def get_workspace_gc_cycles() -> Counter:
     """GCサイクル数"""
     return get_metrics_registry().counter(
@@ -444,3 +772,78 @@ def get_workspace_gc_cycles() -> Counter:
         "Total GC cycles",
         ["result"],
     )
+
+
+# ============================================
+# 実行パイプライン メトリクス
+# ============================================
+
+
+def get_execution_outbox_jobs() -> Counter:
+    """実行後処理アウトボックスのジョブ処理数"""
+    return get_metrics_registry().counter(
+        "execution_outbox_jobs_total",
+        "Total execution outbox jobs processed",
+        ["kind", "status"],
+    )
+
+
+def get_execution_outbox_pending() -> Gauge:
+    """実行後処理アウトボックスの未処理ジョブ数"""
+    return get_metrics_registry().gauge(
+        "execution_outbox_pending",
+        "Number of pending execution outbox jobs",
+    )
+
+
+def get_execution_phase_duration() -> Histogram:
+    """エージェント実行フェーズ別所要時間"""
+    return get_metrics_registry().histogram(
+        "execution_phase_duration_seconds",
+        "Agent execution phase duration in seconds",
+        ["phase"],
+        [0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0],
+    )
+
+
+def get_sse_event_queue_depth() -> Gauge:
+    """SSEイベントキューに滞留しているイベント数（全ストリーム合計）"""
+    return get_metrics_registry().gauge(
+        "sse_event_queue_depth",
+        "Number of events buffered in SSE event queues",
+    )
+
+
+def get_sse_events_coalesced() -> Counter:
+    """SSE送信前に結合・破棄されたイベント数"""
+    return get_metrics_registry().counter(
+        "sse_events_coalesced_total",
+        "Total SSE events merged into a preceding frame",
+        ["event_type"],
+    )
+
+
+def get_lease_held() -> Gauge:
+    """リース更新機構が保持しているリース数（lock / expiry）"""
+    return get_metrics_registry().gauge(
+        "lease_held",
+        "Number of leases held by the background renewer",
+        ["kind"],
+    )
+
+
+def get_lease_renewals() -> Counter:
+    """リース更新結果（renewed / lost / error）"""
+    return get_metrics_registry().counter(
+        "lease_renewals_total",
+        "Total lease renewals by kind and result",
+        ["kind", "result"],
+    )
+
+
+def get_lease_renewal_lag() -> Histogram:
+    """リース更新の予定時刻からの遅れ"""
+    return get_metrics_registry().histogram(
+        "lease_renewal_lag_seconds",
+        "Delay between scheduled and completed lease renewal in seconds",
+    )
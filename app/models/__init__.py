@@ -5,6 +5,7 @@ SQLAlchemyモデル定義
 from app.models.agent_skill import AgentSkill
 from app.models.conversation import Conversation
 from app.models.conversation_file import ConversationFile
+from app.models.execution_outbox import ExecutionOutbox
 from app.models.mcp_server import McpServer
 from app.models.message_log import MessageLog
 from app.models.model import Model
@@ -24,6 +25,7 @@ __all__ = [
     "MessageLog",
     "UsageLog",
     "ToolExecutionLog",
+    "ExecutionOutbox",
     "SimpleChat",
     "SimpleChatMessage",
 ]
@@ -0,0 +1,72 @@
+"""
+実行後処理アウトボックステーブル
+エージェント実行完了後の永続化処理（使用量記録、メッセージログ保存、
+削除した会話のS3ファイル削除）をトランザクショナルアウトボックスとして保持する
+"""
+from datetime import datetime
+
+from sqlalchemy import BigInteger, DateTime, Index, Integer, String, Text, func
+from sqlalchemy.dialects.postgresql import JSON, UUID
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.database import Base
+
+
+class ExecutionOutbox(Base):
+    """
+    実行後処理アウトボックステーブル
+
+    実行リクエストと同一トランザクションでジョブを登録し、
+    会話ロック解放後にワーカーが非同期に処理する。
+    """
+    __tablename__ = "execution_outbox"
+
+    # アウトボックスID（登録順 = 処理順）
+    outbox_id: Mapped[int] = mapped_column(
+        BigInteger, primary_key=True, autoincrement=True
+    )
+
+    # ジョブ種別: "usage" | "assistant_message" | "workspace_delete"
+    kind: Mapped[str] = mapped_column(String(50), nullable=False)
+
+    # テナントID
+    tenant_id: Mapped[str] = mapped_column(String(100), nullable=False)
+
+    # 会話ID（会話単位の順序保証に使用）
+    conversation_id: Mapped[str] = mapped_column(
+        UUID(as_uuid=False), nullable=False, index=True
+    )
+
+    # ジョブ内容（JSON）
+    payload: Mapped[dict] = mapped_column(JSON, nullable=False)
+
+    # ステータス: "pending" | "failed"（完了したジョブは削除する）
+    status: Mapped[str] = mapped_column(
+        String(20), nullable=False, default="pending"
+    )
+
+    # 試行回数
+    attempts: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+
+    # 最終エラー
+    last_error: Mapped[str | None] = mapped_column(Text, nullable=True)
+
+    # 次回処理可能時刻（リトライのバックオフ用）
+    available_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), server_default=func.now()
+    )
+
+    # タイムスタンプ
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), server_default=func.now()
+    )
+    processed_at: Mapped[datetime | None] = mapped_column(
+        DateTime(timezone=True), nullable=True
+    )
+
+    __table_args__ = (
+        Index("ix_execution_outbox_status_available_at", "status", "available_at"),
+    )
+
+    def __repr__(self) -> str:
+        return f"<ExecutionOutbox(outbox_id={self.outbox_id}, kind={self.kind}, status={self.status})>"
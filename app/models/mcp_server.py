@@ -5,7 +5,7 @@ MCPサーバー定義テーブル
 from datetime import datetime
 from uuid import uuid4
 
-from sqlalchemy import DateTime, String, Text, func
+from sqlalchemy import DateTime, Integer, String, Text, func
 from sqlalchemy.dialects.postgresql import JSON, UUID
 from sqlalchemy.orm import Mapped, mapped_column
 
@@ -55,6 +55,14 @@ class McpServer(Base):
     # 仕様のserversセクションを上書き
     openapi_base_url: Mapped[str | None] = mapped_column(String(500), nullable=True)
 
+    # GETレスポンスのキャッシュ有効期間（秒）。NULL・0でキャッシュしない
+    # Cache-Control の max-age がこれより短い場合はそちらを優先
+    response_cache_ttl: Mapped[int | None] = mapped_column(Integer, nullable=True)
+
+    # キャッシュキーに含めるリクエストヘッダー（JSON配列）
+    # 例: ["Accept-Language"]
+    response_cache_vary_headers: Mapped[list | None] = mapped_column(JSON, nullable=True)
+
     # ステータス (active / inactive)
     status: Mapped[str] = mapped_column(
         String(20), nullable=False, default="active"
@@ -4,7 +4,7 @@
 """
 from datetime import datetime
 
-from sqlalchemy import DateTime, ForeignKey, String, Text, func
+from sqlalchemy import Boolean, DateTime, ForeignKey, String, Text, func
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from app.database import Base
@@ -30,6 +30,11 @@ class Tenant(Base):
         nullable=True,
     )
 
+    # Bedrock リクエストへのプロンプトキャッシュチェックポイント自動追加（Proxyで適用）
+    prompt_cache_injection: Mapped[bool] = mapped_column(
+        Boolean, nullable=False, default=False, server_default="false"
+    )
+
     # ステータス (active / inactive)
     status: Mapped[str] = mapped_column(
         String(20), nullable=False, default="active"
@@ -4,6 +4,7 @@
 """
 from app.repositories.base import BaseRepository
 from app.repositories.conversation_repository import ConversationRepository
+from app.repositories.execution_outbox_repository import ExecutionOutboxRepository
 from app.repositories.message_log_repository import MessageLogRepository
 from app.repositories.model_repository import ModelRepository
 from app.repositories.simple_chat_repository import (
@@ -19,6 +20,7 @@ from app.repositories.usage_repository import (
 __all__ = [
     "BaseRepository",
     "ConversationRepository",
+    "ExecutionOutboxRepository",
     "MessageLogRepository",
     "ModelRepository",
     "SimpleChatMessageRepository",
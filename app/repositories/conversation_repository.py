@@ -7,6 +7,7 @@ from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.models.conversation import Conversation
 from app.models.conversation_file import ConversationFile
+from app.models.execution_outbox import ExecutionOutbox
 from app.models.message_log import MessageLog
 from app.repositories.base import BaseRepository
 from app.utils.timezone import to_utc
@@ -102,5 +103,12 @@ class ConversationRepository(BaseRepository[Conversation]):
             )
         )
 
+        # 未処理の実行後処理ジョブを削除（削除済み会話への書き込みを防止）
+        await self.db.execute(
+            ExecutionOutbox.__table__.delete().where(
+                ExecutionOutbox.conversation_id == conversation_id
+            )
+        )
+
         await self.db.delete(conversation)
         return True
@@ -0,0 +1,121 @@
+"""
+実行後処理アウトボックスリポジトリ
+"""
+from datetime import datetime, timedelta, timezone
+from typing import Any
+
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.execution_outbox import ExecutionOutbox
+from app.repositories.base import BaseRepository
+
+
+class ExecutionOutboxRepository(BaseRepository[ExecutionOutbox]):
+    """実行後処理アウトボックスのデータアクセス"""
+
+    def __init__(self, db: AsyncSession):
+        super().__init__(db, ExecutionOutbox, id_field="outbox_id")
+
+    async def enqueue(
+        self,
+        kind: str,
+        tenant_id: str,
+        conversation_id: str,
+        payload: dict[str, Any],
+    ) -> ExecutionOutbox:
+        """ジョブを登録（コミットは呼び出し元のトランザクションで行う）"""
+        entry = ExecutionOutbox(
+            kind=kind,
+            tenant_id=tenant_id,
+            conversation_id=conversation_id,
+            payload=payload,
+            status="pending",
+            attempts=0,
+        )
+        self.db.add(entry)
+        await self.db.flush()
+        return entry
+
+    async def claim_pending(self, limit: int) -> list[ExecutionOutbox]:
+        """
+        処理可能なジョブを取得して行ロック
+
+        FOR UPDATE SKIP LOCKED により、複数ワーカー（複数バックエンドインスタンス）が
+        同じジョブを重複処理しない。
+        """
+        query = (
+            select(ExecutionOutbox)
+            .where(
+                ExecutionOutbox.status == "pending",
+                ExecutionOutbox.available_at <= func.now(),
+            )
+            .order_by(ExecutionOutbox.outbox_id)
+            .limit(limit)
+            .with_for_update(skip_locked=True)
+        )
+        result = await self.db.execute(query)
+        return list(result.scalars().all())
+
+    async def claim_by_conversation(
+        self, conversation_id: str
+    ) -> list[ExecutionOutbox]:
+        """
+        会話の未処理ジョブを取得して行ロック
+
+        ワーカーが処理中の行はロック解放まで待機する（SKIP LOCKEDなし）。
+        バックオフ待ちのジョブも含めて登録順に返す。
+        """
+        query = (
+            select(ExecutionOutbox)
+            .where(
+                ExecutionOutbox.conversation_id == conversation_id,
+                ExecutionOutbox.status == "pending",
+            )
+            .order_by(ExecutionOutbox.outbox_id)
+            .with_for_update()
+        )
+        result = await self.db.execute(query)
+        return list(result.scalars().all())
+
+    async def count_pending(self) -> int:
+        """未処理ジョブ数をカウント"""
+        query = (
+            select(func.count())
+            .select_from(ExecutionOutbox)
+            .where(ExecutionOutbox.status == "pending")
+        )
+        result = await self.db.execute(query)
+        return result.scalar() or 0
+
+    async def delete_done(self, entry: ExecutionOutbox) -> None:
+        """
+        完了したジョブを削除
+
+        完了行を残すとテーブルがターンごとに増え続けるため、処理と同じ
+        トランザクションで削除する（調査用に残すのは failed のみ）。
+        """
+        await self.db.delete(entry)
+
+    @staticmethod
+    def mark_failed(
+        entry: ExecutionOutbox,
+        error: str,
+        max_attempts: int,
+        backoff_seconds: float,
+    ) -> None:
+        """
+        ジョブの失敗を記録
+
+        試行回数が上限に達した場合は failed に遷移し、
+        それ以外は指数バックオフ後に再処理可能にする。
+        """
+        entry.attempts += 1
+        entry.last_error = error[:2000]
+        now = datetime.now(timezone.utc)
+        if entry.attempts >= max_attempts:
+            entry.status = "failed"
+            entry.processed_at = now
+        else:
+            delay = backoff_seconds * (2 ** (entry.attempts - 1))
+            entry.available_at = now + timedelta(seconds=delay)
@@ -75,3 +75,12 @@ class ConversationCreateRequest(BaseModel):
     user_id: str = Field(..., description="ユーザーID")
     model_id: str | None = Field(None, description="モデルID（省略時はテナントのデフォルト）")
     workspace_enabled: bool = Field(default=True, description="ワークスペースを有効にするか")
+
+
+class ConversationPrepareResponse(BaseModel):
+    """会話実行準備レスポンス"""
+
+    conversation_id: str
+    container_status: str = Field(
+        ..., description="コンテナ状態（reserved: 確保中/確保済み、ready/idle/running: 割り当て済み）"
+    )
@@ -30,6 +30,16 @@ class McpServerBase(BaseModel):
         description="OpenAPI APIのベースURL。仕様のserversセクションを上書き",
         max_length=500,
     )
+    response_cache_ttl: int | None = Field(
+        None,
+        description="GETレスポンスのキャッシュ有効期間（秒）。未指定・0でキャッシュしない",
+        ge=0,
+        le=86400,
+    )
+    response_cache_vary_headers: list[str] | None = Field(
+        None,
+        description="キャッシュキーに含めるリクエストヘッダー（例: ['Accept-Language']）",
+    )
 
 
 class McpServerCreate(McpServerBase):
@@ -51,6 +61,8 @@ class McpServerUpdate(BaseModel):
     description: str | None = None
     openapi_spec: dict[str, Any] | None = None
     openapi_base_url: str | None = Field(None, max_length=500)
+    response_cache_ttl: int | None = Field(None, ge=0, le=86400)
+    response_cache_vary_headers: list[str] | None = None
     status: str | None = Field(None, pattern="^(active|inactive)$")
 
 
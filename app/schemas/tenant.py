@@ -12,6 +12,10 @@ class TenantCreateRequest(BaseModel):
     tenant_id: str = Field(..., description="テナントID")
     system_prompt: str | None = Field(None, description="システムプロンプト")
     model_id: str | None = Field(None, description="デフォルトモデルID")
+    prompt_cache_injection: bool = Field(
+        False,
+        description="ツール定義・システムプロンプトの末尾にプロンプトキャッシュのチェックポイントを自動追加する",
+    )
 
 
 class TenantUpdateRequest(BaseModel):
@@ -19,6 +23,9 @@ class TenantUpdateRequest(BaseModel):
 
     system_prompt: str | None = Field(None, description="システムプロンプト")
     model_id: str | None = Field(None, description="デフォルトモデルID")
+    prompt_cache_injection: bool | None = Field(
+        None, description="プロンプトキャッシュのチェックポイントを自動追加する"
+    )
     status: str | None = Field(None, pattern="^(active|inactive)$", description="ステータス")
 
 
@@ -28,6 +35,7 @@ class TenantResponse(BaseModel):
     tenant_id: str
     system_prompt: str | None = None
     model_id: str | None = None
+    prompt_cache_injection: bool = False
     status: str
     created_at: datetime
     updated_at: datetime
@@ -7,6 +7,7 @@ import logging
 from pathlib import Path
 
 from app.config import get_settings
+from app.services.proxy.package_cache import PACKAGE_CACHE_BASE_URL
 
 logger = logging.getLogger(__name__)
 
@@ -42,6 +43,16 @@ def _load_seccomp_profile(path: str) -> str | None:
     return _seccomp_json_cache
 
 
+def _package_cache_env(settings) -> list[str]:
+    """pip / npm の取得先をProxyのパッケージキャッシュに向ける環境変数"""
+    if not settings.proxy_package_cache_enabled:
+        return []
+    return [
+        f"PIP_INDEX_URL={PACKAGE_CACHE_BASE_URL}/pypi/simple/",
+        f"npm_config_registry={PACKAGE_CACHE_BASE_URL}/npm/",
+    ]
+
+
 def get_container_create_config(container_id: str) -> dict:
     """
     コンテナ作成用Docker API設定を生成
@@ -85,6 +96,7 @@ def get_container_create_config(container_id: str) -> dict:
             # CLIバイナリ (standalone ELF) の基本環境変数
             "HOME=/home/appuser",
             "CLAUDE_CONFIG_DIR=/home/appuser/.claude",
+            *_package_cache_env(settings),
         ],
         "User": "1000:1000",
         "Labels": {
@@ -129,9 +141,11 @@ def get_container_create_config(container_id: str) -> dict:
 # Redis キープレフィックス
 REDIS_KEY_CONTAINER = "workspace:container"  # workspace:container:{conversation_id}
 REDIS_KEY_CONTAINER_REVERSE = "workspace:container_reverse"  # workspace:container_reverse:{container_id} → conversation_id
+REDIS_KEY_CONTAINER_ALLOCATING = "workspace:container_allocating"  # workspace:container_allocating:{conversation_id} → 割り当て中のトークン
 REDIS_KEY_WARM_POOL = "workspace:warm_pool"  # List
 REDIS_KEY_WARM_POOL_INFO = "workspace:warm_pool_info"  # workspace:warm_pool_info:{container_id}
 
 # コンテナRedis TTL
 CONTAINER_TTL_SECONDS = 3600  # 1時間
+ALLOCATION_LOCK_TTL_SECONDS = 120  # 割り当て中ロック（割り当て中にプロセスが落ちた場合の解放時間）
 WARM_POOL_TTL_SECONDS = 1800  # 30分
@@ -33,12 +33,15 @@ class ContainerGarbageCollector:
         lifecycle: ContainerLifecycleManager,
         redis: Redis,
         proxy_stop_callback: Callable[[str], Awaitable[None]] | None = None,
+        reservation_release_callback: Callable[[ContainerInfo], Awaitable[None]] | None = None,
     ) -> None:
         self.lifecycle = lifecycle
         self.redis = redis
         self._settings = get_settings()
         # Orchestrator由来のProxy停止コールバック（BUG-12修正）
         self._proxy_stop_callback = proxy_stop_callback
+        # Orchestrator由来の未使用予約コンテナ返却コールバック
+        self._reservation_release_callback = reservation_release_callback
         self._running = False
         self._task: asyncio.Task | None = None
 
@@ -112,6 +115,22 @@ class ContainerGarbageCollector:
             if redis_data:
                 info = ContainerInfo.from_redis_hash(redis_data)
 
+                # 未使用のまま期限切れになった先行確保コンテナはWarmPoolに返却
+                if (
+                    self._reservation_release_callback
+                    and self._is_expired_reservation(info)
+                ):
+                    try:
+                        await self._reservation_release_callback(info)
+                        destroyed_count += 1
+                    except Exception as e:
+                        logger.warning(
+                            "GC: 予約コンテナ返却エラー",
+                            container_id=container_id,
+                            error=str(e),
+                        )
+                    continue
+
                 if self._should_destroy(info):
                     logger.info(
                         "GC: コンテナ破棄対象",
@@ -150,6 +169,13 @@ class ContainerGarbageCollector:
         if destroyed_count > 0:
             logger.info("GCサイクル完了", destroyed=destroyed_count)
 
+    def _is_expired_reservation(self, info: ContainerInfo) -> bool:
+        """先行確保されたまま実行に使われず予約期限を超えたか判定"""
+        if info.status != ContainerStatus.RESERVED:
+            return False
+        reservation_ttl = timedelta(seconds=self._settings.container_reservation_ttl)
+        return (datetime.now(timezone.utc) - info.last_active_at) > reservation_ttl
+
     def _should_destroy(self, info: ContainerInfo) -> bool:
         """コンテナを破棄すべきかどうか判定"""
         now = datetime.now(timezone.utc)
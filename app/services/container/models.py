@@ -10,6 +10,7 @@ class ContainerStatus(str, Enum):
     """コンテナの状態"""
 
     WARM = "warm"  # WarmPool待機中
+    RESERVED = "reserved"  # 会話作成時に先行確保済み、初回実行待ち
     READY = "ready"  # 会話に割り当て済み、実行待ち
     RUNNING = "running"  # リクエスト実行中
     IDLE = "idle"  # 実行完了、アイドル状態
@@ -3,6 +3,7 @@ Container Orchestrator
 会話ごとのコンテナ管理を統括する中心モジュール
 
 フロー:
+  0. （任意）会話作成時に reserve() でコンテナを先行確保
   1. リクエスト受信
   2. Redis: conversation_id → container検索
      ├─ 存在 → TTLリセット → Unix Socket経由でリクエスト転送
@@ -18,6 +19,7 @@ Container Orchestrator
 """
 import asyncio
 import time
+import uuid
 from collections.abc import AsyncIterator
 from datetime import datetime, timezone
 
@@ -31,26 +33,36 @@ from app.infrastructure.audit_log import (
     audit_container_created,
     audit_container_destroyed,
 )
+from app.infrastructure.lease_renewer import get_lease_renewer
 from app.infrastructure.metrics import (
     get_workspace_active_containers,
     get_workspace_container_crashes,
+    get_workspace_container_reservations,
     get_workspace_container_startup,
     get_workspace_requests_total,
 )
 from app.services.container.config import (
+    ALLOCATION_LOCK_TTL_SECONDS,
     CONTAINER_TTL_SECONDS,
     REDIS_KEY_CONTAINER,
+    REDIS_KEY_CONTAINER_ALLOCATING,
     REDIS_KEY_CONTAINER_REVERSE,
 )
 from app.services.container.lifecycle import ContainerLifecycleManager
 from app.services.container.models import ContainerInfo, ContainerStatus
 from app.services.container.warm_pool import WarmPoolManager
+from app.services.proxy.concurrency_limiter import create_concurrency_limiter
 from app.services.proxy.credential_proxy import (
     CredentialInjectionProxy,
     McpHeaderRule,
     ProxyConfig,
 )
-from app.services.proxy.sigv4 import AWSCredentials
+from app.services.proxy.domain_whitelist import get_domain_whitelist
+from app.services.proxy.egress import ContainerEgress, create_container_egress
+from app.services.proxy.package_cache import get_package_cache
+from app.services.proxy.region_router import get_bedrock_region_router
+from app.services.proxy.sigv4 import AWSCredentials, get_sigv4_signer
+from app.services.proxy.token_meter import create_token_ledger
 from app.utils.streaming import (
     event_to_sse_bytes,
     format_container_recovered_event,
@@ -58,6 +70,37 @@ from app.utils.streaming import (
 
 logger = structlog.get_logger(__name__)
 
+# 先行確保コンテナの引き渡し（reserved → ready）をアトミックに行う
+# KEYS[1]: コンテナメタデータ, ARGV: 期待ステータス, 新ステータス, last_active_at
+CLAIM_RESERVATION_SCRIPT = """
+if redis.call("hget", KEYS[1], "status") ~= ARGV[1] then
+    return 0
+end
+redis.call("hset", KEYS[1], "status", ARGV[2], "last_active_at", ARGV[3])
+return 1
+"""
+
+# 未使用の先行確保コンテナのメタデータ削除をアトミックに行う（reserved の場合のみ）
+# KEYS[1]: コンテナメタデータ, KEYS[2]: 逆引きマッピング, ARGV[1]: 期待ステータス
+RELEASE_RESERVATION_SCRIPT = """
+if redis.call("hget", KEYS[1], "status") ~= ARGV[1] then
+    return 0
+end
+redis.call("del", KEYS[1], KEYS[2])
+return 1
+"""
+
+# 割り当て中ロックの解放（トークンが一致する場合のみ）
+RELEASE_ALLOCATION_SCRIPT = """
+if redis.call("get", KEYS[1]) == ARGV[1] then
+    return redis.call("del", KEYS[1])
+end
+return 0
+"""
+
+# 他プロセスの割り当て完了を待つ際のポーリング間隔（秒）
+_ALLOCATION_POLL_INTERVAL = 0.1
+
 
 class ContainerOrchestrator:
     """コンテナオーケストレーター"""
@@ -72,6 +115,8 @@ class ContainerOrchestrator:
         self.warm_pool = warm_pool
         self.redis = redis
         self._proxies: dict[str, CredentialInjectionProxy] = {}
+        # 進行中のコンテナ先行確保タスク（conversation_id → Task）
+        self._reservations: dict[str, asyncio.Task] = {}
         self._settings = get_settings()
 
     async def get_or_create(self, conversation_id: str) -> ContainerInfo:
@@ -84,8 +129,15 @@ class ContainerOrchestrator:
         Returns:
             コンテナ情報
         """
-        # Redis から既存コンテナを検索
+        # 先行確保が進行中の場合は完了を待って引き継ぐ（二重割り当て防止）
+        pending = self._reservations.get(conversation_id)
+        if pending:
+            await asyncio.wait([pending])
+
+        # Redis から既存コンテナを検索（先行確保済みならGCの返却と競合しないよう先に引き渡す）
         existing = await self._get_container_from_redis(conversation_id)
+        if existing:
+            existing = await self._claim_reservation(existing)
         if existing and await self.lifecycle.is_healthy(existing.id):
             existing.touch()
             await self._update_redis(existing)
@@ -105,11 +157,172 @@ class ContainerOrchestrator:
             )
             await self._cleanup_container(existing)
 
-        # WarmPoolからコンテナ取得
+        info = await self._allocate_exclusive(
+            conversation_id, ContainerStatus.READY, wait=True
+        )
+        if info.status == ContainerStatus.RESERVED:
+            # 待機中に他プロセスが先行確保した → 引き渡し・ヘルスチェックからやり直す
+            return await self.get_or_create(conversation_id)
+        return info
+
+    async def reserve(self, conversation_id: str) -> ContainerStatus:
+        """
+        会話用コンテナをバックグラウンドで先行確保
+
+        WarmPool取得・Proxy起動・Redis登録を初回実行前に済ませ、
+        初回の get_or_create() で予約済みコンテナを引き渡す。
+        未使用のまま container_reservation_ttl を超えた予約はGCがWarmPoolに返却する。
+
+        Args:
+            conversation_id: 会話ID
+
+        Returns:
+            割り当て済みの場合はそのステータス、確保を開始した場合は RESERVED
+        """
+        existing = await self._get_container_from_redis(conversation_id)
+        if existing:
+            return existing.status
+
+        if conversation_id not in self._reservations:
+            task = asyncio.create_task(self._reserve(conversation_id))
+            self._reservations[conversation_id] = task
+            task.add_done_callback(
+                lambda _: self._reservations.pop(conversation_id, None)
+            )
+        return ContainerStatus.RESERVED
+
+    async def _reserve(self, conversation_id: str) -> None:
+        """コンテナ先行確保の本体（エラーはログのみ）"""
+        try:
+            info = await self._allocate_exclusive(
+                conversation_id, ContainerStatus.RESERVED, wait=False
+            )
+            if info is None:
+                # 他プロセスが割り当て中または割り当て済み
+                get_workspace_container_reservations().inc(result="skipped")
+                return
+            get_workspace_container_reservations().inc(result="reserved")
+        except Exception as e:
+            get_workspace_container_reservations().inc(result="failed")
+            logger.warning(
+                "コンテナ先行確保失敗（初回実行時に割り当て）",
+                conversation_id=conversation_id,
+                error=str(e),
+            )
+
+    async def release_reservation(self, info: ContainerInfo) -> None:
+        """
+        未使用の先行確保コンテナをWarmPoolに返却
+
+        ステータス確認とメタデータ削除はアトミックに行い、実行に引き渡し済み
+        （ステータスが reserved 以外）の場合は何もしない。
+
+        Args:
+            info: 先行確保済みコンテナ情報
+        """
+        released = await self.redis.eval(
+            RELEASE_RESERVATION_SCRIPT,
+            2,
+            f"{REDIS_KEY_CONTAINER}:{info.conversation_id}",
+            f"{REDIS_KEY_CONTAINER_REVERSE}:{info.id}",
+            ContainerStatus.RESERVED.value,
+        )
+        if not released:
+            return
+
+        await self._stop_proxy(info.id)
+        get_workspace_active_containers().dec()
+
+        returned = await self.warm_pool.release(info)
+        get_workspace_container_reservations().inc(result="released")
+        logger.info(
+            "未使用の先行確保コンテナを解放",
+            container_id=info.id,
+            conversation_id=info.conversation_id,
+            returned_to_pool=returned,
+        )
+
+    async def _claim_reservation(self, info: ContainerInfo) -> ContainerInfo | None:
+        """
+        先行確保コンテナを実行用に引き渡す（reserved 以外はそのまま返す）
+
+        reserved → ready の遷移はアトミックに行う。他の処理が先に遷移させた場合
+        （GCによる返却・別プロセスによる引き渡し）はRedisの最新状態を返す。
+
+        Returns:
+            コンテナ情報（GCに返却済みの場合はNone）
+        """
+        while info is not None and info.status == ContainerStatus.RESERVED:
+            claimed = await self.redis.eval(
+                CLAIM_RESERVATION_SCRIPT,
+                1,
+                f"{REDIS_KEY_CONTAINER}:{info.conversation_id}",
+                ContainerStatus.RESERVED.value,
+                ContainerStatus.READY.value,
+                datetime.now(timezone.utc).isoformat(),
+            )
+            if claimed:
+                info.status = ContainerStatus.READY
+                get_workspace_container_reservations().inc(result="claimed")
+                logger.info(
+                    "先行確保コンテナを引き渡し",
+                    container_id=info.id,
+                    conversation_id=info.conversation_id,
+                )
+                return info
+            info = await self._get_container_from_redis(info.conversation_id)
+        return info
+
+    async def _allocate_exclusive(
+        self, conversation_id: str, status: ContainerStatus, wait: bool
+    ) -> ContainerInfo | None:
+        """
+        会話単位の割り当て中ロック（SET NX）の下でコンテナを割り当てる
+
+        複数ワーカー・レプリカが同じ会話に同時に割り当ててRedisのマッピングを
+        上書きし、コンテナとProxyがリークするのを防ぐ。
+
+        Args:
+            conversation_id: 会話ID
+            status: 割り当て時のステータス
+            wait: True の場合は他プロセスの割り当て完了を待ち、その割り当てを返す。
+                False の場合は他プロセスが割り当て中・割り当て済みなら None を返す。
+
+        Raises:
+            TimeoutError: 他プロセスの割り当てが ALLOCATION_LOCK_TTL_SECONDS 内に終わらない
+        """
+        lock_key = f"{REDIS_KEY_CONTAINER_ALLOCATING}:{conversation_id}"
+        token = uuid.uuid4().hex
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + ALLOCATION_LOCK_TTL_SECONDS
+        while not await self.redis.set(
+            lock_key, token, nx=True, ex=ALLOCATION_LOCK_TTL_SECONDS
+        ):
+            if not wait:
+                return None
+            if loop.time() >= deadline:
+                raise TimeoutError(
+                    f"コンテナ割り当て待機がタイムアウトしました: {conversation_id}"
+                )
+            await asyncio.sleep(_ALLOCATION_POLL_INTERVAL)
+
+        try:
+            # ロック待ちの間に他プロセスが割り当て済みの場合はそれを使う
+            existing = await self._get_container_from_redis(conversation_id)
+            if existing:
+                return existing if wait else None
+            return await self._allocate(conversation_id, status)
+        finally:
+            await self.redis.eval(RELEASE_ALLOCATION_SCRIPT, 1, lock_key, token)
+
+    async def _allocate(
+        self, conversation_id: str, status: ContainerStatus
+    ) -> ContainerInfo:
+        """WarmPoolからコンテナを取得し、Proxy起動・Redis登録まで行う"""
         startup_start = time.perf_counter()
         info = await self.warm_pool.acquire()
         info.conversation_id = conversation_id
-        info.status = ContainerStatus.READY
+        info.status = status
         info.touch()
 
         # Proxy起動
@@ -127,6 +340,7 @@ class ContainerOrchestrator:
             "コンテナ割り当て完了",
             container_id=info.id,
             conversation_id=conversation_id,
+            status=status.value,
             startup_seconds=round(startup_duration, 3),
         )
         audit_container_created(
@@ -137,6 +351,21 @@ class ContainerOrchestrator:
         )
         return info
 
+    async def get_assigned(self, conversation_id: str) -> ContainerInfo | None:
+        """
+        会話に割り当て済みのコンテナ情報をRedisから取得
+
+        get_or_create() と異なりヘルスチェック・TTL更新・新規割り当てを行わない。
+        実行完了直後など、割り当て済みであることが分かっている場面で使用する。
+
+        Args:
+            conversation_id: 会話ID
+
+        Returns:
+            コンテナ情報（未割り当て時はNone）
+        """
+        return await self._get_container_from_redis(conversation_id)
+
     async def execute(
         self,
         conversation_id: str,
@@ -164,6 +393,17 @@ class ContainerOrchestrator:
         info.touch()
         await self._update_redis(info)
 
+        # 実行中はリース更新機構がメタデータのTTLを維持する（出力のない長時間ツール実行対策）
+        lease_id = f"container:{conversation_id}"
+        get_lease_renewer().hold_expiry(
+            lease_id,
+            [
+                f"{REDIS_KEY_CONTAINER}:{conversation_id}",
+                f"{REDIS_KEY_CONTAINER_REVERSE}:{info.id}",
+            ],
+            CONTAINER_TTL_SECONDS,
+        )
+
         agent_socket = info.agent_socket
 
         try:
@@ -282,6 +522,7 @@ class ContainerOrchestrator:
         else:
             get_workspace_requests_total().inc(status="success")
         finally:
+            get_lease_renewer().release_expiry(lease_id)
             # 復旧済みの場合はget_or_createが既にRedisを更新済みなのでスキップ
             if not recovered:
                 info.status = ContainerStatus.IDLE
@@ -301,6 +542,10 @@ class ContainerOrchestrator:
         """全コンテナを破棄（シャットダウン時）"""
         logger.info("全コンテナ破棄開始")
 
+        # 進行中の先行確保を中止
+        for task in list(self._reservations.values()):
+            task.cancel()
+
         # 全Proxyを先に停止
         proxy_ids = list(self._proxies.keys())
         for proxy_id in proxy_ids:
@@ -335,8 +580,10 @@ class ContainerOrchestrator:
         except Exception as e:
             return f"<log capture failed: {e}>"
 
-    async def _start_proxy(self, info: ContainerInfo) -> None:
-        """コンテナ用Proxyを起動"""
+    async def _start_proxy(
+        self, info: ContainerInfo, egress: ContainerEgress | None = None
+    ) -> None:
+        """コンテナ用Proxyを起動（egress: 再起動時に引き継ぐ転送量の積算）"""
         aws_creds = AWSCredentials(
             access_key_id=self._settings.aws_access_key_id or "",
             secret_access_key=self._settings.aws_secret_access_key or "",
@@ -347,22 +594,59 @@ class ContainerOrchestrator:
             whitelist_domains=self._settings.proxy_domain_whitelist_list,
             aws_credentials=aws_creds,
             log_all_requests=self._settings.proxy_log_all_requests,
+            keepalive_timeout=self._settings.proxy_keepalive_timeout,
+            max_request_body_size=self._settings.proxy_max_request_body_size,
+            max_response_size=self._settings.proxy_max_response_size,
+            tunnel_idle_timeout=self._settings.proxy_tunnel_idle_timeout,
+            tunnel_splice=self._settings.proxy_tunnel_splice,
+            signer=get_sigv4_signer(),
+            whitelist=get_domain_whitelist(),
+            package_cache=(
+                get_package_cache() if self._settings.proxy_package_cache_enabled else None
+            ),
+            token_ledger=create_token_ledger(self.redis),
+            container_id=info.id,
+            region_router=get_bedrock_region_router(),
+            bedrock_max_attempts=self._settings.proxy_bedrock_max_attempts,
+            concurrency_limiter=create_concurrency_limiter(self.redis),
+            egress=egress or create_container_egress(info.id),
         )
         proxy = CredentialInjectionProxy(proxy_config, info.proxy_socket)
         await proxy.start()
         self._proxies[info.id] = proxy
 
-    async def _stop_proxy(self, container_id: str) -> None:
-        """コンテナ用Proxyを停止"""
+    async def _stop_proxy(self, container_id: str) -> ContainerEgress | None:
+        """コンテナ用Proxyを停止
+
+        Returns:
+            停止したProxyの転送量の積算（Proxyが未起動の場合はNone）
+        """
         proxy = self._proxies.pop(container_id, None)
         if proxy:
             await proxy.stop()
+            return proxy.config.egress
+        return None
 
     async def _restart_proxy(self, info: ContainerInfo) -> None:
-        """Proxyクラッシュ時の自動再起動"""
+        """Proxyクラッシュ時の自動再起動（転送量の積算は引き継ぐ）"""
         logger.warning("Proxy再起動", container_id=info.id)
-        await self._stop_proxy(info.id)
-        await self._start_proxy(info)
+        egress = await self._stop_proxy(info.id)
+        await self._start_proxy(info, egress=egress)
+
+    def bind_tenant(
+        self, container_id: str, tenant_id: str, prompt_cache_injection: bool = False
+    ) -> None:
+        """コンテナのプロキシにテナントを設定（テナント別ホワイトリスト・トークン予算を適用）
+
+        Args:
+            container_id: コンテナID
+            tenant_id: テナントID
+            prompt_cache_injection: Bedrock リクエストにキャッシュチェックポイントを追加するか
+        """
+        proxy = self._proxies.get(container_id)
+        if proxy:
+            proxy.update_whitelist(get_domain_whitelist(tenant_id))
+            proxy.update_tenant(tenant_id, prompt_cache_injection=prompt_cache_injection)
 
     def update_mcp_header_rules(
         self,
@@ -397,27 +681,31 @@ class ContainerOrchestrator:
     async def _save_to_redis(self, info: ContainerInfo) -> None:
         """コンテナ情報をRedisに保存"""
         key = f"{REDIS_KEY_CONTAINER}:{info.conversation_id}"
-        await self.redis.hset(key, mapping=info.to_redis_hash())
-        await self.redis.expire(key, CONTAINER_TTL_SECONDS)
         # 逆引きマッピング: container_id → conversation_id（GCが正しくコンテナを識別するため）
         reverse_key = f"{REDIS_KEY_CONTAINER_REVERSE}:{info.id}"
-        await self.redis.set(reverse_key, info.conversation_id, ex=CONTAINER_TTL_SECONDS)
+        async with self.redis.pipeline(transaction=False) as pipe:
+            pipe.hset(key, mapping=info.to_redis_hash())
+            pipe.expire(key, CONTAINER_TTL_SECONDS)
+            pipe.set(reverse_key, info.conversation_id, ex=CONTAINER_TTL_SECONDS)
+            await pipe.execute()
 
     async def _update_redis(self, info: ContainerInfo) -> None:
         """コンテナ情報をRedisで更新（TTLリセット含む）"""
         key = f"{REDIS_KEY_CONTAINER}:{info.conversation_id}"
-        await self.redis.hset(key, mapping={
-            "last_active_at": info.last_active_at.isoformat(),
-            "status": info.status.value,
-        })
-        await self.redis.expire(key, CONTAINER_TTL_SECONDS)
-        # 逆引きマッピングのTTLもリセット
+        # 逆引きマッピングのTTLもリセット（1往復で送信）
         reverse_key = f"{REDIS_KEY_CONTAINER_REVERSE}:{info.id}"
-        await self.redis.expire(reverse_key, CONTAINER_TTL_SECONDS)
+        async with self.redis.pipeline(transaction=False) as pipe:
+            pipe.hset(key, mapping={
+                "last_active_at": info.last_active_at.isoformat(),
+                "status": info.status.value,
+            })
+            pipe.expire(key, CONTAINER_TTL_SECONDS)
+            pipe.expire(reverse_key, CONTAINER_TTL_SECONDS)
+            await pipe.execute()
 
     async def _cleanup_container(self, info: ContainerInfo) -> None:
         """コンテナとProxy、Redisメタデータをクリーンアップ"""
-        await self._stop_proxy(info.id)
+        egress = await self._stop_proxy(info.id)
         try:
             await self.lifecycle.destroy_container(
                 info.id, grace_period=self._settings.container_grace_period
@@ -430,5 +718,7 @@ class ContainerOrchestrator:
         audit_container_destroyed(
             container_id=info.id,
             conversation_id=info.conversation_id,
+            tenant_id=egress.tenant_id if egress else "",
             reason="cleanup",
+            egress=egress.usage.as_dict() if egress else None,
         )
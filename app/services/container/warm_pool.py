@@ -26,7 +26,7 @@ from app.services.container.config import (
     WARM_POOL_TTL_SECONDS,
 )
 from app.services.container.lifecycle import ContainerLifecycleManager
-from app.services.container.models import ContainerInfo
+from app.services.container.models import ContainerInfo, ContainerStatus
 
 logger = structlog.get_logger(__name__)
 
@@ -199,6 +199,41 @@ class WarmPoolManager:
                     await asyncio.sleep(delay)
         return False
 
+    async def release(self, info: ContainerInfo) -> bool:
+        """
+        未使用のまま解放されたコンテナをプールに返却
+
+        先行確保されたが実行に使われなかったコンテナ向け。
+        プールが上限に達している場合や不健全な場合は破棄する。
+
+        Returns:
+            プールに返却した場合True
+        """
+        try:
+            current_size = await self.redis.llen(REDIS_KEY_WARM_POOL)
+            if current_size < self.max_size and await self.lifecycle.is_healthy(
+                info.id, check_agent=True
+            ):
+                info.conversation_id = ""
+                info.status = ContainerStatus.WARM
+                await self.redis.hset(
+                    f"{REDIS_KEY_WARM_POOL_INFO}:{info.id}",
+                    mapping=info.to_redis_hash(),
+                )
+                await self.redis.expire(
+                    f"{REDIS_KEY_WARM_POOL_INFO}:{info.id}",
+                    WARM_POOL_TTL_SECONDS,
+                )
+                await self.redis.rpush(REDIS_KEY_WARM_POOL, info.id)
+                self._update_pool_size_metric()
+                logger.info("WarmPool: コンテナ返却", container_id=info.id)
+                return True
+        except Exception as e:
+            logger.error("WarmPool: コンテナ返却失敗", container_id=info.id, error=str(e))
+
+        await self._cleanup_unhealthy(info.id)
+        return False
+
     async def _get_pool_container_info(self, container_id: str) -> ContainerInfo | None:
         """Redisからプールコンテナの情報を取得"""
         data = await self.redis.hgetall(f"{REDIS_KEY_WARM_POOL_INFO}:{container_id}")
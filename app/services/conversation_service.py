@@ -145,22 +145,21 @@ class ConversationService:
         conversation_id: str,
         tenant_id: str,
     ) -> bool:
-        """会話を削除（S3ファイル + DB関連レコード含む）"""
-        from app.config import get_settings
+        """
+        会話を削除（S3ファイル + DB関連レコード含む）
 
-        _settings = get_settings()
-        if _settings.s3_bucket_name:
-            try:
-                from app.services.workspace.s3_storage import S3StorageBackend
-
-                s3 = S3StorageBackend()
-                await s3.delete_prefix(tenant_id, conversation_id)
-            except Exception as e:
-                logger.warning(
-                    "S3ワークスペースファイル削除エラー（続行）",
-                    conversation_id=conversation_id,
-                    error=str(e),
-                )
-
-        return await self.repo.delete_with_related(conversation_id, tenant_id)
+        S3のワークスペースファイルは同じトランザクションでアウトボックスに
+        削除ジョブを登録し、ワーカーがバックグラウンドで削除する。
+        """
+        from app.config import get_settings
+        from app.repositories.execution_outbox_repository import ExecutionOutboxRepository
+        from app.services.execution_outbox_service import OUTBOX_KIND_WORKSPACE_DELETE
+
+        # 関連レコードの削除で会話の未処理ジョブも消えるため、ジョブ登録は削除後に行う
+        deleted = await self.repo.delete_with_related(conversation_id, tenant_id)
+        if deleted and get_settings().s3_bucket_name:
+            await ExecutionOutboxRepository(self.db).enqueue(
+                OUTBOX_KIND_WORKSPACE_DELETE, tenant_id, conversation_id, {}
+            )
+        return deleted
 
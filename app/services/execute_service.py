@@ -5,13 +5,15 @@
 Unix Socket経由でSSEイベントを中継する。
 
 フロー:
-  1. コンテキスト制限チェック / 会話ロック取得
+  1. コンテキスト制限チェック / 会話ロック取得（TTLはリース更新機構が延長）
   2. ContainerOrchestrator経由でコンテナ取得・作成
   3. S3 → コンテナへファイル同期
   4. コンテナ内workspace_agentにリクエスト送信（Unix Socket）
   5. SSEイベントを中継しつつ、doneイベントから使用量を抽出
-  6. コンテナ → S3へファイル同期
-  7. DB記録（使用量、メッセージログ、タイトル生成）
+  6. 実行後処理を並行実行
+     - コンテナ → S3へファイル同期
+     - DB記録（session_id）+ アウトボックス登録（使用量、メッセージログ、セッション保存）
+  7. コミット → 会話ロック解放 → アウトボックスワーカーが非同期に永続化
 """
 
 import asyncio
@@ -37,13 +39,17 @@ from app.schemas.execute import ExecuteRequest
 from app.services.container.models import ContainerInfo
 from app.services.container.orchestrator import ContainerOrchestrator
 from app.services.proxy.credential_proxy import McpHeaderRule
+from app.services.proxy.mcp_response_cache import McpCachePolicy
 from app.services.workspace.file_sync import WorkspaceFileSync
-from app.services.workspace.s3_storage import S3StorageBackend
+from app.services.workspace.s3_storage import get_s3_storage
 from app.services.conversation_service import ConversationService
+from app.services.execution_outbox_service import (
+    ExecutionOutboxService,
+    get_execution_outbox_worker,
+)
 from app.services.mcp_server_service import McpServerService
 from app.services.message_log_service import MessageLogService
 from app.services.skill_service import SkillService
-from app.services.usage_service import UsageService
 from app.infrastructure.distributed_lock import (
     ConversationLockError,
     get_conversation_lock_manager,
@@ -63,6 +69,7 @@ from app.utils.streaming import (
     format_tool_call_event,
     format_tool_result_event,
 )
+from app.utils.phase_timer import PhaseTimer
 from app.utils.progress_messages import get_initial_message
 from app.utils.sensitive_filter import sanitize_log_data
 
@@ -101,10 +108,12 @@ class ExecuteService:
         self._settings = get_settings()
         self.conversation_service = ConversationService(db)
         self.message_log_service = MessageLogService(db)
-        self.usage_service = UsageService(db)
         self.skill_service = SkillService(db)
         self.mcp_server_service = McpServerService(db)
+        # 並行する後処理からのAsyncSession操作を排他制御（WorkspaceFileSyncと共有）
+        self._db_lock = asyncio.Lock()
         self._file_sync = self._create_file_sync()
+        self.outbox_service = ExecutionOutboxService(db)
 
     def _create_file_sync(self) -> WorkspaceFileSync | None:
         """ファイル同期インスタンスを生成（S3未設定時はNone）"""
@@ -115,9 +124,10 @@ class ExecuteService:
             )
             return None
         return WorkspaceFileSync(
-            s3=S3StorageBackend(),
+            s3=get_s3_storage(),
             lifecycle=self.orchestrator.lifecycle,
             db=self.db,
+            db_lock=self._db_lock,
         )
 
     async def execute_streaming(
@@ -148,23 +158,40 @@ class ExecuteService:
             message="実行を開始しています...",
         )
 
-        # コンテキスト制限チェック
-        context_error = await self._check_context_limit(
-            conversation_id, request.tenant_id, model, seq_counter
+        timer = PhaseTimer()
+
+        # 前処理フェーズ1（並行実行）:
+        #   DB: 前ターンの未処理アウトボックス処理 → コンテキスト制限チェック
+        #   Redis: 会話ロック取得
+        lock_manager = get_conversation_lock_manager()
+        context_result, lock_result = await asyncio.gather(
+            timer.measure(
+                "context_check",
+                self._flush_and_check_context(
+                    conversation_id, request.tenant_id, model, seq_counter
+                ),
+            ),
+            timer.measure(
+                "lock_acquire", lock_manager.acquire(conversation_id, renew=True)
+            ),
+            return_exceptions=True,
         )
-        if context_error:
-            yield context_error
-            yield self._error_done(start_time, seq_counter)
+        lock_token = None if isinstance(lock_result, BaseException) else lock_result
+
+        if isinstance(context_result, BaseException) or context_result:
+            if lock_token:
+                await self._release_lock(lock_manager, conversation_id, lock_token)
+            if isinstance(context_result, BaseException):
+                raise context_result
+            yield context_result
+            yield self._error_done(start_time, seq_counter, timer)
             return
 
-        # 会話ロック取得
-        lock_manager = get_conversation_lock_manager()
-        lock_token = None
-        try:
-            lock_token = await lock_manager.acquire(conversation_id)
-        except ConversationLockError as e:
+        if isinstance(lock_result, ConversationLockError):
             logger.warning(
-                "会話ロック取得失敗", conversation_id=conversation_id, error=str(e)
+                "会話ロック取得失敗",
+                conversation_id=conversation_id,
+                error=str(lock_result),
             )
             yield format_error_event(
                 seq=seq_counter.next(),
@@ -172,8 +199,10 @@ class ExecuteService:
                 message="会話は現在使用中です。しばらくしてから再試行してください。",
                 recoverable=True,
             )
-            yield self._error_done(start_time, seq_counter)
+            yield self._error_done(start_time, seq_counter, timer)
             return
+        if isinstance(lock_result, BaseException):
+            raise lock_result
 
         logger.info(
             "エージェント実行開始（コンテナ隔離）",
@@ -185,19 +214,22 @@ class ExecuteService:
         execution_success = False
         container_id = ""
         try:
-            # ユーザーメッセージを保存
-            await self._save_user_message(request)
-
             # ワークスペース準備を通知
             yield format_progress_event(
                 seq=seq_counter.next(),
                 progress_type="setup",
                 message="ワークスペースを準備しています...",
+                timings=timer.as_dict(),
             )
 
-            # コンテナ取得/作成（1回だけ実行し、以降はこのinfoを使い回す）
-            container_info = await self.orchestrator.get_or_create(
-                request.conversation_id
+            # 前処理フェーズ2（並行実行）:
+            #   コンテナ取得/作成（1回だけ実行し、以降はこのinfoを使い回す）
+            #   DB: ユーザーメッセージ保存 → 会話取得 → MCPサーバー設定構築
+            container_info, (conversation, mcp_server_configs) = await asyncio.gather(
+                timer.measure(
+                    "container", self.orchestrator.get_or_create(conversation_id)
+                ),
+                self._load_execution_state(request, timer),
             )
             container_id = container_info.id
 
@@ -208,41 +240,60 @@ class ExecuteService:
                 model_id=model.model_id,
             )
 
-            # S3 → コンテナへファイル同期
             if request.workspace_enabled:
                 yield format_progress_event(
                     seq=seq_counter.next(),
                     progress_type="setup",
                     message="ファイルを同期中...",
+                    timings=timer.as_dict(),
                 )
-                await self._sync_files_to_container(request, container_info)
 
-            # セッションファイル復元（コンテナ破棄後の再開時にS3から復元）
-            conversation = await self.conversation_service.get_conversation_by_id(
-                request.conversation_id, request.tenant_id
+            # 前処理フェーズ3（並行実行）:
+            #   S3 → コンテナへファイル同期 → スキル同期（スキルが同期済みファイルより優先）
+            #   セッションファイル復元（コンテナ破棄後の再開時にS3から復元）
+            session_id = conversation.session_id if conversation else None
+            skills_synced, _ = await asyncio.gather(
+                self._sync_workspace_and_skills(request, container_info, timer),
+                timer.measure(
+                    "session_restore",
+                    self._restore_session_file(request, container_info, session_id),
+                ),
+            )
+
+            # テナント別の追加許可ドメイン・トークン予算・プロンプトキャッシュ設定をプロキシに適用
+            self.orchestrator.bind_tenant(
+                container_info.id,
+                request.tenant_id,
+                prompt_cache_injection=tenant.prompt_cache_injection,
+            )
+
+            # MCPトークンのプロキシ側注入:
+            # コンテナにトークンを渡さず、プロキシ側で認証ヘッダーを注入する
+            container_mcp_configs = self._extract_mcp_headers_to_proxy(
+                mcp_server_configs, container_info.id, tenant_id=request.tenant_id
+            )
+            container_request = self._build_container_request(
+                request,
+                model,
+                mcp_server_configs,
+                container_mcp_configs,
+                skills_synced,
+                session_id,
             )
-            if conversation and conversation.session_id and self._file_sync:
-                try:
-                    await self._file_sync.restore_session_file(
-                        request.tenant_id,
-                        request.conversation_id,
-                        container_info.id,
-                        conversation.session_id,
-                    )
-                except Exception as e:
-                    logger.warning("セッションファイル復元エラー（続行）", error=str(e))
 
             # エージェント起動を通知
             yield format_progress_event(
                 seq=seq_counter.next(),
                 progress_type="setup",
                 message="エージェントを起動しています...",
+                timings=timer.as_dict(),
             )
+            agent_started_at = time.perf_counter()
+            first_event_received = False
 
             # コンテナ内エージェントにリクエスト送信・SSEストリーム中継
             done_data = None
             last_sync_time = 0.0
-            last_lock_extend_time = time.time()
             background_sync_tasks: set[asyncio.Task] = set()
             external_file_paths: list[
                 str
@@ -251,14 +302,21 @@ class ExecuteService:
 
             async for event in self._stream_from_container(
                 request,
-                model,
                 seq_counter,
                 container_info,
+                container_request,
             ):
+                # 最初のイベント受信までをエージェント起動時間として計測
+                if not first_event_received:
+                    first_event_received = True
+                    timer.record("first_event", time.perf_counter() - agent_started_at)
+
                 # done イベントからメタデータ（usage/cost）を抽出
                 # SDK側の "done" イベントを _translate_event() でホスト形式に変換
                 if event.get("event") == "done":
                     done_data = event.get("data", {})
+                    timer.record("agent", time.perf_counter() - agent_started_at)
+                    self._attach_timings(done_data, timer)
 
                     # done前にcontext_statusイベントを送信（仕様準拠）
                     ctx_event = await self._build_context_status_event(
@@ -283,20 +341,6 @@ class ExecuteService:
                 # tool_call イベントから /workspace 外のファイルパスを収集
                 self._collect_external_file_path(event, external_file_paths)
 
-                # 長時間実行時のロックTTL延長（60秒間隔）
-                if lock_token and (time.time() - last_lock_extend_time) > 60:
-                    try:
-                        await lock_manager.extend(
-                            conversation_id, lock_token, additional_ttl=600
-                        )
-                    except Exception as ext_err:
-                        logger.warning(
-                            "ロック延長失敗",
-                            conversation_id=conversation_id,
-                            error=str(ext_err),
-                        )
-                    last_lock_extend_time = time.time()
-
                 # tool_result イベント検出時に非同期ファイル同期をトリガー
                 if (
                     request.workspace_enabled
@@ -322,11 +366,14 @@ class ExecuteService:
             # ストリーム完了後、コンテナ情報を最新に更新
             # クラッシュ復旧時は orchestrator.execute() 内で新コンテナに
             # 切り替わっているため、後続処理が破棄済みコンテナを操作するのを防ぐ
+            # （直前まで実行していたコンテナのためヘルスチェックは行わずRedis参照のみ）
             try:
-                container_info = await self.orchestrator.get_or_create(
+                assigned = await self.orchestrator.get_assigned(
                     request.conversation_id
                 )
-                container_id = container_info.id
+                if assigned:
+                    container_info = assigned
+                    container_id = container_info.id
             except Exception as e:
                 logger.warning(
                     "コンテナ情報再取得失敗（後続処理は旧情報で続行）",
@@ -334,23 +381,34 @@ class ExecuteService:
                     error=str(e),
                 )
 
-            # バックグラウンド同期タスクの完了待ち（最大5秒）
-            if background_sync_tasks:
-                await asyncio.wait(background_sync_tasks, timeout=5.0)
-
-            # /workspace外に書かれたファイルをコンテナ内で/workspaceにコピー
-            if external_file_paths:
-                await self._rescue_external_files(
-                    container_info.id, external_file_paths
-                )
-
-            # コンテナ → S3へファイル同期
-            if request.workspace_enabled:
-                await self._sync_files_from_container(request, container_info)
+            # 実行後処理パイプライン:
+            #   ファイル段: バックグラウンド同期待ち → /workspace外ファイル回収 → コンテナ→S3同期
+            #   DB段: session_id更新 + アウトボックス登録（使用量・メッセージ・セッション保存）
+            # 両段は互いに依存しないため並行実行する（AsyncSessionは _db_lock で排他）
+            results = await asyncio.gather(
+                timer.measure(
+                    "post_files",
+                    self._run_post_file_stage(
+                        request,
+                        container_info,
+                        background_sync_tasks,
+                        external_file_paths,
+                        done_data.get("session_id") if done_data else None,
+                    ),
+                ),
+                timer.measure(
+                    "post_db",
+                    self._run_post_db_stage(
+                        request, model, done_data, assistant_events
+                    ),
+                ),
+                return_exceptions=True,
+            )
+            for result in results:
+                if isinstance(result, BaseException):
+                    raise result
 
-            # 使用量をDB記録
             if done_data:
-                await self._record_usage(request, model, done_data)
                 usage = done_data.get("usage", {})
                 audit_agent_execution_completed(
                     conversation_id=conversation_id,
@@ -362,33 +420,6 @@ class ExecuteService:
                     cost_usd=str(done_data.get("cost_usd", "0")),
                 )
 
-                # session_id をDBに保存（セッション再開用）
-                new_session_id = done_data.get("session_id")
-                if new_session_id:
-                    await self.conversation_service.update_conversation(
-                        conversation_id=request.conversation_id,
-                        tenant_id=request.tenant_id,
-                        session_id=new_session_id,
-                    )
-
-                    # セッションファイルをS3に保存（コンテナ破棄時の復旧用）
-                    if self._file_sync:
-                        try:
-                            await self._file_sync.save_session_file(
-                                request.tenant_id,
-                                request.conversation_id,
-                                container_id,
-                                new_session_id,
-                            )
-                        except Exception as e:
-                            logger.warning(
-                                "セッションファイル保存エラー（続行）", error=str(e)
-                            )
-
-            # アシスタントメッセージをDBに保存（ストリーム完了後に一括）
-            if assistant_events:
-                await self._save_assistant_message(request, assistant_events)
-
             execution_success = True
 
         except Exception as e:
@@ -406,18 +437,15 @@ class ExecuteService:
                 message=str(e),
                 recoverable=False,
             )
-            yield self._error_done(start_time, seq_counter)
+            yield self._error_done(start_time, seq_counter, timer)
 
         finally:
-            if lock_token:
-                try:
-                    await lock_manager.release(conversation_id, lock_token)
-                except Exception as e:
-                    logger.error("会話ロック解放エラー", error=str(e))
-
+            # ロック解放前にコミットし、次ターンが確定済みの状態を参照できるようにする
+            committed = False
             if execution_success:
                 try:
                     await self.db.commit()
+                    committed = True
                 except Exception as e:
                     logger.error("コミットエラー", error=str(e))
                     await self.db.rollback()
@@ -427,39 +455,126 @@ class ExecuteService:
                 except Exception:
                     logger.warning("ロールバック失敗", exc_info=True)
 
-    async def _stream_from_container(
+            if lock_token:
+                await self._release_lock(lock_manager, conversation_id, lock_token)
+
+            # 登録済みアウトボックスジョブの処理をワーカーに通知
+            if committed:
+                worker = get_execution_outbox_worker()
+                if worker:
+                    worker.notify()
+
+    async def _flush_and_check_context(
         self,
-        request: ExecuteRequest,
+        conversation_id: str,
+        tenant_id: str,
         model: Model,
         seq_counter: SequenceCounter,
-        container_info: ContainerInfo,
-    ) -> AsyncGenerator[dict, None]:
-        """コンテナ内エージェントからSSEストリームを受信・中継"""
-        # MCP サーバー設定の構築（テナントDB → シリアライズ）
-        mcp_server_configs = await self._build_mcp_server_configs(request)
+    ) -> dict | None:
+        """前ターンの未処理アウトボックスを処理してからコンテキスト制限をチェック
 
-        # MCPトークンのプロキシ側注入:
-        # コンテナにトークンを渡さず、プロキシ側で認証ヘッダーを注入する
-        container_mcp_configs = self._extract_mcp_headers_to_proxy(
-            mcp_server_configs, container_info.id
+        コンテキスト状況・メッセージ順序を確定させてから本ターンを開始する。
+        """
+        await self._flush_pending_outbox(conversation_id)
+        return await self._check_context_limit(
+            conversation_id, tenant_id, model, seq_counter
         )
 
-        # スキルファイル同期
-        skills_synced = await self._sync_skills_to_container(
-            request.tenant_id, container_info.id
+    @staticmethod
+    async def _release_lock(lock_manager, conversation_id: str, lock_token: str) -> None:
+        """会話ロックを解放（エラーはログのみ）"""
+        try:
+            await lock_manager.release(conversation_id, lock_token)
+        except Exception as e:
+            logger.error("会話ロック解放エラー", error=str(e))
+
+    async def _load_execution_state(
+        self, request: ExecuteRequest, timer: PhaseTimer
+    ) -> tuple:
+        """
+        実行前のDB処理をまとめて実行
+
+        同一AsyncSessionを使用するため、コンテナ取得と並行しつつ内部は逐次実行する。
+
+        Returns:
+            (会話, MCPサーバー設定リスト)
+        """
+        await timer.measure("user_message", self._save_user_message(request))
+        conversation = await timer.measure(
+            "conversation_fetch",
+            self.conversation_service.get_conversation_by_id(
+                request.conversation_id, request.tenant_id
+            ),
+        )
+        # MCP サーバー設定の構築（テナントDB → シリアライズ）
+        mcp_server_configs = await timer.measure(
+            "mcp_config", self._build_mcp_server_configs(request)
+        )
+        return conversation, mcp_server_configs
+
+    async def _sync_workspace_and_skills(
+        self,
+        request: ExecuteRequest,
+        container_info: ContainerInfo,
+        timer: PhaseTimer,
+    ) -> bool:
+        """S3 → コンテナへのファイル同期後にスキルファイルを同期
+
+        スキルはワークスペース内（/workspace/.claude/skills/）に配置されるため、
+        S3から復元された古いコピーを上書きできるよう同期後に書き込む。
+
+        Returns:
+            スキルを同期した場合True
+        """
+        if request.workspace_enabled:
+            await timer.measure(
+                "file_sync", self._sync_files_to_container(request, container_info)
+            )
+        return await timer.measure(
+            "skills_sync",
+            self._sync_skills_to_container(request.tenant_id, container_info.id),
         )
 
+    async def _restore_session_file(
+        self,
+        request: ExecuteRequest,
+        container_info: ContainerInfo,
+        session_id: str | None,
+    ) -> None:
+        """セッションファイル復元（コンテナ破棄後の再開時にS3から復元）"""
+        if not session_id or not self._file_sync:
+            return
+        try:
+            await self._file_sync.restore_session_file(
+                request.tenant_id,
+                request.conversation_id,
+                container_info.id,
+                session_id,
+            )
+        except Exception as e:
+            logger.warning("セッションファイル復元エラー（続行）", error=str(e))
+
+    def _build_container_request(
+        self,
+        request: ExecuteRequest,
+        model: Model,
+        mcp_server_configs: list[dict],
+        container_mcp_configs: list[dict],
+        skills_synced: bool,
+        session_id: str | None,
+    ) -> dict:
+        """コンテナ内エージェントへのリクエストを構築"""
         # allowed_tools の計算
         allowed_tools = self._compute_allowed_tools(request, mcp_server_configs)
 
         # システムプロンプト構築
         system_prompt = self._build_system_prompt(request, skills_synced)
 
-        container_request = {
+        return {
             "user_input": request.user_input,
             "system_prompt": system_prompt,
             "model": model.bedrock_model_id,
-            "session_id": None,
+            "session_id": session_id,
             "max_turns": None,
             "allowed_tools": allowed_tools,
             "cwd": "/workspace",
@@ -469,13 +584,14 @@ class ExecuteService:
             else None,
         }
 
-        # 会話のセッションIDを取得
-        conversation = await self.conversation_service.get_conversation_by_id(
-            request.conversation_id, request.tenant_id
-        )
-        if conversation and conversation.session_id:
-            container_request["session_id"] = conversation.session_id
-
+    async def _stream_from_container(
+        self,
+        request: ExecuteRequest,
+        seq_counter: SequenceCounter,
+        container_info: ContainerInfo,
+        container_request: dict,
+    ) -> AsyncGenerator[dict, None]:
+        """コンテナ内エージェントからSSEストリームを受信・中継"""
         buffer = ""
         async for chunk in self.orchestrator.execute(
             request.conversation_id,
@@ -520,6 +636,8 @@ class ExecuteService:
                     "openapi_spec": server.openapi_spec,
                     "base_url": server.openapi_base_url,
                     "headers": headers,
+                    "response_cache_ttl": server.response_cache_ttl,
+                    "response_cache_vary_headers": server.response_cache_vary_headers,
                 }
             )
         return configs
@@ -545,6 +663,7 @@ class ExecuteService:
         self,
         mcp_server_configs: list[dict],
         container_id: str,
+        tenant_id: str = "",
     ) -> list[dict]:
         """MCPサーバー設定からヘッダーを抽出してプロキシに登録し、コンテナ用設定を返す
 
@@ -554,6 +673,7 @@ class ExecuteService:
         Args:
             mcp_server_configs: ヘッダー解決済みのMCPサーバー設定リスト
             container_id: コンテナID（プロキシルール登録用）
+            tenant_id: テナントID（GETレスポンスキャッシュの分離単位、空ならキャッシュしない）
 
         Returns:
             コンテナ用MCPサーバー設定リスト（ヘッダーなし、base_urlはプロキシローカル）
@@ -572,9 +692,19 @@ class ExecuteService:
 
             if original_base_url:
                 # プロキシルールに登録（ヘッダー有無問わずプロキシ経由に統一）
+                cache_ttl = config.get("response_cache_ttl")
                 proxy_rules[server_name] = McpHeaderRule(
                     real_base_url=original_base_url,
                     headers=headers,
+                    tenant_id=tenant_id,
+                    cache=McpCachePolicy(
+                        ttl=float(cache_ttl),
+                        vary_headers=tuple(
+                            h.lower() for h in config.get("response_cache_vary_headers") or ()
+                        ),
+                    )
+                    if cache_ttl
+                    else None,
                 )
                 # コンテナ用設定: base_urlをプロキシローカルに書き換え、ヘッダーなし
                 container_configs.append(
@@ -832,78 +962,120 @@ class ExecuteService:
             content=content,
         )
 
-    async def _save_assistant_message(
-        self, request: ExecuteRequest, events: list[dict]
-    ) -> None:
-        """ストリーミングイベントをアシスタントメッセージとしてDBに一括保存"""
+    async def _flush_pending_outbox(self, conversation_id: str) -> None:
+        """前ターンで登録された未処理アウトボックスジョブを処理"""
         try:
-            message_seq = (
-                await self.message_log_service.get_max_message_seq(
-                    request.conversation_id
-                )
-                + 1
+            await self.outbox_service.flush_conversation(conversation_id)
+        except Exception as e:
+            logger.warning(
+                "未処理アウトボックス処理エラー（続行）",
+                conversation_id=conversation_id,
+                error=str(e),
             )
+            await self.db.rollback()
 
-            # センシティブ情報をマスクしてからDB保存（多層防御）
-            sanitized_events = sanitize_log_data(events)
-
-            content = {
-                "type": "assistant",
-                "subtype": None,
-                "timestamp": datetime.now(timezone.utc).isoformat(),
-                "events": sanitized_events,
-            }
+    async def _run_post_file_stage(
+        self,
+        request: ExecuteRequest,
+        container_info: ContainerInfo,
+        background_sync_tasks: set[asyncio.Task],
+        external_file_paths: list[str],
+        session_id: str | None,
+    ) -> None:
+        """
+        実行後処理（ファイル段）: コンテナ → S3 同期
 
-            await self.message_log_service.save_message_log(
-                conversation_id=request.conversation_id,
-                message_seq=message_seq,
-                message_type="assistant",
-                message_subtype=None,
-                content=content,
+        セッションファイルは会話ロック保持中にここで保存する
+        （ロック解放後はコンテナ破棄・次ターンの書き込みと競合するため）。
+        """
+        # バックグラウンド同期タスクの完了待ち（最大5秒）
+        if background_sync_tasks:
+            await asyncio.wait(background_sync_tasks, timeout=5.0)
+
+        # /workspace外に書かれたファイルをコンテナ内で/workspaceにコピー
+        if external_file_paths:
+            await self._rescue_external_files(container_info.id, external_file_paths)
+
+        # コンテナ → S3へファイル同期とセッションファイル保存（コンテナ破棄時の復旧用）
+        tasks = []
+        if request.workspace_enabled:
+            tasks.append(self._sync_files_from_container(request, container_info))
+        if session_id and self._file_sync:
+            tasks.append(self._save_session_file(request, container_info.id, session_id))
+        if tasks:
+            await asyncio.gather(*tasks)
+
+    async def _save_session_file(
+        self, request: ExecuteRequest, container_id: str, session_id: str
+    ) -> None:
+        """SDKセッションファイルをS3に保存（失敗しても実行結果には影響させない）"""
+        try:
+            await self._file_sync.save_session_file(
+                request.tenant_id,
+                request.conversation_id,
+                container_id,
+                session_id,
             )
         except Exception as e:
-            logger.error("アシスタントメッセージ保存エラー", error=str(e))
+            logger.warning("セッションファイル保存エラー（続行）", error=str(e))
 
-    async def _record_usage(
-        self, request: ExecuteRequest, model: Model, done_data: dict
+    async def _run_post_db_stage(
+        self,
+        request: ExecuteRequest,
+        model: Model,
+        done_data: dict | None,
+        assistant_events: list[dict],
     ) -> None:
-        """使用量をDBに記録"""
-        try:
-            # SDK/翻訳済みどちらの形式でも正規化して統一
-            usage = self._normalize_usage(done_data.get("usage", {}))
-            input_tokens = usage.get("input_tokens", 0)
-            output_tokens = usage.get("output_tokens", 0)
-            cache_5m = usage.get("cache_creation_5m_tokens", 0)
-            cache_1h = usage.get("cache_creation_1h_tokens", 0)
-            cache_read = usage.get("cache_read_tokens", 0)
+        """
+        実行後処理（DB段）: session_id更新 + アウトボックス登録
 
-            cost = model.calculate_cost(
-                input_tokens, output_tokens, cache_5m, cache_1h, cache_read
-            )
+        使用量記録・アシスタントメッセージ保存はアウトボックスに登録し、
+        コミット後にワーカーが処理する（セッションファイルはファイル段で保存）。
+        """
+        async with self._db_lock:
+            if done_data:
+                await self._enqueue_usage(request, model, done_data)
 
-            await self.usage_service.save_usage_log(
-                tenant_id=request.tenant_id,
-                user_id=request.executor.user_id,
-                model_id=request.model_id,
-                input_tokens=input_tokens,
-                output_tokens=output_tokens,
-                cache_creation_5m_tokens=cache_5m,
-                cache_creation_1h_tokens=cache_1h,
-                cache_read_tokens=cache_read,
-                cost_usd=cost,
-                conversation_id=request.conversation_id,
-            )
+                # session_id をDBに保存（セッション再開用）
+                new_session_id = done_data.get("session_id")
+                if new_session_id:
+                    await self.conversation_service.update_conversation(
+                        conversation_id=request.conversation_id,
+                        tenant_id=request.tenant_id,
+                        session_id=new_session_id,
+                    )
 
-            # コンテキスト状況を更新
-            await self._update_context_status(
-                request.conversation_id,
-                request.tenant_id,
-                model,
-                input_tokens,
-                output_tokens,
-            )
-        except Exception as e:
-            logger.error("使用量記録エラー", error=str(e))
+            # アシスタントメッセージをDBに保存（ストリーム完了後に一括）
+            if assistant_events:
+                # センシティブ情報をマスクしてからDB保存（多層防御）
+                await self.outbox_service.enqueue_assistant_message(
+                    request.tenant_id,
+                    request.conversation_id,
+                    sanitize_log_data(assistant_events),
+                )
+
+    async def _enqueue_usage(
+        self, request: ExecuteRequest, model: Model, done_data: dict
+    ) -> None:
+        """使用量記録ジョブをアウトボックスに登録"""
+        # SDK/翻訳済みどちらの形式でも正規化して統一
+        usage = self._normalize_usage(done_data.get("usage", {}))
+        cost = model.calculate_cost(
+            usage.get("input_tokens", 0),
+            usage.get("output_tokens", 0),
+            usage.get("cache_creation_5m_tokens", 0),
+            usage.get("cache_creation_1h_tokens", 0),
+            usage.get("cache_read_tokens", 0),
+        )
+        await self.outbox_service.enqueue_usage(
+            tenant_id=request.tenant_id,
+            conversation_id=request.conversation_id,
+            user_id=request.executor.user_id,
+            model_id=request.model_id,
+            usage=usage,
+            cost_usd=cost,
+            context_window=model.context_window,
+        )
 
     async def _check_context_limit(
         self,
@@ -940,41 +1112,6 @@ class ExecuteService:
 
         return None
 
-    async def _update_context_status(
-        self,
-        conversation_id: str,
-        tenant_id: str,
-        model: Model,
-        input_tokens: int,
-        output_tokens: int,
-    ) -> None:
-        """コンテキスト状況を更新"""
-        estimated = input_tokens + output_tokens
-        max_context = model.context_window
-
-        # 累積後の値で limit_reached を正確に判定
-        conversation = await self.conversation_service.get_conversation_by_id(
-            conversation_id, tenant_id
-        )
-        accumulated_after = (
-            (conversation.estimated_context_tokens or 0) + estimated
-            if conversation
-            else estimated
-        )
-        usage_percent = (
-            (accumulated_after / max_context) * 100 if max_context > 0 else 0
-        )
-        limit_reached = usage_percent >= 95
-
-        await self.conversation_service.update_conversation_context_status(
-            conversation_id=conversation_id,
-            tenant_id=tenant_id,
-            total_input_tokens=input_tokens,
-            total_output_tokens=output_tokens,
-            estimated_context_tokens=estimated,
-            context_limit_reached=limit_reached,
-        )
-
     async def _build_context_status_event(
         self,
         conversation_id: str,
@@ -1360,9 +1497,19 @@ class ExecuteService:
         tool_name = data.get("tool_name", "")
         return tool_name in _FILE_TOOL_NAMES
 
-    def _error_done(self, start_time: float, seq_counter: SequenceCounter) -> dict:
-        """エラー時のdoneイベントを生成"""
-        return format_done_event(
+    @staticmethod
+    def _attach_timings(done_data: dict, timer: PhaseTimer) -> None:
+        """doneイベントのデータにフェーズ別所要時間（ミリ秒）を付与"""
+        done_data["timings"] = timer.as_dict()
+
+    def _error_done(
+        self,
+        start_time: float,
+        seq_counter: SequenceCounter,
+        timer: PhaseTimer,
+    ) -> dict:
+        """エラー時のdoneイベントを生成（完了済みフェーズの所要時間を含む）"""
+        event = format_done_event(
             seq=seq_counter.next(),
             status="error",
             result=None,
@@ -1379,3 +1526,5 @@ class ExecuteService:
             turn_count=0,
             duration_ms=int((time.time() - start_time) * 1000),
         )
+        self._attach_timings(event["data"], timer)
+        return event
@@ -0,0 +1,363 @@
+"""
+実行後処理アウトボックスサービス
+
+エージェント実行完了後の永続化処理をトランザクショナルアウトボックスとして扱う。
+
+フロー:
+  1. ExecuteService が実行リクエストのトランザクション内でジョブを登録
+  2. コミット後に会話ロックを解放し、ワーカーに通知
+  3. ExecutionOutboxWorker がジョブを取得（FOR UPDATE SKIP LOCKED）して処理し、
+     完了したジョブは同じトランザクションで削除する（failed のみ残す）
+  4. 次ターン開始時に flush_conversation() で同一会話の未処理ジョブを先に処理
+     （メッセージ順序・コンテキスト状況の整合性を保証）
+
+ジョブ種別:
+  - usage: 使用量ログ記録 + 会話のコンテキスト状況更新
+  - assistant_message: アシスタントメッセージのメッセージログ保存
+  - workspace_delete: 削除した会話のS3ワークスペースファイルの一括削除
+"""
+import asyncio
+from datetime import datetime, timezone
+from decimal import Decimal
+
+import structlog
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import get_settings
+from app.infrastructure.metrics import (
+    get_execution_outbox_jobs,
+    get_execution_outbox_pending,
+)
+from app.models.execution_outbox import ExecutionOutbox
+from app.repositories.execution_outbox_repository import ExecutionOutboxRepository
+from app.services.conversation_service import ConversationService
+from app.services.message_log_service import MessageLogService
+from app.services.usage_service import UsageService
+from app.services.workspace.s3_storage import get_s3_storage
+
+logger = structlog.get_logger(__name__)
+
+OUTBOX_KIND_USAGE = "usage"
+OUTBOX_KIND_ASSISTANT_MESSAGE = "assistant_message"
+OUTBOX_KIND_WORKSPACE_DELETE = "workspace_delete"
+
+
+class ExecutionOutboxService:
+    """実行後処理アウトボックスの登録・処理"""
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+        self.repo = ExecutionOutboxRepository(db)
+        self.conversation_service = ConversationService(db)
+        self.message_log_service = MessageLogService(db)
+        self.usage_service = UsageService(db)
+        self._settings = get_settings()
+
+    # ============================================
+    # ジョブ登録
+    # ============================================
+
+    async def enqueue_usage(
+        self,
+        tenant_id: str,
+        conversation_id: str,
+        user_id: str,
+        model_id: str,
+        usage: dict,
+        cost_usd: Decimal,
+        context_window: int,
+    ) -> ExecutionOutbox:
+        """
+        使用量記録ジョブを登録
+
+        Args:
+            usage: 正規化済み使用量（input_tokens, output_tokens, cache_*）
+            cost_usd: 計算済みコスト
+            context_window: モデルのContext Window上限（コンテキスト状況判定用）
+        """
+        payload = {
+            "user_id": user_id,
+            "model_id": model_id,
+            "input_tokens": usage.get("input_tokens", 0),
+            "output_tokens": usage.get("output_tokens", 0),
+            "cache_creation_5m_tokens": usage.get("cache_creation_5m_tokens", 0),
+            "cache_creation_1h_tokens": usage.get("cache_creation_1h_tokens", 0),
+            "cache_read_tokens": usage.get("cache_read_tokens", 0),
+            "cost_usd": str(cost_usd),
+            "context_window": context_window,
+        }
+        return await self.repo.enqueue(
+            OUTBOX_KIND_USAGE, tenant_id, conversation_id, payload
+        )
+
+    async def enqueue_assistant_message(
+        self,
+        tenant_id: str,
+        conversation_id: str,
+        events: list[dict],
+    ) -> ExecutionOutbox:
+        """
+        アシスタントメッセージ保存ジョブを登録
+
+        message_seq は処理時に採番する（次ターンのユーザーメッセージより前に
+        flush_conversation() で処理されるため順序は保たれる）。
+
+        Args:
+            events: センシティブ情報マスク済みのストリーミングイベント
+        """
+        payload = {
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "events": events,
+        }
+        return await self.repo.enqueue(
+            OUTBOX_KIND_ASSISTANT_MESSAGE, tenant_id, conversation_id, payload
+        )
+
+    # ============================================
+    # ジョブ処理
+    # ============================================
+
+    async def flush_conversation(self, conversation_id: str) -> int:
+        """
+        会話の未処理ジョブを同期的に処理してコミット
+
+        次ターン開始時のバリアとして呼び出す。ワーカーが処理中のジョブは
+        行ロック解放まで待機するため、二重処理は発生しない。
+
+        Returns:
+            処理したジョブ数
+        """
+        entries = await self.repo.claim_by_conversation(conversation_id)
+        if not entries:
+            return 0
+
+        for entry in entries:
+            await self._process_entry(entry)
+        await self.db.commit()
+
+        logger.info(
+            "会話の未処理アウトボックスを処理",
+            conversation_id=conversation_id,
+            count=len(entries),
+        )
+        return len(entries)
+
+    async def process_pending(self, limit: int) -> int:
+        """
+        処理可能なジョブをまとめて処理してコミット
+
+        Returns:
+            処理したジョブ数
+        """
+        entries = await self.repo.claim_pending(limit)
+        for entry in entries:
+            await self._process_entry(entry)
+        await self.db.commit()
+        return len(entries)
+
+    async def count_pending(self) -> int:
+        """未処理ジョブ数を取得"""
+        return await self.repo.count_pending()
+
+    async def _process_entry(self, entry: ExecutionOutbox) -> None:
+        """
+        1ジョブを処理
+
+        ジョブごとにSAVEPOINTを張り、失敗時は当該ジョブの書き込みのみ
+        ロールバックしてリトライ状態を記録する。
+        """
+        try:
+            async with self.db.begin_nested():
+                await self._dispatch(entry)
+            await self.repo.delete_done(entry)
+            get_execution_outbox_jobs().inc(kind=entry.kind, status="done")
+        except Exception as e:
+            self.repo.mark_failed(
+                entry,
+                str(e),
+                max_attempts=self._settings.execution_outbox_max_attempts,
+                backoff_seconds=self._settings.execution_outbox_retry_backoff,
+            )
+            get_execution_outbox_jobs().inc(kind=entry.kind, status=entry.status)
+            logger.error(
+                "アウトボックスジョブ処理エラー",
+                outbox_id=entry.outbox_id,
+                kind=entry.kind,
+                conversation_id=entry.conversation_id,
+                attempts=entry.attempts,
+                status=entry.status,
+                error=str(e),
+            )
+        await self.db.flush()
+
+    async def _dispatch(self, entry: ExecutionOutbox) -> None:
+        """ジョブ種別ごとのハンドラを実行"""
+        if entry.kind == OUTBOX_KIND_USAGE:
+            await self._handle_usage(entry)
+        elif entry.kind == OUTBOX_KIND_ASSISTANT_MESSAGE:
+            await self._handle_assistant_message(entry)
+        elif entry.kind == OUTBOX_KIND_WORKSPACE_DELETE:
+            await self._handle_workspace_delete(entry)
+        else:
+            raise ValueError(f"未知のアウトボックスジョブ種別: {entry.kind}")
+
+    async def _handle_usage(self, entry: ExecutionOutbox) -> None:
+        """使用量ログを記録し、会話のコンテキスト状況を更新"""
+        payload = entry.payload
+        input_tokens = payload.get("input_tokens", 0)
+        output_tokens = payload.get("output_tokens", 0)
+
+        await self.usage_service.save_usage_log(
+            tenant_id=entry.tenant_id,
+            user_id=payload["user_id"],
+            model_id=payload["model_id"],
+            input_tokens=input_tokens,
+            output_tokens=output_tokens,
+            cache_creation_5m_tokens=payload.get("cache_creation_5m_tokens", 0),
+            cache_creation_1h_tokens=payload.get("cache_creation_1h_tokens", 0),
+            cache_read_tokens=payload.get("cache_read_tokens", 0),
+            cost_usd=Decimal(payload.get("cost_usd", "0")),
+            conversation_id=entry.conversation_id,
+        )
+
+        # 累積後の値で limit_reached を正確に判定
+        estimated = input_tokens + output_tokens
+        max_context = payload.get("context_window", 0)
+        conversation = await self.conversation_service.get_conversation_by_id(
+            entry.conversation_id, entry.tenant_id
+        )
+        accumulated_after = (
+            (conversation.estimated_context_tokens or 0) + estimated
+            if conversation
+            else estimated
+        )
+        usage_percent = (
+            (accumulated_after / max_context) * 100 if max_context > 0 else 0
+        )
+
+        await self.conversation_service.update_conversation_context_status(
+            conversation_id=entry.conversation_id,
+            tenant_id=entry.tenant_id,
+            total_input_tokens=input_tokens,
+            total_output_tokens=output_tokens,
+            estimated_context_tokens=estimated,
+            context_limit_reached=usage_percent >= 95,
+        )
+
+    async def _handle_assistant_message(self, entry: ExecutionOutbox) -> None:
+        """アシスタントメッセージをメッセージログに保存"""
+        payload = entry.payload
+        message_seq = (
+            await self.message_log_service.get_max_message_seq(entry.conversation_id)
+            + 1
+        )
+        content = {
+            "type": "assistant",
+            "subtype": None,
+            "timestamp": payload.get("timestamp"),
+            "events": payload.get("events", []),
+        }
+        await self.message_log_service.save_message_log(
+            conversation_id=entry.conversation_id,
+            message_seq=message_seq,
+            message_type="assistant",
+            message_subtype=None,
+            content=content,
+        )
+
+    async def _handle_workspace_delete(self, entry: ExecutionOutbox) -> None:
+        """
+        削除した会話のS3ワークスペースファイルを一括削除
+
+        一部のファイルを削除できなかった場合は例外でリトライさせる
+        （再試行時は残っているファイルのみが対象になる）。
+        """
+        if not self._settings.s3_bucket_name:
+            return
+        deleted = await get_s3_storage().delete_prefix(
+            entry.tenant_id, entry.conversation_id
+        )
+        logger.info(
+            "会話のワークスペースファイル削除完了",
+            conversation_id=entry.conversation_id,
+            count=deleted,
+        )
+
+
+class ExecutionOutboxWorker:
+    """実行後処理アウトボックスのワーカーループ"""
+
+    def __init__(self) -> None:
+        self._settings = get_settings()
+        self._running = False
+        self._task: asyncio.Task | None = None
+        self._wakeup = asyncio.Event()
+
+    async def start(self, interval: float = 2.0) -> None:
+        """ワーカーループを開始"""
+        self._running = True
+        self._task = asyncio.create_task(self._worker_loop(interval))
+        logger.info("アウトボックスワーカー開始", interval=interval)
+
+    async def stop(self) -> None:
+        """ワーカーループを停止（未処理ジョブはDBに残り、次回起動時に処理される）"""
+        self._running = False
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        logger.info("アウトボックスワーカー停止")
+
+    def notify(self) -> None:
+        """新規ジョブ登録をワーカーに通知（ポーリング待機を打ち切る）"""
+        self._wakeup.set()
+
+    async def _worker_loop(self, interval: float) -> None:
+        """ワーカーメインループ"""
+        while self._running:
+            try:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=interval)
+                except asyncio.TimeoutError:
+                    pass
+                self._wakeup.clear()
+
+                processed = await self.process_batch()
+                # バッチ上限まで処理した場合は残りがあるため即座に次サイクルへ
+                if processed >= self._settings.execution_outbox_batch_size:
+                    self._wakeup.set()
+            except asyncio.CancelledError:
+                break
+            except Exception as e:
+                logger.error("アウトボックスワーカーサイクルエラー", error=str(e))
+
+    async def process_batch(self) -> int:
+        """1バッチ分のジョブを処理"""
+        from app.database import async_session_maker
+
+        async with async_session_maker() as db:
+            service = ExecutionOutboxService(db)
+            processed = await service.process_pending(
+                self._settings.execution_outbox_batch_size
+            )
+            get_execution_outbox_pending().set(await service.count_pending())
+
+        if processed:
+            logger.debug("アウトボックスジョブ処理完了", processed=processed)
+        return processed
+
+
+_outbox_worker: ExecutionOutboxWorker | None = None
+
+
+def set_execution_outbox_worker(worker: ExecutionOutboxWorker | None) -> None:
+    """アウトボックスワーカーを登録（lifespanから呼び出す）"""
+    global _outbox_worker
+    _outbox_worker = worker
+
+
+def get_execution_outbox_worker() -> ExecutionOutboxWorker | None:
+    """アウトボックスワーカーを取得（未起動時はNone）"""
+    return _outbox_worker
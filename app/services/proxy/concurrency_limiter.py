@@ -0,0 +1,310 @@
+"""
+Bedrock 呼び出しの適応的同時実行制限
+テナント×モデル単位で Bedrock への同時呼び出し数を AIMD で調整し、
+バックエンドの全レプリカで Redis を介して共有する
+
+- 同時実行枠は Redis の Sorted Set にリース（期限付き）として記録する。
+  レプリカが落ちてもリースは期限で解放される
+- 呼び出し完了時に結果で上限を調整する
+  - 成功: 上限 += 1 / 上限（上限と同数の呼び出しが成功するごとに +1）
+  - スロットリング（429）: 上限 × 0.5
+  - レスポンスヘッダー受信までの時間が、同程度のリクエストサイズでの最小値の
+    latency_factor 倍を超えた: 上限 × 0.9（既定は無効。ヘッダー受信までの時間は入力トークン数に
+    比例するため、サイズ区分ごとに最小値を保持して比較する）
+  減少は decrease_interval 秒に1回まで（同時に失敗した呼び出しで過剰に絞らない）
+- 枠が空くまで待機し、max_wait 秒を超えたら拒否する
+- Redis 障害時は制限しない（フェイルオープン）
+"""
+import asyncio
+import random
+import time
+import uuid
+from dataclasses import dataclass
+
+import structlog
+from redis.asyncio import Redis
+
+from app.config import get_settings
+from app.infrastructure.metrics import (
+    get_workspace_bedrock_concurrency_in_flight,
+    get_workspace_bedrock_concurrency_limit,
+    get_workspace_bedrock_concurrency_rejections,
+    get_workspace_bedrock_concurrency_wait,
+)
+
+logger = structlog.get_logger(__name__)
+
+# Redis キープレフィックス（{tenant_id}:{model_id}:leases → Sorted Set、:state → Hash）
+REDIS_KEY_BEDROCK_CONCURRENCY = "workspace:bedrock_concurrency"
+
+# 使われなくなったキーの保持期間
+_STATE_TTL_SECONDS = 86400
+
+# 枠待ちのポーリング間隔（秒）
+_POLL_INITIAL = 0.025
+_POLL_MAX = 0.5
+
+# リクエストサイズ区分の上限（2倍ごとの区分、1KiB未満が0。レイテンシはこの区分ごとに比較する）
+_MAX_SIZE_BUCKET = 20
+
+
+class ConcurrencyLimitTimeoutError(Exception):
+    """同時実行枠の待機時間超過"""
+
+    def __init__(self, waited: float, limit: float) -> None:
+        super().__init__(f"同時実行枠の待機時間超過: waited={waited:.1f}s limit={limit:.1f}")
+        self.waited = waited
+        self.limit = limit
+
+
+@dataclass
+class ConcurrencyLease:
+    """同時実行枠のリース（token が None の場合は制限なしで通過）"""
+
+    tenant_id: str
+    model_id: str
+    token: str | None
+    wait_seconds: float = 0.0
+
+
+class ConcurrencyLimiter:
+    """テナント×モデル単位の適応的同時実行制限（AIMD、Redisで全レプリカ共有）"""
+
+    # Luaスクリプト: 期限切れリースを除去し、上限未満ならリースを追加
+    ACQUIRE_SCRIPT = """
+    local leases = KEYS[1]
+    local state = KEYS[2]
+    local now = tonumber(ARGV[1])
+    local lease_ttl = tonumber(ARGV[2])
+    local token = ARGV[3]
+    local initial = tonumber(ARGV[4])
+    local state_ttl = tonumber(ARGV[5])
+
+    redis.call('ZREMRANGEBYSCORE', leases, '-inf', now)
+    local limit = tonumber(redis.call('HGET', state, 'limit') or initial)
+    local in_flight = redis.call('ZCARD', leases)
+
+    if in_flight < math.max(1, math.floor(limit)) then
+        redis.call('ZADD', leases, now + lease_ttl, token)
+        redis.call('EXPIRE', leases, state_ttl)
+        return {1, tostring(limit), in_flight + 1}
+    end
+    return {0, tostring(limit), in_flight}
+    """
+
+    # Luaスクリプト: リースを解放し、結果に応じて上限を調整
+    RELEASE_SCRIPT = """
+    local leases = KEYS[1]
+    local state = KEYS[2]
+    local token = ARGV[1]
+    local signal = ARGV[2]
+    local now = tonumber(ARGV[3])
+    local latency = tonumber(ARGV[4])
+    local initial = tonumber(ARGV[5])
+    local min_limit = tonumber(ARGV[6])
+    local max_limit = tonumber(ARGV[7])
+    local latency_factor = tonumber(ARGV[8])
+    local decrease_interval = tonumber(ARGV[9])
+    local state_ttl = tonumber(ARGV[10])
+    local min_latency_field = ARGV[11]
+
+    redis.call('ZREM', leases, token)
+    local values = redis.call('HMGET', state, 'limit', min_latency_field, 'decreased_at')
+    local limit = tonumber(values[1] or initial)
+    local min_latency = tonumber(values[2] or 0)
+    local decreased_at = tonumber(values[3] or 0)
+
+    -- 最小レイテンシはサイズ区分ごとに保持し、緩やかに上昇させて傾向変化に追従する
+    if latency > 0 then
+        if min_latency == 0 or latency < min_latency then
+            min_latency = latency
+        else
+            min_latency = min_latency * 1.01
+        end
+        if signal == 'ok' and latency_factor > 0 and latency > min_latency * latency_factor then
+            signal = 'slow'
+        end
+    end
+
+    if signal == 'ok' then
+        limit = math.min(max_limit, limit + 1 / limit)
+    elseif now - decreased_at >= decrease_interval then
+        local factor = 0.9
+        if signal == 'throttled' then
+            factor = 0.5
+        end
+        limit = math.max(min_limit, limit * factor)
+        decreased_at = now
+    end
+
+    redis.call('HSET', state, 'limit', tostring(limit), min_latency_field, tostring(min_latency),
+        'decreased_at', tostring(decreased_at))
+    redis.call('EXPIRE', state, state_ttl)
+    return {tostring(limit), signal}
+    """
+
+    def __init__(
+        self,
+        redis: Redis,
+        initial_limit: float = 8.0,
+        min_limit: float = 1.0,
+        max_limit: float = 64.0,
+        max_wait: float = 120.0,
+        lease_ttl: float = 900.0,
+        latency_factor: float = 0.0,
+        decrease_interval: float = 2.0,
+    ) -> None:
+        """
+        Args:
+            initial_limit: 統計がないキーの同時実行上限
+            min_limit / max_limit: 上限の調整範囲
+            max_wait: 枠待ちの最大時間（秒、超過時は ConcurrencyLimitTimeoutError）
+            lease_ttl: リースの有効期限（秒、解放されなかったリースの回収）
+            latency_factor: 同じサイズ区分の最小レイテンシの何倍で輻輳とみなすか
+                （0で無効、スロットリングのみで調整）
+            decrease_interval: 上限を減少させる最小間隔（秒）
+        """
+        self._redis = redis
+        self._initial = initial_limit
+        self._min = min_limit
+        self._max = max_limit
+        self._max_wait = max_wait
+        self._lease_ttl = lease_ttl
+        self._latency_factor = latency_factor
+        self._decrease_interval = decrease_interval
+
+    async def acquire(self, tenant_id: str, model_id: str) -> ConcurrencyLease:
+        """
+        同時実行枠を確保（空くまで待機）
+
+        Raises:
+            ConcurrencyLimitTimeoutError: max_wait 秒以内に枠を確保できなかった
+        """
+        leases_key, state_key = _keys(tenant_id, model_id)
+        token = uuid.uuid4().hex
+        start = time.monotonic()
+        delay = _POLL_INITIAL
+        while True:
+            try:
+                acquired, limit, in_flight = await self._redis.eval(
+                    self.ACQUIRE_SCRIPT,
+                    2,
+                    leases_key,
+                    state_key,
+                    time.time(),
+                    self._lease_ttl,
+                    token,
+                    self._initial,
+                    _STATE_TTL_SECONDS,
+                )
+            except Exception as e:
+                logger.warning(
+                    "同時実行枠の確保失敗（制限なしで通過）",
+                    tenant_id=tenant_id,
+                    model=model_id,
+                    error=str(e),
+                )
+                return ConcurrencyLease(tenant_id, model_id, None, time.monotonic() - start)
+
+            waited = time.monotonic() - start
+            get_workspace_bedrock_concurrency_limit().set(
+                float(limit), tenant_id=tenant_id, model=model_id
+            )
+            if acquired:
+                get_workspace_bedrock_concurrency_wait().observe(
+                    waited, tenant_id=tenant_id, model=model_id
+                )
+                get_workspace_bedrock_concurrency_in_flight().set(
+                    in_flight, tenant_id=tenant_id, model=model_id
+                )
+                return ConcurrencyLease(tenant_id, model_id, token, waited)
+
+            if waited >= self._max_wait:
+                get_workspace_bedrock_concurrency_rejections().inc(
+                    tenant_id=tenant_id, model=model_id
+                )
+                raise ConcurrencyLimitTimeoutError(waited, float(limit))
+            await asyncio.sleep(min(delay, self._max_wait - waited) * random.uniform(0.5, 1.0))
+            delay = min(delay * 2, _POLL_MAX)
+
+    async def release(
+        self,
+        lease: ConcurrencyLease,
+        throttled: bool,
+        latency: float | None,
+        request_bytes: int = 0,
+    ) -> None:
+        """
+        同時実行枠を解放し、結果に応じて上限を調整
+
+        Args:
+            throttled: Bedrock がスロットリング（429）を返したか
+            latency: レスポンスヘッダー受信までの時間（秒、不明ならNone）
+            request_bytes: リクエストボディのサイズ（レイテンシを比較するサイズ区分の決定に使う）
+        """
+        if lease.token is None:
+            return
+        leases_key, state_key = _keys(lease.tenant_id, lease.model_id)
+        try:
+            limit, signal = await self._redis.eval(
+                self.RELEASE_SCRIPT,
+                2,
+                leases_key,
+                state_key,
+                lease.token,
+                "throttled" if throttled else "ok",
+                time.time(),
+                latency or 0,
+                self._initial,
+                self._min,
+                self._max,
+                self._latency_factor,
+                self._decrease_interval,
+                _STATE_TTL_SECONDS,
+                f"min_latency:{size_bucket(request_bytes)}",
+            )
+        except Exception as e:
+            # リースは lease_ttl で回収される
+            logger.warning(
+                "同時実行枠の解放失敗",
+                tenant_id=lease.tenant_id,
+                model=lease.model_id,
+                error=str(e),
+            )
+            return
+        get_workspace_bedrock_concurrency_limit().set(
+            float(limit), tenant_id=lease.tenant_id, model=lease.model_id
+        )
+        if signal != "ok":
+            logger.info(
+                "Bedrock輻輳シグナル",
+                tenant_id=lease.tenant_id,
+                model=lease.model_id,
+                signal=signal,
+                limit=float(limit),
+            )
+
+
+def size_bucket(request_bytes: int) -> int:
+    """リクエストサイズの区分（1KiB未満が0、以降はサイズが2倍になるごとに+1）"""
+    return min(_MAX_SIZE_BUCKET, (max(0, request_bytes) // 1024).bit_length())
+
+
+def _keys(tenant_id: str, model_id: str) -> tuple[str, str]:
+    base = f"{REDIS_KEY_BEDROCK_CONCURRENCY}:{tenant_id}:{model_id}"
+    return f"{base}:leases", f"{base}:state"
+
+
+def create_concurrency_limiter(redis: Redis) -> ConcurrencyLimiter | None:
+    """設定に基づいて同時実行制限を生成（無効時はNone）"""
+    settings = get_settings()
+    if not settings.proxy_bedrock_concurrency_enabled:
+        return None
+    return ConcurrencyLimiter(
+        redis,
+        initial_limit=settings.proxy_bedrock_concurrency_initial,
+        min_limit=settings.proxy_bedrock_concurrency_min,
+        max_limit=settings.proxy_bedrock_concurrency_max,
+        max_wait=settings.proxy_bedrock_concurrency_max_wait,
+        latency_factor=settings.proxy_bedrock_concurrency_latency_factor,
+    )
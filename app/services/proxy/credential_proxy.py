@@ -5,11 +5,15 @@ Unix Socket上で動作し、コンテナからの全外部通信を中継する
 - ドメインホワイトリストによるアクセス制御
 - Bedrock API向けSigV4認証情報の自動注入
 - MCP API向け認証ヘッダーの自動注入（コンテナにトークンを渡さない）
+- Bedrock 呼び出しのトークン計量とテナント別予算の適用
+- 経路別の転送量計測と帯域制限
 - 全リクエストの監査ログ出力
 """
 
 import asyncio
+import json
 import time
+from collections.abc import AsyncIterable, Callable
 from dataclasses import dataclass, field
 from pathlib import Path
 from urllib.parse import urlparse
@@ -23,18 +27,114 @@ from app.infrastructure.audit_log import (
     audit_proxy_request_blocked,
 )
 from app.infrastructure.metrics import (
+    get_workspace_bedrock_budget_rejections,
+    get_workspace_bedrock_cache_checkpoints,
+    get_workspace_bedrock_region_failovers,
+    get_workspace_bedrock_time_to_first_token,
+    get_workspace_bedrock_tokens,
     get_workspace_proxy_blocked,
+    get_workspace_proxy_connection_requests,
+    get_workspace_proxy_mcp_cache_bytes,
+    get_workspace_proxy_mcp_cache_requests,
+    get_workspace_proxy_oversized_responses,
     get_workspace_proxy_request_duration,
+    get_workspace_proxy_tunnel_bytes,
+    get_workspace_proxy_tunnels,
 )
-from app.services.proxy.dns_cache import DNSCache
+from app.services.proxy.concurrency_limiter import (
+    ConcurrencyLimiter,
+    ConcurrencyLimitTimeoutError,
+)
+from app.services.proxy.dns_cache import get_dns_cache, open_connection_any
 from app.services.proxy.domain_whitelist import DomainWhitelist
-from app.services.proxy.sigv4 import AWSCredentials, sign_request
+from app.services.proxy.egress import ContainerEgress
+from app.services.proxy.mcp_response_cache import (
+    CachedResponse,
+    McpCachePolicy,
+    get_mcp_response_cache,
+    parse_cache_control,
+)
+from app.services.proxy.package_cache import (
+    PACKAGE_CACHE_PREFIX,
+    CachedObject,
+    PackageCache,
+    PackageCacheError,
+)
+from app.services.proxy.prompt_cache import inject_cache_checkpoints
+from app.services.proxy.region_router import FAILOVER_STATUSES, BedrockRegionRouter
+from app.services.proxy.request_body import (
+    RequestBody,
+    RequestBodyTooLargeError,
+    get_header,
+)
+from app.services.proxy.sigv4 import (
+    AWSCredentials,
+    CredentialProvider,
+    SigV4Signer,
+)
+from app.services.proxy.token_meter import BedrockUsageMeter, TokenLedger, model_id_from_path
+from app.services.proxy.tunnel import relay
+from app.services.proxy.upstream_pool import (
+    UpstreamClientPool,
+    UpstreamSlotTimeoutError,
+    get_upstream_pool,
+)
 
 logger = structlog.get_logger(__name__)
 
 # MCP リバースプロキシのパスプレフィックス
 MCP_PROXY_PREFIX = "/mcp/"
 
+# 上流へのリクエストで転送しないヘッダー（フレーミングはhttpxが決定する）
+_HOP_BY_HOP_HEADERS = frozenset(
+    {"host", "connection", "proxy-connection", "keep-alive", "transfer-encoding"}
+)
+
+# クライアントへのレスポンスで転送しないヘッダー（Content-Length 以外のフレーミングはProxy側で決定する）
+_RESPONSE_SKIP_HEADERS = frozenset({"transfer-encoding", "connection", "keep-alive"})
+
+# パッケージキャッシュの送信を帯域制限する場合の sendfile 1回あたりのバイト数
+_SENDFILE_CHUNK_SIZE = 1024 * 1024
+
+
+def _bedrock_region(url: str) -> str | None:
+    """bedrock-runtime.{region}.amazonaws.com 形式のURLからリージョンを取得"""
+    host = urlparse(url).hostname or ""
+    parts = host.split(".")
+    if len(parts) >= 4 and parts[0] == "bedrock-runtime" and parts[-2:] == ["amazonaws", "com"]:
+        return parts[1]
+    return None
+
+
+class _UpstreamFailover(Exception):
+    """レスポンス送信前に別の転送先で再試行する（status: 上流のステータス、接続失敗時はNone）"""
+
+    def __init__(self, status: int | None) -> None:
+        super().__init__(f"upstream failover: {status}")
+        self.status = status
+
+
+@dataclass
+class _RequestHead:
+    """リクエスト行とヘッダー"""
+
+    method: str
+    target: str
+    version: str
+    headers: dict[str, str]
+
+    @property
+    def keep_alive(self) -> bool:
+        """レスポンス後に接続を再利用できるか（HTTP/1.1 かつ Connection: close でない）"""
+        if self.version != "HTTP/1.1":
+            return False
+        connection = (
+            get_header(self.headers, "connection")
+            or get_header(self.headers, "proxy-connection")
+            or ""
+        )
+        return "close" not in connection.lower()
+
 
 @dataclass
 class McpHeaderRule:
@@ -42,6 +142,9 @@ class McpHeaderRule:
 
     real_base_url: str
     headers: dict[str, str] = field(default_factory=dict)
+    # GET レスポンスのキャッシュ（tenant_id が空の場合は無効）
+    tenant_id: str = ""
+    cache: McpCachePolicy | None = None
 
 
 @dataclass
@@ -51,6 +154,27 @@ class ProxyConfig:
     whitelist_domains: list[str]
     aws_credentials: AWSCredentials
     log_all_requests: bool = True
+    keepalive_timeout: float = 60.0  # 接続上で次のリクエストを待つ最大時間（秒）
+    max_request_body_size: int = 32 * 1024 * 1024  # リクエストボディ上限（バイト）
+    max_response_size: int = 10 * 1024 * 1024  # MCP・Forward のレスポンスボディ上限（バイト）
+    # 共有署名器（省略時は aws_credentials から生成）
+    signer: SigV4Signer | None = None
+    # 共有ホワイトリスト（省略時は whitelist_domains から生成）
+    whitelist: DomainWhitelist | None = None
+    tunnel_idle_timeout: float = 300.0  # CONNECT トンネルの無通信タイムアウト（秒）
+    tunnel_splice: bool = True  # Linux では splice でトンネルを中継する
+    # pip / npm 用パッケージキャッシュ（省略時は /pkg/ を提供しない）
+    package_cache: PackageCache | None = None
+    # Bedrock トークン計量・予算判定の台帳（省略時は計量しない）
+    token_ledger: TokenLedger | None = None
+    container_id: str = ""  # トークン使用量を積算するコンテナID
+    # Bedrock 転送先リージョンの選択（省略時は aws_credentials.region のみ）
+    region_router: BedrockRegionRouter | None = None
+    bedrock_max_attempts: int = 3  # 1リクエストで試行するリージョン数の上限
+    # テナント×モデル単位の Bedrock 同時実行制限（省略時は制限しない）
+    concurrency_limiter: ConcurrencyLimiter | None = None
+    # 転送量の計測・帯域制限（省略時は計測しない）
+    egress: ContainerEgress | None = None
 
 
 class CredentialInjectionProxy:
@@ -64,16 +188,28 @@ class CredentialInjectionProxy:
        → 認証ヘッダーを注入し、実際のMCP APIエンドポイントに転送
     3. Forward Proxy: HTTP_PROXY/HTTPS_PROXY からのプロキシリクエスト（絶対URL/CONNECT）
        → 許可ドメインのみ通信許可、bedrock-runtime にはSigV4認証を自動注入
+    4. パッケージキャッシュ: /pkg/... パスのリクエスト（PIP_INDEX_URL / npm_config_registry）
+       → 共有ディスクキャッシュから応答し、ミス時のみ上流から取得
+
+    クライアント接続は HTTP/1.1 keep-alive で再利用され、1接続上の複数リクエスト
+    （パイプライン送信を含む）を到着順に処理する。CONNECT はトンネル終了で接続を閉じる。
+    上流への接続は UpstreamClientPool をプロセス内の全Proxyで共有し、
+    認証情報・許可ドメイン・MCPヘッダーはリクエスト単位でこのインスタンスから適用する。
     """
 
     def __init__(self, config: ProxyConfig, socket_path: str) -> None:
         self.config = config
         self.socket_path = socket_path
-        self._whitelist = DomainWhitelist(config.whitelist_domains)
-        self._dns_cache = DNSCache(ttl_seconds=300)
-        self._http_client: httpx.AsyncClient | None = None
+        self._whitelist = config.whitelist or DomainWhitelist(config.whitelist_domains)
+        self._dns_cache = get_dns_cache()
+        self._signer = config.signer or SigV4Signer(
+            CredentialProvider.from_aws_credentials(config.aws_credentials)
+        )
+        self._upstream: UpstreamClientPool | None = None
         self._server: asyncio.AbstractServer | None = None
         self._mcp_header_rules: dict[str, McpHeaderRule] = {}
+        self._tenant_id = ""
+        self._prompt_cache_injection = False
 
     async def start(self) -> None:
         """Proxyサーバーを起動"""
@@ -85,14 +221,8 @@ class CredentialInjectionProxy:
         if socket_file.exists():
             socket_file.unlink()
 
-        self._http_client = httpx.AsyncClient(
-            timeout=httpx.Timeout(60.0, connect=10.0),
-            limits=httpx.Limits(
-                max_connections=100,
-                max_keepalive_connections=20,
-                keepalive_expiry=30.0,
-            ),
-        )
+        # 上流接続はプロセス内の全Proxyで共有する（停止時も閉じない）
+        self._upstream = get_upstream_pool()
         self._server = await asyncio.start_unix_server(
             self._handle_connection,
             path=self.socket_path,
@@ -112,91 +242,85 @@ class CredentialInjectionProxy:
                 server_names=list(rules.keys()),
             )
 
+    def update_whitelist(self, whitelist: DomainWhitelist) -> None:
+        """ホワイトリストを差し替え（テナント別オーバーレイの適用、実行リクエスト毎に呼ばれる）"""
+        self._whitelist = whitelist
+
+    def update_tenant(self, tenant_id: str, prompt_cache_injection: bool = False) -> None:
+        """テナントを設定（実行リクエスト毎に呼ばれる）
+
+        Args:
+            tenant_id: トークン使用量の積算・予算判定の対象テナント
+            prompt_cache_injection: Bedrock リクエストにキャッシュチェックポイントを追加するか
+        """
+        self._tenant_id = tenant_id
+        self._prompt_cache_injection = prompt_cache_injection
+        if self.config.egress is not None:
+            self.config.egress.bind_tenant(tenant_id)
+
     async def stop(self) -> None:
         """Proxyサーバーを停止"""
         if self._server:
             self._server.close()
             await self._server.wait_closed()
-        if self._http_client:
-            await self._http_client.aclose()
+        self._upstream = None
         self._mcp_header_rules = {}
+        self._tenant_id = ""
+        self._prompt_cache_injection = False
         logger.info("Proxy停止", socket_path=self.socket_path)
 
     async def _handle_connection(
         self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
     ) -> None:
-        """クライアント接続をハンドル"""
-        try:
-            request_line = await reader.readline()
-            if not request_line:
-                return
-
-            request_str = request_line.decode("utf-8", errors="replace").strip()
-            parts = request_str.split(" ")
-            if len(parts) < 3:
-                writer.close()
-                return
-
-            method = parts[0]
-            url = parts[1]
+        """
+        クライアント接続をハンドル
 
-            # ヘッダー読み取り
-            headers: dict[str, str] = {}
-            content_length = 0
+        keep-alive 接続では、レスポンス送信後に同じ接続で次のリクエストを待つ。
+        アイドルタイムアウト・クライアントの Connection: close・フレーミングが
+        保証できないレスポンス（ストリーミング途中の失敗）で接続を閉じる。
+        """
+        served = 0
+        try:
             while True:
-                line = await reader.readline()
-                if line in (b"\r\n", b"\n", b""):
+                try:
+                    head = await asyncio.wait_for(
+                        self._read_request_head(reader),
+                        timeout=self.config.keepalive_timeout,
+                    )
+                except asyncio.TimeoutError:
                     break
-                header_str = line.decode("utf-8", errors="replace").strip()
-                if ":" in header_str:
-                    key, value = header_str.split(":", 1)
-                    headers[key.strip()] = value.strip()
-                    if key.strip().lower() == "content-length":
-                        content_length = int(value.strip())
-
-            # ボディ読み取り
-            body = b""
-            if content_length > 0:
-                body = await reader.readexactly(content_length)
-
-            # CONNECT メソッド（TLSパススルー）
-            # CONNECTはトンネル確立後に双方向パイプで通信するため、
-            # _handle_connect内でレスポンス送信とwriter closeが完了する。
-            # したがってCONNECT後はearly returnする（BUG-04修正）。
-            if method == "CONNECT":
-                await self._handle_connect(url, reader, writer)
-                return
-
-            # Reverse Proxy モード: 相対パス（ANTHROPIC_BEDROCK_BASE_URL経由）
-            if url.startswith(MCP_PROXY_PREFIX):
-                # MCP Reverse Proxy: /mcp/{server_name}/... パスのリクエスト
-                # コンテナにトークンを渡さず、プロキシ側で認証ヘッダーを注入
-                await self._handle_mcp_reverse_proxy(method, url, headers, body, writer)
-                return
-
-            # SDK が ANTHROPIC_BEDROCK_BASE_URL=http://127.0.0.1:8080 で送信するリクエストは
-            # 相対パス（例: /model/{modelId}/invoke）で届く
-            if url.startswith("/"):
-                await self._handle_bedrock_reverse_proxy(
-                    method, url, headers, body, writer
+                if head is None:
+                    break
+
+                get_workspace_proxy_connection_requests().inc(
+                    connection="reused" if served else "new"
                 )
-                return
+                served += 1
 
-            # Forward Proxy モード: 絶対URL（HTTP_PROXY/HTTPS_PROXY経由）
-            status, resp_headers, resp_body = await self.handle_request(
-                method, url, headers, body
-            )
+                # CONNECT メソッド（TLSパススルー）
+                # CONNECTはトンネル確立後に双方向パイプで通信するため、
+                # トンネル終了時点で接続も終了する（BUG-04修正）。
+                if head.method == "CONNECT":
+                    await self._handle_connect(head.target, reader, writer)
+                    return
 
-            # レスポンス送信（HTTP平文リクエストのみ）
-            response_line = f"HTTP/1.1 {status} {'OK' if status < 400 else 'Error'}\r\n"
-            writer.write(response_line.encode())
-            for k, v in resp_headers.items():
-                writer.write(f"{k}: {v}\r\n".encode())
-            writer.write(f"Content-Length: {len(resp_body)}\r\n".encode())
-            writer.write(b"\r\n")
-            writer.write(resp_body)
-            await writer.drain()
+                body = RequestBody(
+                    reader, head.headers, self.config.max_request_body_size
+                )
+                if body.exceeds_limit:
+                    # ボディを読まずに拒否するため、接続は再利用しない
+                    await self._write_simple_response(
+                        writer, "413 Payload Too Large", b"Request body too large"
+                    )
+                    break
+
+                reusable = await self._dispatch_request(head, body, writer)
+                # ハンドラーが読まなかったボディを読み捨ててから次のリクエストへ
+                if not (reusable and head.keep_alive and await body.discard()):
+                    break
 
+        except (asyncio.IncompleteReadError, ConnectionError) as e:
+            logger.debug("Proxy接続切断", error=str(e), requests=served)
         except Exception as e:
             logger.error("Proxy接続エラー", error=str(e))
         finally:
@@ -205,18 +329,113 @@ class CredentialInjectionProxy:
             except Exception:
                 logger.debug("Writer close失敗", exc_info=True)
 
-    async def handle_request(
+    async def _read_request_head(
+        self, reader: asyncio.StreamReader
+    ) -> _RequestHead | None:
+        """リクエスト行とヘッダーを読み取る（接続終了・不正なリクエスト行はNone）"""
+        request_line = await reader.readline()
+        # リクエスト間の空行は読み飛ばす（RFC 9112 2.2）
+        while request_line in (b"\r\n", b"\n"):
+            request_line = await reader.readline()
+        if not request_line:
+            return None
+
+        request_str = request_line.decode("utf-8", errors="replace").strip()
+        parts = request_str.split(" ")
+        if len(parts) < 3:
+            return None
+
+        headers: dict[str, str] = {}
+        while True:
+            line = await reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            header_str = line.decode("utf-8", errors="replace").strip()
+            if ":" in header_str:
+                key, value = header_str.split(":", 1)
+                headers[key.strip()] = value.strip()
+
+        return _RequestHead(
+            method=parts[0],
+            target=parts[1],
+            version=parts[2].upper(),
+            headers=headers,
+        )
+
+    async def _dispatch_request(
+        self, head: _RequestHead, body: RequestBody, writer: asyncio.StreamWriter
+    ) -> bool:
+        """
+        リクエストをモード別に処理してレスポンスを送信
+
+        Returns:
+            接続を再利用できるか（レスポンスのフレーミングが完結しているか）
+        """
+        method, url, headers = head.method, head.target, head.headers
+
+        # Reverse Proxy モード: 相対パス（ANTHROPIC_BEDROCK_BASE_URL経由）
+        if url.startswith(MCP_PROXY_PREFIX):
+            # MCP Reverse Proxy: /mcp/{server_name}/... パスのリクエスト
+            # コンテナにトークンを渡さず、プロキシ側で認証ヘッダーを注入
+            return await self._handle_mcp_reverse_proxy(
+                method, url, headers, body, writer
+            )
+
+        if url.startswith(PACKAGE_CACHE_PREFIX) and self.config.package_cache is not None:
+            return await self._handle_package_cache(method, url, headers, writer)
+
+        # SDK が ANTHROPIC_BEDROCK_BASE_URL=http://127.0.0.1:8080 で送信するリクエストは
+        # 相対パス（例: /model/{modelId}/invoke）で届く
+        if url.startswith("/"):
+            return await self._handle_bedrock_reverse_proxy(
+                method, url, headers, body, writer
+            )
+
+        # Forward Proxy モード: 絶対URL（HTTP_PROXY/HTTPS_PROXY経由）
+        return await self._handle_forward_proxy(method, url, headers, body, writer)
+
+    @staticmethod
+    async def _write_simple_response(
+        writer: asyncio.StreamWriter,
+        status_line: str,
+        body: bytes,
+        headers: dict[str, str] | None = None,
+    ) -> None:
+        """固定ボディのレスポンスを送信（Content-Length はボディから算出）"""
+        extra = "".join(f"{k}: {v}\r\n" for k, v in (headers or {}).items())
+        writer.write(
+            f"HTTP/1.1 {status_line}\r\n{extra}Content-Length: {len(body)}\r\n\r\n".encode()
+        )
+        writer.write(body)
+        await writer.drain()
+
+    async def _write_upstream_busy(self, writer: asyncio.StreamWriter) -> None:
+        """上流ホストの同時リクエスト枠を確保できなかったことを通知（503）"""
+        await self._write_simple_response(
+            writer,
+            "503 Service Unavailable",
+            b"Upstream host busy",
+            headers={"Retry-After": "1"},
+        )
+
+    async def _handle_forward_proxy(
         self,
         method: str,
         url: str,
         headers: dict[str, str],
-        body: bytes,
-    ) -> tuple[int, dict[str, str], bytes]:
+        body: RequestBody,
+        writer: asyncio.StreamWriter,
+    ) -> bool:
         """
-        HTTPリクエストを処理
+        Forward Proxy: 絶対URLのリクエストを許可ドメインに転送
+
+        bedrock-runtime.{region}.amazonaws.com 宛ては Reverse Proxy と同じ経路
+        （トークン計量・予算・同時実行制限・SigV4署名）で処理する。
+        それ以外の bedrock-runtime 系ホスト（FIPS・VPCエンドポイント等）は計量できないため拒否し、
+        その他はリクエスト・レスポンスともにストリーミングで中継する。
 
         Returns:
-            (ステータスコード, レスポンスヘッダー, レスポンスボディ)
+            接続を再利用できるか
         """
         request_start = time.perf_counter()
 
@@ -226,23 +445,47 @@ class CredentialInjectionProxy:
             audit_proxy_request_blocked(method=method, url=url)
             if self.config.log_all_requests:
                 logger.warning("Proxy: ドメイン拒否", method=method, url=url)
-            return 403, {}, b"Domain not in whitelist"
-
-        # Bedrock APIへのリクエストにSigV4認証情報を注入
-        if "bedrock-runtime" in url:
-            headers = sign_request(
-                credentials=self.config.aws_credentials,
-                method=method,
-                url=url,
-                headers=headers,
-                body=body,
-                service="bedrock",
+            await self._write_simple_response(
+                writer, "403 Forbidden", b"Domain not in whitelist"
+            )
+            return True
+
+        region = _bedrock_region(url)
+        if region is not None:
+            # 絶対URLの Bedrock 呼び出しも計量・予算・同時実行制限を迂回させない
+            parsed = urlparse(url)
+            path = parsed.path + (f"?{parsed.query}" if parsed.query else "")
+            return await self._handle_bedrock_reverse_proxy(
+                method, path, headers, body, writer, url_region=region
             )
+        if "bedrock-runtime" in (urlparse(url).hostname or ""):
+            logger.warning("Proxy: 未対応の Bedrock エンドポイントを拒否", method=method, url=url)
+            get_workspace_proxy_blocked().inc()
+            audit_proxy_request_blocked(method=method, url=url)
+            await self._write_simple_response(
+                writer, "403 Forbidden", b"Unsupported Bedrock endpoint"
+            )
+            return True
+
+        forward_headers = {
+            k: v for k, v in headers.items() if k.lower() != "transfer-encoding"
+        }
+        content = b"" if body.is_empty else body.iter_chunks()
 
         if self.config.log_all_requests:
             logger.info("Proxy: 転送", method=method, url=url)
 
-        result = await self._forward_request(method, url, headers, body)
+        status, reusable = await self._relay_upstream(
+            method,
+            url,
+            forward_headers,
+            content,
+            writer,
+            max_response_size=self.config.max_response_size,
+            path_label="forward",
+        )
+        if status is None:
+            return reusable
 
         # レイテンシメトリクス
         duration = time.perf_counter() - request_start
@@ -250,7 +493,7 @@ class CredentialInjectionProxy:
         audit_proxy_request_allowed(
             method=method,
             url=url,
-            status=result[0],
+            status=status,
             duration_ms=int(duration * 1000),
         )
         if self.config.log_all_requests:
@@ -259,162 +502,400 @@ class CredentialInjectionProxy:
                 method=method,
                 url=url,
                 duration_ms=round(duration * 1000, 1),
-                status=result[0],
+                status=status,
             )
-
-        return result
+        return reusable
 
     async def _handle_bedrock_reverse_proxy(
         self,
         method: str,
         path: str,
         headers: dict[str, str],
-        body: bytes,
+        body: RequestBody,
         writer: asyncio.StreamWriter,
-    ) -> None:
+        url_region: str | None = None,
+    ) -> bool:
         """
         Bedrock Reverse Proxy: 相対パスリクエストをBedrock APIに転送
 
         ANTHROPIC_BEDROCK_BASE_URL=http://127.0.0.1:8080 経由で届いたリクエストを
         実際のBedrock APIエンドポイントに転送する。
         SigV4署名を注入し、レスポンスはストリーミングで返す。
+        bedrock-runtime は UNSIGNED-PAYLOAD・aws-chunked 署名を受け付けないため、
+        リクエストボディは上限内で読み切ってペイロードハッシュを算出する。
+        中継するレスポンスからトークン使用量を取り出して計量し、トークン台帳がある場合は
+        積算して、テナントの予算超過時には転送せず 429 を返す。
+        テナントで有効な場合は、ツール定義・システムプロンプトにキャッシュチェックポイントを追加する。
+        リージョンルーターがある場合は健全なリージョンから順に試行し、スロットリング・5xx・
+        接続失敗ではレスポンスを送信する前に次のリージョンへ切り替える（転送先として
+        許可されたリージョンがないモデルは 403 で拒否する）。
+        同時実行制限がある場合はテナント×モデルの枠が空くまで待ち、待機時間超過では 429 を返す。
+
+        Args:
+            url_region: 転送先リージョン（Forward Proxy で絶対URLが指定したもの）。
+                リージョンルーターがある場合はルーターの選択を優先する
+
+        Returns:
+            接続を再利用できるか（レスポンス送信途中で失敗した場合はFalse）
         """
         request_start = time.perf_counter()
-        region = self.config.aws_credentials.region
-        bedrock_url = f"https://bedrock-runtime.{region}.amazonaws.com{path}"
+        router = self.config.region_router
+        model_id = model_id_from_path(path)
+        if router is not None and not router.allowed_regions(model_id):
+            # ARN のリージョンが転送先の設定にない（主リージョンに転送すると許可リストを迂回する）
+            logger.warning(
+                "Proxy: 許可されていないリージョンのBedrockモデル",
+                model_id=model_id,
+                container_id=self.config.container_id,
+            )
+            await self._write_simple_response(
+                writer, "403 Forbidden", b"Bedrock region not allowed for model"
+            )
+            return False
+
+        try:
+            payload = await body.read()
+        except RequestBodyTooLargeError:
+            logger.warning(
+                "Proxy: Bedrockリクエストボディ上限超過", method=method, path=path
+            )
+            await self._write_simple_response(
+                writer, "413 Payload Too Large", b"Request body too large"
+            )
+            return False
+
+        ledger = self.config.token_ledger if self._tenant_id else None
+        if ledger is not None and await ledger.is_over_budget(self._tenant_id):
+            get_workspace_bedrock_budget_rejections().inc(tenant_id=self._tenant_id)
+            logger.warning(
+                "Proxy: トークン予算超過のため Bedrock 呼び出しを拒否",
+                tenant_id=self._tenant_id,
+                container_id=self.config.container_id,
+                budget=ledger.budget_for(self._tenant_id),
+            )
+            await self._write_simple_response(
+                writer,
+                "429 Too Many Requests",
+                json.dumps({"message": "Token budget exceeded for tenant"}).encode(),
+                # SDK の自動リトライを止める（予算はUTC日付が変わるまで回復しない）
+                headers={
+                    "Content-Type": "application/json",
+                    "x-amzn-ErrorType": "ServiceQuotaExceededException",
+                    "x-should-retry": "false",
+                },
+            )
+            return True
+
+        # Hop-by-hop ヘッダーを除去し、Host を設定
+        forward_headers = {
+            k: v for k, v in headers.items() if k.lower() not in _HOP_BY_HOP_HEADERS
+        }
+        checkpoints: list[str] = []
+        if self._prompt_cache_injection and method == "POST":
+            payload, checkpoints = inject_cache_checkpoints(path, payload)
+            if checkpoints:
+                get_workspace_bedrock_cache_checkpoints().inc(
+                    len(checkpoints), tenant_id=self._tenant_id
+                )
+        if body.chunked or checkpoints:
+            for key in [k for k in forward_headers if k.lower() == "content-length"]:
+                del forward_headers[key]
+            forward_headers["Content-Length"] = str(len(payload))
+
+        if router is not None:
+            regions = router.candidates(model_id, request_bytes=len(payload))[
+                : max(1, self.config.bedrock_max_attempts)
+            ]
+        else:
+            regions = [url_region or self.config.aws_credentials.region]
 
         if self.config.log_all_requests:
             logger.info(
                 "Proxy: Bedrock Reverse Proxy",
                 method=method,
                 path=path,
-                bedrock_url=bedrock_url,
+                regions=regions,
             )
 
-        # Hop-by-hop ヘッダーを除去し、Host を設定
-        forward_headers = {
-            k: v
-            for k, v in headers.items()
-            if k.lower()
-            not in (
-                "host",
-                "connection",
-                "proxy-connection",
-                "keep-alive",
-                "transfer-encoding",
+        # 計量のためレスポンスを圧縮させない（イベントストリームは元々非圧縮）
+        meter = BedrockUsageMeter(path)
+        for key in [k for k in forward_headers if k.lower() == "accept-encoding"]:
+            del forward_headers[key]
+        forward_headers["Accept-Encoding"] = "identity"
+
+        # テナント×モデルの同時実行枠（スロットリングの兆候で全レプリカの上限を絞る）
+        limiter = self.config.concurrency_limiter if self._tenant_id else None
+        lease = None
+        if limiter is not None:
+            try:
+                lease = await limiter.acquire(self._tenant_id, model_id)
+            except ConcurrencyLimitTimeoutError as e:
+                logger.warning(
+                    "Proxy: 同時実行枠の待機時間超過のため Bedrock 呼び出しを拒否",
+                    tenant_id=self._tenant_id,
+                    model=model_id,
+                    waited=round(e.waited, 1),
+                    limit=round(e.limit, 1),
+                )
+                await self._write_simple_response(
+                    writer,
+                    "429 Too Many Requests",
+                    json.dumps({"message": "Too many concurrent requests for tenant"}).encode(),
+                    headers={
+                        "Content-Type": "application/json",
+                        "x-amzn-ErrorType": "ThrottlingException",
+                        "Retry-After": "5",
+                    },
+                )
+                return True
+
+        throttled = False
+        header_latency: float | None = None
+        try:
+            for attempt, region in enumerate(regions):
+                host = f"bedrock-runtime.{region}.amazonaws.com"
+                bedrock_url = f"https://{host}{path}"
+                forward_headers["Host"] = host
+
+                # SigV4署名を注入（署名スコープはリージョンごと）
+                signed_headers = self._signer.sign(
+                    method=method,
+                    url=bedrock_url,
+                    headers=forward_headers,
+                    body=payload,
+                    region=region,
+                    service="bedrock",
+                )
+
+                attempt_start = time.perf_counter()
+
+                def on_status(
+                    status: int | None, region: str = region, start: float = attempt_start
+                ) -> bool:
+                    """試行結果を記録し、このリージョンの応答を中継してよいかを返す"""
+                    nonlocal throttled, header_latency
+                    latency = time.perf_counter() - start if status is not None else None
+                    if router is not None:
+                        router.record(region, latency, status, request_bytes=len(payload))
+                    throttled = throttled or status == 429
+                    header_latency = latency
+                    return status is not None and status not in FAILOVER_STATUSES
+
+                # ストリーミングレスポンスでBedrock APIに転送（ストリーム応答のためサイズ上限なし）
+                try:
+                    status, reusable = await self._relay_upstream(
+                        method,
+                        bedrock_url,
+                        signed_headers,
+                        payload,
+                        writer,
+                        max_response_size=None,
+                        path_label="bedrock",
+                        observer=meter.feed,
+                        on_status=on_status,
+                        failover=attempt < len(regions) - 1,
+                    )
+                    break
+                except _UpstreamFailover as e:
+                    get_workspace_bedrock_region_failovers().inc(region=region)
+                    logger.warning(
+                        "Proxy: Bedrockリージョン切り替え",
+                        model=model_id,
+                        from_region=region,
+                        to_region=regions[attempt + 1],
+                        status=e.status,
+                    )
+        finally:
+            if lease is not None:
+                await limiter.release(
+                    lease,
+                    throttled=throttled,
+                    latency=header_latency,
+                    request_bytes=len(payload),
+                )
+
+        if meter.first_token_at is not None:
+            get_workspace_bedrock_time_to_first_token().observe(
+                meter.first_token_at - request_start,
+                prompt_cache="injected" if checkpoints else "none",
             )
-        }
-        forward_headers["Host"] = f"bedrock-runtime.{region}.amazonaws.com"
+        # 中継が途中で失敗しても、それまでに生成されたトークンは積算する
+        await self._record_token_usage(ledger, meter)
+        if status is None:
+            return reusable
 
-        # SigV4署名を注入
-        signed_headers = sign_request(
-            credentials=self.config.aws_credentials,
+        # メトリクス・監査ログ
+        duration = time.perf_counter() - request_start
+        get_workspace_proxy_request_duration().observe(duration, method=method)
+        audit_proxy_request_allowed(
             method=method,
             url=bedrock_url,
-            headers=forward_headers,
-            body=body,
-            service="bedrock",
+            status=status,
+            duration_ms=int(duration * 1000),
         )
-
-        if not self._http_client:
-            writer.write(
-                b"HTTP/1.1 503 Service Unavailable\r\nContent-Length: 22\r\n\r\nProxy not initialized\r\n"
+        if self.config.log_all_requests:
+            logger.info(
+                "Proxy: Bedrock完了",
+                method=method,
+                path=path,
+                status=status,
+                duration_ms=round(duration * 1000, 1),
             )
-            await writer.drain()
+        return reusable
+
+    async def _record_token_usage(
+        self, ledger: TokenLedger | None, meter: BedrockUsageMeter
+    ) -> None:
+        """1回の Bedrock 呼び出しのトークン使用量をメトリクスと台帳（あれば）に記録"""
+        usage = meter.finish()
+        if usage.total == 0:
             return
+        tokens = get_workspace_bedrock_tokens()
+        for token_type, value in (
+            ("input", usage.input_tokens),
+            ("output", usage.output_tokens),
+            ("cache_creation", usage.cache_creation_input_tokens),
+            ("cache_read", usage.cache_read_input_tokens),
+        ):
+            if value:
+                tokens.inc(value, tenant_id=self._tenant_id, model=meter.model_id, type=token_type)
+        tenant_total = None
+        if ledger is not None:
+            tenant_total = await ledger.record(self._tenant_id, self.config.container_id, usage)
+        if self.config.log_all_requests:
+            logger.info(
+                "Proxy: Bedrockトークン計量",
+                tenant_id=self._tenant_id,
+                container_id=self.config.container_id,
+                model=meter.model_id,
+                **usage.as_dict(),
+                tenant_daily_total=tenant_total,
+            )
 
-        try:
-            # ストリーミングレスポンスでBedrock APIに転送
-            async with self._http_client.stream(
-                method=method,
-                url=bedrock_url,
-                headers=signed_headers,
-                content=body,
-            ) as resp:
-                # レスポンスステータス行
-                status_text = "OK" if resp.status_code < 400 else "Error"
-                writer.write(f"HTTP/1.1 {resp.status_code} {status_text}\r\n".encode())
+    async def _handle_package_cache(
+        self,
+        method: str,
+        path: str,
+        headers: dict[str, str],
+        writer: asyncio.StreamWriter,
+    ) -> bool:
+        """
+        パッケージキャッシュ: /pkg/... パスのリクエストにキャッシュから応答
 
-                # レスポンスヘッダー（Content-Lengthがあればそのまま、なければchunked）
-                has_content_length = False
-                for key, value in resp.headers.multi_items():
-                    lower_key = key.lower()
-                    if lower_key in ("transfer-encoding", "connection"):
-                        continue
-                    if lower_key == "content-length":
-                        has_content_length = True
-                    writer.write(f"{key}: {value}\r\n".encode())
+        上流URLにもホワイトリストを適用する。本文は sendfile でファイルから直接送信する。
 
-                if not has_content_length:
-                    writer.write(b"Transfer-Encoding: chunked\r\n")
+        Returns:
+            接続を再利用できるか
+        """
+        request_start = time.perf_counter()
+        cache = self.config.package_cache
+        cache_path = path[len(PACKAGE_CACHE_PREFIX) :]
 
-                writer.write(b"\r\n")
-                await writer.drain()
+        if method not in ("GET", "HEAD"):
+            await self._write_simple_response(
+                writer, "405 Method Not Allowed", b"Package cache is read-only"
+            )
+            return True
 
-                # レスポンスボディをストリーミング
-                if has_content_length:
-                    # Content-Length がある場合はそのまま転送
-                    async for chunk in resp.aiter_bytes():
-                        writer.write(chunk)
-                        await writer.drain()
-                else:
-                    # chunked transfer encoding
-                    async for chunk in resp.aiter_bytes():
-                        if chunk:
-                            writer.write(f"{len(chunk):x}\r\n".encode())
-                            writer.write(chunk)
-                            writer.write(b"\r\n")
-                            await writer.drain()
-                    writer.write(b"0\r\n\r\n")
-                    await writer.drain()
-
-            # メトリクス・監査ログ
-            duration = time.perf_counter() - request_start
-            get_workspace_proxy_request_duration().observe(duration, method=method)
-            audit_proxy_request_allowed(
-                method=method,
-                url=bedrock_url,
-                status=resp.status_code,
-                duration_ms=int(duration * 1000),
+        upstream_url = cache.upstream_url(cache_path)
+        if upstream_url is not None and not self._whitelist.is_allowed(upstream_url):
+            logger.warning("Proxy: ブロック", method=method, url=upstream_url)
+            get_workspace_proxy_blocked().inc()
+            audit_proxy_request_blocked(method=method, url=upstream_url)
+            await self._write_simple_response(
+                writer, "403 Forbidden", b"Domain not in whitelist"
             )
-            if self.config.log_all_requests:
-                logger.info(
-                    "Proxy: Bedrock完了",
-                    method=method,
-                    path=path,
-                    status=resp.status_code,
-                    duration_ms=round(duration * 1000, 1),
-                )
+            return True
 
-        except httpx.TimeoutException:
-            logger.error("Proxy: Bedrockタイムアウト", method=method, path=path)
-            writer.write(
-                b"HTTP/1.1 504 Gateway Timeout\r\nContent-Length: 15\r\n\r\nGateway Timeout"
+        try:
+            obj = await cache.get(
+                cache_path, get_header(headers, "accept") or "", egress=self.config.egress
             )
-            await writer.drain()
-        except Exception as e:
-            logger.error(
-                "Proxy: Bedrock転送エラー", method=method, path=path, error=str(e)
+        except PackageCacheError as e:
+            reason = {
+                400: "Bad Request",
+                404: "Not Found",
+                503: "Service Unavailable",
+            }.get(e.status, "Bad Gateway")
+            await self._write_simple_response(
+                writer, f"{e.status} {reason}", str(e).encode()
             )
+            return True
+
+        try:
             writer.write(
-                b"HTTP/1.1 502 Bad Gateway\r\nContent-Length: 11\r\n\r\nBad Gateway"
+                (
+                    "HTTP/1.1 200 OK\r\n"
+                    f"Content-Type: {obj.content_type}\r\n"
+                    f"Content-Length: {obj.size}\r\n\r\n"
+                ).encode()
             )
             await writer.drain()
+            if method == "GET":
+                # キャッシュが開いたファイルから送信（送信中の追い出し・置き換えの影響を受けない）
+                sent = await self._send_package_file(writer, obj)
+                if sent != obj.size:
+                    return False
+        except OSError as e:
+            logger.warning("Proxy: パッケージ送信失敗", path=path, error=str(e))
+            return False
+        finally:
+            cache.release(obj)
+
+        duration = time.perf_counter() - request_start
+        get_workspace_proxy_request_duration().observe(duration, method=method)
+        if self.config.log_all_requests:
+            logger.info(
+                "Proxy: パッケージキャッシュ完了",
+                method=method,
+                path=path,
+                size=obj.size,
+                duration_ms=round(duration * 1000, 1),
+            )
+        return True
+
+    async def _send_package_file(
+        self, writer: asyncio.StreamWriter, obj: CachedObject
+    ) -> int:
+        """
+        パッケージキャッシュのファイルを sendfile で送信し、送信したバイト数を返す
+
+        上流からの取得時に転送量を記録していない場合（キャッシュヒット等）は、
+        経路 package として記録し、帯域制限の待ち時間を挟みながら分割して送信する。
+        """
+        loop = asyncio.get_running_loop()
+        egress = self.config.egress
+        if egress is None or obj.metered:
+            return await loop.sendfile(writer.transport, obj.file, count=obj.size)
+        sent = 0
+        while sent < obj.size:
+            count = min(_SENDFILE_CHUNK_SIZE, obj.size - sent)
+            await egress.transfer("package", "downstream", count)
+            written = await loop.sendfile(writer.transport, obj.file, offset=sent, count=count)
+            if written == 0:
+                break
+            sent += written
+        return sent
 
     async def _handle_mcp_reverse_proxy(
         self,
         method: str,
         path: str,
         headers: dict[str, str],
-        body: bytes,
+        body: RequestBody,
         writer: asyncio.StreamWriter,
-    ) -> None:
+    ) -> bool:
         """
         MCP Reverse Proxy: /mcp/{server_name}/... パスのリクエストを実際のMCP APIに転送
 
         コンテナ内のOpenAPIMcpServiceが http://127.0.0.1:8080/mcp/{server_name}/api/...
         に送信するリクエストを、実際のMCP APIエンドポイントに転送する。
         プロキシ側で認証ヘッダーを注入し、コンテナにトークンを渡さない。
+        リクエストボディはストリーミングで転送する（chunked 受信時は chunked で送信）。
+        レスポンスもストリーミングで中継し、サイズ上限を超えるものは拒否する。
+
+        Returns:
+            接続を再利用できるか
         """
         request_start = time.perf_counter()
 
@@ -434,13 +915,10 @@ class CredentialInjectionProxy:
             logger.warning(
                 "Proxy: 未知のMCPサーバー", server_name=server_name, path=path
             )
-            error_body = f"Unknown MCP server: {server_name}".encode()
-            writer.write(
-                f"HTTP/1.1 404 Not Found\r\nContent-Length: {len(error_body)}\r\n\r\n".encode()
+            await self._write_simple_response(
+                writer, "404 Not Found", f"Unknown MCP server: {server_name}".encode()
             )
-            writer.write(error_body)
-            await writer.drain()
-            return
+            return True
 
         # 実際のMCP APIのURLを構築
         target_url = f"{rule.real_base_url.rstrip('/')}{remaining_path}"
@@ -455,16 +933,7 @@ class CredentialInjectionProxy:
 
         # Hop-by-hop ヘッダーを除去
         forward_headers = {
-            k: v
-            for k, v in headers.items()
-            if k.lower()
-            not in (
-                "host",
-                "connection",
-                "proxy-connection",
-                "keep-alive",
-                "transfer-encoding",
-            )
+            k: v for k, v in headers.items() if k.lower() not in _HOP_BY_HOP_HEADERS
         }
 
         # 実際のMCP APIのHostヘッダーを設定
@@ -475,79 +944,394 @@ class CredentialInjectionProxy:
         # MCPサーバー用の認証ヘッダーを注入（コンテナから受け取らず、プロキシ側で保持）
         forward_headers.update(rule.headers)
 
-        if not self._http_client:
-            writer.write(
-                b"HTTP/1.1 503 Service Unavailable\r\n"
-                b"Content-Length: 22\r\n\r\nProxy not initialized\r\n"
+        cacheable = (
+            rule.cache is not None
+            and rule.tenant_id != ""
+            and "no-store" not in parse_cache_control(get_header(headers, "cache-control"))
+        )
+        if cacheable and method == "GET" and body.is_empty:
+            status, reusable = await self._handle_mcp_cached_get(
+                server_name, rule, target_url, forward_headers, writer
+            )
+        else:
+            status, reusable = await self._relay_upstream(
+                method,
+                target_url,
+                forward_headers,
+                None if body.is_empty else body.iter_chunks(),
+                writer,
+                max_response_size=self.config.max_response_size,
+                path_label="mcp",
+            )
+        if status is None:
+            return reusable
+
+        if rule.cache is not None and method not in ("GET", "HEAD") and status < 400:
+            # 更新系リクエストが成功したURLのキャッシュは破棄する（RFC 9111 4.4）
+            cache = get_mcp_response_cache()
+            cache.invalidate(
+                cache.namespace(rule.tenant_id, server_name, rule.headers), target_url
             )
-            await writer.drain()
-            return
 
-        try:
-            resp = await self._http_client.request(
+        # メトリクス・監査ログ
+        duration = time.perf_counter() - request_start
+        get_workspace_proxy_request_duration().observe(duration, method=method)
+        audit_mcp_proxy_request(
+            server_name=server_name,
+            method=method,
+            path=remaining_path,
+            status=status,
+            duration_ms=int(duration * 1000),
+        )
+        if self.config.log_all_requests:
+            logger.info(
+                "Proxy: MCP完了",
                 method=method,
-                url=target_url,
-                headers=forward_headers,
-                content=body,
+                server_name=server_name,
+                status=status,
+                duration_ms=round(duration * 1000, 1),
             )
+        return reusable
 
-            # レスポンス送信
-            status_text = "OK" if resp.status_code < 400 else "Error"
-            writer.write(f"HTTP/1.1 {resp.status_code} {status_text}\r\n".encode())
+    async def _handle_mcp_cached_get(
+        self,
+        server_name: str,
+        rule: McpHeaderRule,
+        url: str,
+        headers: dict[str, str],
+        writer: asyncio.StreamWriter,
+    ) -> tuple[int | None, bool]:
+        """
+        キャッシュ対象MCPサーバーへの GET をキャッシュ経由で処理
 
-            resp_body = resp.content
-            for k, v in resp.headers.multi_items():
-                lower_key = k.lower()
-                if lower_key in ("transfer-encoding", "connection", "content-length"):
-                    continue
-                writer.write(f"{k}: {v}\r\n".encode())
+        新鮮なエントリがあれば上流に問い合わせずに応答する。期限切れのエントリは
+        条件付きリクエストで再検証し、304 なら保持しているボディで応答する。
 
-            writer.write(f"Content-Length: {len(resp_body)}\r\n".encode())
-            writer.write(b"\r\n")
-            writer.write(resp_body)
-            await writer.drain()
+        Returns:
+            (クライアントに返したステータスコード（送信できなかった場合はNone）, 接続を再利用できるか)
+        """
+        cache = get_mcp_response_cache()
+        policy = rule.cache
+        namespace = cache.namespace(rule.tenant_id, server_name, rule.headers)
+        key = cache.key(namespace, url, headers, policy)
+        request_cc = parse_cache_control(get_header(headers, "cache-control"))
+        entry = cache.get(key)
+
+        if (
+            entry is not None
+            and entry.fresh
+            and "no-cache" not in request_cc
+            and request_cc.get("max-age") != "0"
+        ):
+            get_workspace_proxy_mcp_cache_requests().inc(server=server_name, result="hit")
+            await self._write_cached_response(writer, entry, path_label="mcp")
+            return entry.status, True
+
+        upstream_headers = dict(headers)
+        if entry is not None:
+            upstream_headers.update(entry.conditional_headers())
+
+        fetched = await self._fetch_upstream(url, upstream_headers, writer, path_label="mcp")
+        if fetched is None:
+            return None, True
+        status, resp_headers, resp_body = fetched
+
+        if status == 304 and entry is not None:
+            cache.refresh(entry, resp_headers, policy)
+            get_workspace_proxy_mcp_cache_requests().inc(
+                server=server_name, result="revalidated"
+            )
+            await self._write_cached_response(writer, entry, path_label="mcp")
+            return entry.status, True
 
-            # メトリクス・監査ログ
-            duration = time.perf_counter() - request_start
-            get_workspace_proxy_request_duration().observe(duration, method=method)
-            audit_mcp_proxy_request(
-                server_name=server_name,
-                method=method,
-                path=remaining_path,
-                status=resp.status_code,
-                duration_ms=int(duration * 1000),
+        stored = cache.store(key, namespace, url, status, resp_headers, resp_body, policy)
+        get_workspace_proxy_mcp_cache_requests().inc(
+            server=server_name, result="miss" if stored else "uncacheable"
+        )
+        get_workspace_proxy_mcp_cache_bytes().set(cache.total_bytes)
+        await self._write_buffered_response(writer, status, resp_headers, resp_body)
+        return status, True
+
+    async def _fetch_upstream(
+        self,
+        url: str,
+        headers: dict[str, str],
+        writer: asyncio.StreamWriter,
+        path_label: str,
+    ) -> tuple[int, list[tuple[str, str]], bytes] | None:
+        """
+        上流に GET を送信し、レスポンスをメモリに読み込む（キャッシュ対象の取得用）
+
+        ボディは max_response_size まで読み込み、デコードせずに保持する。
+        受信したボディは path_label の経路として config.egress に記録し、帯域制限を適用する
+        （取得したボディをそのまま返す場合、送信時には記録しない）。
+
+        Returns:
+            (ステータスコード, ヘッダー, ボディ)。失敗時はエラーレスポンスを送信してNone
+        """
+        if not self._upstream:
+            await self._write_simple_response(
+                writer, "503 Service Unavailable", b"Proxy not initialized"
             )
-            if self.config.log_all_requests:
-                logger.info(
-                    "Proxy: MCP完了",
-                    method=method,
-                    server_name=server_name,
-                    status=resp.status_code,
-                    duration_ms=round(duration * 1000, 1),
-                )
+            return None
 
+        limit = self.config.max_response_size
+        egress = self.config.egress
+        try:
+            async with self._upstream.stream("GET", url, headers, None) as resp:
+                chunks: list[bytes] = []
+                received = 0
+                async for chunk in resp.aiter_raw():
+                    received += len(chunk)
+                    if received > limit:
+                        get_workspace_proxy_oversized_responses().inc(path=path_label)
+                        logger.warning(
+                            "Proxy: レスポンスサイズ上限超過",
+                            path=path_label,
+                            url=url,
+                            limit=limit,
+                        )
+                        await self._write_simple_response(
+                            writer, "502 Bad Gateway", b"Upstream response too large"
+                        )
+                        return None
+                    chunks.append(chunk)
+                    if egress is not None:
+                        await egress.transfer(path_label, "downstream", len(chunk))
+                return resp.status_code, resp.headers.multi_items(), b"".join(chunks)
+        except UpstreamSlotTimeoutError:
+            await self._write_upstream_busy(writer)
         except httpx.TimeoutException:
+            logger.error("Proxy: タイムアウト", path=path_label, method="GET", url=url)
+            await self._write_simple_response(
+                writer, "504 Gateway Timeout", b"Gateway Timeout"
+            )
+        except Exception as e:
             logger.error(
-                "Proxy: MCPタイムアウト",
-                method=method,
-                server_name=server_name,
+                "Proxy: 転送エラー", path=path_label, method="GET", url=url, error=str(e)
             )
-            writer.write(
-                b"HTTP/1.1 504 Gateway Timeout\r\n"
-                b"Content-Length: 15\r\n\r\nGateway Timeout"
+            await self._write_simple_response(writer, "502 Bad Gateway", b"Bad Gateway")
+        return None
+
+    async def _write_cached_response(
+        self, writer: asyncio.StreamWriter, entry: CachedResponse, path_label: str
+    ) -> None:
+        """
+        キャッシュ済みレスポンスを Age ヘッダー付きで送信
+
+        上流から取得せずに返すボディも path_label の経路として config.egress に記録し、
+        帯域制限を適用する。
+        """
+        await self._write_buffered_response(
+            writer,
+            entry.status,
+            [*entry.headers, ("Age", str(entry.age))],
+            entry.body,
+        )
+        if self.config.egress is not None:
+            await self.config.egress.transfer(path_label, "downstream", len(entry.body))
+
+    @staticmethod
+    async def _write_buffered_response(
+        writer: asyncio.StreamWriter,
+        status: int,
+        headers: list[tuple[str, str]],
+        body: bytes,
+    ) -> None:
+        """メモリ上のレスポンスを Content-Length 付きで送信"""
+        status_text = "OK" if status < 400 else "Error"
+        lines = [f"HTTP/1.1 {status} {status_text}"]
+        for key, value in headers:
+            lower_key = key.lower()
+            if lower_key in _RESPONSE_SKIP_HEADERS or lower_key == "content-length":
+                continue
+            lines.append(f"{key}: {value}")
+        lines.append(f"Content-Length: {len(body)}")
+        writer.write(("\r\n".join(lines) + "\r\n\r\n").encode())
+        writer.write(body)
+        await writer.drain()
+
+    async def _relay_upstream(
+        self,
+        method: str,
+        url: str,
+        headers: dict[str, str],
+        content: bytes | AsyncIterable[bytes] | None,
+        writer: asyncio.StreamWriter,
+        max_response_size: int | None,
+        path_label: str,
+        observer: Callable[[bytes], None] | None = None,
+        on_status: Callable[[int | None], bool] | None = None,
+        failover: bool = False,
+    ) -> tuple[int | None, bool]:
+        """
+        上流にリクエストを送信し、レスポンスをクライアントへストリーミングで中継
+
+        レスポンスは Content-Length があればそのまま、なければ chunked で返す。
+        Content-Encoding をそのまま返すため、ボディはデコードせずに転送する。
+        書き込みごとに drain() するため、クライアントの受信速度を超えて上流から読まない。
+
+        Args:
+            max_response_size: レスポンスボディ上限（バイト、Noneで無制限）
+            path_label: メトリクス・ログ用の経路名（bedrock / mcp / forward）
+            observer: 中継するボディのチャンクごとに呼び出すコールバック
+            on_status: レスポンスヘッダー受信時（受信前に失敗した場合はNone）に呼び出し、
+                レスポンスを中継してよいかを返すコールバック
+            failover: True の場合、on_status が False を返すか受信前に失敗したら、
+                クライアントに何も送らず _UpstreamFailover を送出する
+
+        ボディの転送量は path_label の経路として config.egress に記録し、帯域制限を適用する。
+
+        Returns:
+            (上流のステータスコード（中継できなかった場合はNone）, 接続を再利用できるか)
+        """
+        if not self._upstream:
+            await self._write_simple_response(
+                writer, "503 Service Unavailable", b"Proxy not initialized"
             )
-            await writer.drain()
+            return None, True
+
+        egress = self.config.egress
+        if egress is not None and content:
+            if isinstance(content, bytes):
+                await egress.transfer(path_label, "upstream", len(content))
+            else:
+                content = egress.metered(path_label, "upstream", content)
+
+        headers_sent = False
+        try:
+            async with self._upstream.stream(method, url, headers, content) as resp:
+                if on_status is not None and not on_status(resp.status_code) and failover:
+                    raise _UpstreamFailover(resp.status_code)
+
+                # Content-Length で上限超過が分かる場合はボディを読まずに拒否
+                declared = resp.headers.get("content-length")
+                if (
+                    max_response_size is not None
+                    and declared
+                    and declared.isdigit()
+                    and int(declared) > max_response_size
+                ):
+                    get_workspace_proxy_oversized_responses().inc(path=path_label)
+                    logger.warning(
+                        "Proxy: レスポンスサイズ上限超過",
+                        path=path_label,
+                        method=method,
+                        url=url,
+                        content_length=int(declared),
+                        limit=max_response_size,
+                    )
+                    await self._write_simple_response(
+                        writer, "502 Bad Gateway", b"Upstream response too large"
+                    )
+                    return None, True
+
+                # レスポンスステータス行
+                status_text = "OK" if resp.status_code < 400 else "Error"
+                writer.write(f"HTTP/1.1 {resp.status_code} {status_text}\r\n".encode())
+
+                # レスポンスヘッダー（Content-Lengthがあればそのまま、なければchunked）
+                has_content_length = False
+                for key, value in resp.headers.multi_items():
+                    lower_key = key.lower()
+                    if lower_key in _RESPONSE_SKIP_HEADERS:
+                        continue
+                    if lower_key == "content-length":
+                        has_content_length = True
+                    writer.write(f"{key}: {value}\r\n".encode())
+
+                # HEAD・1xx・204・304 はボディを持たない（keep-alive のフレーミング維持）
+                bodyless = (
+                    method == "HEAD"
+                    or resp.status_code < 200
+                    or resp.status_code in (204, 304)
+                )
+                chunked = not has_content_length and not bodyless
+                if chunked:
+                    writer.write(b"Transfer-Encoding: chunked\r\n")
+
+                writer.write(b"\r\n")
+                headers_sent = True
+                await writer.drain()
+
+                if not bodyless:
+                    relayed = 0
+                    async for chunk in resp.aiter_raw():
+                        if not chunk:
+                            continue
+                        relayed += len(chunk)
+                        if max_response_size is not None and relayed > max_response_size:
+                            get_workspace_proxy_oversized_responses().inc(path=path_label)
+                            logger.warning(
+                                "Proxy: レスポンスサイズ上限超過（中継中断）",
+                                path=path_label,
+                                method=method,
+                                url=url,
+                                limit=max_response_size,
+                            )
+                            # ヘッダー送信済みのため、終端を送らずに接続を閉じて中断を通知する
+                            return None, False
+                        if chunked:
+                            writer.write(f"{len(chunk):x}\r\n".encode())
+                            writer.write(chunk)
+                            writer.write(b"\r\n")
+                        else:
+                            writer.write(chunk)
+                        if observer is not None:
+                            observer(chunk)
+                        await writer.drain()
+                        if egress is not None:
+                            await egress.transfer(path_label, "downstream", len(chunk))
+                    if chunked:
+                        writer.write(b"0\r\n\r\n")
+                        await writer.drain()
+
+                return resp.status_code, True
+
+        except _UpstreamFailover:
+            raise
+        except UpstreamSlotTimeoutError:
+            # 枠待ちで打ち切ったため上流には送信していない（転送先を変えても同じ枠を待つ）
+            await self._write_upstream_busy(writer)
+            return None, True
+        except RequestBodyTooLargeError:
+            logger.warning(
+                "Proxy: リクエストボディ上限超過", path=path_label, method=method, url=url
+            )
+            if not headers_sent:
+                await self._write_simple_response(
+                    writer, "413 Payload Too Large", b"Request body too large"
+                )
+            return None, False
+        except httpx.TimeoutException as e:
+            logger.error("Proxy: タイムアウト", path=path_label, method=method, url=url)
+            if not headers_sent and on_status is not None:
+                on_status(None)
+                if failover:
+                    raise _UpstreamFailover(None) from e
+            if headers_sent:
+                # レスポンス途中のためエラーを返せない。接続を閉じて中断を通知する
+                return None, False
+            await self._write_simple_response(
+                writer, "504 Gateway Timeout", b"Gateway Timeout"
+            )
+            return None, True
         except Exception as e:
             logger.error(
-                "Proxy: MCP転送エラー",
+                "Proxy: 転送エラー",
+                path=path_label,
                 method=method,
-                server_name=server_name,
+                url=url,
                 error=str(e),
             )
-            writer.write(
-                b"HTTP/1.1 502 Bad Gateway\r\nContent-Length: 11\r\n\r\nBad Gateway"
-            )
-            await writer.drain()
+            if not headers_sent and on_status is not None:
+                on_status(None)
+                if failover:
+                    raise _UpstreamFailover(None) from e
+            if headers_sent:
+                return None, False
+            await self._write_simple_response(writer, "502 Bad Gateway", b"Bad Gateway")
+            return None, True
 
     async def _handle_connect(
         self,
@@ -560,17 +1344,20 @@ class CredentialInjectionProxy:
 
         レスポンス送信・writerクローズまで全てこのメソッド内で完結する。
         """
-        # ホスト名を検証
-        host = host_port.split(":")[0]
-        dummy_url = f"https://{host}/"
+        # ホスト名とポートを検証
+        target_host, _, target_port_str = host_port.rpartition(":")
+        if target_host and target_port_str.isdigit():
+            target_port = int(target_port_str)
+        else:
+            target_host = host_port
+            target_port = 443
 
-        if not self._whitelist.is_allowed(dummy_url):
+        if not self._whitelist.is_allowed_host(target_host, target_port):
             get_workspace_proxy_blocked().inc()
             logger.warning("Proxy: CONNECT拒否", host=host_port)
-            writer.write(
-                b"HTTP/1.1 403 Forbidden\r\nContent-Length: 26\r\n\r\nDomain not in whitelist\r\n"
+            await self._write_simple_response(
+                writer, "403 Forbidden", b"Domain not in whitelist"
             )
-            await writer.drain()
             return  # writer は caller (_handle_connection) の finally でクローズ
 
         logger.info("Proxy: CONNECT", host=host_port)
@@ -579,41 +1366,53 @@ class CredentialInjectionProxy:
         await writer.drain()
 
         # 双方向プロキシ
-        try:
-            target_host, target_port_str = host_port.split(":")
-            target_port = int(target_port_str)
-        except ValueError:
-            target_host = host_port
-            target_port = 443
-
         remote_reader = None
         remote_writer = None
         try:
-            # DNSキャッシュ経由でホスト名を解決
+            # DNSキャッシュ経由でホスト名を解決し、解決済みアドレスへ段階的に接続
             resolved_addrs = await self._dns_cache.resolve(target_host)
-            connect_host = resolved_addrs[0] if resolved_addrs else target_host
-            remote_reader, remote_writer = await asyncio.open_connection(
-                connect_host, target_port
+            remote_reader, remote_writer = await open_connection_any(
+                resolved_addrs, target_port
             )
         except Exception as e:
             logger.error("Proxy: CONNECT先接続失敗", host=host_port, error=str(e))
             return  # writer は caller (_handle_connection) の finally でクローズ
 
-        async def _pipe(src: asyncio.StreamReader, dst: asyncio.StreamWriter) -> None:
-            try:
-                while True:
-                    data = await src.read(65536)
-                    if not data:
-                        break
-                    dst.write(data)
-                    await dst.drain()
-            except Exception:
-                logger.debug("ストリームパイプ失敗", exc_info=True)
-
+        egress = self.config.egress
+        tunnel_start = time.perf_counter()
         try:
-            await asyncio.gather(
-                _pipe(reader, remote_writer),
-                _pipe(remote_reader, writer),
+            stats = await relay(
+                reader,
+                writer,
+                remote_reader,
+                remote_writer,
+                idle_timeout=self.config.tunnel_idle_timeout,
+                use_splice=self.config.tunnel_splice,
+                on_transfer=(
+                    None
+                    if egress is None
+                    else lambda upstream, size: egress.record(
+                        "connect", "upstream" if upstream else "downstream", size
+                    )
+                ),
+            )
+            get_workspace_proxy_tunnel_bytes().inc(
+                stats.bytes_up, direction="upstream", mode=stats.mode
+            )
+            get_workspace_proxy_tunnel_bytes().inc(
+                stats.bytes_down, direction="downstream", mode=stats.mode
+            )
+            get_workspace_proxy_tunnels().inc(
+                mode=stats.mode, result="idle_timeout" if stats.timed_out else "closed"
+            )
+            logger.info(
+                "Proxy: CONNECT終了",
+                host=host_port,
+                mode=stats.mode,
+                bytes_up=stats.bytes_up,
+                bytes_down=stats.bytes_down,
+                idle_timeout=stats.timed_out,
+                duration_ms=round((time.perf_counter() - tunnel_start) * 1000, 1),
             )
         finally:
             # remote_writer のみクローズ（writer は caller がクローズ）
@@ -623,30 +1422,3 @@ class CredentialInjectionProxy:
                         remote_writer.close()
                 except Exception:
                     logger.debug("リモートWriter close失敗", exc_info=True)
-
-    async def _forward_request(
-        self,
-        method: str,
-        url: str,
-        headers: dict[str, str],
-        body: bytes,
-    ) -> tuple[int, dict[str, str], bytes]:
-        """リクエストを外部に転送"""
-        if not self._http_client:
-            return 503, {}, b"Proxy not initialized"
-
-        try:
-            resp = await self._http_client.request(
-                method=method,
-                url=url,
-                headers=headers,
-                content=body,
-            )
-            resp_headers = dict(resp.headers)
-            return resp.status_code, resp_headers, resp.content
-        except httpx.TimeoutException:
-            logger.error("Proxy: タイムアウト", method=method, url=url)
-            return 504, {}, b"Gateway Timeout"
-        except Exception as e:
-            logger.error("Proxy: 転送エラー", method=method, url=url, error=str(e))
-            return 502, {}, b"Bad Gateway"
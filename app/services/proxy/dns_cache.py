@@ -1,70 +1,182 @@
 """
 TTL付きDNSキャッシュ
 ホワイトリスト対象ドメインのDNS解決結果をキャッシュし、レイテンシを低減する
+
+プロセス内の全Proxyで共有し、以下を行う:
+  - 解決失敗の短時間キャッシュ（ネガティブキャッシュ）
+  - 期限切れエントリを返しつつバックグラウンドで再解決（stale-while-revalidate）
+  - 同一ホストへの同時解決の集約
+  - エントリ数の上限（最後に参照されてから最も古いものから削除）
 """
 import asyncio
+import socket
 import time
+from collections import OrderedDict
 from dataclasses import dataclass
 
 import structlog
 
+from app.config import get_settings
+from app.infrastructure.metrics import (
+    get_workspace_proxy_dns_evictions,
+    get_workspace_proxy_dns_lookups,
+    get_workspace_proxy_dns_resolution_duration,
+)
+
 logger = structlog.get_logger(__name__)
 
 DEFAULT_TTL_SECONDS = 300  # 5 minutes
+DEFAULT_NEGATIVE_TTL_SECONDS = 5
+DEFAULT_STALE_TTL_SECONDS = 60
+DEFAULT_MAX_ENTRIES = 1024
+
+# Happy Eyeballs（RFC 8305）の接続試行間隔
+CONNECTION_ATTEMPT_DELAY = 0.25
+# 全アドレスへの接続試行を合わせた上限時間（秒）
+CONNECT_TIMEOUT = 10.0
+
+
+class DNSResolutionError(OSError):
+    """DNS解決失敗（ネガティブキャッシュからの応答を含む）"""
+
+    def __init__(self, hostname: str, reason: str):
+        self.hostname = hostname
+        super().__init__(f"DNS解決失敗: {hostname}: {reason}")
 
 
 @dataclass(frozen=True)
 class _CacheEntry:
-    """キャッシュエントリ"""
+    """キャッシュエントリ（addresses が空の場合は解決失敗）"""
 
     addresses: list[str]
     expires_at: float
+    error: str | None = None
 
 
 class DNSCache:
     """
-    非同期・スレッドセーフなTTL付きDNSキャッシュ
+    非同期TTL付きDNSキャッシュ
 
     ホワイトリスト対象ドメインのDNS解決結果をメモリにキャッシュし、
     繰り返しの名前解決によるレイテンシを削減する。
-    エントリはTTL経過後に自動的に無効化される。
+    - TTL経過後も stale_ttl_seconds の間は古い結果を即座に返し、裏で再解決する
+      （再解決に失敗した場合は古い結果を維持）
+    - 解決失敗は negative_ttl_seconds の間キャッシュし、同じホストへの再試行を抑える
+    - エントリ数が max_entries を超えたら最後に参照されてから最も古いものから削除する
+      （コンテナが任意のホスト名を解決させてもメモリが増え続けない）
     """
 
-    def __init__(self, ttl_seconds: float = DEFAULT_TTL_SECONDS) -> None:
+    def __init__(
+        self,
+        ttl_seconds: float = DEFAULT_TTL_SECONDS,
+        negative_ttl_seconds: float = DEFAULT_NEGATIVE_TTL_SECONDS,
+        stale_ttl_seconds: float = DEFAULT_STALE_TTL_SECONDS,
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+    ) -> None:
         self._ttl = ttl_seconds
-        self._cache: dict[str, _CacheEntry] = {}
-        self._lock = asyncio.Lock()
+        self._negative_ttl = negative_ttl_seconds
+        self._stale_ttl = stale_ttl_seconds
+        self._max_entries = max(1, max_entries)
+        # ホスト名 → エントリ（先頭ほど参照が古い）
+        self._cache: OrderedDict[str, _CacheEntry] = OrderedDict()
+        self._inflight: dict[str, asyncio.Task] = {}
 
     async def resolve(self, hostname: str) -> list[str]:
         """
         ホスト名をIPアドレスのリストに解決する
 
-        キャッシュに有効なエントリがあればそれを返し、
-        なければDNS解決を行い結果をキャッシュする。
-
         Args:
             hostname: 解決対象のホスト名
 
         Returns:
             IPアドレスの文字列リスト
+
+        Raises:
+            DNSResolutionError: 解決に失敗した場合（キャッシュ済みの失敗を含む）
         """
+        hostname = hostname.lower()
         now = time.monotonic()
+        entry = self._cache.get(hostname)
+        if entry is not None:
+            self._cache.move_to_end(hostname)
+
+        if entry is not None and entry.expires_at > now:
+            if entry.error is not None:
+                get_workspace_proxy_dns_lookups().inc(result="negative")
+                raise DNSResolutionError(hostname, entry.error)
+            get_workspace_proxy_dns_lookups().inc(result="hit")
+            return list(entry.addresses)
 
-        async with self._lock:
+        if (
+            entry is not None
+            and entry.error is None
+            and entry.expires_at + self._stale_ttl > now
+        ):
+            # 古い結果を返し、再解決はバックグラウンドで行う
+            get_workspace_proxy_dns_lookups().inc(result="stale")
+            self._refresh(hostname)
+            return list(entry.addresses)
+
+        get_workspace_proxy_dns_lookups().inc(result="miss")
+        addresses = await asyncio.shield(self._refresh(hostname))
+        if not addresses:
             entry = self._cache.get(hostname)
-            if entry is not None and entry.expires_at > now:
-                logger.debug("DNSキャッシュヒット", hostname=hostname)
-                return list(entry.addresses)
+            raise DNSResolutionError(
+                hostname, entry.error if entry and entry.error else "no address"
+            )
+        return list(addresses)
+
+    async def clear(self) -> None:
+        """キャッシュを全消去する"""
+        count = len(self._cache)
+        self._cache.clear()
+        logger.info("DNSキャッシュクリア", entries_removed=count)
 
-        # ロック外でDNS解決を実行（ブロッキング回避）
-        addresses = await self._do_resolve(hostname)
+    def _refresh(self, hostname: str) -> asyncio.Task:
+        """再解決タスクを取得（同一ホストの解決中タスクがあれば共有）"""
+        task = self._inflight.get(hostname)
+        if task is None:
+            task = asyncio.get_running_loop().create_task(self._resolve_and_store(hostname))
+            self._inflight[hostname] = task
+            task.add_done_callback(lambda _: self._inflight.pop(hostname, None))
+        return task
 
-        async with self._lock:
-            self._cache[hostname] = _CacheEntry(
-                addresses=addresses,
-                expires_at=time.monotonic() + self._ttl,
+    async def _resolve_and_store(self, hostname: str) -> list[str]:
+        """DNS解決を実行してキャッシュに保存（失敗時は空リストを返す）"""
+        start = time.perf_counter()
+        try:
+            addresses = await self._do_resolve(hostname)
+        except (OSError, UnicodeError) as e:
+            get_workspace_proxy_dns_resolution_duration().observe(
+                time.perf_counter() - start, result="error"
+            )
+            previous = self._cache.get(hostname)
+            if (
+                previous is not None
+                and previous.error is None
+                and previous.expires_at + self._stale_ttl > time.monotonic()
+            ):
+                # stale-while-revalidate 中の失敗は古い結果を維持（期限は延ばさない）
+                logger.warning("DNS再解決失敗（古い結果を維持）", hostname=hostname, error=str(e))
+                return list(previous.addresses)
+            self._store(
+                hostname,
+                _CacheEntry(
+                    addresses=[],
+                    expires_at=time.monotonic() + self._negative_ttl,
+                    error=str(e),
+                ),
             )
+            logger.error("DNS解決失敗", hostname=hostname, error=str(e))
+            return []
 
+        get_workspace_proxy_dns_resolution_duration().observe(
+            time.perf_counter() - start, result="ok"
+        )
+        self._store(
+            hostname,
+            _CacheEntry(addresses=addresses, expires_at=time.monotonic() + self._ttl),
+        )
         logger.debug(
             "DNS解決完了・キャッシュ保存",
             hostname=hostname,
@@ -73,21 +185,19 @@ class DNSCache:
         )
         return addresses
 
-    async def clear(self) -> None:
-        """キャッシュを全消去する"""
-        async with self._lock:
-            count = len(self._cache)
-            self._cache.clear()
-        logger.info("DNSキャッシュクリア", entries_removed=count)
+    def _store(self, hostname: str, entry: _CacheEntry) -> None:
+        """エントリを保存し、上限を超えた分を参照の古い順に削除"""
+        self._cache[hostname] = entry
+        self._cache.move_to_end(hostname)
+        while len(self._cache) > self._max_entries:
+            evicted, _ = self._cache.popitem(last=False)
+            get_workspace_proxy_dns_evictions().inc()
+            logger.debug("DNSキャッシュ追い出し", hostname=evicted)
 
     async def _do_resolve(self, hostname: str) -> list[str]:
         """asyncio経由でDNS解決を実行"""
         loop = asyncio.get_running_loop()
-        try:
-            infos = await loop.getaddrinfo(hostname, None)
-        except OSError as e:
-            logger.error("DNS解決失敗", hostname=hostname, error=str(e))
-            raise
+        infos = await loop.getaddrinfo(hostname, None, type=socket.SOCK_STREAM)
 
         # 重複を除いたIPアドレスリストを返す（順序保持）
         seen: set[str] = set()
@@ -99,3 +209,103 @@ class DNSCache:
                 addresses.append(addr)
 
         return addresses
+
+
+def _interleave_families(addresses: list[str]) -> list[str]:
+    """IPv6 / IPv4 を交互に並べる（先頭アドレスのファミリーを優先）"""
+    if not addresses:
+        return []
+    first_is_v6 = ":" in addresses[0]
+    preferred = [a for a in addresses if (":" in a) == first_is_v6]
+    other = [a for a in addresses if (":" in a) != first_is_v6]
+    result: list[str] = []
+    for i in range(max(len(preferred), len(other))):
+        result.extend(group[i] for group in (preferred, other) if i < len(group))
+    return result
+
+
+def _close_if_connected(task: asyncio.Task) -> None:
+    """キャンセルが間に合わず確立された接続を閉じる"""
+    if not task.cancelled() and task.exception() is None:
+        task.result()[1].close()
+
+
+async def open_connection_any(
+    addresses: list[str],
+    port: int,
+    attempt_delay: float = CONNECTION_ATTEMPT_DELAY,
+    timeout: float = CONNECT_TIMEOUT,
+) -> tuple[asyncio.StreamReader, asyncio.StreamWriter]:
+    """
+    複数アドレスへ段階的に接続を試み、最初に成功した接続を返す（Happy Eyeballs）
+
+    前の試行が attempt_delay 秒以内に完了しない、または失敗した時点で次のアドレスへの
+    試行を並行して開始する。勝者以外の試行はキャンセル・クローズする。
+    応答しないアドレスで待ち続けないよう、全体を timeout 秒で打ち切る。
+
+    Raises:
+        OSError: 全アドレスへの接続に失敗した場合（timeout 超過を含む）
+    """
+    if not addresses:
+        raise OSError("接続先アドレスがありません")
+
+    pending: set[asyncio.Task] = set()
+    errors: list[str] = []
+    winner: tuple[asyncio.StreamReader, asyncio.StreamWriter] | None = None
+
+    def collect(done: set[asyncio.Task]) -> None:
+        nonlocal winner
+        for task in done:
+            if task.exception() is not None:
+                errors.append(str(task.exception()))
+            elif winner is None:
+                winner = task.result()
+            else:
+                task.result()[1].close()
+
+    try:
+        async with asyncio.timeout(timeout):
+            for address in _interleave_families(addresses):
+                pending.add(asyncio.create_task(asyncio.open_connection(address, port)))
+                done, pending = await asyncio.wait(
+                    pending, timeout=attempt_delay, return_when=asyncio.FIRST_COMPLETED
+                )
+                collect(done)
+                if winner is not None:
+                    return winner
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                collect(done)
+                if winner is not None:
+                    return winner
+    except TimeoutError:
+        errors.append(f"{timeout:.1f}秒以内に接続できません")
+    finally:
+        for task in pending:
+            task.cancel()
+            task.add_done_callback(_close_if_connected)
+
+    raise OSError(f"全アドレスへの接続に失敗: {'; '.join(errors)}")
+
+
+# プロセス内シングルトン
+_dns_cache: DNSCache | None = None
+
+
+def get_dns_cache() -> DNSCache:
+    """
+    全Proxyで共有するDNSキャッシュを取得
+
+    Returns:
+        DNSCache インスタンス
+    """
+    global _dns_cache
+    if _dns_cache is None:
+        settings = get_settings()
+        _dns_cache = DNSCache(
+            ttl_seconds=settings.proxy_dns_ttl,
+            negative_ttl_seconds=settings.proxy_dns_negative_ttl,
+            stale_ttl_seconds=settings.proxy_dns_stale_ttl,
+            max_entries=settings.proxy_dns_max_entries,
+        )
+    return _dns_cache
@@ -1,39 +1,170 @@
 """
 ドメインホワイトリスト
 許可されたドメインのみ外部通信を許可する
+
+ルールはラベルを逆順にしたトライ木（com → example → api）にコンパイルし、
+ホスト名のラベル数に比例する時間で判定する。
+
+ルール書式:
+  - example.com        example.com とそのサブドメイン（全ポート）
+  - *.example.com      サブドメインのみ（example.com 自体は含まない）
+  - example.com:443    指定ポートのみ（複数ポートはルールを並べて指定）
 """
-from urllib.parse import urlparse
+from dataclasses import dataclass, field
+from urllib.parse import urlsplit
 
 import structlog
 
+from app.config import get_settings
+
 logger = structlog.get_logger(__name__)
 
+_DEFAULT_PORTS = {"http": 80, "https": 443}
+
+# 全ポート許可を表すポート集合
+ANY_PORT: frozenset[int] = frozenset()
+
+
+def _merge_ports(current: frozenset[int] | None, port: int | None) -> frozenset[int]:
+    """ポート制限を合成（どちらかが全ポート許可なら全ポート許可）"""
+    if current == ANY_PORT or port is None:
+        return ANY_PORT
+    return (current or frozenset()) | {port}
+
+
+def _port_allowed(ports: frozenset[int] | None, port: int | None) -> bool:
+    if ports is None:
+        return False
+    return ports == ANY_PORT or port in ports
+
+
+@dataclass
+class _TrieNode:
+    """トライ木のノード（ラベル1つ分）"""
+
+    children: dict[str, "_TrieNode"] = field(default_factory=dict)
+    exact: frozenset[int] | None = None  # このホスト自体の許可ポート
+    subdomains: frozenset[int] | None = None  # 配下のサブドメインの許可ポート
+
 
 class DomainWhitelist:
-    """ドメインベースのアクセス制御"""
+    """
+    ドメインベースのアクセス制御
+
+    プロセス内で共有する前提で、生成後は変更しない。
+    テナント別の追加ドメインは base に共通リストを指定したオーバーレイとして生成する。
+    """
 
-    def __init__(self, allowed_domains: list[str]) -> None:
-        self._allowed = set(d.strip().lower() for d in allowed_domains if d.strip())
+    def __init__(
+        self,
+        allowed_domains: list[str],
+        base: "DomainWhitelist | None" = None,
+    ) -> None:
+        self._base = base
+        self._root = _TrieNode()
+        self._rules: set[str] = set()
+        for rule in allowed_domains:
+            self._add_rule(rule)
 
     def is_allowed(self, url: str) -> bool:
-        """URLのドメインがホワイトリストに含まれるか判定"""
+        """URLのドメイン（とポート）がホワイトリストに含まれるか判定"""
         try:
-            parsed = urlparse(url)
-            host = (parsed.hostname or "").lower()
-        except Exception:
+            parts = urlsplit(url)
+            host = parts.hostname or ""
+            port = parts.port or _DEFAULT_PORTS.get(parts.scheme)
+        except ValueError:
             logger.warning("ドメイン解析失敗", url=url, exc_info=True)
             return False
+        return self.is_allowed_host(host, port)
 
+    def is_allowed_host(self, host: str, port: int | None = None) -> bool:
+        """
+        ホスト名とポートが許可されているか判定
+
+        Args:
+            host: ホスト名
+            port: ポート番号（Noneの場合はポート制限付きルールに一致しない）
+        """
+        host = host.lower().rstrip(".")
         if not host:
             return False
 
-        for allowed in self._allowed:
-            if host == allowed or host.endswith(f".{allowed}"):
+        labels = host.split(".")
+        node = self._root
+        for depth, label in enumerate(reversed(labels), start=1):
+            node = node.children.get(label)
+            if node is None:
+                break
+            if depth < len(labels):
+                if _port_allowed(node.subdomains, port):
+                    return True
+            elif _port_allowed(node.exact, port):
                 return True
 
+        if self._base is not None:
+            return self._base.is_allowed_host(host, port)
         return False
 
     @property
     def domains(self) -> frozenset[str]:
-        """許可ドメイン一覧"""
-        return frozenset(self._allowed)
+        """許可ドメイン一覧（オーバーレイの場合は共通リストを含む）"""
+        if self._base is not None:
+            return frozenset(self._rules) | self._base.domains
+        return frozenset(self._rules)
+
+    def _add_rule(self, rule: str) -> None:
+        """ルールをトライ木に追加"""
+        rule = rule.strip().lower()
+        if not rule:
+            return
+
+        host, port = rule, None
+        head, sep, tail = rule.rpartition(":")
+        if sep and tail.isdigit():
+            host, port = head, int(tail)
+
+        subdomains_only = host.startswith("*.")
+        host = host[2:] if subdomains_only else host.lstrip(".")
+        labels = host.rstrip(".").split(".")
+        if not host or any(not label or label == "*" for label in labels):
+            logger.warning("ホワイトリストルール無効（無視）", rule=rule)
+            return
+
+        node = self._root
+        for label in reversed(labels):
+            node = node.children.setdefault(label, _TrieNode())
+        node.subdomains = _merge_ports(node.subdomains, port)
+        if not subdomains_only:
+            node.exact = _merge_ports(node.exact, port)
+        self._rules.add(rule)
+
+
+# プロセス内キャッシュ（None: 共通リスト、それ以外: テナントID）
+_whitelists: dict[str | None, DomainWhitelist] = {}
+
+
+def get_domain_whitelist(tenant_id: str | None = None) -> DomainWhitelist:
+    """
+    コンパイル済みホワイトリストを取得
+
+    Args:
+        tenant_id: テナントID（追加ドメインが設定されていればオーバーレイを返す）
+
+    Returns:
+        DomainWhitelist インスタンス（全Proxyで共有）
+    """
+    whitelist = _whitelists.get(tenant_id)
+    if whitelist is not None:
+        return whitelist
+
+    settings = get_settings()
+    if None not in _whitelists:
+        _whitelists[None] = DomainWhitelist(settings.proxy_domain_whitelist_list)
+    base = _whitelists[None]
+    if tenant_id is None:
+        return base
+
+    tenant_domains = settings.proxy_tenant_domain_whitelist.get(tenant_id)
+    whitelist = DomainWhitelist(tenant_domains, base=base) if tenant_domains else base
+    _whitelists[tenant_id] = whitelist
+    return whitelist
@@ -0,0 +1,172 @@
+"""
+Proxy の転送量計測と帯域制限
+コンテナ・テナント単位で Proxy を通過したバイト数を経路別に積算し、
+トークンバケットで帯域を制限する
+
+- 経路（path）: bedrock / mcp / forward / connect / package
+- 方向（direction）: upstream（コンテナ → 接続先） / downstream（接続先 → コンテナ）
+- 帯域制限は両方向の合計に適用する（1コンテナにノードの回線を占有させない）
+- テナントのバケットはプロセス内の全Proxyで共有する（同じホストの全コンテナの合計を制限）
+- バケットは不足分を前借りして転送し、呼び出し側が返された時間だけ次の転送を待つ
+  （splice のイベントループコールバックからも使えるよう、待ち時間の計算は同期API）
+"""
+import asyncio
+import time
+from collections.abc import AsyncIterable, AsyncIterator
+from dataclasses import dataclass, field
+
+from app.config import get_settings
+from app.infrastructure.metrics import (
+    get_workspace_proxy_egress_bytes,
+    get_workspace_proxy_egress_throttled,
+)
+
+# バケットの容量（帯域の何秒分まで連続して転送できるか）
+_BURST_SECONDS = 1.0
+
+
+class TokenBucket:
+    """バイト単位のトークンバケット"""
+
+    def __init__(self, rate: float, burst: float) -> None:
+        """
+        Args:
+            rate: 補充速度（バイト/秒）
+            burst: 容量（バイト）
+        """
+        self.rate = rate
+        self.burst = burst
+        self._tokens = burst
+        self._updated = time.monotonic()
+
+    def reserve(self, size: int) -> float:
+        """size バイトを消費し、残量が負の場合は回復までの時間（秒）を返す"""
+        now = time.monotonic()
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+        self._tokens -= size
+        return 0.0 if self._tokens >= 0 else -self._tokens / self.rate
+
+
+@dataclass
+class EgressUsage:
+    """経路・方向別の転送量（バイト）"""
+
+    bytes_up: dict[str, int] = field(default_factory=dict)
+    bytes_down: dict[str, int] = field(default_factory=dict)
+
+    def add(self, path: str, direction: str, size: int) -> None:
+        counts = self.bytes_up if direction == "upstream" else self.bytes_down
+        counts[path] = counts.get(path, 0) + size
+
+    @property
+    def total_up(self) -> int:
+        return sum(self.bytes_up.values())
+
+    @property
+    def total_down(self) -> int:
+        return sum(self.bytes_down.values())
+
+    def as_dict(self) -> dict:
+        return {
+            "bytes_up": self.total_up,
+            "bytes_down": self.total_down,
+            "by_path": {
+                path: {
+                    "up": self.bytes_up.get(path, 0),
+                    "down": self.bytes_down.get(path, 0),
+                }
+                for path in sorted(self.bytes_up.keys() | self.bytes_down.keys())
+            },
+        }
+
+
+_tenant_buckets: dict[str, TokenBucket] = {}
+
+
+def _get_tenant_bucket(tenant_id: str, rate: float) -> TokenBucket:
+    """全Proxyで共有するテナントのバケットを取得"""
+    bucket = _tenant_buckets.get(tenant_id)
+    if bucket is None or bucket.rate != rate:
+        bucket = _tenant_buckets[tenant_id] = TokenBucket(rate, rate * _BURST_SECONDS)
+    return bucket
+
+
+class ContainerEgress:
+    """
+    1コンテナの転送量計測と帯域制限
+
+    Proxy の再起動をまたいで積算するため、Proxy ではなくコンテナ単位で生成する。
+    """
+
+    def __init__(
+        self,
+        container_id: str,
+        rate: float = 0.0,
+        tenant_rate: float = 0.0,
+    ) -> None:
+        """
+        Args:
+            rate: コンテナの帯域上限（バイト/秒、0で無制限）
+            tenant_rate: テナントの帯域上限（バイト/秒、0で無制限、同じホストの全コンテナの合計）
+        """
+        self.container_id = container_id
+        self.tenant_id = ""
+        self.usage = EgressUsage()
+        self._tenant_rate = tenant_rate
+        self._bucket = TokenBucket(rate, rate * _BURST_SECONDS) if rate > 0 else None
+        self._tenant_bucket: TokenBucket | None = None
+
+    def bind_tenant(self, tenant_id: str) -> None:
+        """転送量を積算・制限するテナントを設定"""
+        self.tenant_id = tenant_id
+        self._tenant_bucket = (
+            _get_tenant_bucket(tenant_id, self._tenant_rate)
+            if tenant_id and self._tenant_rate > 0
+            else None
+        )
+
+    def record(self, path: str, direction: str, size: int) -> float:
+        """
+        転送量を記録し、帯域制限による待ち時間を返す
+
+        Returns:
+            次の転送まで待つ時間（秒、制限なしは0）
+        """
+        if size <= 0:
+            return 0.0
+        self.usage.add(path, direction, size)
+        get_workspace_proxy_egress_bytes().inc(
+            size, tenant_id=self.tenant_id, path=path, direction=direction
+        )
+        delay = 0.0
+        for bucket in (self._bucket, self._tenant_bucket):
+            if bucket is not None:
+                delay = max(delay, bucket.reserve(size))
+        if delay > 0:
+            get_workspace_proxy_egress_throttled().inc(delay, tenant_id=self.tenant_id)
+        return delay
+
+    async def transfer(self, path: str, direction: str, size: int) -> None:
+        """転送量を記録し、帯域制限の待ち時間だけ待機"""
+        delay = self.record(path, direction, size)
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    async def metered(
+        self, path: str, direction: str, chunks: AsyncIterable[bytes]
+    ) -> AsyncIterator[bytes]:
+        """ストリーミングのボディをチャンクごとに記録・制限しながら中継"""
+        async for chunk in chunks:
+            yield chunk
+            await self.transfer(path, direction, len(chunk))
+
+
+def create_container_egress(container_id: str) -> ContainerEgress:
+    """設定に基づいてコンテナの転送量計測を生成"""
+    settings = get_settings()
+    return ContainerEgress(
+        container_id,
+        rate=settings.proxy_egress_rate_limit,
+        tenant_rate=settings.proxy_tenant_egress_rate_limit,
+    )
@@ -0,0 +1,259 @@
+"""
+MCPレスポンスキャッシュ
+OpenAPI MCPツールの冪等な GET レスポンスをProxy上でキャッシュする
+
+MCPサーバー単位のオプトイン（McpServer.response_cache_ttl）で有効になる。
+キャッシュキーはテナント・MCPサーバー・Proxyが注入する認証ヘッダーのダイジェスト・URL・
+Vary対象のリクエストヘッダーから構成し、異なるテナントや認証情報の間で応答を共有しない。
+
+HTTPキャッシュ（RFC 9111）のうち以下に従う:
+  - Cache-Control: no-store / Vary: * の応答は保存しない
+  - max-age / s-maxage は設定TTLを上限として鮮度に反映し、no-cache は毎回再検証する
+  - 期限切れエントリは ETag / Last-Modified があれば条件付きリクエストで再検証する
+  - 同じURLへの GET 以外のリクエストが成功したら、そのURLのエントリを破棄する
+"""
+import hashlib
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+
+from app.config import get_settings
+
+# 設定に関わらずキーに含めるリクエストヘッダー（表現の選択に影響するため）
+_ALWAYS_VARY = ("accept", "accept-encoding")
+
+# 保存しないレスポンスヘッダー（フレーミングは応答時に決定する）
+_UNSTORED_HEADERS = frozenset(
+    {"transfer-encoding", "connection", "keep-alive", "content-length", "age"}
+)
+
+# 304 応答で更新しないヘッダー（RFC 9111 3.2）
+_UNUPDATED_HEADERS = frozenset({"content-length", "content-encoding", "content-type"})
+
+
+@dataclass(frozen=True)
+class McpCachePolicy:
+    """MCPサーバー単位のキャッシュ設定"""
+
+    ttl: float  # 鮮度の上限（秒）
+    vary_headers: tuple[str, ...] = ()  # キーに含めるリクエストヘッダー（小文字）
+
+
+@dataclass
+class CachedResponse:
+    """キャッシュ済みレスポンス"""
+
+    status: int
+    headers: list[tuple[str, str]]
+    body: bytes
+    stored_at: float
+    expires_at: float
+    namespace: str = ""
+    url: str = ""
+
+    @property
+    def fresh(self) -> bool:
+        return time.monotonic() < self.expires_at
+
+    @property
+    def age(self) -> int:
+        return int(time.monotonic() - self.stored_at)
+
+    def header(self, name: str) -> str | None:
+        for key, value in self.headers:
+            if key.lower() == name:
+                return value
+        return None
+
+    def conditional_headers(self) -> dict[str, str]:
+        """再検証用の条件付きリクエストヘッダー"""
+        conditions = {}
+        etag = self.header("etag")
+        if etag:
+            conditions["If-None-Match"] = etag
+        last_modified = self.header("last-modified")
+        if last_modified:
+            conditions["If-Modified-Since"] = last_modified
+        return conditions
+
+
+def parse_cache_control(value: str | None) -> dict[str, str | None]:
+    """Cache-Control ヘッダーをディレクティブ（小文字）→ 値 に分解"""
+    directives: dict[str, str | None] = {}
+    for part in (value or "").split(","):
+        name, _, arg = part.strip().partition("=")
+        if name:
+            directives[name.lower()] = arg.strip().strip('"') or None
+    return directives
+
+
+def _seconds(value: str | None) -> float | None:
+    return float(value) if value and value.isdigit() else None
+
+
+def freshness_lifetime(cache_control: dict[str, str | None], ttl: float) -> float:
+    """鮮度の有効期間（秒、設定TTLを上限とする）"""
+    if "no-cache" in cache_control:
+        return 0.0
+    # 共有キャッシュでは s-maxage が max-age より優先される（s-maxage=0 も含む）
+    for directive in ("s-maxage", "max-age"):
+        if directive in cache_control:
+            max_age = _seconds(cache_control[directive])
+            # 値が不正な場合は期限切れとして扱う
+            return 0.0 if max_age is None else min(max_age, ttl)
+    return ttl
+
+
+class McpResponseCache:
+    """
+    MCP GET レスポンスのメモリキャッシュ（全Proxyで共有）
+
+    合計サイズが max_bytes を超えたら最後に参照されてから最も古いものから削除する。
+    """
+
+    def __init__(self, max_bytes: int) -> None:
+        self._max_bytes = max_bytes
+        self._entries: OrderedDict[str, CachedResponse] = OrderedDict()
+        self._total_bytes = 0
+        # (名前空間, URL) → キー（Vary の値ごとに複数）
+        self._keys_by_url: dict[tuple[str, str], set[str]] = {}
+
+    @staticmethod
+    def namespace(tenant_id: str, server_name: str, injected_headers: dict[str, str]) -> str:
+        """テナント・MCPサーバー・注入する認証ヘッダーごとの名前空間"""
+        digest = hashlib.sha256()
+        for key, value in sorted((k.lower(), v) for k, v in injected_headers.items()):
+            digest.update(f"{key}:{value}\n".encode())
+        return f"{tenant_id}/{server_name}/{digest.hexdigest()}"
+
+    @staticmethod
+    def key(
+        namespace: str,
+        url: str,
+        request_headers: dict[str, str],
+        policy: McpCachePolicy,
+    ) -> str:
+        """キャッシュキー（名前空間・URL・Vary対象ヘッダーの値）"""
+        lowered = {k.lower(): v for k, v in request_headers.items()}
+        parts = [namespace, url]
+        for name in sorted(set(_ALWAYS_VARY) | set(policy.vary_headers)):
+            parts.append(f"{name}:{lowered.get(name, '')}")
+        return hashlib.sha256("\n".join(parts).encode()).hexdigest()
+
+    def get(self, key: str) -> CachedResponse | None:
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+        return entry
+
+    def store(
+        self,
+        key: str,
+        namespace: str,
+        url: str,
+        status: int,
+        headers: list[tuple[str, str]],
+        body: bytes,
+        policy: McpCachePolicy,
+    ) -> bool:
+        """
+        レスポンスが保存可能であれば保存する
+
+        Returns:
+            保存したか
+        """
+        lowered = {k.lower(): v for k, v in headers}
+        cache_control = parse_cache_control(lowered.get("cache-control"))
+        if status != 200 or "no-store" in cache_control:
+            return False
+        vary = {v.strip().lower() for v in lowered.get("vary", "").split(",") if v.strip()}
+        if "*" in vary or not vary <= set(_ALWAYS_VARY) | set(policy.vary_headers):
+            # キーに含めていないヘッダーで表現が変わる応答は共有できない
+            return False
+        lifetime = freshness_lifetime(cache_control, policy.ttl)
+        if lifetime <= 0 and "etag" not in lowered and "last-modified" not in lowered:
+            return False
+        if len(body) > self._max_bytes:
+            return False
+
+        now = time.monotonic()
+        self._remove(key)
+        self._entries[key] = CachedResponse(
+            status=status,
+            headers=[(k, v) for k, v in headers if k.lower() not in _UNSTORED_HEADERS],
+            body=body,
+            stored_at=now,
+            expires_at=now + lifetime,
+            namespace=namespace,
+            url=url,
+        )
+        self._total_bytes += len(body)
+        self._keys_by_url.setdefault((namespace, url), set()).add(key)
+        self._evict()
+        return True
+
+    @staticmethod
+    def refresh(
+        entry: CachedResponse, headers: list[tuple[str, str]], policy: McpCachePolicy
+    ) -> None:
+        """304 応答でエントリのヘッダーと鮮度を更新"""
+        updates = {
+            k.lower(): (k, v)
+            for k, v in headers
+            if k.lower() not in _UNSTORED_HEADERS and k.lower() not in _UNUPDATED_HEADERS
+        }
+        merged = [
+            updates.pop(k.lower()) if k.lower() in updates else (k, v)
+            for k, v in entry.headers
+        ]
+        entry.headers = merged + list(updates.values())
+        now = time.monotonic()
+        entry.stored_at = now
+        entry.expires_at = now + freshness_lifetime(
+            parse_cache_control(entry.header("cache-control")), policy.ttl
+        )
+
+    def invalidate(self, namespace: str, url: str) -> int:
+        """URLに対応するエントリを破棄（GET 以外のリクエスト成功時）"""
+        keys = list(self._keys_by_url.get((namespace, url), ()))
+        for key in keys:
+            self._remove(key)
+        return len(keys)
+
+    @property
+    def total_bytes(self) -> int:
+        return self._total_bytes
+
+    def _remove(self, key: str) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        self._total_bytes -= len(entry.body)
+        keys = self._keys_by_url.get((entry.namespace, entry.url))
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._keys_by_url[(entry.namespace, entry.url)]
+
+    def _evict(self) -> None:
+        while self._total_bytes > self._max_bytes and self._entries:
+            self._remove(next(iter(self._entries)))
+
+
+# プロセス内シングルトン
+_mcp_response_cache: McpResponseCache | None = None
+
+
+def get_mcp_response_cache() -> McpResponseCache:
+    """
+    全Proxyで共有するMCPレスポンスキャッシュを取得
+
+    Returns:
+        McpResponseCache インスタンス
+    """
+    global _mcp_response_cache
+    if _mcp_response_cache is None:
+        _mcp_response_cache = McpResponseCache(
+            max_bytes=get_settings().proxy_mcp_cache_max_bytes,
+        )
+    return _mcp_response_cache
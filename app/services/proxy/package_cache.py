@@ -0,0 +1,541 @@
+"""
+パッケージキャッシュ
+コンテナの pip / npm が参照するパッケージインデックスをProxy上で提供する
+
+CONNECT トンネル経由の取得はキャッシュできないため、コンテナには
+PIP_INDEX_URL / npm_config_registry としてこのエンドポイントを指定させる。
+  /pkg/pypi/simple/{project}/  → PyPI Simple API（HTML / JSON）
+  /pkg/pypi/files/{path}       → files.pythonhosted.org の配布ファイル
+  /pkg/npm/{name}              → npm レジストリのパッケージメタデータ
+  /pkg/npm/{name}/-/{file}.tgz → npm の tarball
+
+配布ファイル・tarball は不変のためサイズ上限付きLRUでディスクに保持し、
+保存前にチェックサムを検証する（PyPI: パス中の BLAKE2b-256、npm: メタデータの integrity）。
+インデックス・メタデータは metadata_ttl の間キャッシュし、
+上流取得に失敗した場合は期限切れのコピーを返す。
+キャッシュディレクトリは同じホストの全ワーカープロセスで共有する（app.utils.disk_cache）。
+"""
+import asyncio
+import base64
+import hashlib
+import json
+import re
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from pathlib import Path
+from typing import BinaryIO
+
+import structlog
+
+from app.config import get_settings
+from app.infrastructure.metrics import (
+    get_workspace_package_cache_bytes,
+    get_workspace_package_cache_evictions,
+    get_workspace_package_cache_requests,
+)
+from app.services.proxy.egress import ContainerEgress
+from app.services.proxy.upstream_pool import UpstreamSlotTimeoutError, get_upstream_pool
+from app.utils.disk_cache import (
+    evict_shared,
+    move_into_place,
+    open_entry,
+    tmp_dir,
+)
+
+logger = structlog.get_logger(__name__)
+
+# Proxy上のパスプレフィックス
+PACKAGE_CACHE_PREFIX = "/pkg/"
+
+# コンテナから見たキャッシュのベースURL（socat 経由でProxyに到達）
+PACKAGE_CACHE_BASE_URL = "http://127.0.0.1:8080/pkg"
+
+_PYPI_JSON_TYPE = "application/vnd.pypi.simple.v1+json"
+_PYPI_HTML_TYPE = "text/html"
+_NPM_JSON_TYPE = "application/json"
+_BLOB_TYPE = "application/octet-stream"
+
+# パスに許可する文字（クエリ・フラグメント・ディレクトリ遡りは不可）
+_SAFE_PATH = re.compile(r"^[A-Za-z0-9._~!$&'()*+,;=:@%/-]+$")
+
+# files.pythonhosted.org のパス（/packages/ab/cd/{残り60桁}/{ファイル名}）に含まれる BLAKE2b-256
+_PYPI_FILE_PATH = re.compile(r"^packages/([0-9a-f]{2})/([0-9a-f]{2})/([0-9a-f]{60})/[^/]+$")
+
+# ダウンロード時の書き込み単位
+_WRITE_CHUNK_SIZE = 256 * 1024
+
+# tarball のチェックサムを保持する上限（メタデータから抽出）
+_MAX_NPM_INTEGRITY_ENTRIES = 100_000
+
+# 他プロセスが追加したエントリを含めて合計サイズを確認する間隔（秒）
+_SHARED_SCAN_INTERVAL = 60.0
+
+# 省略形メタデータ（npm install の既定）の Content-Type
+_NPM_ABBREVIATED_TYPE = "application/vnd.npm.install-v1+json"
+
+
+class PackageCacheError(Exception):
+    """パッケージ取得失敗（status はクライアントに返すHTTPステータス）"""
+
+    def __init__(self, status: int, message: str):
+        self.status = status
+        super().__init__(message)
+
+
+@dataclass
+class CachedObject:
+    """
+    クライアントへ返すキャッシュ済みオブジェクト
+
+    file は PackageCache.get が開いた読み取り用ファイルで、送信中に追い出し・置き換えで
+    パスが削除されても内容は変わらない。送信後は PackageCache.release で閉じる。
+    """
+
+    path: Path
+    size: int
+    content_type: str
+    temporary: bool = False  # キャッシュに収まらず、送信後に削除するファイル
+    file: BinaryIO | None = None
+    metered: bool = False  # 上流からの取得時に転送量を記録済み（送信時は記録しない）
+
+
+@dataclass(frozen=True)
+class _Route:
+    """キャッシュ対象のリクエスト"""
+
+    ecosystem: str  # pypi / npm
+    key: str  # キャッシュキー
+    upstream_url: str
+    accept: str
+    content_type: str
+    immutable: bool
+    expected_digest: tuple[str, str] | None = None  # (アルゴリズム, 16進ダイジェスト)
+
+
+class PackageCache:
+    """
+    ディスクバックエンドのパッケージキャッシュ
+
+    - エントリはキャッシュキーの SHA-256 をファイル名として保存する
+    - 合計サイズが max_bytes を超えたら最後に参照されてから最も古いものから削除する
+      （配布ファイル・tarball は参照時に更新時刻を更新する。メタデータは更新時刻を
+      取得時刻として鮮度判定に使うため更新せず、取得が古いものから削除される）
+    - 同じキーへの同時取得は1回の上流取得にまとめる
+    - tarball の integrity は取得済みメタデータから抽出し、再起動後はディスク上の
+      メタデータから復元する
+    """
+
+    def __init__(
+        self,
+        root_dir: str,
+        max_bytes: int,
+        metadata_ttl: float,
+        pypi_index_url: str,
+        pypi_files_url: str,
+        npm_registry_url: str,
+    ) -> None:
+        self._root = Path(root_dir)
+        self._max_bytes = max_bytes
+        self._metadata_ttl = metadata_ttl
+        self._pypi_index_url = pypi_index_url.rstrip("/") + "/"
+        self._pypi_files_url = pypi_files_url.rstrip("/") + "/"
+        self._npm_registry_url = npm_registry_url.rstrip("/") + "/"
+        # ファイル名 → サイズ（このプロセスから見たエントリ、先頭ほど参照が古い）
+        self._entries: OrderedDict[str, int] = OrderedDict()
+        self._total_bytes = 0
+        self._next_shared_scan = 0.0
+        self._loaded = False
+        self._load_lock = asyncio.Lock()
+        self._inflight: dict[str, asyncio.Task] = {}
+        self._npm_integrity: OrderedDict[str, str] = OrderedDict()
+
+    def upstream_url(self, path: str) -> str | None:
+        """リクエストパスに対応する上流URL（ホワイトリスト判定用、対象外ならNone）"""
+        try:
+            return self._route(path, accept="").upstream_url
+        except PackageCacheError:
+            return None
+
+    async def get(
+        self, path: str, accept: str, egress: ContainerEgress | None = None
+    ) -> CachedObject:
+        """
+        パッケージを取得（キャッシュになければ上流から取得して保存）
+
+        返すオブジェクトのファイルは開いた状態のため、送信後に release() を呼ぶこと。
+
+        Args:
+            path: PACKAGE_CACHE_PREFIX 以降のパス
+            accept: クライアントの Accept ヘッダー
+            egress: 上流から取得する場合に転送量を記録・制限するコンテナ
+                （記録した場合は返すオブジェクトの metered が True）
+
+        Raises:
+            PackageCacheError: パス不正・上流エラー・チェックサム不一致
+        """
+        await self._ensure_loaded()
+        route = self._route(path, accept)
+        if route.ecosystem == "npm" and route.immutable and route.expected_digest is None:
+            if await self._restore_npm_integrity(path.partition("/")[2]):
+                route = self._route(path, accept)
+        name = hashlib.sha256(route.key.encode()).hexdigest()
+        file_path = self._file_path(name)
+
+        cached = await asyncio.to_thread(open_entry, file_path, route.immutable)
+        if cached is not None:
+            f, size, mtime = cached
+            if route.immutable or time.time() - mtime < self._metadata_ttl:
+                self._record(name, size)
+                get_workspace_package_cache_requests().inc(
+                    ecosystem=route.ecosystem, result="hit"
+                )
+                return CachedObject(file_path, size, route.content_type, file=f)
+
+        try:
+            obj = await self._fetch_and_open(route, name, egress)
+        except PackageCacheError as e:
+            if cached is not None:
+                # メタデータは上流障害時に期限切れのコピーで応答する
+                logger.warning(
+                    "パッケージメタデータ取得失敗（期限切れキャッシュで応答）",
+                    url=route.upstream_url,
+                    error=str(e),
+                )
+                get_workspace_package_cache_requests().inc(
+                    ecosystem=route.ecosystem, result="stale"
+                )
+                return CachedObject(file_path, cached[1], route.content_type, file=cached[0])
+            get_workspace_package_cache_requests().inc(
+                ecosystem=route.ecosystem, result="error"
+            )
+            raise
+        except BaseException:
+            if cached is not None:
+                cached[0].close()
+            raise
+
+        if cached is not None:
+            cached[0].close()
+        get_workspace_package_cache_requests().inc(ecosystem=route.ecosystem, result="miss")
+        return obj
+
+    def release(self, obj: CachedObject) -> None:
+        """送信済みオブジェクトの後始末（ファイルを閉じ、キャッシュ対象外の一時ファイルを削除）"""
+        if obj.file is not None:
+            obj.file.close()
+        if obj.temporary:
+            obj.path.unlink(missing_ok=True)
+
+    async def _fetch_and_open(
+        self, route: _Route, name: str, egress: ContainerEgress | None
+    ) -> CachedObject:
+        """
+        上流から取得（同じキーの取得中タスクがあれば共有）し、取得したファイルを開く
+
+        転送量は取得を開始したリクエストの egress に記録する（共有した側は送信時に記録する）。
+        """
+        # 取得完了から開くまでに他の取得による追い出しで削除された場合は取得し直す
+        for _ in range(2):
+            task = self._inflight.get(name)
+            metered = False
+            if task is None:
+                task = asyncio.get_running_loop().create_task(self._fetch(route, name, egress))
+                self._inflight[name] = task
+                task.add_done_callback(lambda _: self._inflight.pop(name, None))
+                metered = egress is not None
+            obj = await asyncio.shield(task)
+            opened = await asyncio.to_thread(open_entry, obj.path)
+            if opened is not None:
+                f, size, _ = opened
+                return CachedObject(
+                    obj.path, size, obj.content_type, obj.temporary, f, metered=metered
+                )
+        raise PackageCacheError(502, "Cache entry vanished")
+
+    def _route(self, path: str, accept: str) -> _Route:
+        """リクエストパスをキャッシュ対象に変換"""
+        if not _SAFE_PATH.match(path) or any(seg == ".." for seg in path.split("/")):
+            raise PackageCacheError(400, f"Invalid package path: {path}")
+
+        ecosystem, _, rest = path.partition("/")
+        if ecosystem == "pypi":
+            kind, _, rest = rest.partition("/")
+            if kind == "simple":
+                if _PYPI_JSON_TYPE in accept:
+                    content_type = _PYPI_JSON_TYPE
+                else:
+                    content_type = _PYPI_HTML_TYPE
+                return _Route(
+                    ecosystem="pypi",
+                    key=f"pypi-simple:{content_type}:{rest}",
+                    upstream_url=self._pypi_index_url + rest,
+                    accept=content_type,
+                    content_type=content_type,
+                    immutable=False,
+                )
+            if kind == "files" and rest:
+                match = _PYPI_FILE_PATH.match(rest)
+                return _Route(
+                    ecosystem="pypi",
+                    key=f"pypi-file:{rest}",
+                    upstream_url=self._pypi_files_url + rest,
+                    accept="*/*",
+                    content_type=_BLOB_TYPE,
+                    immutable=True,
+                    expected_digest=("blake2b_256", "".join(match.groups()))
+                    if match
+                    else None,
+                )
+        elif ecosystem == "npm" and rest:
+            if "/-/" in rest:
+                integrity = self._npm_integrity.get(rest)
+                return _Route(
+                    ecosystem="npm",
+                    key=f"npm-tarball:{rest}",
+                    upstream_url=self._npm_registry_url + rest,
+                    accept="*/*",
+                    content_type=_BLOB_TYPE,
+                    immutable=True,
+                    expected_digest=_parse_integrity(integrity) if integrity else None,
+                )
+            # 省略形メタデータ（npm install の既定）と完全形は別エントリとして保持
+            abbreviated = _NPM_ABBREVIATED_TYPE in accept
+            upstream_accept = _NPM_ABBREVIATED_TYPE if abbreviated else _NPM_JSON_TYPE
+            return _Route(
+                ecosystem="npm",
+                key=f"npm-meta:{upstream_accept}:{rest}",
+                upstream_url=self._npm_registry_url + rest,
+                accept=upstream_accept,
+                content_type=_NPM_JSON_TYPE,
+                immutable=False,
+            )
+        raise PackageCacheError(404, f"Unknown package path: {path}")
+
+    async def _fetch(
+        self, route: _Route, name: str, egress: ContainerEgress | None = None
+    ) -> CachedObject:
+        """
+        上流から取得して検証し、キャッシュに保存
+
+        受信したボディは経路 package として egress に記録し、帯域制限の待ち時間を挟んで読む。
+        """
+        tmp_path = tmp_dir(self._root) / f"{name}.{time.monotonic_ns()}"
+        await asyncio.to_thread(tmp_path.parent.mkdir, parents=True, exist_ok=True)
+
+        hasher = _new_hasher(route.expected_digest[0]) if route.expected_digest else None
+        try:
+            async with get_upstream_pool().stream(
+                "GET", route.upstream_url, {"Accept": route.accept}, None
+            ) as resp:
+                if resp.status_code == 404:
+                    raise PackageCacheError(404, "Not Found")
+                if resp.status_code != 200:
+                    raise PackageCacheError(
+                        502, f"Upstream returned {resp.status_code}"
+                    )
+
+                if route.immutable:
+                    size = 0
+                    chunks = resp.aiter_bytes(_WRITE_CHUNK_SIZE)
+                    if egress is not None:
+                        chunks = egress.metered("package", "downstream", chunks)
+                    with open(tmp_path, "wb") as f:
+                        async for chunk in chunks:
+                            if hasher:
+                                hasher.update(chunk)
+                            await asyncio.to_thread(f.write, chunk)
+                            size += len(chunk)
+                else:
+                    raw = await resp.aread()
+                    if egress is not None:
+                        await egress.transfer("package", "downstream", len(raw))
+                    body = self._rewrite_metadata(route, raw)
+                    await asyncio.to_thread(tmp_path.write_bytes, body)
+                    size = len(body)
+        except PackageCacheError:
+            tmp_path.unlink(missing_ok=True)
+            raise
+        except UpstreamSlotTimeoutError as e:
+            tmp_path.unlink(missing_ok=True)
+            raise PackageCacheError(503, "Upstream host busy") from e
+        except Exception as e:
+            tmp_path.unlink(missing_ok=True)
+            logger.error("パッケージ取得失敗", url=route.upstream_url, error=str(e))
+            raise PackageCacheError(502, "Upstream fetch failed") from e
+
+        if hasher and hasher.hexdigest() != route.expected_digest[1]:
+            tmp_path.unlink(missing_ok=True)
+            get_workspace_package_cache_requests().inc(
+                ecosystem=route.ecosystem, result="checksum_mismatch"
+            )
+            logger.error("パッケージのチェックサム不一致", url=route.upstream_url)
+            raise PackageCacheError(502, "Checksum mismatch")
+
+        if size > self._max_bytes:
+            # キャッシュ容量を超えるファイルは保存せず、今回の応答にのみ使う
+            return CachedObject(tmp_path, size, route.content_type, temporary=True)
+
+        file_path = self._file_path(name)
+        await asyncio.to_thread(move_into_place, tmp_path, file_path)
+        self._record(name, size)
+        await self._evict()
+        return CachedObject(file_path, size, route.content_type)
+
+    def _rewrite_metadata(self, route: _Route, body: bytes) -> bytes:
+        """メタデータ中の配布ファイルURLをキャッシュ経由に書き換える"""
+        if route.ecosystem == "pypi":
+            return body.replace(
+                self._pypi_files_url.encode(), f"{PACKAGE_CACHE_BASE_URL}/pypi/files/".encode()
+            )
+
+        try:
+            packument = json.loads(body)
+        except ValueError:
+            return body
+        for version in (packument.get("versions") or {}).values():
+            dist = version.get("dist") if isinstance(version, dict) else None
+            tarball = dist.get("tarball") if isinstance(dist, dict) else None
+            if not isinstance(tarball, str) or not tarball.startswith(self._npm_registry_url):
+                continue
+            rel = tarball[len(self._npm_registry_url):]
+            dist["tarball"] = f"{PACKAGE_CACHE_BASE_URL}/npm/{rel}"
+        self._remember_npm_integrity(packument)
+        return json.dumps(packument, separators=(",", ":")).encode()
+
+    def _remember_npm_integrity(self, packument: dict) -> None:
+        """書き換え済みメタデータから tarball の integrity を記録"""
+        prefix = f"{PACKAGE_CACHE_BASE_URL}/npm/"
+        for version in (packument.get("versions") or {}).values():
+            dist = version.get("dist") if isinstance(version, dict) else None
+            if not isinstance(dist, dict):
+                continue
+            tarball, integrity = dist.get("tarball"), dist.get("integrity")
+            if (
+                isinstance(tarball, str)
+                and tarball.startswith(prefix)
+                and isinstance(integrity, str)
+            ):
+                rel = tarball[len(prefix):]
+                self._npm_integrity[rel] = integrity
+                self._npm_integrity.move_to_end(rel)
+        while len(self._npm_integrity) > _MAX_NPM_INTEGRITY_ENTRIES:
+            self._npm_integrity.popitem(last=False)
+
+    async def _restore_npm_integrity(self, tarball_path: str) -> bool:
+        """
+        ディスク上のメタデータから tarball の integrity を復元
+
+        integrity はメモリ上にのみ保持するため、再起動後や上限による削除後に
+        メタデータを取得せずに tarball が要求された場合に使う。
+
+        Returns:
+            tarball_path の integrity が得られたか
+        """
+        package = tarball_path.partition("/-/")[0]
+        for accept in (_NPM_ABBREVIATED_TYPE, _NPM_JSON_TYPE):
+            name = hashlib.sha256(f"npm-meta:{accept}:{package}".encode()).hexdigest()
+            opened = await asyncio.to_thread(open_entry, self._file_path(name))
+            if opened is None:
+                continue
+            f = opened[0]
+            try:
+                body = await asyncio.to_thread(f.read)
+            finally:
+                f.close()
+            try:
+                packument = json.loads(body)
+            except ValueError:
+                continue
+            if isinstance(packument, dict):
+                self._remember_npm_integrity(packument)
+            if tarball_path in self._npm_integrity:
+                return True
+        return False
+
+    def _file_path(self, name: str) -> Path:
+        return self._root / name[:2] / name
+
+    def _record(self, name: str, size: int) -> None:
+        """エントリを登録（既存なら置き換え、参照順を更新）"""
+        self._total_bytes += size - self._entries.pop(name, 0)
+        self._entries[name] = size
+        get_workspace_package_cache_bytes().set(self._total_bytes)
+
+    async def _evict(self, force: bool = False) -> None:
+        """
+        上限を超えた分を参照の古い順に削除
+
+        キャッシュディレクトリは他のワーカープロセスと共有するため、このプロセスの
+        見積もりが上限を超えたとき、または一定間隔ごとにディレクトリ全体を走査して判定する。
+        """
+        now = time.monotonic()
+        if not force and self._total_bytes <= self._max_bytes and now < self._next_shared_scan:
+            return
+        self._next_shared_scan = now + _SHARED_SCAN_INTERVAL
+        entries, evicted = await asyncio.to_thread(evict_shared, self._root, self._max_bytes)
+        self._entries = OrderedDict(entries)
+        self._total_bytes = sum(self._entries.values())
+        get_workspace_package_cache_bytes().set(self._total_bytes)
+        if evicted:
+            get_workspace_package_cache_evictions().inc(evicted)
+
+    async def _ensure_loaded(self) -> None:
+        """起動後初回に既存のキャッシュファイルを読み込む（更新時刻順）"""
+        if self._loaded:
+            return
+        async with self._load_lock:
+            if self._loaded:
+                return
+            # 書きかけファイルの削除・既存エントリの読み込み・上限超過分の削除
+            await self._evict(force=True)
+            self._loaded = True
+            logger.info(
+                "パッケージキャッシュ読み込み",
+                root=str(self._root),
+                entries=len(self._entries),
+                total_bytes=self._total_bytes,
+            )
+
+
+def _parse_integrity(integrity: str) -> tuple[str, str] | None:
+    """npm の integrity（例: sha512-<base64>）を (アルゴリズム, 16進) に変換"""
+    for candidate in integrity.split():
+        algo, _, b64 = candidate.partition("-")
+        if algo in ("sha512", "sha384", "sha256", "sha1"):
+            try:
+                return algo, base64.b64decode(b64).hex()
+            except ValueError:
+                return None
+    return None
+
+
+def _new_hasher(algorithm: str):
+    if algorithm == "blake2b_256":
+        return hashlib.blake2b(digest_size=32)
+    return hashlib.new(algorithm)
+
+
+# プロセス内シングルトン
+_package_cache: PackageCache | None = None
+
+
+def get_package_cache() -> PackageCache:
+    """
+    全Proxyで共有するパッケージキャッシュを取得
+
+    Returns:
+        PackageCache インスタンス
+    """
+    global _package_cache
+    if _package_cache is None:
+        settings = get_settings()
+        _package_cache = PackageCache(
+            root_dir=settings.proxy_package_cache_dir,
+            max_bytes=settings.proxy_package_cache_max_bytes,
+            metadata_ttl=settings.proxy_package_cache_metadata_ttl,
+            pypi_index_url=settings.proxy_package_cache_pypi_url,
+            pypi_files_url=settings.proxy_package_cache_pypi_files_url,
+            npm_registry_url=settings.proxy_package_cache_npm_url,
+        )
+    return _package_cache
@@ -0,0 +1,151 @@
+"""
+プロンプトキャッシュのチェックポイント注入
+Bedrock への InvokeModel / Converse リクエストボディを書き換え、
+安定したプレフィックス（ツール定義・システムプロンプト）の末尾にキャッシュチェックポイントを追加する
+
+プロンプトは ツール定義 → システムプロンプト → メッセージ の順に連結されるため、
+ツール定義の末尾とシステムプロンプトの末尾にチェックポイントを置けば、
+会話履歴が変わっても共通プレフィックスをキャッシュから読み取れる。
+
+- クライアントが既にチェックポイントを置いている区間は変更しない
+- 1リクエストあたりの上限（4個）を超えない
+- キャッシュ対象の最小長に満たない短いプレフィックスには置かない
+- 解析できないボディはそのまま転送する
+"""
+import json
+
+import structlog
+
+logger = structlog.get_logger(__name__)
+
+# 1リクエストあたりのチェックポイント上限（Anthropic / Bedrock 共通）
+MAX_CHECKPOINTS = 4
+
+# キャッシュ対象の最小長（最小1024トークン ≒ 4文字/トークンで概算）
+_MIN_CACHEABLE_CHARS = 4096
+
+_CACHE_CONTROL = {"type": "ephemeral"}
+_CACHE_POINT = {"cachePoint": {"type": "default"}}
+
+
+def inject_cache_checkpoints(path: str, body: bytes) -> tuple[bytes, list[str]]:
+    """
+    リクエストボディにキャッシュチェックポイントを追加
+
+    Args:
+        path: Bedrock API のパス（/model/{modelId}/invoke, /converse 等）
+        body: リクエストボディ
+
+    Returns:
+        (書き換え後のボディ, チェックポイントを追加した区間（tools / system）のリスト)
+    """
+    operation = path.split("?", 1)[0].rstrip("/").rsplit("/", 1)[-1]
+    if operation not in ("invoke", "invoke-with-response-stream", "converse", "converse-stream"):
+        return body, []
+    try:
+        request = json.loads(body)
+    except ValueError:
+        return body, []
+    if not isinstance(request, dict) or not isinstance(request.get("messages"), list):
+        return body, []
+
+    try:
+        if operation.startswith("converse"):
+            added = _inject_converse(request)
+        else:
+            added = _inject_messages(request)
+    except (AttributeError, TypeError) as e:
+        # 想定外の構造（ブロックが dict でない等）は書き換えない
+        logger.debug("キャッシュチェックポイント注入スキップ", path=path, error=str(e))
+        return body, []
+
+    if not added:
+        return body, []
+    return json.dumps(request, ensure_ascii=False, separators=(",", ":")).encode(), added
+
+
+def _inject_messages(request: dict) -> list[str]:
+    """Anthropic Messages 形式（InvokeModel）: ブロックに cache_control を付ける"""
+    tools = request.get("tools") or []
+    system = request.get("system")
+    if isinstance(system, str):
+        system = [{"type": "text", "text": system}] if system else []
+    system = system or []
+
+    existing = _count(tools, _has_cache_control) + _count(system, _has_cache_control)
+    for message in request["messages"]:
+        content = message.get("content")
+        if isinstance(content, list):
+            existing += _count(content, _has_cache_control)
+
+    added = []
+    prefix = _length(tools)
+    if (
+        tools
+        and prefix >= _MIN_CACHEABLE_CHARS
+        and not any(_has_cache_control(t) for t in tools)
+        and existing + len(added) < MAX_CHECKPOINTS
+    ):
+        tools[-1]["cache_control"] = dict(_CACHE_CONTROL)
+        added.append("tools")
+
+    prefix += _length(system)
+    if (
+        system
+        and prefix >= _MIN_CACHEABLE_CHARS
+        and not any(_has_cache_control(b) for b in system)
+        and existing + len(added) < MAX_CHECKPOINTS
+    ):
+        system[-1]["cache_control"] = dict(_CACHE_CONTROL)
+        request["system"] = system
+        added.append("system")
+    return added
+
+
+def _inject_converse(request: dict) -> list[str]:
+    """Converse 形式: 区間の末尾に cachePoint ブロックを追加する"""
+    tool_config = request.get("toolConfig") or {}
+    tools = tool_config.get("tools") or []
+    system = request.get("system") or []
+
+    existing = _count(tools, _is_cache_point) + _count(system, _is_cache_point)
+    for message in request["messages"]:
+        existing += _count(message.get("content") or [], _is_cache_point)
+
+    added = []
+    prefix = _length(tools)
+    if (
+        tools
+        and prefix >= _MIN_CACHEABLE_CHARS
+        and not any(_is_cache_point(t) for t in tools)
+        and existing + len(added) < MAX_CHECKPOINTS
+    ):
+        tools.append(dict(_CACHE_POINT))
+        added.append("tools")
+
+    prefix += _length(system)
+    if (
+        system
+        and prefix >= _MIN_CACHEABLE_CHARS
+        and not any(_is_cache_point(b) for b in system)
+        and existing + len(added) < MAX_CHECKPOINTS
+    ):
+        system.append(dict(_CACHE_POINT))
+        added.append("system")
+    return added
+
+
+def _has_cache_control(block: dict) -> bool:
+    return "cache_control" in block
+
+
+def _is_cache_point(block: dict) -> bool:
+    return "cachePoint" in block
+
+
+def _count(blocks: list, predicate) -> int:
+    return sum(1 for block in blocks if isinstance(block, dict) and predicate(block))
+
+
+def _length(blocks: list) -> int:
+    return len(json.dumps(blocks, ensure_ascii=False)) if blocks else 0
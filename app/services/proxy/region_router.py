@@ -0,0 +1,221 @@
+"""
+Bedrock リージョンルーティング
+Bedrock Reverse Proxy の転送先リージョンを、リージョン別のレイテンシ・エラー統計から選ぶ
+
+- 統計はプロセス内の全Proxyで共有する（同じホストの全コンテナの結果を反映）
+- スロットリング（429）・5xx・接続失敗が起きたリージョンは一定時間候補の後ろに回す
+- プロンプトキャッシュはリージョンごとに独立しているため、健全なリージョンの中では
+  設定順（先頭が主リージョン）を維持し、レイテンシが突出して悪い場合のみ順位を下げる
+- レスポンスヘッダーまでの時間は入力サイズに比例して伸びるため、レイテンシは
+  リクエストサイズ区分ごとに記録・比較する（大きいプロンプトを多く処理したリージョンを低速扱いしない）
+- モデルごとに転送してよいリージョンを制限できる（クロスリージョン推論プロファイル
+  us. / eu. / apac. などはプレフィックスから地域を推定して絞り込む。
+  ARN 指定で設定にないリージョンのモデルは転送しない）
+"""
+import time
+from dataclasses import dataclass, field
+
+import structlog
+
+from app.config import get_settings
+from app.infrastructure.metrics import (
+    get_workspace_bedrock_region_latency,
+    get_workspace_bedrock_region_requests,
+)
+from app.services.proxy.concurrency_limiter import size_bucket
+
+logger = structlog.get_logger(__name__)
+
+# フェイルオーバー対象のステータス（スロットリング・一時的なサーバーエラー）
+FAILOVER_STATUSES = frozenset({429, 500, 502, 503, 504})
+
+# EWMA の平滑化係数
+_ALPHA = 0.2
+
+# 推論プロファイルのプレフィックス → 対応するリージョン名のプレフィックス
+_PROFILE_GEOGRAPHY = {
+    "us": ("us-",),
+    "us-gov": ("us-gov-",),
+    "eu": ("eu-",),
+    "apac": ("ap-",),
+    "jp": ("ap-northeast-",),
+    "au": ("ap-southeast-",),
+}
+
+
+@dataclass
+class RegionStats:
+    """リージョン別の統計"""
+
+    # リクエストサイズ区分 → レスポンスヘッダー受信までの時間のEWMA（秒）
+    latency: dict[int, float] = field(default_factory=dict)
+    error_rate: float = 0.0  # 失敗率のEWMA
+    updated_at: float = 0.0
+    cooldown_until: float = 0.0  # スロットリング等による順位降格の期限
+
+    def score(self, bucket: int) -> float:
+        """小さいほど健全（サイズ区分のレイテンシを失敗率で割り増し）"""
+        return self.latency.get(bucket, 0.0) * (1.0 + 4.0 * self.error_rate)
+
+
+class BedrockRegionRouter:
+    """
+    リージョン別の統計に基づく転送先の選択
+
+    candidates() の順に試行し、各試行の結果を record() で報告する。
+    """
+
+    def __init__(
+        self,
+        regions: list[str],
+        model_regions: dict[str, list[str]] | None = None,
+        cooldown_seconds: float = 15.0,
+        stale_after_seconds: float = 300.0,
+        slow_factor: float = 2.0,
+    ) -> None:
+        """
+        Args:
+            regions: 転送先リージョン（先頭が主リージョン）
+            model_regions: モデルID → 許可リージョン（regions の順序で候補化する）
+            cooldown_seconds: 失敗したリージョンを候補の後ろに回す時間（秒）
+            stale_after_seconds: これより古い統計は破棄して再計測する（秒）
+            slow_factor: 最も健全なリージョンのスコアの何倍を超えたら順位を下げるか
+        """
+        self._regions = list(dict.fromkeys(regions))
+        self._model_regions = model_regions or {}
+        self._cooldown = cooldown_seconds
+        self._stale_after = stale_after_seconds
+        self._slow_factor = slow_factor
+        self._stats: dict[str, RegionStats] = {region: RegionStats() for region in self._regions}
+
+    @property
+    def regions(self) -> list[str]:
+        return list(self._regions)
+
+    def allowed_regions(self, model_id: str) -> list[str]:
+        """
+        モデルの転送先として許可されたリージョン（設定順）
+
+        ARN 指定のモデルは ARN のリージョンに固定し、設定にないリージョンなら空を返す
+        （許可リストを迂回して主リージョンに転送しない）。それ以外で該当するリージョンが
+        ない場合は主リージョンのみを返す。
+        """
+        if model_id in self._model_regions:
+            allowed = set(self._model_regions[model_id])
+            regions = [r for r in self._regions if r in allowed]
+        elif model_id.startswith("arn:"):
+            # ARN 指定のモデル・推論プロファイルは ARN のリージョンに固定
+            arn_region = model_id.split(":")[3] if model_id.count(":") >= 3 else ""
+            return [r for r in self._regions if r == arn_region]
+        else:
+            prefix = model_id.split(".", 1)[0] if "." in model_id else ""
+            geography = _PROFILE_GEOGRAPHY.get(prefix)
+            regions = (
+                [r for r in self._regions if r.startswith(geography)]
+                if geography
+                else list(self._regions)
+            )
+        return regions or self._regions[:1]
+
+    def candidates(self, model_id: str, request_bytes: int = 0) -> list[str]:
+        """
+        試行順に並べた転送先リージョン
+
+        健全なリージョン（設定順） → 低速なリージョン（スコア順） → 降格中のリージョン（期限順）
+        レイテンシは request_bytes と同じサイズ区分の統計で比較する。
+        """
+        bucket = size_bucket(request_bytes)
+        now = time.monotonic()
+        healthy: list[str] = []
+        cooling: list[str] = []
+        for region in self.allowed_regions(model_id):
+            stats = self._stats[region]
+            if stats.updated_at and now - stats.updated_at > self._stale_after:
+                stats = self._stats[region] = RegionStats()
+            (cooling if stats.cooldown_until > now else healthy).append(region)
+
+        measured = [self._stats[r].score(bucket) for r in healthy if bucket in self._stats[r].latency]
+        best = min(measured, default=0.0)
+        fast = [
+            r
+            for r in healthy
+            if bucket not in self._stats[r].latency
+            or self._stats[r].score(bucket) <= best * self._slow_factor
+        ]
+        slow = sorted(
+            (r for r in healthy if r not in fast), key=lambda r: self._stats[r].score(bucket)
+        )
+        cooling.sort(key=lambda r: self._stats[r].cooldown_until)
+        return fast + slow + cooling
+
+    def record(
+        self,
+        region: str,
+        latency: float | None,
+        status: int | None,
+        request_bytes: int = 0,
+    ) -> None:
+        """
+        試行結果を記録
+
+        Args:
+            latency: レスポンスヘッダー受信までの時間（接続失敗時はNone）
+            status: ステータスコード（接続失敗・タイムアウト時はNone）
+            request_bytes: リクエストボディのサイズ（レイテンシのサイズ区分）
+        """
+        stats = self._stats.get(region)
+        if stats is None:
+            return
+        now = time.monotonic()
+        failed = status is None or status in FAILOVER_STATUSES
+        bucket = size_bucket(request_bytes)
+        if latency is not None:
+            previous = stats.latency.get(bucket)
+            stats.latency[bucket] = (
+                latency if previous is None else _ALPHA * latency + (1 - _ALPHA) * previous
+            )
+        stats.error_rate = _ALPHA * (1.0 if failed else 0.0) + (1 - _ALPHA) * stats.error_rate
+        stats.updated_at = now
+        if failed:
+            stats.cooldown_until = now + self._cooldown
+            logger.warning(
+                "Bedrockリージョン降格",
+                region=region,
+                status=status,
+                cooldown_seconds=self._cooldown,
+            )
+
+        if status is None:
+            result = "transport_error"
+        elif status == 429:
+            result = "throttled"
+        elif failed:
+            result = "error"
+        else:
+            result = "ok"
+        get_workspace_bedrock_region_requests().inc(region=region, result=result)
+        if bucket in stats.latency:
+            get_workspace_bedrock_region_latency().set(
+                stats.latency[bucket], region=region, size_class=str(bucket)
+            )
+
+
+_bedrock_region_router: BedrockRegionRouter | None = None
+
+
+def get_bedrock_region_router() -> BedrockRegionRouter:
+    """
+    全Proxyで共有するリージョンルーターを取得
+
+    Returns:
+        BedrockRegionRouter インスタンス
+    """
+    global _bedrock_region_router
+    if _bedrock_region_router is None:
+        settings = get_settings()
+        _bedrock_region_router = BedrockRegionRouter(
+            regions=[settings.aws_region, *settings.proxy_bedrock_regions_list],
+            model_regions=settings.proxy_bedrock_model_regions,
+            cooldown_seconds=settings.proxy_bedrock_region_cooldown,
+        )
+    return _bedrock_region_router
@@ -0,0 +1,131 @@
+"""
+Proxyリクエストボディ
+クライアント接続からリクエストボディをストリームで読み出す（Content-Length / chunked 対応）
+"""
+import asyncio
+from collections.abc import AsyncIterator
+
+# 1回の読み取りサイズ
+READ_CHUNK_SIZE = 64 * 1024
+
+
+class RequestBodyTooLargeError(Exception):
+    """リクエストボディがサイズ上限を超えた"""
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        super().__init__(f"リクエストボディが上限を超えました: {limit} bytes")
+
+
+def get_header(headers: dict[str, str], name: str) -> str | None:
+    """ヘッダー値を大文字小文字を区別せずに取得"""
+    for key, value in headers.items():
+        if key.lower() == name:
+            return value
+    return None
+
+
+class RequestBody:
+    """
+    クライアント接続上のリクエストボディ
+
+    ボディはメモリに溜めずに iter_chunks() で上流へ流す。
+    署名のためにボディ全体が必要な場合のみ read() で読み切る。
+    どちらもサイズ上限を超えた時点で RequestBodyTooLargeError を送出する。
+    """
+
+    def __init__(
+        self,
+        reader: asyncio.StreamReader,
+        headers: dict[str, str],
+        max_size: int,
+    ) -> None:
+        self._reader = reader
+        self._max_size = max_size
+        transfer_encoding = get_header(headers, "transfer-encoding") or ""
+        self.chunked = "chunked" in transfer_encoding.lower()
+        self.content_length: int | None = (
+            None if self.chunked else int(get_header(headers, "content-length") or 0)
+        )
+        self.received = 0
+        self._started = False
+        self._done = not self.chunked and self.content_length == 0
+
+    @property
+    def is_empty(self) -> bool:
+        """ボディを持たないリクエストか"""
+        return not self.chunked and self.content_length == 0
+
+    @property
+    def exceeds_limit(self) -> bool:
+        """Content-Length が読み取り前の時点で上限を超えているか"""
+        return self.content_length is not None and self.content_length > self._max_size
+
+    async def iter_chunks(self) -> AsyncIterator[bytes]:
+        """ボディを先頭から順に読み出す（1回のみ）"""
+        if self._started:
+            raise RuntimeError("リクエストボディは既に読み取られています")
+        self._started = True
+        if self.chunked:
+            async for chunk in self._iter_chunked():
+                yield chunk
+        else:
+            remaining = self.content_length or 0
+            while remaining > 0:
+                data = await self._reader.read(min(READ_CHUNK_SIZE, remaining))
+                if not data:
+                    raise asyncio.IncompleteReadError(b"", remaining)
+                remaining -= len(data)
+                self._count(len(data))
+                yield data
+        self._done = True
+
+    async def read(self) -> bytes:
+        """ボディ全体を読み取る"""
+        return b"".join([chunk async for chunk in self.iter_chunks()])
+
+    async def discard(self) -> bool:
+        """
+        未読のボディを読み捨てる（接続を次のリクエストに再利用するため）
+
+        Returns:
+            フレーミングが完結したか（読み取り途中で中断されていた場合はFalse）
+        """
+        if self._done:
+            return True
+        if self._started:
+            return False
+        try:
+            async for _ in self.iter_chunks():
+                pass
+        except RequestBodyTooLargeError:
+            return False
+        return True
+
+    async def _iter_chunked(self) -> AsyncIterator[bytes]:
+        """chunked エンコードをデコードしながら読み出す"""
+        while True:
+            size_line = await self._reader.readline()
+            if not size_line:
+                raise asyncio.IncompleteReadError(b"", None)
+            size = int(size_line.split(b";", 1)[0].strip(), 16)
+            if size == 0:
+                # トレーラーを読み飛ばす
+                while (await self._reader.readline()) not in (b"\r\n", b"\n", b""):
+                    pass
+                return
+            remaining = size
+            while remaining > 0:
+                data = await self._reader.read(min(READ_CHUNK_SIZE, remaining))
+                if not data:
+                    raise asyncio.IncompleteReadError(b"", remaining)
+                remaining -= len(data)
+                self._count(len(data))
+                yield data
+            await self._reader.readexactly(2)  # チャンク末尾のCRLF
+
+    def _count(self, size: int) -> None:
+        """受信バイト数を加算し、上限を検査"""
+        self.received += size
+        if self.received > self._max_size:
+            raise RequestBodyTooLargeError(self._max_size)
@@ -1,12 +1,32 @@
 """
 AWS SigV4 署名ユーティリティ
 Bedrock API呼び出しにAWS認証情報を注入する
+
+署名は botocore.auth.SigV4Auth と同一の正規化規則で計算するが、
+リクエストごとに botocore のオブジェクトを生成せず、
+日単位の署名キー（リージョン・サービス別）をキャッシュして再利用する。
 """
+import hashlib
+import hmac
 from dataclasses import dataclass
+from datetime import datetime, timezone
+from email.utils import formatdate
+from urllib.parse import quote, urlsplit
 
-import botocore.auth
 import botocore.credentials
-from botocore.awsrequest import AWSRequest
+import botocore.session
+import structlog
+from botocore.utils import normalize_url_path
+
+from app.config import get_settings
+
+logger = structlog.get_logger(__name__)
+
+# 署名対象から除外するヘッダー（botocore の SIGNED_HEADERS_BLACKLIST と同一）
+_UNSIGNED_HEADERS = frozenset({"expect", "transfer-encoding", "user-agent", "x-amzn-trace-id"})
+
+_EMPTY_SHA256 = hashlib.sha256(b"").hexdigest()
+_DEFAULT_PORTS = {"http": 80, "https": 443}
 
 
 @dataclass
@@ -19,36 +39,215 @@ class AWSCredentials:
     region: str = "us-west-2"
 
 
-def sign_request(
-    credentials: AWSCredentials,
-    method: str,
-    url: str,
-    headers: dict[str, str],
-    body: bytes,
-    service: str = "bedrock",
-) -> dict[str, str]:
+class CredentialProvider:
     """
-    リクエストにSigV4署名を付与する
+    AWS認証情報プロバイダー
 
-    Args:
-        credentials: AWS認証情報
-        method: HTTPメソッド
-        url: リクエストURL
-        headers: 既存ヘッダー
-        body: リクエストボディ
-        service: AWSサービス名
+    アクセスキーが指定されていれば固定値を、なければ botocore の
+    デフォルトチェーン（環境変数・共有設定・コンテナロール・インスタンスロール）を使う。
+    STS・ロール由来の一時認証情報は botocore が有効期限前に自動更新する。
+    """
 
-    Returns:
-        署名済みヘッダー辞書
+    def __init__(self, credentials: botocore.credentials.Credentials | None) -> None:
+        self._credentials = credentials
+
+    @classmethod
+    def from_aws_credentials(cls, credentials: AWSCredentials) -> "CredentialProvider":
+        """AWSCredentials から生成（アクセスキー未設定ならデフォルトチェーン）"""
+        if credentials.access_key_id and credentials.secret_access_key:
+            return cls(
+                botocore.credentials.Credentials(
+                    access_key=credentials.access_key_id,
+                    secret_key=credentials.secret_access_key,
+                    token=credentials.session_token,
+                )
+            )
+        resolved = botocore.session.get_session().get_credentials()
+        if resolved is None:
+            logger.warning("AWS認証情報が見つかりません（SigV4署名は失敗します）")
+        else:
+            logger.info("AWS認証情報をデフォルトチェーンから取得", method=resolved.method)
+        return cls(resolved)
+
+    def get(self) -> botocore.credentials.ReadOnlyCredentials:
+        """
+        現在の認証情報を取得（期限切れ間近なら更新される）
+
+        Raises:
+            RuntimeError: 認証情報が見つからない場合
+        """
+        if self._credentials is None:
+            raise RuntimeError("AWS認証情報が設定されていません")
+        return self._credentials.get_frozen_credentials()
+
+
+class SigV4Signer:
+    """
+    キャッシュ付き SigV4 署名
+
+    署名キーは (シークレットキー, 日付, リージョン, サービス) ごとに1日1回だけ導出する。
+    日付またはシークレットキーが変わった時点でキャッシュを破棄する。
     """
-    creds = botocore.credentials.Credentials(
-        access_key=credentials.access_key_id,
-        secret_key=credentials.secret_access_key,
-        token=credentials.session_token,
-    )
 
-    aws_request = AWSRequest(method=method, url=url, headers=headers, data=body)
-    signer = botocore.auth.SigV4Auth(creds, service, credentials.region)
-    signer.add_auth(aws_request)
+    def __init__(self, provider: CredentialProvider) -> None:
+        self._provider = provider
+        self._key_scope: tuple[str, str] | None = None  # (シークレットキー, 日付)
+        self._signing_keys: dict[tuple[str, str], bytes] = {}
+
+    def sign(
+        self,
+        method: str,
+        url: str,
+        headers: dict[str, str],
+        body: bytes,
+        region: str,
+        service: str = "bedrock",
+    ) -> dict[str, str]:
+        """
+        リクエストにSigV4署名を付与する
+
+        Args:
+            method: HTTPメソッド
+            url: リクエストURL
+            headers: 既存ヘッダー
+            body: リクエストボディ
+            region: AWSリージョン
+            service: AWSサービス名
+
+        Returns:
+            署名済みヘッダー辞書
+        """
+        creds = self._provider.get()
+        signed_at = datetime.now(timezone.utc)
+        timestamp = signed_at.strftime("%Y%m%dT%H%M%SZ")
+        datestamp = timestamp[:8]
+
+        # 再署名に備えて既存の署名関連ヘッダーを除去
+        dropped = {"authorization", "x-amz-date"}
+        if creds.token:
+            dropped.add("x-amz-security-token")
+        signed = {k: v for k, v in headers.items() if k.lower() not in dropped}
+        date_header = next((k for k in signed if k.lower() == "date"), None)
+        if date_header is not None:
+            # Date ヘッダーがある場合は X-Amz-Date ではなく Date を署名時刻として使う
+            del signed[date_header]
+            signed["Date"] = formatdate(int(signed_at.replace(microsecond=0).timestamp()))
+        else:
+            signed["X-Amz-Date"] = timestamp
+        if creds.token:
+            signed["X-Amz-Security-Token"] = creds.token
 
-    return dict(aws_request.headers)
+        parts = urlsplit(url)
+        canonical_headers: dict[str, list[str]] = {}
+        payload_hash = None
+        for name, value in signed.items():
+            lower = name.lower()
+            if lower == "x-amz-content-sha256":
+                payload_hash = value
+            if lower not in _UNSIGNED_HEADERS:
+                canonical_headers.setdefault(lower, []).append(" ".join(value.split()))
+        if "host" not in canonical_headers:
+            canonical_headers["host"] = [_host_from_url(parts)]
+        if payload_hash is None:
+            payload_hash = hashlib.sha256(body).hexdigest() if body else _EMPTY_SHA256
+
+        header_names = sorted(canonical_headers)
+        signed_header_names = ";".join(header_names)
+        canonical_request = "\n".join(
+            (
+                method.upper(),
+                quote(normalize_url_path(parts.path), safe="/~"),
+                _canonical_query_string(parts.query),
+                "".join(f"{n}:{','.join(canonical_headers[n])}\n" for n in header_names),
+                signed_header_names,
+                payload_hash,
+            )
+        )
+
+        scope = f"{datestamp}/{region}/{service}/aws4_request"
+        string_to_sign = "\n".join(
+            (
+                "AWS4-HMAC-SHA256",
+                timestamp,
+                scope,
+                hashlib.sha256(canonical_request.encode("utf-8")).hexdigest(),
+            )
+        )
+        signing_key = self._signing_key(creds.secret_key, datestamp, region, service)
+        signature = hmac.new(
+            signing_key, string_to_sign.encode("utf-8"), hashlib.sha256
+        ).hexdigest()
+
+        signed["Authorization"] = (
+            f"AWS4-HMAC-SHA256 Credential={creds.access_key}/{scope}, "
+            f"SignedHeaders={signed_header_names}, Signature={signature}"
+        )
+        return signed
+
+    def _signing_key(
+        self, secret_key: str, datestamp: str, region: str, service: str
+    ) -> bytes:
+        """署名キーを取得（キャッシュになければ導出）"""
+        if self._key_scope != (secret_key, datestamp):
+            self._key_scope = (secret_key, datestamp)
+            self._signing_keys.clear()
+        key = self._signing_keys.get((region, service))
+        if key is None:
+            key = _hmac(f"AWS4{secret_key}".encode("utf-8"), datestamp)
+            key = _hmac(key, region)
+            key = _hmac(key, service)
+            key = _hmac(key, "aws4_request")
+            self._signing_keys[(region, service)] = key
+        return key
+
+
+def _hmac(key: bytes, msg: str) -> bytes:
+    return hmac.new(key, msg.encode("utf-8"), hashlib.sha256).digest()
+
+
+def _canonical_query_string(query: str) -> str:
+    """URLのクエリ文字列を正規化（キー・値の順でソート、エンコードはそのまま）"""
+    if not query:
+        return ""
+    pairs = []
+    for pair in query.split("&"):
+        key, _, value = pair.partition("=")
+        pairs.append((key, value))
+    return "&".join(f"{key}={value}" for key, value in sorted(pairs))
+
+
+def _host_from_url(parts) -> str:
+    """URLからHostヘッダー値を導出（デフォルトポートは省略）"""
+    host = parts.hostname or ""
+    if ":" in host:
+        host = f"[{host}]"
+    if parts.port is not None and parts.port != _DEFAULT_PORTS.get(parts.scheme):
+        host = f"{host}:{parts.port}"
+    return host
+
+
+# プロセス内シングルトン
+_sigv4_signer: SigV4Signer | None = None
+
+
+def get_sigv4_signer() -> SigV4Signer:
+    """
+    設定の認証情報を使う共有署名器を取得
+
+    Returns:
+        SigV4Signer インスタンス
+    """
+    global _sigv4_signer
+    if _sigv4_signer is None:
+        settings = get_settings()
+        _sigv4_signer = SigV4Signer(
+            CredentialProvider.from_aws_credentials(
+                AWSCredentials(
+                    access_key_id=settings.aws_access_key_id or "",
+                    secret_access_key=settings.aws_secret_access_key or "",
+                    session_token=settings.aws_session_token,
+                    region=settings.aws_region,
+                )
+            )
+        )
+    return _sigv4_signer
@@ -0,0 +1,291 @@
+"""
+Bedrock トークン計量
+Bedrock Reverse Proxy を通過するレスポンスからトークン使用量を取り出し、
+コンテナ・テナント単位で Redis に積算する
+
+実行完了後の usage 記録（ExecutionOutbox）とは独立に、呼び出しごとにリアルタイムで積算し、
+テナントの1日あたりの予算を超えたら新しい呼び出しを拒否する。
+
+対応するレスポンス形式:
+  - invoke-with-response-stream: application/vnd.amazon.eventstream
+    （chunk イベントの bytes に Anthropic Messages API のイベントJSONが base64 で入る）
+  - invoke: Anthropic Messages API のレスポンスJSON
+  - converse-stream: application/vnd.amazon.eventstream（metadata イベントに usage）
+  - converse: Converse API のレスポンスJSON
+"""
+import base64
+import json
+import struct
+import time
+from dataclasses import dataclass, fields
+from datetime import datetime, timezone
+from urllib.parse import unquote
+
+import structlog
+from redis.asyncio import Redis
+
+from app.config import get_settings
+
+logger = structlog.get_logger(__name__)
+
+# Redis キープレフィックス
+REDIS_KEY_TOKEN_USAGE_TENANT = "workspace:token_usage:tenant"  # {tenant_id}:{YYYYMMDD} → Hash
+REDIS_KEY_TOKEN_USAGE_CONTAINER = "workspace:token_usage:container"  # {container_id} → Hash
+
+_TENANT_USAGE_TTL_SECONDS = 2 * 86400
+_CONTAINER_USAGE_TTL_SECONDS = 86400
+
+# invoke（非ストリーム）のレスポンスJSONを保持する上限
+_MAX_JSON_BODY = 4 * 1024 * 1024
+
+# イベントストリームのプレリュード（全体長・ヘッダー長・CRC）とメッセージCRC
+_PRELUDE = struct.Struct(">III")
+_MESSAGE_CRC_SIZE = 4
+
+# ヘッダー値の型 → 固定長（可変長の 6: bytes / 7: string は2バイトの長さが先頭に付く）
+_HEADER_VALUE_SIZES = {0: 0, 1: 0, 2: 1, 3: 2, 4: 4, 5: 8, 8: 8, 9: 16}
+
+
+@dataclass
+class TokenUsage:
+    """トークン使用量"""
+
+    input_tokens: int = 0
+    output_tokens: int = 0
+    cache_creation_input_tokens: int = 0
+    cache_read_input_tokens: int = 0
+
+    @property
+    def total(self) -> int:
+        return sum(getattr(self, f.name) for f in fields(self))
+
+    def as_dict(self) -> dict[str, int]:
+        return {f.name: getattr(self, f.name) for f in fields(self)}
+
+    def update_from(self, usage: dict) -> None:
+        """Anthropic の usage オブジェクトの値で更新（出力トークンは累積値で届く）"""
+        for f in fields(self):
+            value = usage.get(f.name)
+            if isinstance(value, int):
+                setattr(self, f.name, value)
+
+    def update_from_converse(self, usage: dict) -> None:
+        """Converse API の usage オブジェクトの値で更新"""
+        self.update_from(
+            {
+                "input_tokens": usage.get("inputTokens"),
+                "output_tokens": usage.get("outputTokens"),
+                "cache_creation_input_tokens": usage.get("cacheWriteInputTokens"),
+                "cache_read_input_tokens": usage.get("cacheReadInputTokens"),
+            }
+        )
+
+
+def model_id_from_path(path: str) -> str:
+    """Bedrock のパス（/model/{modelId}/invoke...）からモデルIDを取り出す"""
+    parts = path.split("?", 1)[0].split("/")
+    if len(parts) >= 3 and parts[1] == "model":
+        return unquote(parts[2])
+    return "unknown"
+
+
+class EventStreamDecoder:
+    """application/vnd.amazon.eventstream のインクリメンタルデコーダー"""
+
+    def __init__(self) -> None:
+        self._buffer = bytearray()
+
+    def feed(self, data: bytes) -> list[tuple[dict[str, str], bytes]]:
+        """
+        受信データを追加し、完成したメッセージを返す
+
+        Returns:
+            [(文字列ヘッダー, ペイロード)] のリスト
+        """
+        self._buffer.extend(data)
+        messages = []
+        while len(self._buffer) >= _PRELUDE.size:
+            total_length, headers_length, _ = _PRELUDE.unpack_from(self._buffer)
+            if total_length < _PRELUDE.size + _MESSAGE_CRC_SIZE + headers_length:
+                raise ValueError(f"不正なイベントストリームメッセージ長: {total_length}")
+            if len(self._buffer) < total_length:
+                break
+            headers_start = _PRELUDE.size
+            payload_start = headers_start + headers_length
+            headers = _parse_headers(bytes(self._buffer[headers_start:payload_start]))
+            payload = bytes(self._buffer[payload_start : total_length - _MESSAGE_CRC_SIZE])
+            del self._buffer[:total_length]
+            messages.append((headers, payload))
+        return messages
+
+
+def _parse_headers(data: bytes) -> dict[str, str]:
+    """イベントストリームのヘッダーを解析（文字列型のみ返す）"""
+    headers: dict[str, str] = {}
+    pos = 0
+    while pos < len(data):
+        name_length = data[pos]
+        name = data[pos + 1 : pos + 1 + name_length].decode()
+        pos += 1 + name_length
+        value_type = data[pos]
+        pos += 1
+        if value_type in (6, 7):
+            (value_length,) = struct.unpack_from(">H", data, pos)
+            value = data[pos + 2 : pos + 2 + value_length]
+            pos += 2 + value_length
+            if value_type == 7:
+                headers[name] = value.decode()
+        elif value_type in _HEADER_VALUE_SIZES:
+            pos += _HEADER_VALUE_SIZES[value_type]
+        else:
+            raise ValueError(f"不明なヘッダー値の型: {value_type}")
+    return headers
+
+
+class BedrockUsageMeter:
+    """
+    Bedrock レスポンスを通過させながらトークン使用量を取り出す
+
+    解析に失敗してもレスポンスの中継には影響させず、それ以降の計量を止める。
+    ストリーミングでは最初のテキスト差分を受け取った時刻（first_token_at）も記録する。
+    """
+
+    def __init__(self, path: str) -> None:
+        self.model_id = model_id_from_path(path)
+        self.usage = TokenUsage()
+        self.first_token_at: float | None = None  # time.perf_counter() の値
+        operation = path.split("?", 1)[0].rstrip("/").rsplit("/", 1)[-1]
+        self._converse = operation.startswith("converse")
+        self._streaming = operation.endswith("-stream")
+        self._decoder = EventStreamDecoder() if self._streaming else None
+        self._json_body = bytearray()
+        self._failed = False
+
+    def feed(self, chunk: bytes) -> None:
+        """レスポンスボディのチャンクを解析"""
+        if self._failed:
+            return
+        try:
+            if self._decoder is not None:
+                for headers, payload in self._decoder.feed(chunk):
+                    event_type = headers.get(":event-type")
+                    if event_type == "chunk":
+                        self._on_event(json.loads(base64.b64decode(json.loads(payload)["bytes"])))
+                    elif event_type == "contentBlockDelta":
+                        self._mark_first_token()
+                    elif event_type == "metadata":
+                        self.usage.update_from_converse(json.loads(payload).get("usage") or {})
+            elif len(self._json_body) + len(chunk) <= _MAX_JSON_BODY:
+                self._json_body.extend(chunk)
+            else:
+                self._failed = True
+        except (ValueError, KeyError, TypeError) as e:
+            logger.warning("Bedrockレスポンスのトークン解析失敗", model=self.model_id, error=str(e))
+            self._failed = True
+
+    def finish(self) -> TokenUsage:
+        """レスポンス終了時に呼び出し、取り出した使用量を返す"""
+        if not self._streaming and self._json_body and not self._failed:
+            try:
+                usage = json.loads(self._json_body).get("usage") or {}
+                if self._converse:
+                    self.usage.update_from_converse(usage)
+                else:
+                    self.usage.update_from(usage)
+            except (ValueError, AttributeError) as e:
+                logger.warning("Bedrockレスポンスのトークン解析失敗", model=self.model_id, error=str(e))
+        return self.usage
+
+    def _on_event(self, event: dict) -> None:
+        event_type = event.get("type")
+        if event_type == "message_start":
+            self.usage.update_from((event.get("message") or {}).get("usage") or {})
+        elif event_type == "content_block_delta":
+            self._mark_first_token()
+        elif event_type == "message_delta":
+            self.usage.update_from(event.get("usage") or {})
+
+    def _mark_first_token(self) -> None:
+        if self.first_token_at is None:
+            self.first_token_at = time.perf_counter()
+
+
+class TokenLedger:
+    """
+    トークン使用量の Redis 台帳と予算判定
+
+    テナントの使用量は UTC 日単位で積算し、予算（合計トークン数）を超えたら
+    is_over_budget が True を返す。Redis 障害時は呼び出しを止めない（フェイルオープン）。
+    """
+
+    def __init__(
+        self,
+        redis: Redis,
+        daily_budget: int = 0,
+        tenant_budgets: dict[str, int] | None = None,
+    ) -> None:
+        self._redis = redis
+        self._daily_budget = daily_budget
+        self._tenant_budgets = tenant_budgets or {}
+
+    def budget_for(self, tenant_id: str) -> int:
+        """テナントの1日あたりの予算（0 は無制限）"""
+        return self._tenant_budgets.get(tenant_id, self._daily_budget)
+
+    async def is_over_budget(self, tenant_id: str) -> bool:
+        """テナントの当日の使用量が予算以上か"""
+        budget = self.budget_for(tenant_id)
+        if budget <= 0:
+            return False
+        try:
+            used = await self._redis.hget(_tenant_key(tenant_id), "total")
+        except Exception as e:
+            logger.warning("トークン予算確認失敗（許可）", tenant_id=tenant_id, error=str(e))
+            return False
+        return int(used or 0) >= budget
+
+    async def record(self, tenant_id: str, container_id: str, usage: TokenUsage) -> int | None:
+        """
+        呼び出し1回分の使用量を積算
+
+        Returns:
+            テナントの当日の合計トークン数（記録できなかった場合はNone）
+        """
+        if usage.total == 0:
+            return None
+        tenant_key = _tenant_key(tenant_id)
+        container_key = f"{REDIS_KEY_TOKEN_USAGE_CONTAINER}:{container_id}"
+        try:
+            async with self._redis.pipeline(transaction=False) as pipe:
+                for key, ttl in (
+                    (tenant_key, _TENANT_USAGE_TTL_SECONDS),
+                    (container_key, _CONTAINER_USAGE_TTL_SECONDS),
+                ):
+                    pipe.hincrby(key, "total", usage.total)
+                    for name, value in usage.as_dict().items():
+                        if value:
+                            pipe.hincrby(key, name, value)
+                    pipe.expire(key, ttl)
+                results = await pipe.execute()
+        except Exception as e:
+            logger.warning(
+                "トークン使用量記録失敗", tenant_id=tenant_id, container_id=container_id, error=str(e)
+            )
+            return None
+        # 最初のコマンドがテナントの total の加算
+        return int(results[0])
+
+
+def _tenant_key(tenant_id: str) -> str:
+    day = datetime.now(timezone.utc).strftime("%Y%m%d")
+    return f"{REDIS_KEY_TOKEN_USAGE_TENANT}:{tenant_id}:{day}"
+
+
+def create_token_ledger(redis: Redis) -> TokenLedger:
+    """設定に基づいてトークン台帳を生成"""
+    settings = get_settings()
+    return TokenLedger(
+        redis,
+        daily_budget=settings.proxy_tenant_daily_token_budget,
+        tenant_budgets=settings.proxy_tenant_token_budgets,
+    )
@@ -0,0 +1,385 @@
+"""
+CONNECT トンネルの双方向中継
+
+Linux では両方向を os.splice() でソケット → パイプ → ソケットと転送し、
+データをユーザー空間（Pythonのbytes）にコピーせずカーネル内で移動する。
+splice はイベントループの読み書き可能通知から非ブロッキングで呼び出すため、
+スレッドは使わない。splice が使えない環境では StreamReader/StreamWriter で中継する。
+
+どちらの方式でも、両方向とも idle_timeout 秒間データが流れなければトンネルを閉じる。
+on_transfer を指定すると転送ごとに呼び出し、返された時間だけその方向の読み取りを止める
+（帯域制限）。
+"""
+import asyncio
+import fcntl
+import os
+import socket
+import sys
+import time
+from collections.abc import Callable
+from dataclasses import dataclass
+
+import structlog
+
+logger = structlog.get_logger(__name__)
+
+# ストリーム中継の読み取り単位
+_STREAM_CHUNK_SIZE = 64 * 1024
+
+# splice 用パイプのバッファサイズ（fs.pipe-max-size を超える場合は既定の64KBのまま）
+_PIPE_SIZE = 1024 * 1024
+
+# 転送ごとのコールバック（引数: upstream か、バイト数 → 次の読み取りまでの待ち時間（秒））
+TransferCallback = Callable[[bool, int], float]
+
+
+def splice_available() -> bool:
+    """splice によるゼロコピー中継が使えるか"""
+    return sys.platform == "linux" and hasattr(os, "splice")
+
+
+@dataclass
+class TunnelStats:
+    """トンネルの転送量"""
+
+    mode: str  # splice / stream
+    bytes_up: int = 0  # クライアント → 接続先
+    bytes_down: int = 0  # 接続先 → クライアント
+    timed_out: bool = False
+
+
+class _Activity:
+    """両方向で共有する最終転送時刻"""
+
+    def __init__(self) -> None:
+        self.last = time.monotonic()
+
+    def touch(self) -> None:
+        self.last = time.monotonic()
+
+    async def wait_idle(self, idle_timeout: float) -> None:
+        """idle_timeout 秒間転送がなくなるまで待つ"""
+        while True:
+            remaining = self.last + idle_timeout - time.monotonic()
+            if remaining <= 0:
+                return
+            await asyncio.sleep(remaining)
+
+
+async def relay(
+    client_reader: asyncio.StreamReader,
+    client_writer: asyncio.StreamWriter,
+    remote_reader: asyncio.StreamReader,
+    remote_writer: asyncio.StreamWriter,
+    idle_timeout: float,
+    use_splice: bool = True,
+    on_transfer: TransferCallback | None = None,
+) -> TunnelStats:
+    """
+    クライアントと接続先の間でデータを中継し、両方向が終了したら戻る
+
+    ストリームの close はしない（呼び出し側の責務）。
+
+    Args:
+        idle_timeout: 両方向とも転送がない場合にトンネルを閉じるまでの時間（秒）
+        use_splice: splice が使える環境ではゼロコピー中継を使う
+        on_transfer: 転送ごとに呼び出し、次の読み取りまでの待ち時間を返すコールバック
+    """
+    if use_splice and splice_available():
+        stats = await _prepare_splice(
+            client_reader, client_writer, remote_reader, remote_writer, on_transfer
+        )
+        if stats is not None:
+            return await _splice_relay(
+                client_writer, remote_writer, idle_timeout, stats, on_transfer
+            )
+    return await _stream_relay(
+        client_reader,
+        client_writer,
+        remote_reader,
+        remote_writer,
+        idle_timeout,
+        on_transfer=on_transfer,
+    )
+
+
+async def _stream_relay(
+    client_reader: asyncio.StreamReader,
+    client_writer: asyncio.StreamWriter,
+    remote_reader: asyncio.StreamReader,
+    remote_writer: asyncio.StreamWriter,
+    idle_timeout: float,
+    stats: TunnelStats | None = None,
+    on_transfer: TransferCallback | None = None,
+) -> TunnelStats:
+    """StreamReader/StreamWriter による中継（ユーザー空間コピー）"""
+    stats = stats or TunnelStats(mode="stream")
+    activity = _Activity()
+
+    async def pipe(
+        src: asyncio.StreamReader, dst: asyncio.StreamWriter, upstream: bool
+    ) -> None:
+        try:
+            while True:
+                data = await src.read(_STREAM_CHUNK_SIZE)
+                if not data:
+                    break
+                dst.write(data)
+                await dst.drain()
+                activity.touch()
+                if upstream:
+                    stats.bytes_up += len(data)
+                else:
+                    stats.bytes_down += len(data)
+                if on_transfer is not None:
+                    delay = on_transfer(upstream, len(data))
+                    if delay > 0:
+                        await asyncio.sleep(delay)
+            if dst.can_write_eof():
+                dst.write_eof()
+        except Exception:
+            logger.debug("ストリームパイプ失敗", exc_info=True)
+
+    pipes = asyncio.gather(
+        pipe(client_reader, remote_writer, upstream=True),
+        pipe(remote_reader, client_writer, upstream=False),
+    )
+    idle = asyncio.ensure_future(activity.wait_idle(idle_timeout))
+    try:
+        done, _ = await asyncio.wait({pipes, idle}, return_when=asyncio.FIRST_COMPLETED)
+        if idle in done:
+            stats.timed_out = True
+    finally:
+        idle.cancel()
+        pipes.cancel()
+        await asyncio.gather(pipes, idle, return_exceptions=True)
+    return stats
+
+
+def _take_buffered(reader: asyncio.StreamReader) -> bytes:
+    """StreamReader が読み込み済みのデータを取り出す（公開APIがないため内部バッファを参照）"""
+    buffered = bytes(reader._buffer)
+    reader._buffer.clear()
+    return buffered
+
+
+async def _prepare_splice(
+    client_reader: asyncio.StreamReader,
+    client_writer: asyncio.StreamWriter,
+    remote_reader: asyncio.StreamReader,
+    remote_writer: asyncio.StreamWriter,
+    on_transfer: TransferCallback | None = None,
+) -> TunnelStats | None:
+    """
+    トランスポートの読み取りを止め、読み込み済みのデータを転送してから splice に移る
+
+    Returns:
+        splice に移行できない場合（EOF受信済み・ソケット以外）はNone（読み取りは再開する）
+    """
+    transports = (client_writer.transport, remote_writer.transport)
+    for transport in transports:
+        transport.pause_reading()
+
+    if (
+        client_reader.at_eof()
+        or remote_reader.at_eof()
+        or client_reader.exception() is not None
+        or remote_reader.exception() is not None
+        or any(t.get_extra_info("socket") is None for t in transports)
+    ):
+        for transport in transports:
+            transport.resume_reading()
+        return None
+
+    # 200 送信後、接続先への接続中にクライアントが送った ClientHello などを先に転送する
+    stats = TunnelStats(mode="splice")
+    upstream = _take_buffered(client_reader)
+    downstream = _take_buffered(remote_reader)
+    if upstream:
+        remote_writer.write(upstream)
+        stats.bytes_up += len(upstream)
+    if downstream:
+        client_writer.write(downstream)
+        stats.bytes_down += len(downstream)
+    await asyncio.gather(remote_writer.drain(), client_writer.drain())
+    if on_transfer is not None:
+        # 先行データは小さいため、待ち時間は splice 側の次の転送で反映される
+        on_transfer(True, len(upstream))
+        on_transfer(False, len(downstream))
+    return stats
+
+
+class _SplicePump:
+    """一方向の splice 中継（src ソケット → パイプ → dst ソケット）"""
+
+    def __init__(
+        self,
+        loop: asyncio.AbstractEventLoop,
+        src: socket.socket,
+        dst: socket.socket,
+        activity: _Activity,
+        on_transfer: Callable[[int], float] | None = None,
+    ) -> None:
+        self._loop = loop
+        self._src = src
+        self._dst = dst
+        self._activity = activity
+        self._on_transfer = on_transfer
+        self._delay = 0.0  # 帯域制限による次の読み取りまでの待ち時間
+        self._resume: asyncio.TimerHandle | None = None
+        self._pipe_r, self._pipe_w = os.pipe2(os.O_NONBLOCK | os.O_CLOEXEC)
+        try:
+            fcntl.fcntl(self._pipe_w, fcntl.F_SETPIPE_SZ, _PIPE_SIZE)
+        except OSError:
+            pass
+        self._chunk = fcntl.fcntl(self._pipe_w, fcntl.F_GETPIPE_SZ)
+        self._pending = 0  # パイプに溜まっているバイト数（0 の間だけ src を読む）
+        self._eof = False
+        self.transferred = 0
+        self.done: asyncio.Future[None] = loop.create_future()
+
+    def start(self) -> None:
+        self._loop.add_reader(self._src.fileno(), self._on_readable)
+
+    def close(self) -> None:
+        self._cancel_resume()
+        self._loop.remove_reader(self._src.fileno())
+        self._loop.remove_writer(self._dst.fileno())
+        os.close(self._pipe_r)
+        os.close(self._pipe_w)
+
+    def _cancel_resume(self) -> None:
+        if self._resume is not None:
+            self._resume.cancel()
+            self._resume = None
+
+    def _resume_reading(self) -> None:
+        self._resume = None
+        self._loop.add_reader(self._src.fileno(), self._on_readable)
+
+    def _finish(self, exc: BaseException | None = None) -> None:
+        self._cancel_resume()
+        self._loop.remove_reader(self._src.fileno())
+        self._loop.remove_writer(self._dst.fileno())
+        if not self.done.done():
+            if exc is None:
+                self.done.set_result(None)
+            else:
+                self.done.set_exception(exc)
+
+    def _on_readable(self) -> None:
+        try:
+            n = os.splice(
+                self._src.fileno(),
+                self._pipe_w,
+                self._chunk,
+                flags=os.SPLICE_F_MOVE | os.SPLICE_F_NONBLOCK,
+            )
+        except BlockingIOError:
+            return
+        except OSError as e:
+            self._finish(e)
+            return
+        if n == 0:
+            self._eof = True
+            self._loop.remove_reader(self._src.fileno())
+        self._pending += n
+        self._flush()
+
+    def _on_writable(self) -> None:
+        self._flush()
+
+    def _flush(self) -> None:
+        while self._pending:
+            try:
+                n = os.splice(
+                    self._pipe_r,
+                    self._dst.fileno(),
+                    self._pending,
+                    flags=os.SPLICE_F_MOVE | os.SPLICE_F_NONBLOCK,
+                )
+            except BlockingIOError:
+                # 送信先が詰まっている間は読み取りを止め、書き込み可能になったら再開する
+                self._loop.remove_reader(self._src.fileno())
+                self._loop.add_writer(self._dst.fileno(), self._on_writable)
+                return
+            except OSError as e:
+                self._finish(e)
+                return
+            self._pending -= n
+            self.transferred += n
+            self._activity.touch()
+            if self._on_transfer is not None:
+                self._delay = self._on_transfer(n)
+
+        self._loop.remove_writer(self._dst.fileno())
+        if self._eof:
+            try:
+                self._dst.shutdown(socket.SHUT_WR)
+            except OSError:
+                pass
+            self._finish()
+        elif self._delay > 0:
+            # 帯域制限: 待ち時間が経過するまで src を読まない
+            self._loop.remove_reader(self._src.fileno())
+            self._resume = self._loop.call_later(self._delay, self._resume_reading)
+            self._delay = 0.0
+        else:
+            self._loop.add_reader(self._src.fileno(), self._on_readable)
+
+
+async def _splice_relay(
+    client_writer: asyncio.StreamWriter,
+    remote_writer: asyncio.StreamWriter,
+    idle_timeout: float,
+    stats: TunnelStats,
+    on_transfer: TransferCallback | None = None,
+) -> TunnelStats:
+    """splice による中継（トランスポートの読み取りは停止済みであること）"""
+    loop = asyncio.get_running_loop()
+    # トランスポートが登録済みのfdはイベントループに直接登録できないため複製して使う
+    client = _dup_socket(client_writer)
+    remote = _dup_socket(remote_writer)
+    activity = _Activity()
+    up = _SplicePump(
+        loop, client, remote, activity, _directed(on_transfer, upstream=True)
+    )
+    down = _SplicePump(
+        loop, remote, client, activity, _directed(on_transfer, upstream=False)
+    )
+    idle = asyncio.ensure_future(activity.wait_idle(idle_timeout))
+    both = asyncio.gather(up.done, down.done)
+    try:
+        up.start()
+        down.start()
+        done, _ = await asyncio.wait({both, idle}, return_when=asyncio.FIRST_COMPLETED)
+        if idle in done:
+            stats.timed_out = True
+        elif both.exception() is not None:
+            logger.debug("spliceパイプ失敗", error=str(both.exception()))
+    finally:
+        idle.cancel()
+        both.cancel()
+        await asyncio.gather(both, idle, return_exceptions=True)
+        up.close()
+        down.close()
+        client.close()
+        remote.close()
+    stats.bytes_up += up.transferred
+    stats.bytes_down += down.transferred
+    return stats
+
+
+def _directed(
+    on_transfer: TransferCallback | None, upstream: bool
+) -> Callable[[int], float] | None:
+    if on_transfer is None:
+        return None
+    return lambda size: on_transfer(upstream, size)
+
+
+def _dup_socket(writer: asyncio.StreamWriter) -> socket.socket:
+    sock = writer.transport.get_extra_info("socket")
+    dup = socket.socket(sock.family, sock.type, sock.proto, fileno=os.dup(sock.fileno()))
+    dup.setblocking(False)
+    return dup
@@ -0,0 +1,224 @@
+"""
+上流接続プール
+全コンテナのProxyで共有する上流HTTPクライアント（Bedrock / MCP / Forward）
+
+コンテナごとにクライアントを持つと、同じ bedrock-runtime ホストに対して
+コンテナ数分の接続プールとTLSハンドシェイクが発生する。
+プロセス内で1つのクライアントを共有し、HTTP/2 で接続を多重化する。
+"""
+import asyncio
+import time
+from collections.abc import AsyncIterable, AsyncIterator
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from http.cookiejar import CookieJar, DefaultCookiePolicy
+from typing import Any
+from urllib.parse import urlparse
+
+import httpx
+import structlog
+
+from app.config import get_settings
+from app.infrastructure.metrics import (
+    get_workspace_proxy_upstream_connections,
+    get_workspace_proxy_upstream_in_flight,
+    get_workspace_proxy_upstream_slot_timeouts,
+    get_workspace_proxy_upstream_slot_wait,
+)
+
+logger = structlog.get_logger(__name__)
+
+# 接続確立を示す httpcore のトレースイベント → メトリクスラベル
+_CONNECTION_TRACE_EVENTS = {
+    "connection.connect_tcp.complete": "tcp",
+    "connection.start_tls.complete": "tls",
+}
+
+
+# ホスト単位の枠を適用しないホストの接頭辞
+# bedrock-runtime はテナント・モデル単位の分散同時実行制限（ConcurrencyLimiter）で制御しており、
+# プロセス全体の枠を重ねると長時間のストリーミング応答が枠を占有して他コンテナが詰まる
+DEFAULT_EXEMPT_HOST_PREFIXES = ("bedrock-runtime.",)
+
+
+class UpstreamSlotTimeoutError(Exception):
+    """ホストの同時リクエスト枠の待機時間超過"""
+
+    def __init__(self, host: str, limit: float) -> None:
+        super().__init__(f"上流ホストの同時リクエスト枠の待機時間超過: host={host} limit={limit:.1f}")
+        self.host = host
+        self.limit = limit
+
+
+@dataclass
+class _HostSlot:
+    """ホスト単位の同時リクエスト枠"""
+
+    semaphore: asyncio.Semaphore
+    users: int = 0  # 保持中 + 待機中のリクエスト数
+
+
+class UpstreamClientPool:
+    """
+    共有上流クライアント
+
+    - 接続はプロセス内の全Proxyで共有し、ホストごとに HTTP/2 で多重化する
+    - ホストごとの同時リクエスト数を max_per_host で制限する
+      （slot_timeout 秒以内に枠を確保できなければ UpstreamSlotTimeoutError、
+      exempt_host_prefixes に一致するホストは制限しない）
+    - Cookie は保存しない（コンテナ間で状態が共有されないよう、隔離はリクエスト単位で行う）
+    - クライアントは初回利用時に生成し、close() 後に再度利用された場合は作り直す
+    """
+
+    def __init__(
+        self,
+        max_connections: int = 200,
+        max_keepalive_connections: int = 50,
+        keepalive_expiry: float = 60.0,
+        max_per_host: int = 64,
+        slot_timeout: float = 10.0,
+        exempt_host_prefixes: tuple[str, ...] = DEFAULT_EXEMPT_HOST_PREFIXES,
+        http2: bool = True,
+    ) -> None:
+        self._limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry,
+        )
+        self._max_per_host = max(1, max_per_host)
+        self._slot_timeout = slot_timeout
+        self._exempt_host_prefixes = exempt_host_prefixes
+        self._http2 = http2
+        self._client: httpx.AsyncClient | None = None
+        self._host_slots: dict[str, _HostSlot] = {}
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        """共有クライアント（未生成なら生成）"""
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                http2=self._http2,
+                timeout=httpx.Timeout(60.0, connect=10.0),
+                limits=self._limits,
+                cookies=CookieJar(policy=DefaultCookiePolicy(allowed_domains=[])),
+            )
+            logger.info(
+                "上流クライアント生成",
+                http2=self._http2,
+                max_connections=self._limits.max_connections,
+                max_per_host=self._max_per_host,
+            )
+        return self._client
+
+    @asynccontextmanager
+    async def stream(
+        self,
+        method: str,
+        url: str,
+        headers: dict[str, str],
+        content: bytes | AsyncIterable[bytes] | None,
+    ) -> AsyncIterator[httpx.Response]:
+        """
+        ホストの同時リクエスト枠を確保してストリーミングリクエストを送信
+
+        Yields:
+            レスポンス（ボディ未読）
+
+        Raises:
+            UpstreamSlotTimeoutError: ホストの同時リクエスト枠を確保できなかった
+        """
+        host = urlparse(url).hostname or ""
+        async with self._host_slot(host):
+            async with self.client.stream(
+                method=method,
+                url=url,
+                headers=headers,
+                content=content,
+                extensions={"trace": self._make_trace(host)},
+            ) as resp:
+                yield resp
+
+    async def close(self) -> None:
+        """共有クライアントを閉じる"""
+        if self._client is not None:
+            client, self._client = self._client, None
+            await client.aclose()
+            logger.info("上流クライアント終了")
+
+    @asynccontextmanager
+    async def _host_slot(self, host: str) -> AsyncIterator[None]:
+        """ホスト単位の同時リクエスト枠を確保（対象外ホストは計測のみ）"""
+        if host.startswith(self._exempt_host_prefixes):
+            get_workspace_proxy_upstream_in_flight().inc(host=host)
+            try:
+                yield
+            finally:
+                get_workspace_proxy_upstream_in_flight().dec(host=host)
+            return
+
+        slot = self._host_slots.get(host)
+        if slot is None:
+            slot = _HostSlot(semaphore=asyncio.Semaphore(self._max_per_host))
+            self._host_slots[host] = slot
+        slot.users += 1
+        try:
+            wait_start = time.perf_counter()
+            try:
+                async with asyncio.timeout(self._slot_timeout):
+                    await slot.semaphore.acquire()
+            except TimeoutError:
+                get_workspace_proxy_upstream_slot_timeouts().inc(host=host)
+                logger.warning(
+                    "上流ホストの同時リクエスト枠の待機時間超過",
+                    host=host,
+                    limit=self._slot_timeout,
+                    max_per_host=self._max_per_host,
+                )
+                raise UpstreamSlotTimeoutError(host, self._slot_timeout) from None
+            get_workspace_proxy_upstream_slot_wait().observe(time.perf_counter() - wait_start)
+            get_workspace_proxy_upstream_in_flight().inc(host=host)
+            try:
+                yield
+            finally:
+                get_workspace_proxy_upstream_in_flight().dec(host=host)
+                slot.semaphore.release()
+        finally:
+            slot.users -= 1
+            if slot.users == 0:
+                self._host_slots.pop(host, None)
+
+    @staticmethod
+    def _make_trace(host: str):
+        """接続確立（TCP / TLS）を計測する httpcore トレースコールバック"""
+
+        async def trace(event_name: str, info: dict[str, Any]) -> None:
+            kind = _CONNECTION_TRACE_EVENTS.get(event_name)
+            if kind:
+                get_workspace_proxy_upstream_connections().inc(host=host, kind=kind)
+
+        return trace
+
+
+# プロセス内シングルトン
+_upstream_pool: UpstreamClientPool | None = None
+
+
+def get_upstream_pool() -> UpstreamClientPool:
+    """
+    共有上流クライアントを取得
+
+    Returns:
+        UpstreamClientPool インスタンス
+    """
+    global _upstream_pool
+    if _upstream_pool is None:
+        settings = get_settings()
+        _upstream_pool = UpstreamClientPool(
+            max_connections=settings.proxy_upstream_max_connections,
+            max_keepalive_connections=settings.proxy_upstream_max_keepalive_connections,
+            keepalive_expiry=settings.proxy_upstream_keepalive_expiry,
+            max_per_host=settings.proxy_upstream_max_per_host,
+            slot_timeout=settings.proxy_upstream_slot_timeout,
+            http2=settings.proxy_upstream_http2,
+        )
+    return _upstream_pool
@@ -15,6 +15,7 @@ import structlog
 
 from app.config import get_settings
 from app.infrastructure.metrics import get_s3_operations
+from app.services.workspace.s3_storage import DELETE_BATCH_CONCURRENCY, DELETE_BATCH_SIZE
 
 logger = structlog.get_logger(__name__)
 
@@ -50,6 +51,9 @@ class SkillS3Backup:
         self.bucket = _settings.s3_bucket_name
         self.prefix = _settings.s3_skills_prefix.rstrip("/")
         self._metrics = get_s3_operations()
+        self._delete_concurrency = _settings.s3_operation_concurrency.get(
+            "delete_batch", DELETE_BATCH_CONCURRENCY
+        )
 
     def _get_s3_key(self, tenant_id: str, skill_name: str, filename: str) -> str:
         """S3キーを生成"""
@@ -118,12 +122,18 @@ class SkillS3Backup:
         """
         スキルのS3ファイルを全削除
 
+        DeleteObjects で最大1000件ずつ削除し、複数バッチを並行実行する
+        （同時実行数は s3_operation_concurrency の delete_batch）。
+
         Args:
             tenant_id: テナントID
             skill_name: スキル名
 
         Returns:
             削除したファイル数
+
+        Raises:
+            RuntimeError: 削除できなかったファイルがある（全バッチの完了後に送出）
         """
         prefix = self._get_skill_prefix(tenant_id, skill_name)
 
@@ -148,19 +158,52 @@ class SkillS3Backup:
             self._metrics.inc(operation="skill_delete", status="error")
             raise
 
-        # 各オブジェクトを削除
+        # DeleteObjects で最大1000件ずつ、複数バッチを並行して削除
+        total = len(keys)
         deleted = 0
-        for key in keys:
+        failed = 0
+        semaphore = asyncio.Semaphore(self._delete_concurrency)
+
+        async def _delete_batch(batch: list[str]) -> None:
+            nonlocal deleted, failed
             try:
-                await asyncio.to_thread(
-                    self.client.delete_object,
-                    Bucket=self.bucket,
-                    Key=key,
-                )
-                deleted += 1
+                async with semaphore:
+                    response = await asyncio.to_thread(
+                        self.client.delete_objects,
+                        Bucket=self.bucket,
+                        Delete={
+                            "Objects": [{"Key": key} for key in batch],
+                            "Quiet": True,
+                        },
+                    )
             except Exception as e:
-                logger.error("S3スキルファイル削除エラー", key=key, error=str(e))
+                logger.error(
+                    "S3スキル一括削除エラー", prefix=prefix, count=len(batch), error=str(e)
+                )
+                failed += len(batch)
+                return
+            # Quiet モードでは失敗したキーのみが Errors に含まれる
+            errors = response.get("Errors", [])
+            for error in errors[:10]:
+                logger.error(
+                    "S3スキルファイル削除エラー",
+                    key=error.get("Key"),
+                    code=error.get("Code"),
+                    error=error.get("Message"),
+                )
+            deleted += len(batch) - len(errors)
+            failed += len(errors)
+
+        await asyncio.gather(*(
+            _delete_batch(keys[i:i + DELETE_BATCH_SIZE])
+            for i in range(0, total, DELETE_BATCH_SIZE)
+        ))
 
+        if failed:
+            self._metrics.inc(operation="skill_delete", status="error")
+            raise RuntimeError(
+                f"S3スキル削除で {failed}/{total} 件のファイルを削除できませんでした"
+            )
         self._metrics.inc(operation="skill_delete", status="success")
         logger.info(
             "S3スキル削除完了",
@@ -35,12 +35,14 @@ class TenantService:
         tenant_id: str,
         system_prompt: str | None = None,
         model_id: str | None = None,
+        prompt_cache_injection: bool = False,
     ) -> Tenant:
         """テナントを作成"""
         tenant = Tenant(
             tenant_id=tenant_id,
             system_prompt=system_prompt,
             model_id=model_id,
+            prompt_cache_injection=prompt_cache_injection,
             status="active",
         )
         return await self.repo.create(tenant)
@@ -50,6 +52,7 @@ class TenantService:
         tenant_id: str,
         system_prompt: str | None = None,
         model_id: str | None = None,
+        prompt_cache_injection: bool | None = None,
         status: str | None = None,
     ) -> Tenant | None:
         """テナントを更新"""
@@ -61,6 +64,8 @@ class TenantService:
             tenant.system_prompt = system_prompt
         if model_id is not None:
             tenant.model_id = model_id
+        if prompt_cache_injection is not None:
+            tenant.prompt_cache_injection = prompt_cache_injection
         if status is not None:
             tenant.status = status
 
@@ -1,10 +1,13 @@
 """
 ワークスペースサービスパッケージ（S3版）
 """
-from app.services.workspace.s3_storage import S3StorageBackend
+from app.services.workspace.object_cache import S3ObjectCache
+from app.services.workspace.s3_storage import S3StorageBackend, get_s3_storage
 from app.services.workspace.context_builder import AIContextBuilder
 
 __all__ = [
     "S3StorageBackend",
+    "get_s3_storage",
+    "S3ObjectCache",
     "AIContextBuilder",
 ]
@@ -59,12 +59,14 @@ class WorkspaceFileSync:
         s3: S3StorageBackend,
         lifecycle: ContainerLifecycleManager,
         db: AsyncSession,
+        db_lock: asyncio.Lock | None = None,
     ) -> None:
         self.s3 = s3
         self.lifecycle = lifecycle
         self.db = db
         # バックグラウンド同期タスクからの並行DB操作を排他制御
-        self._db_lock = asyncio.Lock()
+        # 同じAsyncSessionを並行利用する呼び出し元はロックを共有する
+        self._db_lock = db_lock or asyncio.Lock()
 
     @staticmethod
     def _is_reserved_path(file_path: str) -> bool:
@@ -0,0 +1,263 @@
+"""
+S3オブジェクトのノードローカル読み取りキャッシュ
+
+コンテナ再作成時の同期・ファイルダウンロード・sync_to_local で
+同じオブジェクトを繰り返しS3から取得しないよう、ノードのディスクに保持する。
+
+エントリは (バケット, キー, ETag) 単位で保存するため、上書きされたオブジェクトは
+別エントリとなり、古い内容を返すことはない（古いエントリはLRUで追い出される）。
+キャッシュは取得の高速化のみを目的とし、失敗時は呼び出し側がS3から直接取得する。
+"""
+import asyncio
+import functools
+import hashlib
+import os
+import shutil
+import time
+from collections import OrderedDict
+from collections.abc import Awaitable, Callable
+from concurrent.futures import Executor
+from pathlib import Path
+from typing import Any
+from uuid import uuid4
+
+import structlog
+
+from app.infrastructure.metrics import (
+    get_s3_object_cache_bytes,
+    get_s3_object_cache_bytes_saved,
+    get_s3_object_cache_evictions,
+    get_s3_object_cache_requests,
+)
+from app.utils.disk_cache import evict_shared, move_into_place, tmp_dir
+
+logger = structlog.get_logger(__name__)
+
+# 他のワーカープロセスの書き込みを反映するため、共有ディレクトリ全体を走査する間隔（秒）
+_SHARED_SCAN_INTERVAL = 60.0
+
+
+class S3ObjectCache:
+    """
+    ディスクバックエンドのS3オブジェクトキャッシュ
+
+    - エントリは (バケット, キー, ETag) の SHA-256 をファイル名として保存する
+    - 合計サイズが max_bytes を超えたら最後に参照されてから最も古いものから削除する
+    - 同じエントリへの同時取得は1回のS3取得にまとめる
+    - キャッシュディレクトリは同じノードの他のワーカープロセスと共有する
+      （参照時に更新時刻を更新し、追い出しはディレクトリ全体の更新時刻で判定する）
+    """
+
+    def __init__(
+        self,
+        root_dir: str,
+        max_bytes: int,
+        executor: Executor | None = None,
+    ) -> None:
+        """
+        Args:
+            root_dir: キャッシュディレクトリ
+            max_bytes: ディスク使用量の上限
+            executor: ファイル操作を実行するスレッドプール（Noneならイベントループ既定）
+        """
+        self._root = Path(root_dir)
+        self.max_bytes = max_bytes
+        self._executor = executor
+        # ファイル名 → サイズ（先頭ほど参照が古い）
+        self._entries: OrderedDict[str, int] = OrderedDict()
+        self._total_bytes = 0
+        self._loaded = False
+        self._load_lock = asyncio.Lock()
+        self._inflight: dict[str, asyncio.Task] = {}
+        self._next_shared_scan = 0.0
+
+    async def get(self, bucket: str, key: str, etag: str) -> Path | None:
+        """
+        キャッシュ済みのファイルパスを取得（なければNone）
+
+        返したファイルは他の取得による追い出しで削除されることがあるため、
+        呼び出し側は読み出し時の FileNotFoundError をキャッシュミスとして扱う。
+        """
+        await self._ensure_loaded()
+        name = _entry_name(bucket, key, etag)
+        path = await self._lookup(name)
+        if path is None:
+            get_s3_object_cache_requests().inc(result="miss")
+            return None
+        self._count_saved("hit", name)
+        return path
+
+    async def fetch(
+        self,
+        bucket: str,
+        key: str,
+        etag: str,
+        download: Callable[[Path], Awaitable[None]],
+    ) -> Path:
+        """
+        キャッシュ済みのファイルパスを取得（なければ download で取得して保存）
+
+        Args:
+            bucket: バケット名
+            key: オブジェクトキー
+            etag: 取得対象の ETag（download はこの版を取得すること）
+            download: 指定パスにオブジェクトを書き込むコルーチン関数
+
+        Raises:
+            download が送出した例外（同時に待っている全員に伝わる）
+        """
+        await self._ensure_loaded()
+        name = _entry_name(bucket, key, etag)
+        path = await self._lookup(name)
+        if path is not None:
+            self._count_saved("hit", name)
+            return path
+
+        task = self._inflight.get(name)
+        if task is None:
+            get_s3_object_cache_requests().inc(result="miss")
+            task = asyncio.get_running_loop().create_task(self._fill(name, download))
+            self._inflight[name] = task
+            task.add_done_callback(lambda _: self._inflight.pop(name, None))
+            return await asyncio.shield(task)
+
+        # 取得中の同じエントリを待つ（S3取得1回分を節約）
+        path = await asyncio.shield(task)
+        self._count_saved("coalesced", name)
+        return path
+
+    async def put(self, bucket: str, key: str, etag: str, source: Path) -> None:
+        """ローカルに取得済みのファイルをキャッシュに登録（失敗はログのみ）"""
+        await self._ensure_loaded()
+        name = _entry_name(bucket, key, etag)
+        if name in self._entries or name in self._inflight:
+            return
+        try:
+            await self._fill(name, lambda tmp: self._run(shutil.copyfile, source, tmp))
+        except Exception as e:
+            logger.warning("S3キャッシュ登録エラー", key=key, error=str(e))
+
+    async def discard(self, bucket: str, objects: list[tuple[str, str]]) -> None:
+        """
+        削除したオブジェクトのエントリを削除（失敗はログのみ）
+
+        Args:
+            bucket: バケット名
+            objects: (キー, ETag) のリスト
+        """
+        await self._ensure_loaded()
+        names = [_entry_name(bucket, key, etag) for key, etag in objects]
+        for name in names:
+            self._forget(name)
+        try:
+            await self._run(_unlink_all, [self._file_path(name) for name in names])
+        except OSError as e:
+            logger.warning("S3キャッシュ削除エラー", count=len(names), error=str(e))
+
+    async def _run(self, func: Callable[..., Any], *args, **kwargs) -> Any:
+        """ファイル操作をスレッドプールで実行"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self._executor, functools.partial(func, *args, **kwargs)
+        )
+
+    async def _lookup(self, name: str) -> Path | None:
+        """
+        エントリのファイルパスを取得し、参照順を更新
+
+        他のワーカープロセスが保存したエントリも使えるよう、ディスク上の有無で判定する。
+        """
+        path = self._file_path(name)
+        size = await self._run(_touch, path)
+        if size is None:
+            # 未保存、または外部（他プロセスの追い出しを含む）から削除された
+            self._forget(name)
+            return None
+        self._record(name, size)
+        return path
+
+    async def _fill(self, name: str, download: Callable[[Path], Awaitable[None]]) -> Path:
+        """一時ファイルに取得してからエントリとして配置"""
+        tmp_path = tmp_dir(self._root) / f"{name}.{uuid4().hex}"
+        file_path = self._file_path(name)
+        try:
+            await self._run(tmp_path.parent.mkdir, parents=True, exist_ok=True)
+            await download(tmp_path)
+            size = await self._run(move_into_place, tmp_path, file_path)
+        except BaseException:
+            get_s3_object_cache_requests().inc(result="error")
+            await self._run(tmp_path.unlink, missing_ok=True)
+            raise
+        self._record(name, size)
+        await self._evict()
+        return file_path
+
+    def _count_saved(self, result: str, name: str) -> None:
+        get_s3_object_cache_requests().inc(result=result)
+        get_s3_object_cache_bytes_saved().inc(self._entries.get(name, 0))
+
+    def _file_path(self, name: str) -> Path:
+        return self._root / name[:2] / name
+
+    def _record(self, name: str, size: int) -> None:
+        """エントリを登録（既存なら置き換え、参照順を更新）"""
+        self._total_bytes += size - self._entries.pop(name, 0)
+        self._entries[name] = size
+        get_s3_object_cache_bytes().set(self._total_bytes)
+
+    def _forget(self, name: str) -> None:
+        self._total_bytes -= self._entries.pop(name, 0)
+        get_s3_object_cache_bytes().set(self._total_bytes)
+
+    async def _evict(self, force: bool = False) -> None:
+        """
+        上限を超えた分を参照の古い順に削除
+
+        キャッシュディレクトリは他のワーカープロセスと共有するため、このプロセスの
+        見積もりが上限を超えたとき、または一定間隔ごとにディレクトリ全体を走査して判定する。
+        """
+        now = time.monotonic()
+        if not force and self._total_bytes <= self.max_bytes and now < self._next_shared_scan:
+            return
+        self._next_shared_scan = now + _SHARED_SCAN_INTERVAL
+        entries, evicted = await self._run(evict_shared, self._root, self.max_bytes)
+        self._entries = OrderedDict(entries)
+        self._total_bytes = sum(self._entries.values())
+        get_s3_object_cache_bytes().set(self._total_bytes)
+        if evicted:
+            get_s3_object_cache_evictions().inc(evicted)
+
+    async def _ensure_loaded(self) -> None:
+        """起動後初回に既存のキャッシュファイルを読み込む（更新時刻順）"""
+        if self._loaded:
+            return
+        async with self._load_lock:
+            if self._loaded:
+                return
+            # 書きかけファイルの削除・既存エントリの読み込み・上限超過分の削除
+            await self._evict(force=True)
+            self._loaded = True
+            logger.info(
+                "S3キャッシュ読み込み",
+                root=str(self._root),
+                entries=len(self._entries),
+                total_bytes=self._total_bytes,
+            )
+
+
+def _entry_name(bucket: str, key: str, etag: str) -> str:
+    return hashlib.sha256(f"{bucket}\0{key}\0{etag}".encode()).hexdigest()
+
+
+def _touch(path: Path) -> int | None:
+    """更新時刻を現在時刻にしてサイズを返す（なければNone）"""
+    try:
+        os.utime(path)
+        return path.stat().st_size
+    except FileNotFoundError:
+        return None
+
+
+def _unlink_all(paths: list[Path]) -> None:
+    for path in paths:
+        path.unlink(missing_ok=True)
@@ -3,37 +3,99 @@ S3ストレージバックエンド
 
 すべてのS3アクセスはこのクラスを経由する。
 ワークスペースファイルの保存・取得・同期を担当。
-asyncio.to_thread()による非同期I/Oでイベントループをブロックしない。
+
+boto3 呼び出しは S3 専用のスレッドプールで実行し、イベントループをブロックしない。
+既定のスレッドプール（asyncio.to_thread）はタイトル生成などと共有されるため使わない。
+インスタンスはプロセス内で共有する（get_s3_storage()）。
+読み出し（download / download_stream / sync_to_local）はノードローカルの
+S3ObjectCache を経由し、同じ版のオブジェクトを繰り返しS3から取得しない。
 """
 import asyncio
+import functools
+import hashlib
 import io
 import mimetypes
 import os
-from collections.abc import AsyncIterator
+import shutil
+import time
+from collections.abc import AsyncIterator, Callable
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any
 
 import boto3
+from boto3.s3.transfer import TransferConfig
 from botocore.config import Config
 from botocore.exceptions import ClientError
 import structlog
 
 from app.config import get_settings
-from app.infrastructure.metrics import get_s3_operations
+from app.infrastructure.metrics import (
+    get_s3_operation_duration,
+    get_s3_operations,
+    get_s3_transfer_bytes,
+)
+from app.services.workspace.object_cache import S3ObjectCache
 
 logger = structlog.get_logger(__name__)
 
+# DeleteObjects 1回あたりの最大キー数（S3の上限）
+DELETE_BATCH_SIZE = 1000
+
+# DeleteObjects の同時実行数の既定値（s3_operation_concurrency の delete_batch で上書き）
+DELETE_BATCH_CONCURRENCY = 4
+
+# 同期時に1回のスレッド実行でまとめて転送する小さいファイルの最大件数
+SYNC_BATCH_MAX_FILES = 32
+
+# アップロード前にチェックサムを計算する際の読み出し単位
+_HASH_CHUNK_SIZE = 1024 * 1024
+
+# 操作別の同時実行数の既定値（s3_operation_concurrency で上書き、未指定は s3_transfer_workers）
+_DEFAULT_OPERATION_CONCURRENCY = {"delete_batch": DELETE_BATCH_CONCURRENCY}
+
+
+@dataclass(frozen=True)
+class _SyncItem:
+    """ワークスペース同期の転送対象"""
+
+    file_path: str
+    key: str
+    local_path: str
+    size: int
+    etag: str | None = None
+
+
+def _hash_seekable(stream: io.IOBase) -> tuple[str, int]:
+    """シーク可能なストリームの現在位置以降の SHA-256 とサイズを計算し、位置を戻す"""
+    start = stream.tell()
+    digest = hashlib.sha256()
+    size = 0
+    while chunk := stream.read(_HASH_CHUNK_SIZE):
+        digest.update(chunk)
+        size += len(chunk)
+    stream.seek(start)
+    return digest.hexdigest(), size
+
 
 class S3StorageBackend:
     """
     S3ストレージ操作
 
     すべてのS3アクセスはこのクラスを経由する
-    asyncio.to_thread()で同期boto3呼び出しをスレッドプールにオフロード
+    - 同期boto3呼び出しを S3 専用のスレッドプール（s3_transfer_workers）にオフロード
+    - boto3 の接続プールは s3_max_pool_connections（スレッド数以上にする）
+    - 操作ごとの同時実行数を s3_operation_concurrency で制限する
+    - ワークスペース同期は s3_sync_concurrency 件まで並行転送し、
+      大きいファイルはマルチパート/Range GET でパートを並列転送する
+    - 読み出しは s3_object_cache_enabled のときノードローカルキャッシュを経由する
     """
 
     def __init__(self):
         _settings = get_settings()
 
-        # boto3 の設定（リトライ設定を含む）
+        # boto3 の設定（リトライ設定・接続プールサイズを含む）
         config = Config(
             retries={
                 'max_attempts': 3,
@@ -41,6 +103,7 @@ class S3StorageBackend:
             },
             connect_timeout=10,
             read_timeout=30,
+            max_pool_connections=_settings.s3_max_pool_connections,
         )
 
         self.client = boto3.client(
@@ -54,6 +117,68 @@ class S3StorageBackend:
         self.prefix = _settings.s3_workspace_prefix.rstrip('/')
         self.chunk_size = _settings.s3_chunk_size
         self._metrics = get_s3_operations()
+        self._duration = get_s3_operation_duration()
+        self._executor = ThreadPoolExecutor(
+            max_workers=_settings.s3_transfer_workers,
+            thread_name_prefix="s3-transfer",
+        )
+        self._default_concurrency = _settings.s3_transfer_workers
+        self._concurrency = {
+            **_DEFAULT_OPERATION_CONCURRENCY,
+            **_settings.s3_operation_concurrency,
+        }
+        self._semaphores: dict[str, asyncio.Semaphore] = {}
+        self._transfer_bytes = get_s3_transfer_bytes()
+        self._sync_concurrency = _settings.s3_sync_concurrency
+        self._sync_small_file_size = _settings.s3_sync_small_file_size
+        self._transfer_config = TransferConfig(
+            multipart_threshold=_settings.s3_multipart_threshold,
+            multipart_chunksize=self.chunk_size,
+            max_concurrency=_settings.s3_multipart_concurrency,
+        )
+        # キャッシュのファイル操作もS3専用スレッドプールで実行する
+        self._cache: S3ObjectCache | None = (
+            S3ObjectCache(
+                root_dir=_settings.s3_object_cache_dir,
+                max_bytes=_settings.s3_object_cache_max_bytes,
+                executor=self._executor,
+            )
+            if _settings.s3_object_cache_enabled
+            else None
+        )
+
+    async def _run(self, func: Callable[..., Any], *args, **kwargs) -> Any:
+        """S3専用スレッドプールで同期関数を実行"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self._executor, functools.partial(func, *args, **kwargs)
+        )
+
+    async def _call(
+        self, operation: str, func: Callable[..., Any], *args, **kwargs
+    ) -> Any:
+        """
+        操作ごとの同時実行数制限の下でS3呼び出しを実行し、所要時間を記録
+
+        Args:
+            operation: 操作名（同時実行数の設定キー・メトリクスラベル）
+        """
+        semaphore = self._semaphores.get(operation)
+        if semaphore is None:
+            limit = self._concurrency.get(operation, self._default_concurrency)
+            semaphore = self._semaphores[operation] = asyncio.Semaphore(limit)
+        async with semaphore:
+            start = time.perf_counter()
+            try:
+                return await self._run(func, *args, **kwargs)
+            finally:
+                self._duration.observe(
+                    time.perf_counter() - start, operation=operation
+                )
+
+    def close(self) -> None:
+        """スレッドプールを終了（実行中の呼び出しは完了を待たない）"""
+        self._executor.shutdown(wait=False, cancel_futures=True)
 
     def get_key(self, tenant_id: str, session_id: str, file_path: str) -> str:
         """S3キーを生成"""
@@ -75,7 +200,8 @@ class S3StorageBackend:
         key = self.get_key(tenant_id, session_id, file_path)
 
         try:
-            await asyncio.to_thread(
+            await self._call(
+                "upload",
                 self.client.put_object,
                 Bucket=self.bucket,
                 Key=key,
@@ -107,7 +233,8 @@ class S3StorageBackend:
         try:
             extra_args = {'ContentType': content_type}
 
-            await asyncio.to_thread(
+            await self._call(
+                "upload_stream",
                 self.client.upload_fileobj,
                 stream,
                 self.bucket,
@@ -124,22 +251,95 @@ class S3StorageBackend:
             self._metrics.inc(operation="upload_stream", status="error")
             raise
 
+    async def upload_stream_with_checksum(
+        self,
+        tenant_id: str,
+        session_id: str,
+        file_path: str,
+        stream: io.IOBase,
+        content_type: str = "application/octet-stream",
+    ) -> tuple[str, int]:
+        """
+        ストリームのSHA-256を計算し、マルチパートで並列アップロード
+
+        パートサイズ・並列数はワークスペース同期と同じ TransferConfig を使う。
+        各パートは S3 の追加チェックサム（SHA256）で検証される。
+        オブジェクト全体の SHA-256 は事前に1回読み出して計算し、先頭に戻してから渡す。
+        シーク可能なまま渡すことで、s3transfer はパートを位置指定で読み出し、
+        ストリーム全体をメモリにバッファしない。
+
+        Args:
+            tenant_id: テナントID
+            session_id: セッションID
+            file_path: ファイルパス
+            stream: アップロードするシーク可能なストリーム（現在位置から読み出す）
+            content_type: MIMEタイプ
+
+        Returns:
+            (SHA-256の16進文字列, アップロードしたバイト数)
+        """
+        key = self.get_key(tenant_id, session_id, file_path)
+
+        try:
+            start = time.perf_counter()
+            checksum, size = await self._run(_hash_seekable, stream)
+            await self._call(
+                "upload_stream",
+                self.client.upload_fileobj,
+                stream,
+                self.bucket,
+                key,
+                ExtraArgs={
+                    'ContentType': content_type,
+                    'ChecksumAlgorithm': 'SHA256',
+                },
+                Config=self._transfer_config,
+            )
+            elapsed = time.perf_counter() - start
+
+            logger.info(
+                "S3ストリームアップロード完了",
+                key=key,
+                size=size,
+                duration_ms=round(elapsed * 1000),
+            )
+            self._metrics.inc(operation="upload_stream", status="success")
+            return checksum, size
+
+        except Exception as e:
+            logger.error("S3ストリームアップロードエラー", key=key, error=str(e))
+            self._metrics.inc(operation="upload_stream", status="error")
+            raise
+
     async def download(
         self,
         tenant_id: str,
         session_id: str,
         file_path: str,
     ) -> tuple[bytes, str]:
-        """ファイルをS3からダウンロード"""
+        """ファイルをS3からダウンロード（キャッシュ有効時はキャッシュ経由）"""
         key = self.get_key(tenant_id, session_id, file_path)
 
+        cached = await self._cached_object(key, file_path, "download")
+        if cached is not None:
+            path, content_type = cached
+            try:
+                content = await self._run(path.read_bytes)
+            except FileNotFoundError:
+                # 読み出し前に追い出された場合はS3から直接取得する
+                pass
+            else:
+                self._metrics.inc(operation="download", status="success")
+                return content, content_type
+
         try:
-            response = await asyncio.to_thread(
+            response = await self._call(
+                "download",
                 self.client.get_object,
                 Bucket=self.bucket,
                 Key=key,
             )
-            content = await asyncio.to_thread(response['Body'].read)
+            content = await self._run(response['Body'].read)
             content_type = response.get('ContentType', 'application/octet-stream')
 
             self._metrics.inc(operation="download", status="success")
@@ -158,11 +358,31 @@ class S3StorageBackend:
         session_id: str,
         file_path: str,
     ) -> AsyncIterator[bytes]:
-        """ファイルをS3からストリーミングダウンロード（メモリ効率化）"""
+        """ファイルをS3からストリーミングダウンロード（メモリ効率化、キャッシュ有効時はキャッシュ経由）"""
         key = self.get_key(tenant_id, session_id, file_path)
 
+        cached = await self._cached_object(key, file_path, "download_stream")
+        if cached is not None:
+            try:
+                f = await self._run(open, cached[0], 'rb')
+            except FileNotFoundError:
+                # 開く前に追い出された場合はS3から直接取得する
+                f = None
+            if f is not None:
+                try:
+                    while True:
+                        chunk = await self._run(f.read, self.chunk_size)
+                        if not chunk:
+                            break
+                        yield chunk
+                finally:
+                    await self._run(f.close)
+                self._metrics.inc(operation="download_stream", status="success")
+                return
+
         try:
-            response = await asyncio.to_thread(
+            response = await self._call(
+                "download_stream",
                 self.client.get_object,
                 Bucket=self.bucket,
                 Key=key,
@@ -171,13 +391,13 @@ class S3StorageBackend:
 
             try:
                 while True:
-                    chunk = await asyncio.to_thread(body.read, self.chunk_size)
+                    chunk = await self._run(body.read, self.chunk_size)
                     if not chunk:
                         break
                     yield chunk
             finally:
                 # 正常終了・異常終了問わずBodyをクローズ
-                await asyncio.to_thread(body.close)
+                await self._run(body.close)
 
             self._metrics.inc(operation="download_stream", status="success")
 
@@ -188,6 +408,64 @@ class S3StorageBackend:
             self._metrics.inc(operation="download_stream", status="error")
             raise
 
+    async def _cached_object(
+        self, key: str, file_path: str, operation: str
+    ) -> tuple[Path, str] | None:
+        """
+        オブジェクトをキャッシュ経由で取得し、(キャッシュファイル, MIMEタイプ) を返す
+
+        現在の ETag を head_object で確認してからキャッシュを引く。
+        キャッシュ無効・上限超えのサイズ・キャッシュ取得失敗の場合は None
+        （呼び出し側がS3から直接取得する）。
+
+        Raises:
+            FileNotFoundError: オブジェクトが存在しない
+        """
+        if self._cache is None:
+            return None
+        try:
+            head = await self._call(
+                "head",
+                self.client.head_object,
+                Bucket=self.bucket,
+                Key=key,
+            )
+        except ClientError as e:
+            if e.response['Error']['Code'] in ('404', 'NoSuchKey'):
+                self._metrics.inc(operation=operation, status="not_found")
+                raise FileNotFoundError(f"File not found: {file_path}")
+            logger.warning("S3キャッシュ用メタデータ取得エラー", key=key, error=str(e))
+            return None
+
+        if head.get('ContentLength', 0) > self._cache.max_bytes:
+            return None
+        etag = head['ETag']
+        try:
+            path = await self._cache.fetch(
+                self.bucket, key, etag,
+                functools.partial(self._fetch_version, key, etag),
+            )
+        except Exception as e:
+            logger.warning("S3キャッシュ取得エラー（S3から直接取得）", key=key, error=str(e))
+            return None
+        return path, head.get('ContentType', 'application/octet-stream')
+
+    async def _fetch_version(self, key: str, etag: str, local_path: Path) -> None:
+        """指定した ETag の版のオブジェクトをローカルファイルに書き込む（キャッシュ充填用）"""
+
+        def _get_to_file() -> None:
+            # 確認後に上書きされた場合は PreconditionFailed になり、別の版をキャッシュしない
+            response = self.client.get_object(Bucket=self.bucket, Key=key, IfMatch=etag)
+            body = response['Body']
+            try:
+                with open(local_path, 'wb') as f:
+                    while chunk := body.read(self.chunk_size):
+                        f.write(chunk)
+            finally:
+                body.close()
+
+        await self._call("download_to_file", _get_to_file)
+
     async def download_to_file(
         self,
         tenant_id: str,
@@ -201,7 +479,8 @@ class S3StorageBackend:
         try:
             os.makedirs(os.path.dirname(local_path), exist_ok=True)
 
-            await asyncio.to_thread(
+            await self._call(
+                "download_to_file",
                 self.client.download_file,
                 self.bucket,
                 key,
@@ -229,7 +508,8 @@ class S3StorageBackend:
         key = self.get_key(tenant_id, session_id, file_path)
 
         try:
-            response = await asyncio.to_thread(
+            response = await self._call(
+                "head",
                 self.client.head_object,
                 Bucket=self.bucket,
                 Key=key,
@@ -267,10 +547,11 @@ class S3StorageBackend:
                                 'file_size': obj['Size'],
                                 'last_modified': obj['LastModified'],
                                 'storage_class': obj.get('StorageClass', 'STANDARD'),
+                                'etag': obj.get('ETag'),
                             })
                 return result
 
-            files = await asyncio.to_thread(_list_all)
+            files = await self._call("list", _list_all)
 
             self._metrics.inc(operation="list", status="success")
             return files
@@ -290,7 +571,8 @@ class S3StorageBackend:
         key = self.get_key(tenant_id, session_id, file_path)
 
         try:
-            await asyncio.to_thread(
+            await self._call(
+                "delete",
                 self.client.delete_object,
                 Bucket=self.bucket,
                 Key=key,
@@ -310,28 +592,87 @@ class S3StorageBackend:
         """
         セッション配下の全ファイルを削除
 
+        DeleteObjects で最大1000件ずつ削除し、複数バッチを並行実行する
+        （同時実行数は s3_operation_concurrency の delete_batch）。
+        このノードのオブジェクトキャッシュからも該当エントリを削除する
+        （他ノードのキャッシュに残ったエントリは参照されずLRUで追い出される）。
+
         Args:
             tenant_id: テナントID
             session_id: セッションID
 
         Returns:
             削除されたファイル数
+
+        Raises:
+            RuntimeError: 削除できなかったファイルがある（全バッチの完了後に送出）
         """
+        prefix = self.get_prefix(tenant_id, session_id)
         files = await self.list_files(tenant_id, session_id)
+        keys = [prefix + file_info['file_path'] for file_info in files]
+        total = len(keys)
         deleted = 0
+        failed = 0
 
-        for file_info in files:
+        async def _delete_batch(batch: list[str]) -> None:
+            nonlocal deleted, failed
             try:
-                await self.delete(tenant_id, session_id, file_info['file_path'])
-                deleted += 1
+                response = await self._call(
+                    "delete_batch",
+                    self.client.delete_objects,
+                    Bucket=self.bucket,
+                    Delete={
+                        'Objects': [{'Key': key} for key in batch],
+                        'Quiet': True,
+                    },
+                )
             except Exception as e:
+                logger.error("S3一括削除エラー", prefix=prefix, count=len(batch), error=str(e))
+                self._metrics.inc(operation="delete_batch", status="error")
+                failed += len(batch)
+                return
+
+            # Quiet モードでは失敗したキーのみが Errors に含まれる
+            errors = response.get('Errors', [])
+            for error in errors[:10]:
                 logger.error(
                     "S3ファイル削除エラー",
-                    file_path=file_info['file_path'],
-                    error=str(e),
+                    key=error.get('Key'),
+                    code=error.get('Code'),
+                    error=error.get('Message'),
                 )
+            deleted += len(batch) - len(errors)
+            failed += len(errors)
+            self._metrics.inc(
+                operation="delete_batch", status="error" if errors else "success"
+            )
+            logger.info(
+                "S3プレフィックス削除進捗",
+                prefix=prefix,
+                deleted=deleted,
+                failed=failed,
+                total=total,
+            )
 
-        logger.info("S3プレフィックス削除完了", count=deleted)
+        await asyncio.gather(*(
+            _delete_batch(keys[i:i + DELETE_BATCH_SIZE])
+            for i in range(0, total, DELETE_BATCH_SIZE)
+        ))
+
+        if self._cache is not None:
+            # 削除したワークスペースの内容をノードのディスクに残さない
+            # （削除できなかったファイルも、次回はS3から取得すればよいため削除する）
+            await self._cache.discard(self.bucket, [
+                (key, file_info['etag'])
+                for key, file_info in zip(keys, files)
+                if file_info.get('etag')
+            ])
+
+        if failed:
+            raise RuntimeError(
+                f"S3プレフィックス削除で {failed}/{total} 件のファイルを削除できませんでした"
+            )
+        logger.info("S3プレフィックス削除完了", prefix=prefix, count=deleted)
         return deleted
 
     async def exists(
@@ -343,7 +684,8 @@ class S3StorageBackend:
         """ファイルの存在確認"""
         key = self.get_key(tenant_id, session_id, file_path)
         try:
-            await asyncio.to_thread(
+            await self._call(
+                "head",
                 self.client.head_object,
                 Bucket=self.bucket,
                 Key=key,
@@ -352,6 +694,154 @@ class S3StorageBackend:
         except ClientError:
             return False
 
+    def _sync_batches(self, items: list[_SyncItem]) -> list[list[_SyncItem]]:
+        """
+        同期対象を転送単位に分割
+
+        小さいファイルは件数・合計サイズの上限までまとめて1回のスレッド実行で転送し、
+        大きいファイルは1ファイルずつ転送する（TransferConfig でマルチパート/Range GET）。
+        所要時間の長い大きいファイルから先に開始する。
+        """
+        batches: list[list[_SyncItem]] = []
+        batch: list[_SyncItem] = []
+        batch_bytes = 0
+        for item in sorted(items, key=lambda i: i.size, reverse=True):
+            if item.size >= self._sync_small_file_size:
+                batches.append([item])
+                continue
+            if batch and (
+                len(batch) >= SYNC_BATCH_MAX_FILES
+                or batch_bytes + item.size > self.chunk_size
+            ):
+                batches.append(batch)
+                batch, batch_bytes = [], 0
+            batch.append(item)
+            batch_bytes += item.size
+        if batch:
+            batches.append(batch)
+        return batches
+
+    def _download_batch(
+        self, items: list[_SyncItem], verified: set[str] | None = None
+    ) -> None:
+        """
+        同期対象をダウンロード（S3専用スレッドで実行）
+
+        Args:
+            items: 同期対象
+            verified: 一覧取得時の ETag と同じ版を取得できたキーを追加する集合（キャッシュ登録用）
+        """
+        for item in items:
+            os.makedirs(os.path.dirname(item.local_path), exist_ok=True)
+            try:
+                if item.size < self._sync_small_file_size:
+                    response = self.client.get_object(Bucket=self.bucket, Key=item.key)
+                    with open(item.local_path, 'wb') as f:
+                        f.write(response['Body'].read())
+                    etag = response.get('ETag')
+                else:
+                    # 閾値以上は Range GET でパートを並列取得する
+                    self.client.download_file(
+                        self.bucket, item.key, item.local_path,
+                        Config=self._transfer_config,
+                    )
+                    etag = None
+                    if verified is not None and item.etag:
+                        # 取得中に上書きされていないことを取得後の ETag で確認する
+                        etag = self.client.head_object(
+                            Bucket=self.bucket, Key=item.key
+                        ).get('ETag')
+                if verified is not None and item.etag and etag == item.etag:
+                    verified.add(item.key)
+            except ClientError as e:
+                if e.response['Error']['Code'] in ('NoSuchKey', '404'):
+                    raise FileNotFoundError(f"File not found: {item.file_path}") from e
+                raise
+
+    def _upload_batch(self, items: list[_SyncItem]) -> None:
+        """同期対象をアップロード（S3専用スレッドで実行）"""
+        for item in items:
+            content_type, _ = mimetypes.guess_type(item.local_path)
+            content_type = content_type or 'application/octet-stream'
+            if item.size < self._sync_small_file_size:
+                with open(item.local_path, 'rb') as f:
+                    self.client.put_object(
+                        Bucket=self.bucket,
+                        Key=item.key,
+                        Body=f.read(),
+                        ContentType=content_type,
+                    )
+            else:
+                # 閾値以上はマルチパートでパートを並列アップロードする
+                self.client.upload_file(
+                    item.local_path, self.bucket, item.key,
+                    ExtraArgs={'ContentType': content_type},
+                    Config=self._transfer_config,
+                )
+
+    async def _sync(
+        self,
+        operation: str,
+        items: list[_SyncItem],
+        transfer: Callable[[list[_SyncItem]], None],
+    ) -> list[str]:
+        """
+        同期対象を s3_sync_concurrency 件まで並行して転送し、スループットを記録
+
+        1件でも失敗した場合は全転送の完了を待ってから最初の例外を送出する。
+
+        Args:
+            operation: 操作名（sync_to_local / sync_from_local）
+            items: 同期対象
+            transfer: バッチを転送する同期関数
+
+        Returns:
+            同期したファイルの相対パス一覧
+        """
+        semaphore = asyncio.Semaphore(self._sync_concurrency)
+        batches = self._sync_batches(items)
+
+        async def _transfer(batch: list[_SyncItem]) -> None:
+            async with semaphore:
+                await self._call(operation, transfer, batch)
+
+        start = time.perf_counter()
+        results = await asyncio.gather(
+            *(_transfer(batch) for batch in batches), return_exceptions=True
+        )
+        elapsed = time.perf_counter() - start
+
+        transferred = 0
+        error: BaseException | None = None
+        for batch, result in zip(batches, results):
+            if isinstance(result, BaseException):
+                error = error or result
+            else:
+                transferred += sum(item.size for item in batch)
+        self._transfer_bytes.inc(transferred, operation=operation)
+
+        if error is not None:
+            logger.error(
+                "S3同期エラー",
+                operation=operation,
+                count=len(items),
+                bytes=transferred,
+                error=str(error),
+            )
+            self._metrics.inc(operation=operation, status="error")
+            raise error
+
+        self._metrics.inc(operation=operation, status="success")
+        logger.info(
+            "S3→ローカル同期完了" if operation == "sync_to_local" else "ローカル→S3同期完了",
+            count=len(items),
+            batches=len(batches),
+            bytes=transferred,
+            duration_ms=round(elapsed * 1000),
+            throughput_mbps=round(transferred / elapsed / (1024 * 1024), 2) if elapsed else 0.0,
+        )
+        return [item.file_path for item in items]
+
     async def sync_to_local(
         self,
         tenant_id: str,
@@ -359,20 +849,73 @@ class S3StorageBackend:
         local_dir: str,
     ) -> list[str]:
         """S3からローカルにファイルを同期（エージェント実行用）"""
+        prefix = self.get_prefix(tenant_id, session_id)
         files = await self.list_files(tenant_id, session_id)
-        synced = []
+        items = [
+            _SyncItem(
+                file_path=file_info['file_path'],
+                key=prefix + file_info['file_path'],
+                local_path=os.path.join(local_dir, file_info['file_path']),
+                size=file_info['file_size'],
+                etag=file_info.get('etag'),
+            )
+            for file_info in files
+        ]
+        if self._cache is None:
+            return await self._sync("sync_to_local", items, self._download_batch)
+
+        restored, items = await self._restore_from_cache(items)
+        verified: set[str] = set()
+        synced = await self._sync(
+            "sync_to_local", items,
+            functools.partial(self._download_batch, verified=verified),
+        )
+        await asyncio.gather(*(
+            self._cache.put(self.bucket, item.key, item.etag, Path(item.local_path))
+            for item in items
+            if item.key in verified and item.size <= self._cache.max_bytes
+        ))
+        return restored + synced
+
+    async def _restore_from_cache(
+        self, items: list[_SyncItem]
+    ) -> tuple[list[str], list[_SyncItem]]:
+        """
+        キャッシュ済みの同期対象をローカルにコピー
 
-        for file_info in files:
-            file_path = file_info['file_path']
-            local_path = os.path.join(local_dir, file_path)
+        Returns:
+            (コピーしたファイルの相対パス一覧, S3から取得が必要な同期対象)
+        """
 
-            await self.download_to_file(
-                tenant_id, session_id, file_path, local_path
-            )
-            synced.append(file_path)
+        def _copy(source: Path, local_path: str) -> None:
+            os.makedirs(os.path.dirname(local_path), exist_ok=True)
+            shutil.copyfile(source, local_path)
+
+        async def _restore(item: _SyncItem) -> bool:
+            if not item.etag:
+                return False
+            path = await self._cache.get(self.bucket, item.key, item.etag)
+            if path is None:
+                return False
+            try:
+                await self._run(_copy, path, item.local_path)
+            except FileNotFoundError:
+                # コピー前に追い出された
+                return False
+            return True
 
-        logger.info("S3→ローカル同期完了", count=len(synced))
-        return synced
+        results = await asyncio.gather(*(_restore(item) for item in items))
+        restored = [item for item, hit in zip(items, results) if hit]
+        if restored:
+            logger.info(
+                "S3キャッシュから復元",
+                count=len(restored),
+                bytes=sum(item.size for item in restored),
+            )
+        return (
+            [item.file_path for item in restored],
+            [item for item, hit in zip(items, results) if not hit],
+        )
 
     async def sync_from_local(
         self,
@@ -381,7 +924,7 @@ class S3StorageBackend:
         local_dir: str,
     ) -> list[str]:
         """ローカルからS3にファイルを同期（エージェント実行後）"""
-        synced = []
+        prefix = self.get_prefix(tenant_id, session_id)
 
         def _walk_dir():
             result = []
@@ -389,20 +932,37 @@ class S3StorageBackend:
                 for filename in files:
                     local_path = os.path.join(root, filename)
                     relative_path = os.path.relpath(local_path, local_dir)
-                    content_type, _ = mimetypes.guess_type(filename)
-                    content_type = content_type or 'application/octet-stream'
-                    result.append((local_path, relative_path, content_type))
+                    result.append(_SyncItem(
+                        file_path=relative_path,
+                        key=prefix + relative_path,
+                        local_path=local_path,
+                        size=os.path.getsize(local_path),
+                    ))
             return result
 
-        file_list = await asyncio.to_thread(_walk_dir)
+        items = await self._run(_walk_dir)
+        return await self._sync("sync_from_local", items, self._upload_batch)
 
-        for local_path, relative_path, content_type in file_list:
-            with open(local_path, 'rb') as f:
-                await self.upload_stream(
-                    tenant_id, session_id, relative_path,
-                    f, content_type
-                )
-            synced.append(relative_path)
 
-        logger.info("ローカル→S3同期完了", count=len(synced))
-        return synced
+_s3_storage: S3StorageBackend | None = None
+
+
+def get_s3_storage() -> S3StorageBackend:
+    """
+    プロセス内で共有するS3ストレージバックエンドを取得
+
+    Returns:
+        S3StorageBackend インスタンス
+    """
+    global _s3_storage
+    if _s3_storage is None:
+        _s3_storage = S3StorageBackend()
+    return _s3_storage
+
+
+def close_s3_storage() -> None:
+    """共有S3ストレージバックエンドのスレッドプールを終了（シャットダウン時）"""
+    global _s3_storage
+    if _s3_storage is not None:
+        _s3_storage.close()
+        _s3_storage = None
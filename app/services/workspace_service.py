@@ -27,7 +27,7 @@ from app.schemas.workspace import (
     WorkspaceFileList,
     WorkspaceInfo,
 )
-from app.services.workspace.s3_storage import S3StorageBackend
+from app.services.workspace.s3_storage import get_s3_storage
 from app.services.workspace.context_builder import AIContextBuilder
 from app.services.workspace.file_processors import FileTypeClassifier
 
@@ -46,7 +46,7 @@ class WorkspaceService:
         """
         self.db = db
         self._settings = get_settings()
-        self.s3 = S3StorageBackend()
+        self.s3 = get_s3_storage()
         self.context_builder = AIContextBuilder()
 
     async def upload_user_file_with_metadata(
@@ -90,23 +90,25 @@ class WorkspaceService:
         # フロントエンドで組み立て済みのパスをそのまま使用
         file_path = f"uploads/{metadata.relative_path}"
 
-        # S3にストリームアップロード（メモリ効率化：ファイル全体をメモリに読み込まない）
-        await self.s3.upload_stream(
+        # SHA-256を計算してからS3にマルチパートで並列アップロード
+        # （メモリ効率化：シーク可能な SpooledTemporaryFile をそのまま渡し、全体をメモリに読み込まない）
+        checksum, uploaded_size = await self.s3.upload_stream_with_checksum(
             tenant_id, conversation_id, file_path,
-            file.file,  # SpooledTemporaryFile を直接ストリーム
+            file.file,
             content_type,
         )
 
-        # DBに記録（original_relative_path 含む）
+        # DBに記録（original_relative_path・チェックサム含む、サイズは実際の転送量）
         file_info = await self._save_file_record(
             tenant_id=tenant_id,
             conversation_id=conversation_id,
             file_path=file_path,
             original_name=metadata.original_name,
             original_relative_path=metadata.original_relative_path,
-            file_size=metadata.size,
+            file_size=uploaded_size,
             content_type=content_type,
             source="user_upload",
+            checksum=checksum,
         )
 
         return file_info
@@ -489,6 +491,7 @@ class WorkspaceService:
         source: str,
         is_presented: bool = False,
         original_relative_path: str | None = None,
+        checksum: str | None = None,
     ) -> ConversationFileInfo:
         """
         ファイルレコードをDBに保存
@@ -503,6 +506,7 @@ class WorkspaceService:
             source: ソース
             is_presented: Presentedフラグ
             original_relative_path: 元の相対パス（表示用）
+            checksum: SHA-256チェックサム（アップロード時に計算した場合のみ）
 
         Returns:
             ファイル情報
@@ -521,7 +525,7 @@ class WorkspaceService:
             version=new_version,
             source=source,
             is_presented=is_presented,
-            checksum=None,  # S3版ではチェックサムは省略
+            checksum=checksum,
             description=None,
             original_relative_path=original_relative_path,
             status="active",
@@ -8,4 +8,7 @@
   - app.utils.security: セキュリティバリデーション
   - app.utils.tool_summary: ツール実行結果サマリー生成
   - app.utils.timezone: タイムゾーンユーティリティ
+  - app.utils.phase_timer: 実行フェーズ所要時間の計測
+  - app.utils.event_queue: SSEイベントキュー（テキスト差分の結合）
+  - app.utils.disk_cache: 複数プロセスで共有するディスクキャッシュのファイル操作
 """
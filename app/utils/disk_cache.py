@@ -0,0 +1,133 @@
+"""
+ディスクキャッシュ共通処理
+パッケージキャッシュ・S3オブジェクトキャッシュが共有するファイル操作（同期関数、スレッドで実行する）
+
+同じキャッシュディレクトリを複数のワーカープロセスが共有する前提で、以下を行う:
+  - 書きかけファイルはプロセスごとの一時ディレクトリに置き、古いものだけを削除する
+  - 容量超過時の追い出しはファイルロック下でディレクトリ全体を走査し、更新時刻の古い順に削除する
+    （参照時に更新時刻を更新することで、プロセスをまたいだLRUになる）
+"""
+import fcntl
+import os
+import time
+from pathlib import Path
+from typing import BinaryIO
+
+# 他プロセスの書きかけとみなさず削除する一時ファイルの経過時間（秒）
+STALE_TMP_SECONDS = 600
+
+_TMP_DIR = "tmp"
+_LOCK_FILE = ".lock"
+
+
+def tmp_dir(root: Path) -> Path:
+    """このプロセスの書きかけファイル置き場"""
+    return root / _TMP_DIR / str(os.getpid())
+
+
+def open_entry(path: Path, touch: bool = False) -> tuple[BinaryIO, int, float] | None:
+    """
+    エントリを読み取り用に開く（なければNone）
+
+    開いたファイルは追い出し・置き換えでパスが削除されても読み続けられる。
+
+    Args:
+        path: エントリのパス
+        touch: 更新時刻を現在時刻にする（LRUの参照として記録）
+
+    Returns:
+        (ファイル, サイズ, 開く前の更新時刻)
+    """
+    try:
+        f = open(path, "rb")
+    except FileNotFoundError:
+        return None
+    try:
+        st = os.fstat(f.fileno())
+        if touch:
+            os.utime(f.fileno())
+    except OSError:
+        f.close()
+        raise
+    return f, st.st_size, st.st_mtime
+
+
+def move_into_place(tmp_path: Path, file_path: Path) -> int:
+    """一時ファイルをエントリとして配置し、サイズを返す"""
+    file_path.parent.mkdir(parents=True, exist_ok=True)
+    os.replace(tmp_path, file_path)
+    return file_path.stat().st_size
+
+
+def scan_cache_dir(root: Path) -> list[tuple[str, int]]:
+    """
+    キャッシュディレクトリを走査し、(ファイル名, サイズ) を更新時刻の古い順に返す
+
+    他プロセスが書き込み中の一時ファイルは残し、STALE_TMP_SECONDS を過ぎたもの
+    （異常終了したプロセスの書きかけ）だけを削除する。
+    """
+    found: list[tuple[int, str, int]] = []
+    if not root.exists():
+        return []
+    stale_before = time.time() - STALE_TMP_SECONDS
+    for sub in root.iterdir():
+        if not sub.is_dir():
+            continue
+        if sub.name == _TMP_DIR:
+            _remove_stale_tmp(sub, stale_before)
+            continue
+        for entry in sub.iterdir():
+            try:
+                st = entry.stat()
+            except FileNotFoundError:
+                # 走査中に他プロセスが削除した
+                continue
+            found.append((st.st_mtime_ns, entry.name, st.st_size))
+    found.sort()
+    return [(name, size) for _, name, size in found]
+
+
+def evict_shared(root: Path, max_bytes: int) -> tuple[list[tuple[str, int]], int]:
+    """
+    ディレクトリ全体の合計が max_bytes 以下になるまで更新時刻の古い順に削除
+
+    複数プロセスが同時に削除しないよう、キャッシュディレクトリのファイルロック下で行う。
+
+    Returns:
+        (残ったエントリ（更新時刻の古い順）, 削除したエントリ数)
+    """
+    root.mkdir(parents=True, exist_ok=True)
+    with open(root / _LOCK_FILE, "a") as lock:
+        fcntl.flock(lock.fileno(), fcntl.LOCK_EX)
+        try:
+            entries = scan_cache_dir(root)
+            total = sum(size for _, size in entries)
+            evicted = 0
+            while total > max_bytes and len(entries) - evicted > 1:
+                name, size = entries[evicted]
+                (root / name[:2] / name).unlink(missing_ok=True)
+                total -= size
+                evicted += 1
+        finally:
+            fcntl.flock(lock.fileno(), fcntl.LOCK_UN)
+    return entries[evicted:], evicted
+
+
+def _remove_stale_tmp(tmp_root: Path, stale_before: float) -> None:
+    """更新時刻が stale_before より古い一時ファイルと空のプロセス別ディレクトリを削除"""
+    for proc_dir in tmp_root.iterdir():
+        if not proc_dir.is_dir():
+            continue
+        for leftover in proc_dir.iterdir():
+            try:
+                if leftover.stat().st_mtime < stale_before:
+                    leftover.unlink(missing_ok=True)
+            except FileNotFoundError:
+                continue
+        try:
+            # 作成直後のディレクトリは、そのプロセスがこれから書き込むため残す
+            if proc_dir.stat().st_mtime < stale_before:
+                proc_dir.rmdir()
+        except OSError:
+            # 書き込み中のファイルが残っている、または他プロセスが削除済み
+            pass
@@ -0,0 +1,189 @@
+"""
+SSEイベントキュー
+バックグラウンド実行とSSE送信の間に置く有界キュー。
+送信が追いつかない間に溜まったテキスト差分を1フレームに結合する
+"""
+import asyncio
+import json
+from collections import deque
+
+from app.infrastructure.metrics import get_sse_event_queue_depth, get_sse_events_coalesced
+
+# 結合時に比較対象から除外するフィールド
+_VOLATILE_FIELDS = ("seq", "timestamp")
+
+
+class CoalescingEventQueue:
+    """
+    結合機能付き有界イベントキュー
+
+    - 末尾のイベントと同種・同一親エージェントのテキスト差分（assistant / thinking）は
+      新しいフレームを積まずに末尾へ連結する。seq と timestamp は先頭イベントのものを維持する
+    - 連結可能な差分の直前に入る同一内容の progress イベントは重複として破棄する
+    - 連結できないイベントはキューが満杯の間 put() で待機する（バックプレッシャー）
+    - 終端の None は上限に関係なく常に受け付ける
+    - get() は先頭が連結可能な差分の場合、coalesce_window 秒まで後続の差分を待ってから返す
+
+    get() は取り出し確定までキューを変更しないため、wait_for によるキャンセルで
+    イベントが失われることはない。
+    """
+
+    def __init__(
+        self,
+        maxsize: int,
+        coalesce_window: float = 0.0,
+        coalesce_thinking: bool = True,
+    ) -> None:
+        self._buffer: deque[dict | None] = deque()
+        self._maxsize = max(1, maxsize)
+        self._coalesce_window = max(0.0, coalesce_window)
+        self._coalesce_thinking = coalesce_thinking
+        self._cond = asyncio.Condition()
+        self._closed = False
+        # 末尾の連結可能イベントの直前に送出された progress のキー
+        self._last_progress_key: str | None = None
+        self._wake_task: asyncio.Task | None = None
+
+    def qsize(self) -> int:
+        """キュー内のイベント数"""
+        return len(self._buffer)
+
+    async def put(self, event: dict | None) -> None:
+        """
+        イベントを追加
+
+        close() 後は破棄する。
+        """
+        async with self._cond:
+            if self._closed:
+                return
+            if event is not None:
+                if self._try_coalesce(event):
+                    return
+                while len(self._buffer) >= self._maxsize and not self._closed:
+                    await self._cond.wait()
+                if self._closed:
+                    return
+            self._append(event)
+            self._cond.notify_all()
+
+    async def get(self) -> dict | None:
+        """イベントを取り出す（None は終端）"""
+        async with self._cond:
+            while not self._buffer:
+                await self._cond.wait()
+
+            if self._coalesce_window > 0 and self._coalesce_key(self._buffer[0]):
+                # 後続の差分が先頭に連結されるのを待つ。
+                # 連結できないイベントが続いた時点で待機を打ち切る
+                loop = asyncio.get_running_loop()
+                deadline = loop.time() + self._coalesce_window
+                while len(self._buffer) == 1 and not self._closed:
+                    remaining = deadline - loop.time()
+                    if remaining <= 0:
+                        break
+                    try:
+                        await asyncio.wait_for(self._cond.wait(), remaining)
+                    except asyncio.TimeoutError:
+                        break
+
+            event = self._buffer.popleft()
+            get_sse_event_queue_depth().dec()
+            self._cond.notify_all()
+            return event
+
+    def close(self) -> None:
+        """
+        キューを閉じる
+
+        残りのイベントを破棄し、待機中の put() を解放する。
+        クライアント切断後にバックグラウンド実行がブロックしないようにするために使用する。
+        """
+        if self._closed:
+            return
+        self._closed = True
+        if self._buffer:
+            get_sse_event_queue_depth().dec(len(self._buffer))
+            self._buffer.clear()
+
+        async def _wake() -> None:
+            async with self._cond:
+                self._cond.notify_all()
+
+        self._wake_task = asyncio.get_running_loop().create_task(_wake())
+
+    def _append(self, event: dict | None) -> None:
+        """末尾に追加し、progress 重複判定用の状態を更新"""
+        if event is not None and event.get("event") == "progress":
+            self._last_progress_key = self._progress_key(event)
+        elif event is None or not self._coalesce_key(event):
+            self._last_progress_key = None
+        self._buffer.append(event)
+        get_sse_event_queue_depth().inc()
+
+    def _try_coalesce(self, event: dict) -> bool:
+        """末尾のイベントへの連結（または重複 progress の破棄）を試みる"""
+        if not self._buffer:
+            return False
+        tail = self._buffer[-1]
+        tail_key = self._coalesce_key(tail)
+        if not tail_key:
+            return False
+
+        event_type = event.get("event")
+        if event_type == "progress":
+            if self._progress_key(event) == self._last_progress_key:
+                get_sse_events_coalesced().inc(event_type="progress")
+                return True
+            return False
+
+        if self._coalesce_key(event) != tail_key:
+            return False
+
+        # 永続化用に同じ辞書を保持している呼び出し元があるため、元のイベントは変更しない
+        self._buffer[-1] = self._merge(tail, event)
+        get_sse_events_coalesced().inc(event_type=event_type)
+        return True
+
+    def _coalesce_key(self, event: dict | None) -> tuple[str, str | None] | None:
+        """連結可能なイベントの場合にキー（種別, 親エージェントID）を返す"""
+        if event is None:
+            return None
+        event_type = event.get("event")
+        data = event.get("data", {})
+        if event_type == "assistant":
+            blocks = data.get("content_blocks")
+            if not (
+                isinstance(blocks, list)
+                and len(blocks) == 1
+                and blocks[0].get("type") == "text"
+            ):
+                return None
+        elif event_type == "thinking":
+            if not self._coalesce_thinking:
+                return None
+        else:
+            return None
+        return (event_type, data.get("parent_agent_id"))
+
+    @staticmethod
+    def _progress_key(event: dict) -> str:
+        """progress イベントの内容比較用キー"""
+        data = {
+            k: v for k, v in event.get("data", {}).items() if k not in _VOLATILE_FIELDS
+        }
+        return json.dumps(data, sort_keys=True, ensure_ascii=False, default=str)
+
+    @staticmethod
+    def _merge(head: dict, event: dict) -> dict:
+        """2つの差分イベントを連結した新しいイベントを生成"""
+        data = dict(head["data"])
+        if head["event"] == "assistant":
+            text = head["data"]["content_blocks"][0].get("text", "")
+            text += event["data"]["content_blocks"][0].get("text", "")
+            data["content_blocks"] = [{"type": "text", "text": text}]
+        else:
+            data["content"] = head["data"].get("content", "") + event["data"].get(
+                "content", ""
+            )
+        return {"event": head["event"], "data": data}
@@ -0,0 +1,43 @@
+"""
+実行フェーズ計測ユーティリティ
+エージェント実行の各フェーズ所要時間を計測し、メトリクスとSSEイベントに反映する
+"""
+import time
+from collections.abc import Awaitable
+from typing import TypeVar
+
+from app.infrastructure.metrics import get_execution_phase_duration
+
+T = TypeVar("T")
+
+
+class PhaseTimer:
+    """
+    フェーズ別所要時間の計測
+
+    並行実行されるフェーズもそれぞれの壁時計時間を記録する。
+    計測値はヒストグラムメトリクスに記録され、as_dict() で
+    SSEイベントの timings フィールド（ミリ秒）として取得できる。
+    """
+
+    def __init__(self) -> None:
+        self._durations: dict[str, float] = {}
+
+    async def measure(self, phase: str, awaitable: Awaitable[T]) -> T:
+        """awaitableの完了までをフェーズとして計測"""
+        start = time.perf_counter()
+        try:
+            return await awaitable
+        finally:
+            self.record(phase, time.perf_counter() - start)
+
+    def record(self, phase: str, seconds: float) -> None:
+        """フェーズ所要時間を記録"""
+        self._durations[phase] = seconds
+        get_execution_phase_duration().observe(seconds, phase=phase)
+
+    def as_dict(self) -> dict[str, int]:
+        """フェーズ別所要時間（ミリ秒）"""
+        return {
+            phase: int(seconds * 1000) for phase, seconds in self._durations.items()
+        }
@@ -334,6 +334,7 @@ def format_progress_event(
     tool_name: str | None = None,
     tool_status: str | None = None,
     parent_agent_id: str | None = None,
+    timings: dict[str, int] | None = None,
 ) -> dict:
     """
     進捗イベントをフォーマット（統合型）
@@ -346,6 +347,7 @@ def format_progress_event(
         tool_name: ツール名（tool タイプ時）
         tool_status: ツールステータス（pending / running / completed / error）
         parent_agent_id: 親エージェントID（サブエージェント内の場合）
+        timings: 完了済みフェーズの所要時間（ミリ秒、setup タイプ時）
 
     Returns:
         イベントデータ
@@ -363,6 +365,8 @@ def format_progress_event(
         data["tool_status"] = tool_status
     if parent_agent_id:
         data["parent_agent_id"] = parent_agent_id
+    if timings:
+        data["timings"] = timings
 
     return create_event("progress", seq, data)
 
@@ -239,6 +239,13 @@ class TestOrchestratorCrashRecovery:
         mock_lifecycle.is_healthy.return_value = True
         mock_warm_pool = AsyncMock()
         mock_redis = AsyncMock()
+        # pipeline() は同期メソッドで、非同期コンテキストマネージャーを返す
+        mock_pipe = MagicMock()
+        mock_pipe.execute = AsyncMock(return_value=[])
+        mock_redis.pipeline = MagicMock(return_value=MagicMock(
+            __aenter__=AsyncMock(return_value=mock_pipe),
+            __aexit__=AsyncMock(return_value=False),
+        ))
 
         # get_or_create のモック: 2回呼ばれる（1回目=クラッシュ元、2回目=復旧先）
         container_info = ContainerInfo(
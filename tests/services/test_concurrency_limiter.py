@@ -0,0 +1,273 @@
+"""
+Bedrock 同時実行制限の単体テスト
+
+待機・拒否・フェイルオープンはスクリプトの戻り値を再現する Redis で、
+上限の調整（AIMD）は fakeredis（Luaスクリプト対応）で実際のスクリプトを実行して確認する。
+"""
+import asyncio
+from contextlib import asynccontextmanager
+
+import fakeredis
+import httpx
+import pytest
+
+from app.services.proxy.concurrency_limiter import (
+    ConcurrencyLease,
+    ConcurrencyLimiter,
+    ConcurrencyLimitTimeoutError,
+)
+from app.services.proxy.credential_proxy import CredentialInjectionProxy, ProxyConfig
+from app.services.proxy.region_router import BedrockRegionRouter
+from app.services.proxy.sigv4 import AWSCredentials
+
+
+class _ScriptedRedis:
+    """ACQUIRE は in_flight < limit の間だけ成功し、RELEASE で in_flight を減らす"""
+
+    def __init__(self, limit: int) -> None:
+        self.limit = limit
+        self.in_flight = 0
+        self.signals: list[str] = []
+
+    async def eval(self, script, numkeys, *args):
+        if script == ConcurrencyLimiter.ACQUIRE_SCRIPT:
+            if self.in_flight < self.limit:
+                self.in_flight += 1
+                return [1, str(self.limit), self.in_flight]
+            return [0, str(self.limit), self.in_flight]
+        self.in_flight -= 1
+        self.signals.append(args[numkeys + 1])
+        return [str(self.limit), args[numkeys + 1]]
+
+
+class TestConcurrencyLimiter:
+    """枠の確保・待機・解放のテスト"""
+
+    @pytest.mark.unit
+    async def test_waits_until_a_slot_is_released(self):
+        """上限に達している間は待機し、解放されたら確保する"""
+        redis = _ScriptedRedis(limit=1)
+        limiter = ConcurrencyLimiter(redis, max_wait=5)
+        first = await limiter.acquire("t1", "m")
+
+        waiter = asyncio.create_task(limiter.acquire("t1", "m"))
+        await asyncio.sleep(0.1)
+        assert not waiter.done()
+
+        await limiter.release(first, throttled=False, latency=0.2)
+        second = await asyncio.wait_for(waiter, timeout=2)
+
+        assert second.token is not None
+        assert second.wait_seconds > 0
+        assert redis.in_flight == 1
+
+    @pytest.mark.unit
+    async def test_gives_up_after_max_wait(self):
+        """max_wait を超えても枠が空かなければ拒否する"""
+        limiter = ConcurrencyLimiter(_ScriptedRedis(limit=0), max_wait=0.1)
+
+        with pytest.raises(ConcurrencyLimitTimeoutError):
+            await limiter.acquire("t1", "m")
+
+    @pytest.mark.unit
+    async def test_redis_failure_fails_open(self):
+        """Redis 障害時は制限なしで通過し、解放は何もしない"""
+
+        class _BrokenRedis:
+            async def eval(self, *args):
+                raise ConnectionError("down")
+
+        limiter = ConcurrencyLimiter(_BrokenRedis())
+        lease = await limiter.acquire("t1", "m")
+
+        assert lease.token is None
+        await limiter.release(lease, throttled=True, latency=None)
+
+
+async def _limit(redis, tenant_id: str = "t1", model_id: str = "m") -> float:
+    state = await redis.hget(f"workspace:bedrock_concurrency:{tenant_id}:{model_id}:state", "limit")
+    return float(state)
+
+
+async def _call(limiter: ConcurrencyLimiter, throttled=False, latency=1.0, request_bytes=0):
+    lease = await limiter.acquire("t1", "m")
+    await limiter.release(lease, throttled=throttled, latency=latency, request_bytes=request_bytes)
+
+
+class TestConcurrencyLimiterScripts:
+    """Luaスクリプトによる枠管理と上限調整のテスト"""
+
+    @pytest.fixture
+    def redis(self):
+        return fakeredis.FakeAsyncRedis(decode_responses=True)
+
+    @pytest.mark.unit
+    async def test_acquire_stops_at_limit(self, redis):
+        """上限と同数のリースを確保したら、それ以上は待機後に拒否する"""
+        limiter = ConcurrencyLimiter(redis, initial_limit=2, max_wait=0.05)
+        leases = [await limiter.acquire("t1", "m") for _ in range(2)]
+
+        with pytest.raises(ConcurrencyLimitTimeoutError):
+            await limiter.acquire("t1", "m")
+
+        await limiter.release(leases[0], throttled=False, latency=1.0)
+        assert (await limiter.acquire("t1", "m")).token is not None
+
+    @pytest.mark.unit
+    async def test_expired_lease_is_reclaimed(self, redis):
+        """解放されなかったリースは lease_ttl 経過後に回収される"""
+        limiter = ConcurrencyLimiter(redis, initial_limit=1, max_wait=0.5, lease_ttl=0.05)
+        await limiter.acquire("t1", "m")
+
+        lease = await limiter.acquire("t1", "m")
+
+        assert lease.token is not None
+        assert lease.wait_seconds >= 0.02
+
+    @pytest.mark.unit
+    async def test_success_increases_additively(self, redis):
+        """成功ごとに上限が 1/上限 ずつ増える（上限と同数の成功で +1）"""
+        limiter = ConcurrencyLimiter(redis, initial_limit=4)
+
+        expected = 4.0
+        for _ in range(4):
+            await _call(limiter)
+            expected += 1 / expected
+
+        assert await _limit(redis) == pytest.approx(expected)
+        assert 4.9 < expected < 5.0
+
+    @pytest.mark.unit
+    async def test_throttling_halves_once_per_interval(self, redis):
+        """429 で上限を半減し、decrease_interval 内の連続した 429 では重ねて減らさない"""
+        limiter = ConcurrencyLimiter(redis, initial_limit=16, decrease_interval=60)
+
+        await _call(limiter, throttled=True)
+        await _call(limiter, throttled=True)
+
+        assert await _limit(redis) == pytest.approx(8.0)
+
+    @pytest.mark.unit
+    async def test_limit_respects_bounds(self, redis):
+        """上限は min_limit / max_limit の範囲に収まる"""
+        limiter = ConcurrencyLimiter(
+            redis, initial_limit=2, min_limit=1.5, max_limit=2.2, decrease_interval=0
+        )
+        for _ in range(10):
+            await _call(limiter)
+        assert await _limit(redis) == pytest.approx(2.2)
+
+        for _ in range(5):
+            await _call(limiter, throttled=True)
+        assert await _limit(redis) == pytest.approx(1.5)
+
+    @pytest.mark.unit
+    async def test_latency_is_ignored_by_default(self, redis):
+        """既定では遅いレスポンスで上限を下げない（スロットリングのみで調整）"""
+        limiter = ConcurrencyLimiter(redis, initial_limit=4)
+
+        await _call(limiter, latency=0.1)
+        await _call(limiter, latency=30.0)
+
+        assert await _limit(redis) > 4.0
+
+    @pytest.mark.unit
+    async def test_large_request_is_not_compared_with_small_ones(self, redis):
+        """入力が大きく遅いリクエストは、小さいリクエストの最小レイテンシと比較しない"""
+        limiter = ConcurrencyLimiter(
+            redis, initial_limit=4, latency_factor=3.0, decrease_interval=0
+        )
+
+        await _call(limiter, latency=0.2, request_bytes=500)
+        await _call(limiter, latency=6.0, request_bytes=400_000)
+
+        assert await _limit(redis) > 4.0
+
+    @pytest.mark.unit
+    async def test_slow_response_within_size_bucket_decreases(self, redis):
+        """同程度のサイズで最小レイテンシの latency_factor 倍を超えたら上限 × 0.9"""
+        limiter = ConcurrencyLimiter(
+            redis, initial_limit=10, latency_factor=3.0, decrease_interval=0
+        )
+
+        await _call(limiter, latency=0.2, request_bytes=500)
+        before = await _limit(redis)
+        await _call(limiter, latency=2.0, request_bytes=600)
+
+        assert await _limit(redis) == pytest.approx(before * 0.9)
+
+
+class _RecordingLimiter:
+    """Proxy からの acquire / release を記録する"""
+
+    def __init__(self, reject: bool = False) -> None:
+        self.reject = reject
+        self.released: list[tuple[bool, float | None]] = []
+
+    async def acquire(self, tenant_id: str, model_id: str) -> ConcurrencyLease:
+        if self.reject:
+            raise ConcurrencyLimitTimeoutError(waited=120.0, limit=2.0)
+        return ConcurrencyLease(tenant_id, model_id, "token")
+
+    async def release(self, lease, throttled, latency, request_bytes=0) -> None:
+        self.released.append((throttled, latency))
+
+
+class _ThrottlingPrimary:
+    """主リージョンは 429、それ以外は 200 を返す上流"""
+
+    @asynccontextmanager
+    async def stream(self, method, url, headers, content):
+        status = 429 if "us-east-1" in url else 200
+        yield httpx.Response(status, headers={"Content-Length": "2"}, stream=httpx.ByteStream(b"{}"))
+
+
+async def _invoke(tmp_path, limiter: _RecordingLimiter) -> bytes:
+    config = ProxyConfig(
+        whitelist_domains=[],
+        aws_credentials=AWSCredentials("test", "test", region="us-east-1"),
+        log_all_requests=False,
+        region_router=BedrockRegionRouter(["us-east-1", "us-west-2"]),
+        concurrency_limiter=limiter,
+    )
+    proxy = CredentialInjectionProxy(config, str(tmp_path / "proxy.sock"))
+    await proxy.start()
+    proxy._upstream = _ThrottlingPrimary()
+    proxy.update_tenant("t1")
+    try:
+        reader, writer = await asyncio.open_unix_connection(proxy.socket_path)
+        writer.write(
+            b"POST /model/anthropic.claude/invoke HTTP/1.1\r\n"
+            b"Content-Length: 2\r\nConnection: close\r\n\r\n{}"
+        )
+        await writer.drain()
+        response = await reader.read()
+        writer.close()
+    finally:
+        await proxy.stop()
+    return response
+
+
+class TestProxyConcurrencyLimit:
+    """Proxy での同時実行枠の適用テスト"""
+
+    @pytest.mark.unit
+    async def test_throttling_is_reported_even_after_failover(self, tmp_path):
+        """別リージョンで成功しても、途中の 429 は輻輳として報告する"""
+        limiter = _RecordingLimiter()
+
+        response = await _invoke(tmp_path, limiter)
+
+        assert response.startswith(b"HTTP/1.1 200 ")
+        assert len(limiter.released) == 1
+        throttled, latency = limiter.released[0]
+        assert throttled is True
+        assert latency is not None
+
+    @pytest.mark.unit
+    async def test_wait_timeout_returns_429(self, tmp_path):
+        """枠待ちが上限を超えたら上流に送らず 429 を返す"""
+        response = await _invoke(tmp_path, _RecordingLimiter(reject=True))
+
+        assert response.startswith(b"HTTP/1.1 429 ")
+        assert b"Retry-After: 5" in response
@@ -0,0 +1,239 @@
+"""
+コンテナ先行確保の単体テスト
+
+引き渡し・返却・割り当て中ロックは fakeredis（Luaスクリプト対応）で検証する。
+"""
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+import fakeredis
+import pytest
+
+from app.services.container.config import REDIS_KEY_CONTAINER, REDIS_KEY_CONTAINER_REVERSE
+from app.services.container.gc import ContainerGarbageCollector
+from app.services.container.models import ContainerInfo, ContainerStatus
+from app.services.container.orchestrator import ContainerOrchestrator
+
+
+def _make_info(status: ContainerStatus, idle_seconds: int) -> ContainerInfo:
+    """テスト用コンテナ情報を生成"""
+    last_active = datetime.now(timezone.utc) - timedelta(seconds=idle_seconds)
+    return ContainerInfo(
+        id="ws-test",
+        conversation_id="conv-test",
+        agent_socket="/tmp/agent.sock",
+        proxy_socket="/tmp/proxy.sock",
+        last_active_at=last_active,
+        status=status,
+    )
+
+
+class TestReservationExpiry:
+    """先行確保コンテナの期限判定のテスト"""
+
+    @pytest.mark.unit
+    def test_expired_reservation(self):
+        """予約期限を超えた reserved コンテナは返却対象"""
+        gc = ContainerGarbageCollector(lifecycle=None, redis=None)
+        ttl = gc._settings.container_reservation_ttl
+        info = _make_info(ContainerStatus.RESERVED, ttl + 10)
+        assert gc._is_expired_reservation(info) is True
+
+    @pytest.mark.unit
+    def test_fresh_reservation(self):
+        """予約期限内の reserved コンテナは返却しない"""
+        gc = ContainerGarbageCollector(lifecycle=None, redis=None)
+        info = _make_info(ContainerStatus.RESERVED, 0)
+        assert gc._is_expired_reservation(info) is False
+
+    @pytest.mark.unit
+    def test_claimed_container_is_not_reservation(self):
+        """実行に引き渡し済みのコンテナは予約期限の対象外"""
+        gc = ContainerGarbageCollector(lifecycle=None, redis=None)
+        ttl = gc._settings.container_reservation_ttl
+        info = _make_info(ContainerStatus.IDLE, ttl + 10)
+        assert gc._is_expired_reservation(info) is False
+
+    @pytest.mark.unit
+    def test_redis_roundtrip_keeps_reserved_status(self):
+        """reserved ステータスはRedisハッシュ経由で保持される"""
+        info = _make_info(ContainerStatus.RESERVED, 0)
+        restored = ContainerInfo.from_redis_hash(info.to_redis_hash())
+        assert restored.status == ContainerStatus.RESERVED
+
+
+class _WarmPool:
+    """取得ごとに新しいコンテナを返すWarmPool（取得に時間がかかる）"""
+
+    def __init__(self):
+        self.acquired: list[str] = []
+        self.released: list[str] = []
+
+    async def acquire(self) -> ContainerInfo:
+        container_id = f"ws-{len(self.acquired) + 1}"
+        self.acquired.append(container_id)
+        await asyncio.sleep(0.05)
+        return ContainerInfo(
+            id=container_id,
+            conversation_id="",
+            agent_socket=f"/tmp/{container_id}/agent.sock",
+            proxy_socket=f"/tmp/{container_id}/proxy.sock",
+        )
+
+    async def release(self, info: ContainerInfo) -> bool:
+        self.released.append(info.id)
+        return True
+
+
+class _Lifecycle:
+    def __init__(self):
+        self.on_health_check = None
+
+    async def is_healthy(self, container_id: str) -> bool:
+        if self.on_health_check:
+            await self.on_health_check()
+        return True
+
+
+def _orchestrator(redis, warm_pool: _WarmPool, lifecycle: _Lifecycle | None = None):
+    """Proxy起動を省略したオーケストレーター（プロセスごとの状態を持つ）"""
+    orchestrator = ContainerOrchestrator(lifecycle or _Lifecycle(), warm_pool, redis)
+
+    async def start_proxy(info, egress=None):
+        return None
+
+    async def stop_proxy(container_id):
+        return None
+
+    orchestrator._start_proxy = start_proxy
+    orchestrator._stop_proxy = stop_proxy
+    return orchestrator
+
+
+@pytest.fixture
+def redis():
+    return fakeredis.FakeAsyncRedis(decode_responses=True)
+
+
+async def _reserve_and_wait(orchestrator: ContainerOrchestrator, conversation_id: str):
+    assert await orchestrator.reserve(conversation_id) == ContainerStatus.RESERVED
+    await asyncio.gather(*orchestrator._reservations.values())
+
+
+class TestReservationLifecycle:
+    """先行確保・引き渡し・返却のテスト"""
+
+    @pytest.mark.unit
+    async def test_reserved_container_is_claimed(self, redis):
+        """初回実行では先行確保したコンテナを ready にして引き渡す"""
+        pool = _WarmPool()
+        orchestrator = _orchestrator(redis, pool)
+        await _reserve_and_wait(orchestrator, "conv-1")
+        assert await redis.hget(f"{REDIS_KEY_CONTAINER}:conv-1", "status") == "reserved"
+
+        info = await orchestrator.get_or_create("conv-1")
+
+        assert info.id == "ws-1"
+        assert pool.acquired == ["ws-1"]
+        assert await redis.hget(f"{REDIS_KEY_CONTAINER}:conv-1", "status") == "ready"
+
+    @pytest.mark.unit
+    async def test_unclaimed_reservation_is_released(self, redis):
+        """未使用の予約はメタデータを削除してWarmPoolに返却する"""
+        pool = _WarmPool()
+        orchestrator = _orchestrator(redis, pool)
+        await _reserve_and_wait(orchestrator, "conv-1")
+        reserved = await orchestrator.get_assigned("conv-1")
+
+        await orchestrator.release_reservation(reserved)
+
+        assert pool.released == ["ws-1"]
+        assert not await redis.exists(f"{REDIS_KEY_CONTAINER}:conv-1")
+        assert not await redis.exists(f"{REDIS_KEY_CONTAINER_REVERSE}:ws-1")
+        assert (await orchestrator.get_or_create("conv-1")).id == "ws-2"
+
+    @pytest.mark.unit
+    async def test_claimed_reservation_is_not_released(self, redis):
+        """引き渡し済みのコンテナは古い予約情報で返却を試みても返却しない"""
+        pool = _WarmPool()
+        orchestrator = _orchestrator(redis, pool)
+        await _reserve_and_wait(orchestrator, "conv-1")
+        stale = await orchestrator.get_assigned("conv-1")
+        await orchestrator.get_or_create("conv-1")
+
+        await orchestrator.release_reservation(stale)
+
+        assert pool.released == []
+        assert await redis.hget(f"{REDIS_KEY_CONTAINER}:conv-1", "status") == "ready"
+
+    @pytest.mark.unit
+    async def test_gc_release_during_claim_does_not_return_running_container(self, redis):
+        """引き渡し処理中にGCが返却を試みても、実行に渡したコンテナはWarmPoolに戻らない"""
+        pool = _WarmPool()
+        lifecycle = _Lifecycle()
+        orchestrator = _orchestrator(redis, pool, lifecycle)
+        await _reserve_and_wait(orchestrator, "conv-1")
+        stale = await orchestrator.get_assigned("conv-1")
+
+        async def gc_runs_during_health_check():
+            lifecycle.on_health_check = None
+            await orchestrator.release_reservation(stale)
+
+        lifecycle.on_health_check = gc_runs_during_health_check
+
+        info = await orchestrator.get_or_create("conv-1")
+
+        assert info.id == "ws-1"
+        assert pool.released == []
+        assert await redis.hget(f"{REDIS_KEY_CONTAINER}:conv-1", "status") == "ready"
+
+    @pytest.mark.unit
+    async def test_gc_release_before_claim_allocates_new_container(self, redis):
+        """GCが先に返却した場合は、返却済みコンテナを使わず新しく割り当てる"""
+        pool = _WarmPool()
+        orchestrator = _orchestrator(redis, pool)
+        await _reserve_and_wait(orchestrator, "conv-1")
+        reserved = await orchestrator.get_assigned("conv-1")
+
+        results = await asyncio.gather(
+            orchestrator.release_reservation(reserved),
+            orchestrator.get_or_create("conv-1"),
+        )
+
+        info = results[1]
+        assert info.id not in pool.released
+        assert (await orchestrator.get_assigned("conv-1")).id == info.id
+
+
+class TestCrossProcessAllocation:
+    """複数プロセス（オーケストレーター）間の割り当て排他のテスト"""
+
+    @pytest.mark.unit
+    async def test_concurrent_allocation_uses_one_container(self, redis):
+        """別プロセスからの同時割り当ては1つのコンテナにまとまる"""
+        pool = _WarmPool()
+        first = _orchestrator(redis, pool)
+        second = _orchestrator(redis, pool)
+
+        a, b = await asyncio.gather(
+            first.get_or_create("conv-1"), second.get_or_create("conv-1")
+        )
+
+        assert a.id == b.id == "ws-1"
+        assert pool.acquired == ["ws-1"]
+
+    @pytest.mark.unit
+    async def test_prepare_and_stream_on_different_processes(self, redis):
+        """/prepare と /stream が別プロセスで同時に来ても二重に割り当てない"""
+        pool = _WarmPool()
+        prepare = _orchestrator(redis, pool)
+        stream = _orchestrator(redis, pool)
+
+        await prepare.reserve("conv-1")
+        info = await stream.get_or_create("conv-1")
+        await asyncio.gather(*prepare._reservations.values())
+
+        assert pool.acquired == ["ws-1"]
+        assert info.id == "ws-1"
+        assert await redis.hget(f"{REDIS_KEY_CONTAINER}:conv-1", "status") == "ready"
+        assert await redis.get(f"{REDIS_KEY_CONTAINER_REVERSE}:ws-1") == "conv-1"
@@ -0,0 +1,247 @@
+"""
+Credential Injection Proxy の単体テスト
+"""
+import asyncio
+
+import pytest
+
+from app.services.proxy.credential_proxy import (
+    CredentialInjectionProxy,
+    McpHeaderRule,
+    ProxyConfig,
+)
+from app.services.proxy.upstream_pool import UpstreamClientPool, get_upstream_pool
+from app.services.proxy.request_body import RequestBody, RequestBodyTooLargeError
+from app.services.proxy.sigv4 import AWSCredentials
+
+
+@pytest.fixture
+async def proxy(tmp_path):
+    """Unix Socket上で起動したProxy"""
+    config = ProxyConfig(
+        whitelist_domains=["example.com"],
+        aws_credentials=AWSCredentials(
+            access_key_id="test",
+            secret_access_key="test",
+            region="us-west-2",
+        ),
+        log_all_requests=False,
+        keepalive_timeout=1.0,
+        max_request_body_size=1024,
+        max_response_size=1024,
+    )
+    proxy = CredentialInjectionProxy(config, str(tmp_path / "proxy.sock"))
+    await proxy.start()
+    yield proxy
+    await proxy.stop()
+    # 共有クライアントはイベントループに紐づくため、テストごとに閉じる
+    await get_upstream_pool().close()
+
+
+async def _read_response(reader: asyncio.StreamReader) -> tuple[str, bytes]:
+    """Content-Length 区切りのレスポンスを1件読み取る"""
+    status_line = (await reader.readline()).decode().strip()
+    content_length = 0
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b""):
+            break
+        key, value = line.decode().split(":", 1)
+        if key.strip().lower() == "content-length":
+            content_length = int(value.strip())
+    return status_line, await reader.readexactly(content_length)
+
+
+class TestProxyKeepAlive:
+    """クライアント接続の keep-alive 処理のテスト"""
+
+    @pytest.mark.unit
+    async def test_sequential_requests_on_one_connection(self, proxy):
+        """1接続で複数リクエストを順に処理できる"""
+        reader, writer = await asyncio.open_unix_connection(proxy.socket_path)
+        try:
+            for name in ("first", "second"):
+                writer.write(f"GET /mcp/{name}/items HTTP/1.1\r\nHost: x\r\n\r\n".encode())
+                await writer.drain()
+                status_line, body = await _read_response(reader)
+                assert status_line.startswith("HTTP/1.1 404")
+                assert body == f"Unknown MCP server: {name}".encode()
+        finally:
+            writer.close()
+
+    @pytest.mark.unit
+    async def test_pipelined_requests_with_chunked_body(self, proxy):
+        """パイプライン送信されたリクエストを到着順に処理する（chunked ボディ含む）"""
+        reader, writer = await asyncio.open_unix_connection(proxy.socket_path)
+        try:
+            writer.write(
+                b"POST /mcp/a/items HTTP/1.1\r\nTransfer-Encoding: chunked\r\n\r\n"
+                b"5\r\nhello\r\n0\r\n\r\n"
+                b"GET /mcp/b/items HTTP/1.1\r\n\r\n"
+            )
+            await writer.drain()
+
+            _, first = await _read_response(reader)
+            _, second = await _read_response(reader)
+            assert first == b"Unknown MCP server: a"
+            assert second == b"Unknown MCP server: b"
+        finally:
+            writer.close()
+
+    @pytest.mark.unit
+    async def test_connection_close_is_honored(self, proxy):
+        """Connection: close を指定したリクエストの後は接続を閉じる"""
+        reader, writer = await asyncio.open_unix_connection(proxy.socket_path)
+        try:
+            writer.write(b"GET /mcp/a/items HTTP/1.1\r\nConnection: close\r\n\r\n")
+            await writer.drain()
+            await _read_response(reader)
+            assert await asyncio.wait_for(reader.read(), timeout=1) == b""
+        finally:
+            writer.close()
+
+    @pytest.mark.unit
+    async def test_oversized_content_length_is_rejected(self, proxy):
+        """Content-Length が上限を超えるリクエストはボディを読まずに413で拒否する"""
+        reader, writer = await asyncio.open_unix_connection(proxy.socket_path)
+        try:
+            writer.write(b"POST /mcp/a/items HTTP/1.1\r\nContent-Length: 4096\r\n\r\n")
+            await writer.drain()
+            status_line, _ = await _read_response(reader)
+            assert status_line.startswith("HTTP/1.1 413")
+            assert await asyncio.wait_for(reader.read(), timeout=1) == b""
+        finally:
+            writer.close()
+
+
+@pytest.fixture
+async def upstream():
+    """パスに応じたレスポンスを返す上流HTTPサーバー（/large: Content-Length付き, /stream: 長さ不明）"""
+
+    async def handle(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        request_line = (await reader.readline()).decode()
+        while (await reader.readline()) not in (b"\r\n", b""):
+            pass
+        if " /large " in request_line:
+            writer.write(b"HTTP/1.1 200 OK\r\nContent-Length: 4096\r\n\r\n" + b"x" * 4096)
+        elif " /stream " in request_line:
+            writer.write(b"HTTP/1.1 200 OK\r\nConnection: close\r\n\r\n" + b"x" * 4096)
+        else:
+            writer.write(b"HTTP/1.1 200 OK\r\nContent-Length: 2\r\n\r\nok")
+        await writer.drain()
+        writer.close()
+
+    server = await asyncio.start_server(handle, "127.0.0.1", 0)
+    port = server.sockets[0].getsockname()[1]
+    yield f"http://127.0.0.1:{port}"
+    server.close()
+    await server.wait_closed()
+
+
+class TestProxyResponseStreaming:
+    """上流レスポンスのストリーミング中継とサイズ上限のテスト"""
+
+    @pytest.mark.unit
+    async def test_small_response_is_relayed(self, proxy, upstream):
+        """上限内のレスポンスはそのまま中継され、接続は再利用できる"""
+        proxy.update_mcp_header_rules({"svc": McpHeaderRule(real_base_url=upstream)})
+        reader, writer = await asyncio.open_unix_connection(proxy.socket_path)
+        try:
+            for _ in range(2):
+                writer.write(b"GET /mcp/svc/ok HTTP/1.1\r\n\r\n")
+                await writer.drain()
+                status_line, body = await _read_response(reader)
+                assert status_line.startswith("HTTP/1.1 200")
+                assert body == b"ok"
+        finally:
+            writer.close()
+
+    @pytest.mark.unit
+    async def test_declared_oversize_response_is_rejected(self, proxy, upstream):
+        """Content-Length が上限を超えるレスポンスはボディを中継せずに502を返す"""
+        proxy.update_mcp_header_rules({"svc": McpHeaderRule(real_base_url=upstream)})
+        reader, writer = await asyncio.open_unix_connection(proxy.socket_path)
+        try:
+            writer.write(b"GET /mcp/svc/large HTTP/1.1\r\n\r\n")
+            await writer.drain()
+            status_line, body = await _read_response(reader)
+            assert status_line.startswith("HTTP/1.1 502")
+            assert body == b"Upstream response too large"
+        finally:
+            writer.close()
+
+    @pytest.mark.unit
+    async def test_undeclared_oversize_response_is_aborted(self, proxy, upstream):
+        """長さ不明のレスポンスは上限超過時点で中継を打ち切り、終端チャンクを送らずに接続を閉じる"""
+        proxy.update_mcp_header_rules({"svc": McpHeaderRule(real_base_url=upstream)})
+        reader, writer = await asyncio.open_unix_connection(proxy.socket_path)
+        try:
+            writer.write(b"GET /mcp/svc/stream HTTP/1.1\r\n\r\n")
+            await writer.drain()
+            received = await asyncio.wait_for(reader.read(), timeout=5)
+            assert received.startswith(b"HTTP/1.1 200")
+            assert b"Transfer-Encoding: chunked" in received
+            assert not received.endswith(b"0\r\n\r\n")
+        finally:
+            writer.close()
+
+
+    @pytest.mark.unit
+    async def test_busy_upstream_host_returns_503(self, proxy, upstream):
+        """上流ホストの同時リクエスト枠を待機時間内に確保できなければ503を返す"""
+        pool = UpstreamClientPool(max_per_host=1, slot_timeout=0.05, http2=False)
+        proxy._upstream = pool
+        proxy.update_mcp_header_rules({"svc": McpHeaderRule(real_base_url=upstream)})
+        reader, writer = await asyncio.open_unix_connection(proxy.socket_path)
+        try:
+            async with pool._host_slot("127.0.0.1"):
+                writer.write(b"GET /mcp/svc/ok HTTP/1.1\r\n\r\n")
+                await writer.drain()
+                status_line, body = await _read_response(reader)
+            assert status_line.startswith("HTTP/1.1 503")
+            assert body == b"Upstream host busy"
+        finally:
+            writer.close()
+            await pool.close()
+
+
+def _reader_with(data: bytes) -> asyncio.StreamReader:
+    reader = asyncio.StreamReader()
+    reader.feed_data(data)
+    reader.feed_eof()
+    return reader
+
+
+class TestRequestBody:
+    """リクエストボディのストリーム読み取りのテスト"""
+
+    @pytest.mark.unit
+    async def test_chunked_body_is_decoded_as_stream(self):
+        """chunked ボディをデコードしながら順に読み出し、後続データを残す"""
+        reader = _reader_with(b"3\r\nabc\r\n2;ext=1\r\nde\r\n0\r\nX-Trailer: 1\r\n\r\nNEXT")
+        body = RequestBody(reader, {"Transfer-Encoding": "chunked"}, max_size=100)
+
+        chunks = [chunk async for chunk in body.iter_chunks()]
+
+        assert b"".join(chunks) == b"abcde"
+        assert await body.discard() is True
+        assert await reader.read() == b"NEXT"
+
+    @pytest.mark.unit
+    async def test_limit_is_enforced_while_streaming(self):
+        """chunked ボディが上限を超えた時点で例外を送出する"""
+        reader = _reader_with(b"8\r\n12345678\r\n8\r\n12345678\r\n0\r\n\r\n")
+        body = RequestBody(reader, {"transfer-encoding": "chunked"}, max_size=10)
+
+        with pytest.raises(RequestBodyTooLargeError):
+            await body.read()
+        assert await body.discard() is False
+
+    @pytest.mark.unit
+    async def test_unread_content_length_body_is_discarded(self):
+        """未読の Content-Length ボディは discard() で読み捨てられる"""
+        reader = _reader_with(b"hello" + b"NEXT")
+        body = RequestBody(reader, {"Content-Length": "5"}, max_size=100)
+
+        assert await body.discard() is True
+        assert await reader.read() == b"NEXT"
@@ -0,0 +1,154 @@
+"""
+DNSキャッシュの単体テスト
+"""
+import asyncio
+
+import pytest
+
+from app.services.proxy.dns_cache import DNSCache, DNSResolutionError, open_connection_any
+
+
+class _FakeResolverCache(DNSCache):
+    """_do_resolve を差し替えたDNSキャッシュ"""
+
+    def __init__(self, results: list, **kwargs):
+        super().__init__(**kwargs)
+        self.results = results
+        self.calls = 0
+
+    async def _do_resolve(self, hostname: str) -> list[str]:
+        self.calls += 1
+        await asyncio.sleep(0.01)
+        result = self.results[min(self.calls, len(self.results)) - 1]
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+
+class TestDNSCache:
+    """ネガティブキャッシュ・stale-while-revalidate・同時解決集約のテスト"""
+
+    @pytest.mark.unit
+    async def test_concurrent_misses_share_one_lookup(self):
+        """同一ホストへの同時解決は1回のDNS問い合わせにまとめられる"""
+        cache = _FakeResolverCache([["10.0.0.1"]])
+
+        results = await asyncio.gather(*(cache.resolve("example.com") for _ in range(5)))
+
+        assert results == [["10.0.0.1"]] * 5
+        assert cache.calls == 1
+
+    @pytest.mark.unit
+    async def test_failures_are_negatively_cached(self):
+        """解決失敗は negative TTL の間キャッシュされ、再問い合わせしない"""
+        cache = _FakeResolverCache(
+            [OSError("NXDOMAIN"), ["10.0.0.1"]], negative_ttl_seconds=0.05
+        )
+
+        for _ in range(3):
+            with pytest.raises(DNSResolutionError):
+                await cache.resolve("flaky.example.com")
+        assert cache.calls == 1
+
+        await asyncio.sleep(0.06)
+        assert await cache.resolve("flaky.example.com") == ["10.0.0.1"]
+
+    @pytest.mark.unit
+    async def test_stale_entry_is_served_while_revalidating(self):
+        """期限切れエントリは即座に返され、裏で再解決した結果に置き換わる"""
+        cache = _FakeResolverCache(
+            [["10.0.0.1"], ["10.0.0.2"]], ttl_seconds=0.01, stale_ttl_seconds=10
+        )
+        await cache.resolve("example.com")
+        await asyncio.sleep(0.02)
+
+        assert await cache.resolve("example.com") == ["10.0.0.1"]
+        await asyncio.sleep(0.03)
+        assert await cache.resolve("example.com") == ["10.0.0.2"]
+        assert cache.calls == 2
+
+    @pytest.mark.unit
+    async def test_failed_revalidation_keeps_stale_entry(self):
+        """再解決に失敗しても、stale 期間中は古い結果を返し続ける"""
+        cache = _FakeResolverCache(
+            [["10.0.0.1"], OSError("SERVFAIL")], ttl_seconds=0.01, stale_ttl_seconds=10
+        )
+        await cache.resolve("example.com")
+        await asyncio.sleep(0.02)
+
+        assert await cache.resolve("example.com") == ["10.0.0.1"]
+        await asyncio.sleep(0.03)
+        assert await cache.resolve("example.com") == ["10.0.0.1"]
+
+    @pytest.mark.unit
+    async def test_entries_are_bounded_by_lru(self):
+        """エントリ数が上限を超えたら最後に参照されてから最も古いホストを削除する"""
+        cache = _FakeResolverCache([["10.0.0.1"]], max_entries=2)
+        await cache.resolve("a.example.com")
+        await cache.resolve("b.example.com")
+        await cache.resolve("a.example.com")
+
+        await cache.resolve("c.example.com")
+
+        assert list(cache._cache) == ["a.example.com", "c.example.com"]
+        calls = cache.calls
+        await cache.resolve("a.example.com")
+        assert cache.calls == calls
+
+    @pytest.mark.unit
+    async def test_negative_entries_count_toward_limit(self):
+        """解決失敗のエントリも上限の対象になる"""
+        cache = _FakeResolverCache([OSError("NXDOMAIN")], max_entries=3)
+
+        for i in range(10):
+            with pytest.raises(DNSResolutionError):
+                await cache.resolve(f"random-{i}.example.com")
+
+        assert len(cache._cache) == 3
+
+
+class TestOpenConnectionAny:
+    """複数アドレスへの段階的接続のテスト"""
+
+    @pytest.mark.unit
+    async def test_falls_back_to_next_address(self):
+        """接続できないアドレスの次のアドレスに接続する"""
+        server = await asyncio.start_server(lambda r, w: w.close(), "127.0.0.1", 0)
+        port = server.sockets[0].getsockname()[1]
+        try:
+            reader, writer = await asyncio.wait_for(
+                open_connection_any(["127.0.0.2", "127.0.0.1"], port), timeout=2
+            )
+            assert writer.get_extra_info("peername")[0] == "127.0.0.1"
+            writer.close()
+        finally:
+            server.close()
+            await server.wait_closed()
+
+    @pytest.mark.unit
+    async def test_all_addresses_failing_raises(self):
+        """全アドレスへの接続に失敗した場合は OSError を送出する"""
+        server = await asyncio.start_server(lambda r, w: w.close(), "127.0.0.1", 0)
+        port = server.sockets[0].getsockname()[1]
+        server.close()
+        await server.wait_closed()
+
+        with pytest.raises(OSError):
+            await open_connection_any(["127.0.0.1", "127.0.0.2"], port)
+
+    @pytest.mark.unit
+    async def test_overall_deadline(self, monkeypatch):
+        """応答しないアドレスしかない場合は timeout 秒で OSError を送出する"""
+
+        async def hang(host, port):
+            await asyncio.sleep(10)
+
+        monkeypatch.setattr(asyncio, "open_connection", hang)
+
+        with pytest.raises(OSError, match="接続に失敗"):
+            await asyncio.wait_for(
+                open_connection_any(
+                    ["10.0.0.1", "10.0.0.2"], 443, attempt_delay=0.01, timeout=0.05
+                ),
+                timeout=2,
+            )
@@ -0,0 +1,66 @@
+"""
+ドメインホワイトリストの単体テスト
+"""
+import pytest
+
+from app.services.proxy.domain_whitelist import DomainWhitelist
+
+
+class TestDomainWhitelist:
+    """コンパイル済みホワイトリストの判定テスト"""
+
+    @pytest.mark.unit
+    def test_plain_rule_matches_domain_and_subdomains(self):
+        """ドメイン指定は自身とサブドメインに一致し、末尾一致の別ドメインには一致しない"""
+        wl = DomainWhitelist(["Example.com"])
+
+        assert wl.is_allowed("https://example.com/")
+        assert wl.is_allowed("https://api.eu.example.com/v1")
+        assert wl.is_allowed_host("EXAMPLE.COM.", 443)
+        assert not wl.is_allowed("https://badexample.com/")
+        assert not wl.is_allowed("https://example.com.evil.net/")
+
+    @pytest.mark.unit
+    def test_wildcard_rule_excludes_apex(self):
+        """*.example.com はサブドメインのみに一致する"""
+        wl = DomainWhitelist(["*.example.com"])
+
+        assert wl.is_allowed("https://mirror.example.com/")
+        assert not wl.is_allowed("https://example.com/")
+
+    @pytest.mark.unit
+    def test_port_rules(self):
+        """ポート指定ルールは指定ポートのみ許可し、ポート指定なしのルールとは和集合になる"""
+        wl = DomainWhitelist(["api.partner.io:443", "api.partner.io:8443", "open.io"])
+
+        assert wl.is_allowed("https://api.partner.io/")
+        assert wl.is_allowed_host("api.partner.io", 8443)
+        assert not wl.is_allowed("http://api.partner.io/")
+        assert not wl.is_allowed_host("api.partner.io", 22)
+        assert wl.is_allowed_host("open.io", 22)
+
+    @pytest.mark.unit
+    def test_broader_rule_is_not_shadowed_by_narrower_port_rule(self):
+        """上位ドメインの全ポート許可は、下位ドメインのポート制限に隠されない"""
+        wl = DomainWhitelist(["example.com", "api.example.com:443"])
+
+        assert wl.is_allowed_host("api.example.com", 8080)
+
+    @pytest.mark.unit
+    def test_invalid_rules_are_ignored(self):
+        """全許可につながる不正なルールは無視する"""
+        wl = DomainWhitelist(["*", "*.", "a..b", ""])
+
+        assert wl.domains == frozenset()
+        assert not wl.is_allowed("https://anything.com/")
+
+    @pytest.mark.unit
+    def test_tenant_overlay_extends_base(self):
+        """オーバーレイはテナント分のドメインを追加し、共通リストも引き継ぐ"""
+        base = DomainWhitelist(["pypi.org"])
+        overlay = DomainWhitelist(["mirror.internal:8080"], base=base)
+
+        assert overlay.is_allowed("http://mirror.internal:8080/simple/")
+        assert overlay.is_allowed("https://pypi.org/simple/")
+        assert not base.is_allowed("http://mirror.internal:8080/simple/")
+        assert overlay.domains == {"pypi.org", "mirror.internal:8080"}
@@ -0,0 +1,165 @@
+"""
+Proxy の転送量計測・帯域制限の単体テスト
+"""
+import asyncio
+
+import pytest
+
+from app.infrastructure.metrics import get_workspace_proxy_mcp_cache_requests
+from app.services.proxy import mcp_response_cache
+from app.services.proxy.credential_proxy import (
+    CredentialInjectionProxy,
+    McpHeaderRule,
+    ProxyConfig,
+)
+from app.services.proxy.egress import ContainerEgress, TokenBucket
+from app.services.proxy.mcp_response_cache import McpCachePolicy, McpResponseCache
+from app.services.proxy.sigv4 import AWSCredentials
+from app.services.proxy.upstream_pool import get_upstream_pool
+
+
+class TestTokenBucket:
+    """トークンバケットのテスト"""
+
+    @pytest.mark.unit
+    def test_burst_then_delay(self):
+        """容量までは待たずに転送し、超過分は補充速度に応じた時間を待たせる"""
+        bucket = TokenBucket(rate=1000, burst=1000)
+
+        assert bucket.reserve(1000) == 0.0
+        assert bucket.reserve(500) == pytest.approx(0.5, abs=0.01)
+
+
+class TestContainerEgress:
+    """コンテナ単位の転送量積算と帯域制限のテスト"""
+
+    @pytest.mark.unit
+    def test_usage_is_accumulated_per_path_and_direction(self):
+        """経路・方向別に積算し、監査ログ用の合計を返す"""
+        egress = ContainerEgress("ws-1")
+        egress.bind_tenant("t1")
+
+        assert egress.record("connect", "downstream", 4096) == 0.0
+        egress.record("bedrock", "upstream", 100)
+        egress.record("bedrock", "downstream", 300)
+
+        assert egress.usage.as_dict() == {
+            "bytes_up": 100,
+            "bytes_down": 4396,
+            "by_path": {
+                "bedrock": {"up": 100, "down": 300},
+                "connect": {"up": 0, "down": 4096},
+            },
+        }
+
+    @pytest.mark.unit
+    def test_tenant_bucket_is_shared_between_containers(self):
+        """テナントの帯域は同じテナントの全コンテナの合計に適用する"""
+        first = ContainerEgress("ws-1", tenant_rate=1000)
+        second = ContainerEgress("ws-2", tenant_rate=1000)
+        first.bind_tenant("tenant-shared")
+        second.bind_tenant("tenant-shared")
+
+        assert first.record("forward", "downstream", 1000) == 0.0
+        assert second.record("forward", "downstream", 1000) > 0.9
+
+
+@pytest.fixture
+async def upstream():
+    """リクエストボディを読み切って 2048 バイトを返す上流HTTPサーバー"""
+
+    async def handle(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        await reader.readline()
+        content_length = 0
+        while (line := await reader.readline()) not in (b"\r\n", b""):
+            key, _, value = line.decode().partition(":")
+            if key.strip().lower() == "content-length":
+                content_length = int(value)
+        await reader.readexactly(content_length)
+        writer.write(b"HTTP/1.1 200 OK\r\nContent-Length: 2048\r\n\r\n" + b"x" * 2048)
+        await writer.drain()
+        writer.close()
+
+    server = await asyncio.start_server(handle, "127.0.0.1", 0)
+    port = server.sockets[0].getsockname()[1]
+    yield f"http://127.0.0.1:{port}"
+    server.close()
+    await server.wait_closed()
+
+
+class TestProxyEgressAccounting:
+    """Proxy 経由の転送量計測のテスト"""
+
+    @pytest.mark.unit
+    async def test_mcp_request_and_response_bytes_are_recorded(self, tmp_path, upstream):
+        """リクエスト・レスポンスのボディを経路 mcp として記録する"""
+        egress = ContainerEgress("ws-1")
+        config = ProxyConfig(
+            whitelist_domains=[],
+            aws_credentials=AWSCredentials("test", "test", region="us-east-1"),
+            log_all_requests=False,
+            egress=egress,
+        )
+        proxy = CredentialInjectionProxy(config, str(tmp_path / "proxy.sock"))
+        await proxy.start()
+        proxy.update_tenant("t1")
+        proxy.update_mcp_header_rules({"svc": McpHeaderRule(real_base_url=upstream)})
+        try:
+            reader, writer = await asyncio.open_unix_connection(proxy.socket_path)
+            writer.write(
+                b"POST /mcp/svc/items HTTP/1.1\r\n"
+                b"Content-Length: 512\r\nConnection: close\r\n\r\n" + b"y" * 512
+            )
+            await writer.drain()
+            response = await reader.read()
+            writer.close()
+        finally:
+            await proxy.stop()
+            await get_upstream_pool().close()
+
+        assert response.startswith(b"HTTP/1.1 200 ")
+        assert egress.tenant_id == "t1"
+        assert egress.usage.bytes_up == {"mcp": 512}
+        assert egress.usage.bytes_down == {"mcp": 2048}
+
+    @pytest.mark.unit
+    async def test_cached_mcp_responses_are_recorded(self, tmp_path, upstream, monkeypatch):
+        """キャッシュ対象のMCPサーバーでも、上流から取得したボディとキャッシュから返したボディを記録する"""
+        monkeypatch.setattr(
+            mcp_response_cache, "_mcp_response_cache", McpResponseCache(max_bytes=1024 * 1024)
+        )
+        egress = ContainerEgress("ws-1")
+        config = ProxyConfig(
+            whitelist_domains=[],
+            aws_credentials=AWSCredentials("test", "test", region="us-east-1"),
+            log_all_requests=False,
+            egress=egress,
+        )
+        proxy = CredentialInjectionProxy(config, str(tmp_path / "proxy.sock"))
+        await proxy.start()
+        proxy.update_tenant("t1")
+        proxy.update_mcp_header_rules({
+            "svc": McpHeaderRule(
+                real_base_url=upstream, tenant_id="t1", cache=McpCachePolicy(ttl=60.0)
+            )
+        })
+        hits_before = get_workspace_proxy_mcp_cache_requests().get(server="svc", result="hit")
+        responses = []
+        try:
+            for _ in range(2):
+                reader, writer = await asyncio.open_unix_connection(proxy.socket_path)
+                writer.write(b"GET /mcp/svc/items HTTP/1.1\r\nConnection: close\r\n\r\n")
+                await writer.drain()
+                responses.append(await reader.read())
+                writer.close()
+        finally:
+            await proxy.stop()
+            await get_upstream_pool().close()
+
+        assert all(response.endswith(b"x" * 2048) for response in responses)
+        # 1回目は上流からの取得、2回目はキャッシュからの応答
+        assert get_workspace_proxy_mcp_cache_requests().get(server="svc", result="hit") == (
+            hits_before + 1
+        )
+        assert egress.usage.bytes_down == {"mcp": 4096}
+        assert egress.usage.bytes_up == {}
@@ -0,0 +1,141 @@
+"""
+SSEイベントキューの単体テスト
+"""
+import asyncio
+
+import pytest
+
+from app.utils.event_queue import CoalescingEventQueue
+from app.utils.streaming import (
+    format_assistant_event,
+    format_progress_event,
+    format_thinking_event,
+    format_tool_call_event,
+)
+
+
+def _text_delta(seq: int, text: str, parent_agent_id: str | None = None) -> dict:
+    return format_assistant_event(
+        seq=seq,
+        content_blocks=[{"type": "text", "text": text}],
+        parent_agent_id=parent_agent_id,
+    )
+
+
+def _generating(seq: int) -> dict:
+    return format_progress_event(seq=seq, progress_type="generating", message="生成中")
+
+
+class TestCoalescingEventQueue:
+    """テキスト差分の結合とバックプレッシャーのテスト"""
+
+    @pytest.mark.unit
+    async def test_adjacent_text_deltas_are_merged(self):
+        """滞留中の連続するテキスト差分は1イベントに結合される"""
+        queue = CoalescingEventQueue(maxsize=10)
+        await queue.put(_generating(1))
+        await queue.put(_text_delta(2, "Hello"))
+        await queue.put(_generating(3))
+        await queue.put(_text_delta(4, ", "))
+        await queue.put(_generating(5))
+        await queue.put(_text_delta(6, "world"))
+        await queue.put(None)
+
+        events = [await queue.get() for _ in range(queue.qsize())]
+
+        assert [e["event"] if e else None for e in events] == [
+            "progress",
+            "assistant",
+            None,
+        ]
+        assert events[1]["data"]["seq"] == 2
+        assert events[1]["data"]["content_blocks"] == [
+            {"type": "text", "text": "Hello, world"}
+        ]
+
+    @pytest.mark.unit
+    async def test_original_events_are_not_mutated(self):
+        """結合しても呼び出し元が保持するイベントは変更されない"""
+        first = _text_delta(1, "a")
+        queue = CoalescingEventQueue(maxsize=10)
+        await queue.put(first)
+        await queue.put(_text_delta(2, "b"))
+
+        merged = await queue.get()
+
+        assert merged["data"]["content_blocks"][0]["text"] == "ab"
+        assert first["data"]["content_blocks"][0]["text"] == "a"
+
+    @pytest.mark.unit
+    async def test_different_agents_and_types_are_not_merged(self):
+        """親エージェントやイベント種別が異なる差分は結合しない"""
+        queue = CoalescingEventQueue(maxsize=10)
+        await queue.put(_text_delta(1, "main"))
+        await queue.put(_text_delta(2, "sub", parent_agent_id="agent-1"))
+        await queue.put(format_thinking_event(seq=3, content="think"))
+        await queue.put(format_thinking_event(seq=4, content="ing"))
+
+        assert queue.qsize() == 3
+        events = [await queue.get() for _ in range(3)]
+        assert events[2]["data"]["content"] == "thinking"
+
+    @pytest.mark.unit
+    async def test_thinking_coalescing_can_be_disabled(self):
+        """coalesce_thinking=False では thinking 差分を結合しない"""
+        queue = CoalescingEventQueue(maxsize=10, coalesce_thinking=False)
+        await queue.put(format_thinking_event(seq=1, content="a"))
+        await queue.put(format_thinking_event(seq=2, content="b"))
+
+        assert queue.qsize() == 2
+
+    @pytest.mark.unit
+    async def test_window_merges_deltas_arriving_after_get(self):
+        """get() は結合ウィンドウ内に届いた差分を先頭に結合して返す"""
+        queue = CoalescingEventQueue(maxsize=10, coalesce_window=0.05)
+        await queue.put(_generating(1))
+        await queue.put(_text_delta(2, "a"))
+        assert (await queue.get())["event"] == "progress"
+
+        async def produce():
+            await asyncio.sleep(0.01)
+            await queue.put(_generating(3))
+            await queue.put(_text_delta(4, "b"))
+
+        producer = asyncio.create_task(produce())
+        event = await queue.get()
+        await producer
+
+        assert event["data"]["content_blocks"][0]["text"] == "ab"
+        assert queue.qsize() == 0
+
+    @pytest.mark.unit
+    async def test_full_queue_blocks_until_consumed(self):
+        """満杯のキューでは結合できないイベントの追加が待機する"""
+        queue = CoalescingEventQueue(maxsize=1)
+        await queue.put(
+            format_tool_call_event(
+                seq=1, tool_use_id="t1", tool_name="Read", tool_input={}, summary=""
+            )
+        )
+
+        put_task = asyncio.create_task(queue.put(_text_delta(2, "a")))
+        await asyncio.sleep(0.01)
+        assert not put_task.done()
+
+        await queue.get()
+        await asyncio.wait_for(put_task, timeout=1)
+        assert queue.qsize() == 1
+
+    @pytest.mark.unit
+    async def test_close_releases_blocked_producer(self):
+        """close() で待機中の put() が解放され、以降のイベントは破棄される"""
+        queue = CoalescingEventQueue(maxsize=1)
+        await queue.put(_generating(1))
+        put_task = asyncio.create_task(queue.put(_generating(2)))
+        await asyncio.sleep(0.01)
+
+        queue.close()
+        await asyncio.wait_for(put_task, timeout=1)
+        await queue.put(None)
+
+        assert queue.qsize() == 0
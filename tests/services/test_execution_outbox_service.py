@@ -0,0 +1,169 @@
+"""
+実行後処理アウトボックスサービスの単体テスト
+"""
+from decimal import Decimal
+
+import pytest
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models import Conversation, ExecutionOutbox, MessageLog, Tenant, UsageLog
+from app.repositories.execution_outbox_repository import ExecutionOutboxRepository
+from app.services.execution_outbox_service import ExecutionOutboxService
+
+
+@pytest.fixture
+async def setup_conversation(db_session: AsyncSession):
+    """テスト用会話を作成"""
+    from app.schemas.model import ModelCreate
+    from app.services.model_service import ModelService
+
+    model_service = ModelService(db_session)
+    await model_service.create(
+        ModelCreate(
+            model_id="outbox-test-model",
+            display_name="Outbox Test Model",
+            bedrock_model_id="us.anthropic.claude-outbox:0",
+            input_token_price="1.0",
+            output_token_price="5.0",
+        )
+    )
+
+    tenant = Tenant(tenant_id="outbox-test-tenant", model_id="outbox-test-model")
+    db_session.add(tenant)
+    await db_session.flush()
+
+    conversation = Conversation(
+        tenant_id="outbox-test-tenant",
+        user_id="outbox-test-user",
+        model_id="outbox-test-model",
+    )
+    db_session.add(conversation)
+    await db_session.flush()
+
+    return {
+        "tenant_id": tenant.tenant_id,
+        "conversation_id": conversation.conversation_id,
+    }
+
+
+class TestExecutionOutboxService:
+    """アウトボックスの登録・処理のテスト"""
+
+    @pytest.mark.unit
+    async def test_flush_conversation_processes_usage(
+        self, db_session: AsyncSession, setup_conversation
+    ):
+        """使用量ジョブ処理で使用量ログとコンテキスト状況が更新される"""
+        service = ExecutionOutboxService(db_session)
+        await service.enqueue_usage(
+            tenant_id=setup_conversation["tenant_id"],
+            conversation_id=setup_conversation["conversation_id"],
+            user_id="outbox-test-user",
+            model_id="outbox-test-model",
+            usage={"input_tokens": 900, "output_tokens": 100},
+            cost_usd=Decimal("0.0014"),
+            context_window=1000,
+        )
+
+        processed = await service.flush_conversation(
+            setup_conversation["conversation_id"]
+        )
+
+        assert processed == 1
+        usage_logs = (await db_session.execute(select(UsageLog))).scalars().all()
+        assert len(usage_logs) == 1
+        assert usage_logs[0].cost_usd == Decimal("0.0014")
+
+        conversation = await db_session.get(
+            Conversation, setup_conversation["conversation_id"]
+        )
+        assert conversation.estimated_context_tokens == 1000
+        assert conversation.context_limit_reached is True
+
+        # 完了したジョブは削除される
+        entries = (await db_session.execute(select(ExecutionOutbox))).scalars().all()
+        assert entries == []
+
+    @pytest.mark.unit
+    async def test_assistant_message_seq_assigned_at_processing(
+        self, db_session: AsyncSession, setup_conversation
+    ):
+        """アシスタントメッセージのmessage_seqは処理時に採番される"""
+        conversation_id = setup_conversation["conversation_id"]
+        service = ExecutionOutboxService(db_session)
+        await service.enqueue_assistant_message(
+            setup_conversation["tenant_id"],
+            conversation_id,
+            [{"event": "assistant", "data": {"text": "hello"}}],
+        )
+
+        await service.flush_conversation(conversation_id)
+
+        logs = (
+            await db_session.execute(
+                select(MessageLog).where(MessageLog.conversation_id == conversation_id)
+            )
+        ).scalars().all()
+        assert len(logs) == 1
+        assert logs[0].message_seq == 1
+        assert logs[0].message_type == "assistant"
+
+    @pytest.mark.unit
+    async def test_failed_job_is_retried_then_marked_failed(
+        self, db_session: AsyncSession, setup_conversation
+    ):
+        """失敗したジョブはバックオフ後に再試行され、上限で failed になる"""
+        repo = ExecutionOutboxRepository(db_session)
+        entry = await repo.enqueue(
+            "unknown_kind",
+            setup_conversation["tenant_id"],
+            setup_conversation["conversation_id"],
+            {},
+        )
+
+        repo.mark_failed(entry, "error", max_attempts=2, backoff_seconds=1.0)
+        assert entry.status == "pending"
+        assert entry.attempts == 1
+        assert entry.available_at is not None
+
+        repo.mark_failed(entry, "error", max_attempts=2, backoff_seconds=1.0)
+        assert entry.status == "failed"
+        assert entry.processed_at is not None
+
+    @pytest.mark.unit
+    async def test_conversation_delete_enqueues_workspace_delete(
+        self, db_session: AsyncSession, setup_conversation, monkeypatch
+    ):
+        """会話削除ではS3ファイルを直接削除せず、削除後にジョブを登録して処理する"""
+        from app.config import get_settings
+        from app.services import execution_outbox_service
+        from app.services.conversation_service import ConversationService
+
+        monkeypatch.setattr(get_settings(), "s3_bucket_name", "test-bucket")
+        deleted_prefixes = []
+
+        class _Storage:
+            async def delete_prefix(self, tenant_id, session_id):
+                deleted_prefixes.append((tenant_id, session_id))
+                return 3
+
+        monkeypatch.setattr(execution_outbox_service, "get_s3_storage", _Storage)
+
+        conversation_id = setup_conversation["conversation_id"]
+        assert await ConversationService(db_session).delete_conversation(
+            conversation_id, setup_conversation["tenant_id"]
+        )
+        entries = (await db_session.execute(select(ExecutionOutbox))).scalars().all()
+        assert [e.kind for e in entries] == ["workspace_delete"]
+        assert deleted_prefixes == []
+
+        processed = await ExecutionOutboxService(db_session).flush_conversation(
+            conversation_id
+        )
+
+        assert processed == 1
+        assert deleted_prefixes == [(setup_conversation["tenant_id"], conversation_id)]
+        remaining = (await db_session.execute(select(ExecutionOutbox))).scalars().all()
+        assert remaining == []
+
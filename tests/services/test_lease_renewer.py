@@ -0,0 +1,181 @@
+"""
+リース更新機構の単体テスト
+
+ロック延長の Lua スクリプトは fakeredis（Luaスクリプト対応）で実行する。
+"""
+import asyncio
+from contextlib import asynccontextmanager
+
+import fakeredis
+import pytest
+from redis.exceptions import ConnectionError as RedisConnectionError
+
+from app.infrastructure import lease_renewer as lease_renewer_module
+from app.infrastructure.lease_renewer import LeaseRenewer
+from app.infrastructure.metrics import get_lease_renewal_lag, get_lease_renewals
+
+
+@pytest.fixture
+def redis(monkeypatch):
+    """lease_renewer が使う redis_client を fakeredis に差し替える"""
+    client = fakeredis.FakeAsyncRedis(decode_responses=True)
+
+    @asynccontextmanager
+    async def fake_redis_client():
+        yield client
+
+    monkeypatch.setattr(lease_renewer_module, "redis_client", fake_redis_client)
+    return client
+
+
+def _renewals(kind: str, result: str) -> float:
+    return get_lease_renewals().get(kind=kind, result=result)
+
+
+class TestRenewOnce:
+    """renew_once のテスト"""
+
+    @pytest.mark.unit
+    async def test_extends_held_lock(self, redis):
+        """トークンが一致するロックは取得時のTTLまで延長する"""
+        await redis.set("lock:conv-1", "token-1", px=1000)
+        renewer = LeaseRenewer()
+        renewer.hold_lock("lock:conv-1", "token-1", ttl=60)
+        before = _renewals("lock", "renewed")
+
+        await renewer.renew_once()
+
+        assert await redis.pttl("lock:conv-1") > 50_000
+        assert _renewals("lock", "renewed") == before + 1
+        assert "lock:conv-1" in renewer._locks
+
+    @pytest.mark.unit
+    async def test_lost_lock_is_dropped(self, redis):
+        """他プロセスに奪われたロックは延長せず追跡を外す"""
+        await redis.set("lock:conv-1", "other-token", px=1000)
+        renewer = LeaseRenewer()
+        renewer.hold_lock("lock:conv-1", "token-1", ttl=60)
+        before = _renewals("lock", "lost")
+
+        await renewer.renew_once()
+
+        assert await redis.pttl("lock:conv-1") <= 1000
+        assert _renewals("lock", "lost") == before + 1
+        assert "lock:conv-1" not in renewer._locks
+
+    @pytest.mark.unit
+    async def test_expired_lock_is_dropped(self, redis):
+        """失効済みのロックは再作成せず追跡を外す"""
+        renewer = LeaseRenewer()
+        renewer.hold_lock("lock:conv-1", "token-1", ttl=60)
+
+        await renewer.renew_once()
+
+        assert not await redis.exists("lock:conv-1")
+        assert renewer._locks == {}
+
+    @pytest.mark.unit
+    async def test_expiry_keys_are_refreshed(self, redis):
+        """TTL維持対象のキーは EXPIRE でリセットする"""
+        await redis.set("container:conv-1", "x", ex=5)
+        await redis.set("reverse:ws-1", "conv-1", ex=5)
+        renewer = LeaseRenewer()
+        renewer.hold_expiry("conv-1", ["container:conv-1", "reverse:ws-1"], ttl=300)
+
+        await renewer.renew_once()
+
+        assert await redis.ttl("container:conv-1") > 200
+        assert await redis.ttl("reverse:ws-1") > 200
+        assert "conv-1" in renewer._expiries
+
+    @pytest.mark.unit
+    async def test_expiry_dropped_when_primary_key_gone(self, redis):
+        """主キーが消えていればリソース破棄済みとして追跡を外す"""
+        renewer = LeaseRenewer()
+        renewer.hold_expiry("conv-1", ["container:conv-1"], ttl=300)
+        before = _renewals("expiry", "lost")
+
+        await renewer.renew_once()
+
+        assert renewer._expiries == {}
+        assert _renewals("expiry", "lost") == before + 1
+
+    @pytest.mark.unit
+    async def test_redis_error_keeps_leases(self, monkeypatch):
+        """Redisエラー時は追跡を維持して次回サイクルで再試行する"""
+
+        class _FailingPipeline:
+            async def __aenter__(self):
+                return self
+
+            async def __aexit__(self, *exc):
+                return False
+
+            def eval(self, *args):
+                pass
+
+            def expire(self, *args):
+                pass
+
+            async def execute(self):
+                raise RedisConnectionError("connection refused")
+
+        class _FailingRedis:
+            def pipeline(self, transaction=True):
+                return _FailingPipeline()
+
+        @asynccontextmanager
+        async def failing_redis_client():
+            yield _FailingRedis()
+
+        monkeypatch.setattr(lease_renewer_module, "redis_client", failing_redis_client)
+        renewer = LeaseRenewer()
+        renewer.hold_lock("lock:conv-1", "token-1", ttl=60)
+        renewer.hold_expiry("conv-1", ["container:conv-1"], ttl=300)
+        before = _renewals("lock", "error")
+
+        await renewer.renew_once()
+
+        assert _renewals("lock", "error") == before + 1
+        assert "lock:conv-1" in renewer._locks
+        assert "conv-1" in renewer._expiries
+
+
+class TestRenewLoop:
+    """更新ループのテスト"""
+
+    @pytest.mark.unit
+    async def test_loop_renews_and_records_lag(self, redis):
+        """ループは一定間隔で更新し、予定時刻からの遅れを記録する"""
+        await redis.set("lock:conv-1", "token-1", px=1000)
+        renewer = LeaseRenewer(interval=0.01)
+        renewer.hold_lock("lock:conv-1", "token-1", ttl=60)
+        lag = get_lease_renewal_lag()
+        before = lag._totals.get((), 0)
+
+        await renewer.start()
+        await asyncio.sleep(0.1)
+        await renewer.stop()
+
+        assert lag._totals.get((), 0) >= before + 2
+        assert await redis.pttl("lock:conv-1") > 50_000
+
+    @pytest.mark.unit
+    async def test_loop_survives_renew_error(self, redis, monkeypatch):
+        """更新で予期しない例外が出てもループは継続する"""
+        renewer = LeaseRenewer(interval=0.01)
+        calls = 0
+
+        async def flaky_renew_once():
+            nonlocal calls
+            calls += 1
+            if calls == 1:
+                raise RuntimeError("boom")
+
+        monkeypatch.setattr(renewer, "renew_once", flaky_renew_once)
+
+        await renewer.start()
+        await asyncio.sleep(0.1)
+        await renewer.stop()
+
+        assert calls >= 2
@@ -0,0 +1,241 @@
+"""
+MCPレスポンスキャッシュの単体テスト
+"""
+import asyncio
+
+import pytest
+
+from app.services.proxy import mcp_response_cache
+from app.services.proxy.credential_proxy import (
+    CredentialInjectionProxy,
+    McpHeaderRule,
+    ProxyConfig,
+)
+from app.services.proxy.mcp_response_cache import (
+    McpCachePolicy,
+    McpResponseCache,
+    freshness_lifetime,
+    parse_cache_control,
+)
+from app.services.proxy.sigv4 import AWSCredentials
+from app.services.proxy.upstream_pool import get_upstream_pool
+
+_POLICY = McpCachePolicy(ttl=60.0)
+
+
+def _store(cache: McpResponseCache, headers: list[tuple[str, str]], body: bytes = b"{}") -> bool:
+    namespace = cache.namespace("tenant-a", "svc", {})
+    key = cache.key(namespace, "https://api/x", {}, _POLICY)
+    return cache.store(key, namespace, "https://api/x", 200, headers, body, _POLICY)
+
+
+class TestMcpResponseCache:
+    """保存可否・キー構成の判定テスト"""
+
+    @pytest.mark.unit
+    @pytest.mark.parametrize(
+        ("headers", "stored"),
+        [
+            ([], True),
+            ([("Cache-Control", "no-store")], False),
+            ([("Cache-Control", "max-age=0")], False),
+            ([("Cache-Control", "no-cache"), ("ETag", '"v1"')], True),
+            ([("Vary", "*")], False),
+            ([("Vary", "Authorization")], False),
+            ([("Vary", "Accept-Encoding")], True),
+        ],
+    )
+    def test_storability(self, headers, stored):
+        """no-store・鮮度0で検証子なし・キー外の Vary は保存しない"""
+        assert _store(McpResponseCache(max_bytes=1024), headers) is stored
+
+    @pytest.mark.unit
+    def test_freshness_is_capped_by_configured_ttl(self):
+        """max-age は設定TTLを上限として扱う"""
+        cache = McpResponseCache(max_bytes=1024)
+        _store(cache, [("Cache-Control", "max-age=3600")])
+        entry = next(iter(cache._entries.values()))
+
+        assert entry.expires_at - entry.stored_at == pytest.approx(60.0)
+
+    @pytest.mark.unit
+    @pytest.mark.parametrize(
+        ("cache_control", "lifetime"),
+        [
+            ("s-maxage=0, max-age=30", 0.0),
+            ("s-maxage=10, max-age=30", 10.0),
+            ("max-age=30", 30.0),
+            ("s-maxage=abc, max-age=30", 0.0),
+            ("no-cache, max-age=30", 0.0),
+            ("public", 60.0),
+        ],
+    )
+    def test_s_maxage_takes_precedence(self, cache_control, lifetime):
+        """共有キャッシュでは s-maxage（0を含む）が max-age より優先される"""
+        assert freshness_lifetime(parse_cache_control(cache_control), 60.0) == lifetime
+
+    @pytest.mark.unit
+    def test_namespace_separates_tenants_and_credentials(self):
+        """テナント・注入する認証ヘッダーが異なれば別の名前空間になる"""
+        token_a = {"Authorization": "Bearer a"}
+
+        assert McpResponseCache.namespace("t1", "svc", token_a) != McpResponseCache.namespace(
+            "t2", "svc", token_a
+        )
+        assert McpResponseCache.namespace("t1", "svc", token_a) != McpResponseCache.namespace(
+            "t1", "svc", {"Authorization": "Bearer b"}
+        )
+
+    @pytest.mark.unit
+    def test_least_recently_used_entries_are_evicted(self):
+        """容量上限を超えると最後の参照が古いエントリから削除する"""
+        cache = McpResponseCache(max_bytes=10)
+        namespace = cache.namespace("t", "svc", {})
+        keys = [cache.key(namespace, f"https://api/{i}", {}, _POLICY) for i in range(3)]
+        for i, key in enumerate(keys[:2]):
+            cache.store(key, namespace, f"https://api/{i}", 200, [], b"x" * 4, _POLICY)
+        cache.get(keys[0])
+        cache.store(keys[2], namespace, "https://api/2", 200, [], b"x" * 4, _POLICY)
+
+        assert cache.get(keys[1]) is None
+        assert cache.get(keys[0]) is not None
+        assert cache.total_bytes == 8
+
+
+class _ReferenceApi:
+    """ETag付きの参照データAPI（If-None-Match 一致時は304）"""
+
+    def __init__(self) -> None:
+        self.version = 1
+        self.cache_control = "max-age=0"
+        self.requests: list[tuple[str, str, str | None]] = []
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        method, path, _ = (await reader.readline()).decode().split(" ", 2)
+        headers = {}
+        while (line := await reader.readline()) not in (b"\r\n", b""):
+            key, value = line.decode().split(":", 1)
+            headers[key.strip().lower()] = value.strip()
+        if "content-length" in headers:
+            await reader.readexactly(int(headers["content-length"]))
+        self.requests.append((method, headers.get("authorization"), headers.get("if-none-match")))
+
+        etag = f'"v{self.version}"'
+        if method == "POST":
+            self.version += 1
+            writer.write(b"HTTP/1.1 204 No Content\r\n\r\n")
+        elif headers.get("if-none-match") == etag:
+            writer.write(f"HTTP/1.1 304 Not Modified\r\nETag: {etag}\r\n\r\n".encode())
+        else:
+            body = f'{{"version": {self.version}}}'.encode()
+            writer.write(
+                f"HTTP/1.1 200 OK\r\nContent-Type: application/json\r\nETag: {etag}\r\n"
+                f"Cache-Control: {self.cache_control}\r\nContent-Length: {len(body)}\r\n\r\n".encode()
+                + body
+            )
+        await writer.drain()
+        writer.close()
+
+
+@pytest.fixture
+async def reference_api():
+    api = _ReferenceApi()
+    server = await asyncio.start_server(api.handle, "127.0.0.1", 0)
+    api.base_url = f"http://127.0.0.1:{server.sockets[0].getsockname()[1]}"
+    yield api
+    server.close()
+    await server.wait_closed()
+
+
+@pytest.fixture
+async def cached_proxy(tmp_path, monkeypatch):
+    """MCPレスポンスキャッシュを新規に持つProxy"""
+    monkeypatch.setattr(
+        mcp_response_cache, "_mcp_response_cache", McpResponseCache(max_bytes=1024 * 1024)
+    )
+    config = ProxyConfig(
+        whitelist_domains=[],
+        aws_credentials=AWSCredentials("test", "test"),
+        log_all_requests=False,
+    )
+    proxy = CredentialInjectionProxy(config, str(tmp_path / "proxy.sock"))
+    await proxy.start()
+    yield proxy
+    await proxy.stop()
+    # 共有クライアントはイベントループに紐づくため、テストごとに閉じる
+    await get_upstream_pool().close()
+
+
+async def _request(proxy: CredentialInjectionProxy, request: bytes) -> tuple[bytes, bytes]:
+    reader, writer = await asyncio.open_unix_connection(proxy.socket_path)
+    try:
+        writer.write(request)
+        await writer.drain()
+        head = await reader.readuntil(b"\r\n\r\n")
+        length = 0
+        for line in head.split(b"\r\n"):
+            if line.lower().startswith(b"content-length:"):
+                length = int(line.split(b":", 1)[1])
+        return head, await reader.readexactly(length)
+    finally:
+        writer.close()
+
+
+class TestProxyMcpResponseCache:
+    """Proxy経由でのキャッシュ・再検証・破棄のテスト"""
+
+    @pytest.mark.unit
+    async def test_revalidation_and_invalidation(self, cached_proxy, reference_api):
+        """期限切れエントリは304で再利用し、更新系リクエスト後は新しい内容を取得する"""
+        cached_proxy.update_mcp_header_rules(
+            {
+                "svc": McpHeaderRule(
+                    real_base_url=reference_api.base_url,
+                    headers={"Authorization": "Bearer a"},
+                    tenant_id="tenant-a",
+                    cache=_POLICY,
+                )
+            }
+        )
+        get = b"GET /mcp/svc/ref HTTP/1.1\r\nConnection: close\r\n\r\n"
+
+        _, first = await _request(cached_proxy, get)
+        head, second = await _request(cached_proxy, get)
+        assert first == second == b'{"version": 1}'
+        assert b"Age: " in head
+        assert reference_api.requests[1] == ("GET", "Bearer a", '"v1"')
+
+        await _request(
+            cached_proxy,
+            b"POST /mcp/svc/ref HTTP/1.1\r\nContent-Length: 2\r\nConnection: close\r\n\r\n{}",
+        )
+        _, third = await _request(cached_proxy, get)
+        assert third == b'{"version": 2}'
+        assert reference_api.requests[-1][2] is None
+
+    @pytest.mark.unit
+    async def test_fresh_entries_are_not_shared_across_tenants(self, cached_proxy, reference_api):
+        """新鮮なエントリは同じテナントにのみ返し、別テナントは上流に問い合わせる"""
+        reference_api.cache_control = "max-age=300"
+
+        async def fetch(tenant_id: str, token: str) -> None:
+            cached_proxy.update_mcp_header_rules(
+                {
+                    "svc": McpHeaderRule(
+                        real_base_url=reference_api.base_url,
+                        headers={"Authorization": token},
+                        tenant_id=tenant_id,
+                        cache=_POLICY,
+                    )
+                }
+            )
+            await _request(cached_proxy, b"GET /mcp/svc/ref HTTP/1.1\r\nConnection: close\r\n\r\n")
+
+        await fetch("tenant-a", "Bearer a")
+        await fetch("tenant-a", "Bearer a")
+        await fetch("tenant-b", "Bearer b")
+
+        assert [r[1:] for r in reference_api.requests] == [
+            ("Bearer a", None),
+            ("Bearer b", None),
+        ]
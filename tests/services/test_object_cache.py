@@ -0,0 +1,218 @@
+"""
+S3オブジェクトキャッシュの単体テスト
+"""
+import asyncio
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import pytest
+
+from app.infrastructure.metrics import (
+    get_s3_object_cache_bytes_saved,
+    get_s3_object_cache_requests,
+)
+from app.services.workspace.object_cache import S3ObjectCache
+from app.utils.disk_cache import STALE_TMP_SECONDS, tmp_dir
+
+
+def _writer(content: bytes, calls: list[Path] | None = None):
+    """指定内容を書き込む download 関数"""
+
+    async def download(path: Path) -> None:
+        if calls is not None:
+            calls.append(path)
+        await asyncio.sleep(0.01)
+        path.write_bytes(content)
+
+    return download
+
+
+class TestS3ObjectCache:
+    """読み取りキャッシュのテスト"""
+
+    @pytest.mark.unit
+    async def test_miss_then_hit_records_bytes_saved(self, tmp_path):
+        """初回はS3から取得し、2回目以降はキャッシュから返して節約バイト数を記録する"""
+        cache = S3ObjectCache(str(tmp_path), max_bytes=1024)
+        requests = get_s3_object_cache_requests()
+        saved = get_s3_object_cache_bytes_saved()
+        hits_before = requests.get(result="hit")
+        saved_before = saved.get()
+        calls: list[Path] = []
+
+        first = await cache.fetch("b", "k", '"e1"', _writer(b"hello", calls))
+        second = await cache.fetch("b", "k", '"e1"', _writer(b"other", calls))
+
+        assert first == second
+        assert second.read_bytes() == b"hello"
+        assert len(calls) == 1
+        assert requests.get(result="hit") - hits_before == 1
+        assert saved.get() - saved_before == 5
+
+    @pytest.mark.unit
+    async def test_new_etag_is_a_separate_entry(self, tmp_path):
+        """上書きされたオブジェクト（ETag が異なる）は古い内容を返さない"""
+        cache = S3ObjectCache(str(tmp_path), max_bytes=1024)
+
+        await cache.fetch("b", "k", '"e1"', _writer(b"old"))
+        path = await cache.fetch("b", "k", '"e2"', _writer(b"new"))
+
+        assert path.read_bytes() == b"new"
+        assert await cache.get("b", "k", '"e3"') is None
+
+    @pytest.mark.unit
+    async def test_concurrent_fetches_are_coalesced(self, tmp_path):
+        """同じエントリへの同時取得はS3取得1回にまとめる"""
+        cache = S3ObjectCache(str(tmp_path), max_bytes=1024)
+        requests = get_s3_object_cache_requests()
+        coalesced_before = requests.get(result="coalesced")
+        calls: list[Path] = []
+
+        paths = await asyncio.gather(*(
+            cache.fetch("b", "k", '"e1"', _writer(b"data", calls)) for _ in range(5)
+        ))
+
+        assert len(calls) == 1
+        assert len(set(paths)) == 1
+        assert requests.get(result="coalesced") - coalesced_before == 4
+
+    @pytest.mark.unit
+    async def test_failed_fetch_is_not_cached(self, tmp_path):
+        """取得失敗は待っている全員に伝え、エントリを残さない"""
+        cache = S3ObjectCache(str(tmp_path), max_bytes=1024)
+
+        async def failing(path: Path) -> None:
+            raise OSError("boom")
+
+        with pytest.raises(OSError):
+            await cache.fetch("b", "k", '"e1"', failing)
+        assert await cache.get("b", "k", '"e1"') is None
+        assert list(tmp_dir(tmp_path).iterdir()) == []
+
+    @pytest.mark.unit
+    async def test_least_recently_used_entries_are_evicted(self, tmp_path):
+        """上限を超えたら参照の古いエントリから削除する"""
+        cache = S3ObjectCache(str(tmp_path), max_bytes=10)
+
+        for age, key in ((20, "a"), (10, "b")):
+            path = await cache.fetch("b", key, '"e"', _writer(key.encode() * 4))
+            # 更新時刻の粒度に左右されないよう保存時刻をずらす
+            old = time.time() - age
+            os.utime(path, (old, old))
+        await cache.get("b", "a", '"e"')
+        await cache.fetch("b", "c", '"e"', _writer(b"cccc"))
+
+        assert await cache.get("b", "a", '"e"') is not None
+        assert await cache.get("b", "b", '"e"') is None
+        assert await cache.get("b", "c", '"e"') is not None
+
+    @pytest.mark.unit
+    async def test_put_and_reload(self, tmp_path):
+        """登録したファイルは再起動後（新しいインスタンス）もキャッシュとして使う"""
+        source = tmp_path / "local.txt"
+        source.write_bytes(b"local")
+        cache = S3ObjectCache(str(tmp_path / "cache"), max_bytes=1024)
+
+        await cache.put("b", "k", '"e1"', source)
+        reloaded = S3ObjectCache(str(tmp_path / "cache"), max_bytes=1024)
+        path = await reloaded.get("b", "k", '"e1"')
+
+        assert path is not None
+        assert path.read_bytes() == b"local"
+
+    @pytest.mark.unit
+    async def test_file_operations_run_on_given_executor(self, tmp_path):
+        """ファイル操作は指定されたスレッドプール（S3専用）で実行する"""
+        source = tmp_path / "local.txt"
+        source.write_bytes(b"local")
+        executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="s3-transfer")
+        threads: list[str] = []
+
+        def record_thread(path: Path) -> None:
+            threads.append(threading.current_thread().name)
+            path.write_bytes(b"data")
+
+        async def download(path: Path) -> None:
+            await asyncio.get_running_loop().run_in_executor(executor, record_thread, path)
+
+        try:
+            cache = S3ObjectCache(str(tmp_path / "cache"), max_bytes=1024, executor=executor)
+            await cache.fetch("b", "k", '"e1"', download)
+            await cache.put("b", "k2", '"e1"', source)
+            path = await cache.get("b", "k2", '"e1"')
+        finally:
+            executor.shutdown()
+
+        assert path is not None and path.read_bytes() == b"local"
+        assert threads and all(name.startswith("s3-transfer") for name in threads)
+
+    @pytest.mark.unit
+    async def test_discard_removes_entries(self, tmp_path):
+        """削除したオブジェクトのエントリはディスクからも消える"""
+        cache = S3ObjectCache(str(tmp_path), max_bytes=1024)
+        kept = await cache.fetch("b", "keep", '"e1"', _writer(b"keep"))
+        path = await cache.fetch("b", "gone", '"e1"', _writer(b"gone"))
+
+        await cache.discard("b", [("gone", '"e1"'), ("never-cached", '"e1"')])
+
+        assert not path.exists()
+        assert await cache.get("b", "gone", '"e1"') is None
+        assert await cache.get("b", "keep", '"e1"') == kept
+        assert cache._total_bytes == 4
+
+
+class TestSharedCacheDir:
+    """複数ワーカープロセスでのキャッシュディレクトリ共有のテスト"""
+
+    @pytest.mark.unit
+    async def test_entries_from_other_workers_are_used(self, tmp_path):
+        """他のワーカーが保存したエントリもS3から取得せずに使う"""
+        worker1 = S3ObjectCache(str(tmp_path), max_bytes=1024)
+        worker2 = S3ObjectCache(str(tmp_path), max_bytes=1024)
+        await worker2.get("b", "k", '"e1"')  # 読み込み済みにする
+        calls: list[Path] = []
+
+        await worker1.fetch("b", "k", '"e1"', _writer(b"shared", calls))
+        path = await worker2.fetch("b", "k", '"e1"', _writer(b"shared", calls))
+
+        assert path.read_bytes() == b"shared"
+        assert len(calls) == 1
+
+    @pytest.mark.unit
+    async def test_only_stale_tmp_files_are_removed(self, tmp_path):
+        """起動時に他ワーカーの書き込み中ファイルは残し、古い書きかけだけを削除する"""
+        other = tmp_path / "tmp" / "99999"
+        other.mkdir(parents=True)
+        writing = other / "writing"
+        writing.write_bytes(b"x")
+        stale = other / "stale"
+        stale.write_bytes(b"x")
+        old = time.time() - STALE_TMP_SECONDS - 1
+        os.utime(stale, (old, old))
+
+        cache = S3ObjectCache(str(tmp_path), max_bytes=1024)
+        await cache.get("b", "k", '"e1"')
+
+        assert writing.exists()
+        assert not stale.exists()
+
+    @pytest.mark.unit
+    async def test_eviction_accounts_for_other_workers(self, tmp_path):
+        """上限は共有ディレクトリ全体で判定し、更新時刻の古いエントリから削除する"""
+        worker1 = S3ObjectCache(str(tmp_path), max_bytes=10)
+        worker2 = S3ObjectCache(str(tmp_path), max_bytes=10)
+
+        first = await worker1.fetch("b", "a", '"e"', _writer(b"aaaa"))
+        old = time.time() - 10
+        os.utime(first, (old, old))
+        await worker2.fetch("b", "b", '"e"', _writer(b"bbbb"))
+        # 走査間隔が経過した後の保存（worker1 の見積もりだけでは上限内）
+        worker1._next_shared_scan = 0.0
+        await worker1.fetch("b", "c", '"e"', _writer(b"cccc"))
+
+        assert not first.exists()
+        assert await worker2.get("b", "b", '"e"') is not None
+        assert await worker2.get("b", "c", '"e"') is not None
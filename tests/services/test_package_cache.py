@@ -0,0 +1,354 @@
+"""
+パッケージキャッシュの単体テスト
+"""
+import asyncio
+import base64
+import hashlib
+import json
+import os
+import time
+
+import pytest
+
+from app.infrastructure.metrics import get_workspace_proxy_egress_throttled
+from app.services.proxy.credential_proxy import CredentialInjectionProxy, ProxyConfig
+from app.services.proxy.domain_whitelist import DomainWhitelist
+from app.services.proxy.egress import ContainerEgress
+from app.services.proxy.package_cache import CachedObject, PackageCache, PackageCacheError
+from app.services.proxy.sigv4 import AWSCredentials
+from app.services.proxy.upstream_pool import get_upstream_pool
+
+_WHEEL = b"wheel-bytes" * 100
+_WHEEL_DIGEST = hashlib.blake2b(_WHEEL, digest_size=32).hexdigest()
+_WHEEL_PATH = (
+    f"packages/{_WHEEL_DIGEST[:2]}/{_WHEEL_DIGEST[2:4]}/{_WHEEL_DIGEST[4:]}/demo-1.0-py3-none-any.whl"
+)
+_TARBALL = b"tarball-bytes" * 100
+_TARBALL_INTEGRITY = "sha512-" + base64.b64encode(hashlib.sha512(_TARBALL).digest()).decode()
+
+
+class _Registry:
+    """PyPI / files.pythonhosted.org / npm を模した上流サーバー"""
+
+    def __init__(self) -> None:
+        self.base_url = ""
+        self.hits: dict[str, int] = {}
+        self.fail = False
+        self.tarball = _TARBALL
+
+    def routes(self) -> dict[str, tuple[str, bytes]]:
+        files_url = f"{self.base_url}/files/"
+        return {
+            "/simple/demo/": (
+                "text/html",
+                f'<a href="{files_url}{_WHEEL_PATH}">demo-1.0</a>'.encode(),
+            ),
+            f"/files/{_WHEEL_PATH}": ("application/octet-stream", _WHEEL),
+            "/files/packages/00/11/" + "0" * 60 + "/bad.whl": (
+                "application/octet-stream",
+                b"tampered",
+            ),
+            "/npm/left-pad": (
+                "application/json",
+                json.dumps(
+                    {
+                        "name": "left-pad",
+                        "versions": {
+                            "1.3.0": {
+                                "dist": {
+                                    "tarball": f"{self.base_url}/npm/left-pad/-/left-pad-1.3.0.tgz",
+                                    "integrity": _TARBALL_INTEGRITY,
+                                }
+                            }
+                        },
+                    }
+                ).encode(),
+            ),
+            "/npm/left-pad/-/left-pad-1.3.0.tgz": ("application/octet-stream", self.tarball),
+        }
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        path = (await reader.readline()).decode().split(" ")[1]
+        while (await reader.readline()) not in (b"\r\n", b""):
+            pass
+        self.hits[path] = self.hits.get(path, 0) + 1
+        route = self.routes().get(path)
+        if self.fail:
+            writer.write(b"HTTP/1.1 503 Service Unavailable\r\nContent-Length: 0\r\n\r\n")
+        elif route is None:
+            writer.write(b"HTTP/1.1 404 Not Found\r\nContent-Length: 0\r\n\r\n")
+        else:
+            content_type, body = route
+            writer.write(
+                f"HTTP/1.1 200 OK\r\nContent-Type: {content_type}\r\n"
+                f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode()
+                + body
+            )
+        await writer.drain()
+        writer.close()
+
+
+@pytest.fixture
+async def registry():
+    registry = _Registry()
+    server = await asyncio.start_server(registry.handle, "127.0.0.1", 0)
+    registry.base_url = f"http://127.0.0.1:{server.sockets[0].getsockname()[1]}"
+    yield registry
+    server.close()
+    await server.wait_closed()
+    # 共有クライアントはイベントループに紐づくため、テストごとに閉じる
+    await get_upstream_pool().close()
+
+
+def _cache(registry: _Registry, tmp_path, **kwargs) -> PackageCache:
+    options = {"max_bytes": 1024 * 1024, "metadata_ttl": 600.0}
+    options.update(kwargs)
+    return PackageCache(
+        root_dir=str(tmp_path / "cache"),
+        pypi_index_url=f"{registry.base_url}/simple/",
+        pypi_files_url=f"{registry.base_url}/files/",
+        npm_registry_url=f"{registry.base_url}/npm/",
+        **options,
+    )
+
+
+def _read(cache: PackageCache, obj: CachedObject) -> bytes:
+    """キャッシュが開いたファイルから読み出して解放"""
+    try:
+        return obj.file.read()
+    finally:
+        cache.release(obj)
+
+
+class TestPackageCache:
+    """ディスクキャッシュ・チェックサム検証・容量管理のテスト"""
+
+    @pytest.mark.unit
+    async def test_pypi_index_is_rewritten_and_cached(self, registry, tmp_path):
+        """インデックスの配布ファイルURLはキャッシュ経由に書き換えられ、2回目は上流に問い合わせない"""
+        cache = _cache(registry, tmp_path)
+
+        first = await cache.get("pypi/simple/demo/", accept="text/html")
+        second = await cache.get("pypi/simple/demo/", accept="text/html")
+
+        body = _read(cache, first)
+        assert f"http://127.0.0.1:8080/pkg/pypi/files/{_WHEEL_PATH}".encode() in body
+        assert second.path == first.path
+        assert _read(cache, second) == body
+        assert registry.hits["/simple/demo/"] == 1
+
+    @pytest.mark.unit
+    async def test_pypi_file_checksum_is_verified(self, registry, tmp_path):
+        """配布ファイルはパス中の BLAKE2b-256 と一致したものだけ保存する"""
+        cache = _cache(registry, tmp_path)
+
+        obj = await asyncio.gather(
+            cache.get(f"pypi/files/{_WHEEL_PATH}", accept=""),
+            cache.get(f"pypi/files/{_WHEEL_PATH}", accept=""),
+        )
+        assert [_read(cache, o) for o in obj] == [_WHEEL, _WHEEL]
+        assert registry.hits[f"/files/{_WHEEL_PATH}"] == 1
+
+        with pytest.raises(PackageCacheError) as exc_info:
+            await cache.get("pypi/files/packages/00/11/" + "0" * 60 + "/bad.whl", accept="")
+        assert exc_info.value.status == 502
+        assert len(cache._entries) == 1
+
+    @pytest.mark.unit
+    async def test_npm_tarball_is_verified_against_packument_integrity(self, registry, tmp_path):
+        """tarball はメタデータの integrity で検証され、改ざんされたものは拒否する"""
+        cache = _cache(registry, tmp_path)
+
+        meta = await cache.get("npm/left-pad", accept="application/json")
+        tarball = json.loads(_read(cache, meta))["versions"]["1.3.0"]["dist"]["tarball"]
+        assert tarball == "http://127.0.0.1:8080/pkg/npm/left-pad/-/left-pad-1.3.0.tgz"
+
+        registry.tarball = b"tampered"
+        with pytest.raises(PackageCacheError):
+            await cache.get("npm/left-pad/-/left-pad-1.3.0.tgz", accept="")
+
+        registry.tarball = _TARBALL
+        obj = await cache.get("npm/left-pad/-/left-pad-1.3.0.tgz", accept="")
+        assert _read(cache, obj) == _TARBALL
+
+    @pytest.mark.unit
+    async def test_least_recently_used_entries_are_evicted(self, registry, tmp_path):
+        """容量上限を超えると最後の参照が古いエントリから削除する"""
+        cache = _cache(registry, tmp_path, max_bytes=len(_WHEEL) + len(_TARBALL) + 100)
+        _read(cache, await cache.get("npm/left-pad", accept=""))
+        _read(cache, await cache.get(f"pypi/files/{_WHEEL_PATH}", accept=""))
+        _read(cache, await cache.get("npm/left-pad/-/left-pad-1.3.0.tgz", accept=""))
+
+        # npm メタデータが最も古いため削除され、再取得になる
+        _read(cache, await cache.get(f"pypi/files/{_WHEEL_PATH}", accept=""))
+        assert cache._total_bytes <= cache._max_bytes
+        _read(cache, await cache.get("npm/left-pad", accept=""))
+        assert registry.hits["/npm/left-pad"] == 2
+        assert registry.hits[f"/files/{_WHEEL_PATH}"] == 1
+
+    @pytest.mark.unit
+    async def test_entries_survive_restart(self, registry, tmp_path):
+        """再起動後もディスク上のエントリを引き継ぐ"""
+        cache = _cache(registry, tmp_path)
+        _read(cache, await cache.get(f"pypi/files/{_WHEEL_PATH}", accept=""))
+
+        restarted = _cache(registry, tmp_path)
+        obj = await restarted.get(f"pypi/files/{_WHEEL_PATH}", accept="")
+
+        assert obj.size == len(_WHEEL)
+        assert _read(restarted, obj) == _WHEEL
+        assert registry.hits[f"/files/{_WHEEL_PATH}"] == 1
+
+    @pytest.mark.unit
+    async def test_stale_metadata_is_served_when_upstream_fails(self, registry, tmp_path):
+        """期限切れのメタデータは上流障害時にそのまま返す"""
+        cache = _cache(registry, tmp_path, metadata_ttl=0.0)
+        _read(cache, await cache.get("pypi/simple/demo/", accept=""))
+
+        registry.fail = True
+        obj = await cache.get("pypi/simple/demo/", accept="")
+
+        assert b"demo-1.0" in _read(cache, obj)
+        assert registry.hits["/simple/demo/"] == 2
+
+    @pytest.mark.unit
+    async def test_open_file_survives_eviction(self, registry, tmp_path):
+        """返したファイルは送信前に追い出し・置き換えでパスが削除されても読み出せる"""
+        cache = _cache(registry, tmp_path)
+        obj = await cache.get(f"pypi/files/{_WHEEL_PATH}", accept="")
+
+        obj.path.unlink()
+
+        assert _read(cache, obj) == _WHEEL
+
+    @pytest.mark.unit
+    async def test_npm_integrity_is_restored_after_restart(self, registry, tmp_path):
+        """再起動後も、ディスク上のメタデータの integrity で tarball を検証する"""
+        cache = _cache(registry, tmp_path)
+        _read(cache, await cache.get("npm/left-pad", accept="application/json"))
+
+        restarted = _cache(registry, tmp_path)
+        registry.tarball = b"tampered"
+        with pytest.raises(PackageCacheError) as exc_info:
+            await restarted.get("npm/left-pad/-/left-pad-1.3.0.tgz", accept="")
+        assert exc_info.value.status == 502
+
+        registry.tarball = _TARBALL
+        obj = await restarted.get("npm/left-pad/-/left-pad-1.3.0.tgz", accept="")
+        assert _read(restarted, obj) == _TARBALL
+        assert registry.hits["/npm/left-pad"] == 1
+
+    @pytest.mark.unit
+    async def test_only_stale_tmp_files_are_removed(self, registry, tmp_path):
+        """起動時は他プロセスの書き込み中ファイルを残し、古い書きかけだけを削除する"""
+        other_worker = tmp_path / "cache" / "tmp" / "99999"
+        other_worker.mkdir(parents=True)
+        writing = other_worker / "writing"
+        writing.write_bytes(b"partial")
+        leftover = other_worker / "leftover"
+        leftover.write_bytes(b"partial")
+        an_hour_ago = time.time() - 3600
+        os.utime(leftover, (an_hour_ago, an_hour_ago))
+
+        await _cache(registry, tmp_path)._ensure_loaded()
+
+        assert writing.exists()
+        assert not leftover.exists()
+
+    @pytest.mark.unit
+    async def test_eviction_accounts_for_other_workers(self, registry, tmp_path):
+        """同じディレクトリを共有する他ワーカーのエントリを含めて容量上限を守る"""
+        max_bytes = len(_WHEEL) + len(_TARBALL) - 1
+        first = _cache(registry, tmp_path, max_bytes=max_bytes)
+        second = _cache(registry, tmp_path, max_bytes=max_bytes)
+        _read(first, await first.get(f"pypi/files/{_WHEEL_PATH}", accept=""))
+        _read(second, await second.get("npm/left-pad", accept=""))
+        _read(second, await second.get("npm/left-pad/-/left-pad-1.3.0.tgz", accept=""))
+
+        on_disk = [
+            f.stat().st_size
+            for d in (tmp_path / "cache").iterdir()
+            if d.is_dir() and d.name != "tmp"
+            for f in d.iterdir()
+        ]
+        assert sum(on_disk) <= max_bytes
+        # 最も古い参照（first が取得した配布ファイル）から削除される
+        _read(first, await first.get(f"pypi/files/{_WHEEL_PATH}", accept=""))
+        assert registry.hits[f"/files/{_WHEEL_PATH}"] == 2
+
+    @pytest.mark.unit
+    @pytest.mark.parametrize("path", ["pypi/files/../../etc/passwd", "npm/a?b", "other/x"])
+    async def test_invalid_paths_are_rejected(self, registry, tmp_path, path):
+        """ディレクトリ遡り・クエリ・未知のエコシステムは上流に問い合わせず拒否する"""
+        with pytest.raises(PackageCacheError):
+            await _cache(registry, tmp_path).get(path, accept="")
+        assert registry.hits == {}
+
+
+class TestProxyPackageCache:
+    """Proxy経由でのパッケージキャッシュ応答のテスト"""
+
+    @pytest.mark.unit
+    async def test_served_through_proxy(self, registry, tmp_path):
+        """/pkg/ へのリクエストにキャッシュから応答し、上流ドメインにはホワイトリストを適用する"""
+        config = ProxyConfig(
+            whitelist_domains=["127.0.0.1"],
+            aws_credentials=AWSCredentials("test", "test"),
+            log_all_requests=False,
+            package_cache=_cache(registry, tmp_path),
+        )
+        proxy = CredentialInjectionProxy(config, str(tmp_path / "proxy.sock"))
+        await proxy.start()
+        try:
+            reader, writer = await asyncio.open_unix_connection(proxy.socket_path)
+            for _ in range(2):
+                writer.write(f"GET /pkg/pypi/files/{_WHEEL_PATH} HTTP/1.1\r\n\r\n".encode())
+                await writer.drain()
+                assert await reader.readline() == b"HTTP/1.1 200 OK\r\n"
+                assert await reader.readuntil(b"\r\n\r\n")
+                assert await reader.readexactly(len(_WHEEL)) == _WHEEL
+            writer.close()
+
+            proxy.update_whitelist(DomainWhitelist([]))
+            reader, writer = await asyncio.open_unix_connection(proxy.socket_path)
+            writer.write(b"GET /pkg/npm/left-pad HTTP/1.1\r\n\r\n")
+            await writer.drain()
+            assert (await reader.readline()).startswith(b"HTTP/1.1 403")
+            writer.close()
+        finally:
+            await proxy.stop()
+
+        assert registry.hits[f"/files/{_WHEEL_PATH}"] == 1
+        assert "/npm/left-pad" not in registry.hits
+
+    @pytest.mark.unit
+    async def test_transfers_are_metered_and_shaped(self, registry, tmp_path):
+        """上流からの取得とキャッシュからの送信を経路 package として記録し、帯域制限を適用する"""
+        egress = ContainerEgress("ws-1", rate=2000)
+        config = ProxyConfig(
+            whitelist_domains=["127.0.0.1"],
+            aws_credentials=AWSCredentials("test", "test"),
+            log_all_requests=False,
+            package_cache=_cache(registry, tmp_path),
+            egress=egress,
+        )
+        proxy = CredentialInjectionProxy(config, str(tmp_path / "proxy.sock"))
+        await proxy.start()
+        proxy.update_tenant("t-pkg")
+        throttled = get_workspace_proxy_egress_throttled()
+        throttled_before = throttled.get(tenant_id="t-pkg")
+        try:
+            reader, writer = await asyncio.open_unix_connection(proxy.socket_path)
+            for _ in range(2):
+                writer.write(f"GET /pkg/pypi/files/{_WHEEL_PATH} HTTP/1.1\r\n\r\n".encode())
+                await writer.drain()
+                await reader.readuntil(b"\r\n\r\n")
+                assert await reader.readexactly(len(_WHEEL)) == _WHEEL
+            writer.close()
+        finally:
+            await proxy.stop()
+
+        # 1回目は上流からの取得時、2回目（キャッシュヒット）は送信時に記録する
+        assert registry.hits[f"/files/{_WHEEL_PATH}"] == 1
+        assert egress.usage.bytes_down == {"package": 2 * len(_WHEEL)}
+        assert throttled.get(tenant_id="t-pkg") > throttled_before
@@ -0,0 +1,139 @@
+"""
+実行フェーズ計測と前処理パイプラインの単体テスト
+"""
+import asyncio
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from app.infrastructure.metrics import get_execution_phase_duration
+from app.services.execute_service import ExecuteService
+from app.utils.phase_timer import PhaseTimer
+from app.utils.streaming import SequenceCounter
+
+
+def _service() -> ExecuteService:
+    """DB・コンテナに依存しない部分だけを使うため初期化を省略して生成"""
+    return ExecuteService.__new__(ExecuteService)
+
+
+def _request(workspace_enabled: bool = True) -> SimpleNamespace:
+    return SimpleNamespace(
+        tenant_id="t1", conversation_id="c1", workspace_enabled=workspace_enabled
+    )
+
+
+class TestPhaseTimer:
+    """フェーズ別所要時間の計測のテスト"""
+
+    @pytest.mark.unit
+    async def test_concurrent_phases_record_their_own_wall_time(self):
+        """並行実行したフェーズはそれぞれの壁時計時間を記録し、メトリクスにも反映する"""
+        timer = PhaseTimer()
+        histogram = get_execution_phase_duration()
+        before = histogram._totals.get(("timer_fast",), 0)
+
+        await asyncio.gather(
+            timer.measure("timer_fast", asyncio.sleep(0.01)),
+            timer.measure("timer_slow", asyncio.sleep(0.05)),
+        )
+
+        timings = timer.as_dict()
+        assert 5 <= timings["timer_fast"] < 45
+        assert timings["timer_slow"] >= 45
+        assert histogram._totals.get(("timer_fast",), 0) - before == 1
+
+    @pytest.mark.unit
+    async def test_failed_phase_is_recorded(self):
+        """例外で終わったフェーズも所要時間を記録する"""
+        timer = PhaseTimer()
+
+        async def fail():
+            raise RuntimeError("boom")
+
+        with pytest.raises(RuntimeError):
+            await timer.measure("timer_fail", fail())
+        assert "timer_fail" in timer.as_dict()
+
+
+class TestPreExecutionPipeline:
+    """前処理フェーズの並行実行のテスト"""
+
+    @pytest.mark.unit
+    async def test_skills_are_synced_after_workspace_files(self):
+        """スキルはS3からのファイル同期の完了後に書き込み、両フェーズを計測する"""
+        service = _service()
+        order = []
+
+        async def sync_files(request, container_info):
+            await asyncio.sleep(0.01)
+            order.append("file_sync")
+
+        async def sync_skills(tenant_id, container_id):
+            order.append("skills_sync")
+            return True
+
+        service._sync_files_to_container = sync_files
+        service._sync_skills_to_container = sync_skills
+        timer = PhaseTimer()
+
+        synced = await service._sync_workspace_and_skills(
+            _request(), SimpleNamespace(id="ws-1"), timer
+        )
+
+        assert synced is True
+        assert order == ["file_sync", "skills_sync"]
+        assert set(timer.as_dict()) == {"file_sync", "skills_sync"}
+
+    @pytest.mark.unit
+    async def test_db_state_runs_concurrently_with_container(self):
+        """DB段は内部では逐次実行し、コンテナ取得とは並行して進む"""
+        service = _service()
+        order = []
+
+        async def save_user_message(request):
+            order.append("user_message")
+
+        async def get_conversation(conversation_id, tenant_id):
+            order.append("conversation_fetch")
+            return "conversation"
+
+        async def build_mcp(request):
+            order.append("mcp_config")
+            return ["mcp"]
+
+        async def get_container():
+            await asyncio.sleep(0.05)
+            order.append("container")
+            return "container-info"
+
+        service._save_user_message = save_user_message
+        service.conversation_service = SimpleNamespace(
+            get_conversation_by_id=get_conversation
+        )
+        service._build_mcp_server_configs = build_mcp
+        timer = PhaseTimer()
+
+        started = time.perf_counter()
+        container, state = await asyncio.gather(
+            timer.measure("container", get_container()),
+            service._load_execution_state(_request(), timer),
+        )
+
+        assert time.perf_counter() - started < 0.09
+        assert container == "container-info"
+        assert state == ("conversation", ["mcp"])
+        assert order == ["user_message", "conversation_fetch", "mcp_config", "container"]
+
+    @pytest.mark.unit
+    def test_error_done_carries_completed_timings(self):
+        """エラー時のdoneイベントにも完了済みフェーズの所要時間を含める"""
+        timer = PhaseTimer()
+        timer.record("context_check", 0.012)
+
+        event = _service()._error_done(time.time(), SequenceCounter(), timer)
+
+        assert event["event"] == "done"
+        assert event["data"]["status"] == "error"
+        assert event["data"]["timings"] == {"context_check": 12}
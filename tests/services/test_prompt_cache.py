@@ -0,0 +1,111 @@
+"""
+プロンプトキャッシュのチェックポイント注入の単体テスト
+"""
+import json
+
+import pytest
+
+from app.services.proxy.prompt_cache import inject_cache_checkpoints
+
+_LONG = "x" * 5000
+_INVOKE = "/model/us.anthropic.claude-sonnet-4-20250514-v1%3A0/invoke-with-response-stream"
+_CONVERSE = "/model/us.anthropic.claude-sonnet-4-20250514-v1%3A0/converse"
+
+
+def _tool(name: str, description: str = _LONG) -> dict:
+    return {"name": name, "description": description, "input_schema": {"type": "object"}}
+
+
+def _inject(path: str, request: dict) -> tuple[dict, list[str]]:
+    body, added = inject_cache_checkpoints(path, json.dumps(request).encode())
+    return json.loads(body), added
+
+
+class TestInvokeCheckpoints:
+    """InvokeModel（Anthropic Messages 形式）への注入テスト"""
+
+    @pytest.mark.unit
+    def test_checkpoints_at_end_of_tools_and_system(self):
+        """ツール定義とシステムプロンプトの末尾に cache_control を追加する"""
+        request, added = _inject(
+            _INVOKE,
+            {
+                "anthropic_version": "bedrock-2023-05-31",
+                "system": _LONG,
+                "tools": [_tool("a"), _tool("b")],
+                "messages": [{"role": "user", "content": "hi"}],
+            },
+        )
+
+        assert added == ["tools", "system"]
+        assert "cache_control" not in request["tools"][0]
+        assert request["tools"][1]["cache_control"] == {"type": "ephemeral"}
+        assert request["system"] == [
+            {"type": "text", "text": _LONG, "cache_control": {"type": "ephemeral"}}
+        ]
+        assert request["messages"] == [{"role": "user", "content": "hi"}]
+
+    @pytest.mark.unit
+    def test_short_tools_are_cached_together_with_system(self):
+        """単独では短いツール定義には置かず、システムプロンプト末尾でまとめてキャッシュする"""
+        request, added = _inject(
+            _INVOKE,
+            {
+                "system": [{"type": "text", "text": _LONG}],
+                "tools": [_tool("a", description="short")],
+                "messages": [],
+            },
+        )
+
+        assert added == ["system"]
+        assert "cache_control" not in request["tools"][0]
+
+    @pytest.mark.unit
+    def test_client_checkpoints_and_limit_are_respected(self):
+        """クライアントが置いた区間は変更せず、合計4個を超えない"""
+        marked = {"type": "text", "text": "m", "cache_control": {"type": "ephemeral"}}
+        request = {
+            "system": [{"type": "text", "text": _LONG, "cache_control": {"type": "ephemeral"}}],
+            "tools": [_tool("a")],
+            "messages": [{"role": "user", "content": [marked, marked, marked]}],
+        }
+
+        body, added = inject_cache_checkpoints(_INVOKE, json.dumps(request).encode())
+
+        assert added == []
+        assert json.loads(body) == request
+
+    @pytest.mark.unit
+    @pytest.mark.parametrize(
+        ("path", "body"),
+        [
+            ("/model/m/invoke", b"not json"),
+            ("/model/m/invoke", b'{"prompt": "legacy"}'),
+            ("/model/m/invoke", json.dumps({"system": _LONG, "messages": ["x"]}).encode()),
+            ("/model/m/count-tokens", json.dumps({"system": _LONG, "messages": []}).encode()),
+        ],
+    )
+    def test_unsupported_bodies_pass_through(self, path, body):
+        """解析できない・対象外のボディはそのまま返す"""
+        assert inject_cache_checkpoints(path, body) == (body, [])
+
+
+class TestConverseCheckpoints:
+    """Converse 形式への注入テスト"""
+
+    @pytest.mark.unit
+    def test_cache_point_blocks_are_appended(self):
+        """system と toolConfig.tools の末尾に cachePoint ブロックを追加する"""
+        spec = {"toolSpec": {"name": "a", "description": _LONG, "inputSchema": {"json": {}}}}
+        request, added = _inject(
+            _CONVERSE,
+            {
+                "system": [{"text": _LONG}],
+                "toolConfig": {"tools": [spec]},
+                "messages": [{"role": "user", "content": [{"text": "hi"}]}],
+            },
+        )
+
+        assert added == ["tools", "system"]
+        assert request["toolConfig"]["tools"] == [spec, {"cachePoint": {"type": "default"}}]
+        assert request["system"] == [{"text": _LONG}, {"cachePoint": {"type": "default"}}]
@@ -0,0 +1,190 @@
+"""
+Bedrock リージョンルーティングの単体テスト
+"""
+import asyncio
+from contextlib import asynccontextmanager
+
+import httpx
+import pytest
+
+from app.services.proxy.credential_proxy import CredentialInjectionProxy, ProxyConfig
+from app.services.proxy.region_router import BedrockRegionRouter
+from app.services.proxy.sigv4 import AWSCredentials
+
+_REGIONS = ["us-east-1", "us-west-2", "ap-northeast-1"]
+
+
+class TestBedrockRegionRouter:
+    """候補順・降格・モデル別許可リージョンのテスト"""
+
+    @pytest.mark.unit
+    def test_primary_region_first_until_it_fails(self):
+        """健全な間は設定順を維持し、スロットリングしたリージョンは後ろに回す"""
+        router = BedrockRegionRouter(_REGIONS, cooldown_seconds=60)
+        assert router.candidates("anthropic.claude") == _REGIONS
+
+        router.record("us-east-1", 0.5, 429)
+
+        assert router.candidates("anthropic.claude") == [
+            "us-west-2",
+            "ap-northeast-1",
+            "us-east-1",
+        ]
+
+    @pytest.mark.unit
+    def test_only_markedly_slower_regions_are_demoted(self):
+        """レイテンシが最良の slow_factor 倍以内なら設定順、超えると後ろに回す"""
+        router = BedrockRegionRouter(_REGIONS, slow_factor=2.0)
+        router.record("us-east-1", 0.6, 200)
+        router.record("us-west-2", 0.4, 200)
+        router.record("ap-northeast-1", 0.3, 200)
+        assert router.candidates("anthropic.claude") == _REGIONS
+
+        for _ in range(10):
+            router.record("us-east-1", 3.0, 200)
+
+        assert router.candidates("anthropic.claude") == [
+            "us-west-2",
+            "ap-northeast-1",
+            "us-east-1",
+        ]
+
+    @pytest.mark.unit
+    def test_latency_is_compared_within_size_class(self):
+        """大きいプロンプトの遅い応答で、小さいリクエストの順位を下げない"""
+        router = BedrockRegionRouter(_REGIONS, slow_factor=2.0)
+        router.record("us-west-2", 0.4, 200, request_bytes=500)
+        router.record("ap-northeast-1", 0.4, 200, request_bytes=500)
+        for _ in range(10):
+            router.record("us-east-1", 3.0, 200, request_bytes=400_000)
+        router.record("us-east-1", 0.5, 200, request_bytes=500)
+
+        assert router.candidates("anthropic.claude", request_bytes=500) == _REGIONS
+        # 同じサイズ区分の比較では他リージョンに計測がないため順位を維持する
+        assert router.candidates("anthropic.claude", request_bytes=400_000) == _REGIONS
+
+        for region in ("us-west-2", "ap-northeast-1"):
+            router.record(region, 1.0, 200, request_bytes=400_000)
+
+        assert router.candidates("anthropic.claude", request_bytes=400_000) == [
+            "us-west-2",
+            "ap-northeast-1",
+            "us-east-1",
+        ]
+
+    @pytest.mark.unit
+    @pytest.mark.parametrize(
+        ("model_id", "expected"),
+        [
+            ("us.anthropic.claude-sonnet-4-20250514-v1:0", ["us-east-1", "us-west-2"]),
+            ("apac.anthropic.claude-sonnet-4-20250514-v1:0", ["ap-northeast-1"]),
+            ("eu.anthropic.claude-sonnet-4-20250514-v1:0", ["us-east-1"]),
+            ("anthropic.claude-3-5-haiku-20241022-v1:0", ["us-west-2"]),
+            ("arn:aws:bedrock:us-west-2:123456789012:inference-profile/x", ["us-west-2"]),
+            ("arn:aws:bedrock:eu-west-1:123456789012:inference-profile/x", []),
+            ("anthropic.claude-3-haiku-20240307-v1:0", _REGIONS),
+        ],
+    )
+    def test_allowed_regions(self, model_id, expected):
+        """明示的な許可リスト → ARN → 推論プロファイルの地域の順に絞り込み、該当なしは主リージョン（ARN は転送不可）"""
+        router = BedrockRegionRouter(
+            _REGIONS,
+            model_regions={"anthropic.claude-3-5-haiku-20241022-v1:0": ["us-west-2", "eu-west-1"]},
+        )
+
+        assert router.allowed_regions(model_id) == expected
+
+
+class _FakeBedrock:
+    """リージョンごとに固定のステータスを返す上流"""
+
+    def __init__(self, statuses: dict[str, int]) -> None:
+        self.statuses = statuses
+        self.hosts: list[str] = []
+
+    @asynccontextmanager
+    async def stream(self, method, url, headers, content):
+        host = httpx.URL(url).host
+        self.hosts.append(host)
+        region = host.split(".")[1]
+        status = self.statuses[region]
+        body = f'{{"region": "{region}"}}'.encode()
+        yield httpx.Response(
+            status, headers={"Content-Length": str(len(body))}, stream=httpx.ByteStream(body)
+        )
+
+
+class TestProxyRegionFailover:
+    """Proxy でのレスポンス送信前のフェイルオーバーテスト"""
+
+    @staticmethod
+    async def _invoke(tmp_path, statuses: dict[str, int]) -> tuple[bytes, _FakeBedrock]:
+        config = ProxyConfig(
+            whitelist_domains=[],
+            aws_credentials=AWSCredentials("test", "test", region="us-east-1"),
+            log_all_requests=False,
+            region_router=BedrockRegionRouter(["us-east-1", "us-west-2"]),
+        )
+        proxy = CredentialInjectionProxy(config, str(tmp_path / "proxy.sock"))
+        await proxy.start()
+        upstream = proxy._upstream = _FakeBedrock(statuses)
+        try:
+            reader, writer = await asyncio.open_unix_connection(proxy.socket_path)
+            writer.write(
+                b"POST /model/us.anthropic.claude/invoke HTTP/1.1\r\n"
+                b"Content-Length: 2\r\nConnection: close\r\n\r\n{}"
+            )
+            await writer.drain()
+            response = await reader.read()
+            writer.close()
+        finally:
+            await proxy.stop()
+        return response, upstream
+
+    @pytest.mark.unit
+    async def test_throttled_region_fails_over_before_streaming(self, tmp_path):
+        """主リージョンが 429 の場合、クライアントには次のリージョンの応答だけを返す"""
+        response, upstream = await self._invoke(tmp_path, {"us-east-1": 429, "us-west-2": 200})
+
+        assert upstream.hosts == [
+            "bedrock-runtime.us-east-1.amazonaws.com",
+            "bedrock-runtime.us-west-2.amazonaws.com",
+        ]
+        assert response.startswith(b"HTTP/1.1 200 ")
+        assert response.endswith(b'{"region": "us-west-2"}')
+
+    @pytest.mark.unit
+    async def test_arn_outside_configured_regions_is_rejected(self, tmp_path):
+        """設定にないリージョンの ARN は主リージョンに転送せず 403 を返す"""
+        config = ProxyConfig(
+            whitelist_domains=[],
+            aws_credentials=AWSCredentials("test", "test", region="us-east-1"),
+            log_all_requests=False,
+            region_router=BedrockRegionRouter(["us-east-1", "us-west-2"]),
+        )
+        proxy = CredentialInjectionProxy(config, str(tmp_path / "proxy.sock"))
+        await proxy.start()
+        upstream = proxy._upstream = _FakeBedrock({"us-east-1": 200, "us-west-2": 200})
+        try:
+            reader, writer = await asyncio.open_unix_connection(proxy.socket_path)
+            writer.write(
+                b"POST /model/arn%3Aaws%3Abedrock%3Aeu-west-1%3A123456789012"
+                b"%3Ainference-profile%2Fx/invoke HTTP/1.1\r\n"
+                b"Content-Length: 2\r\nConnection: close\r\n\r\n{}"
+            )
+            await writer.drain()
+            response = await reader.read()
+            writer.close()
+        finally:
+            await proxy.stop()
+
+        assert response.startswith(b"HTTP/1.1 403 ")
+        assert upstream.hosts == []
+
+    @pytest.mark.unit
+    async def test_last_region_response_is_relayed_as_is(self, tmp_path):
+        """全リージョンが失敗した場合は最後のリージョンの応答をそのまま返す"""
+        response, upstream = await self._invoke(tmp_path, {"us-east-1": 429, "us-west-2": 503})
+
+        assert len(upstream.hosts) == 2
+        assert response.startswith(b"HTTP/1.1 503 ")
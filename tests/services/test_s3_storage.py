@@ -0,0 +1,359 @@
+"""
+S3ストレージバックエンドの単体テスト
+
+boto3 クライアントの呼び出しを差し替え、専用スレッドプールと操作別の同時実行数制限を確認する。
+"""
+import asyncio
+import hashlib
+import os
+import tempfile
+import threading
+import time
+
+import boto3
+import pytest
+from boto3.s3.transfer import TransferConfig
+from botocore.config import Config
+from moto import mock_aws
+
+from app.infrastructure.metrics import (
+    get_s3_object_cache_requests,
+    get_s3_operation_duration,
+    get_s3_transfer_bytes,
+)
+from app.services.workspace.object_cache import S3ObjectCache
+from app.services.workspace.s3_storage import (
+    S3StorageBackend,
+    SYNC_BATCH_MAX_FILES,
+    _SyncItem,
+    close_s3_storage,
+    get_s3_storage,
+)
+
+
+@pytest.fixture
+def backend():
+    backend = S3StorageBackend()
+    # キャッシュを使うテストは tmp_path のキャッシュを明示的に設定する
+    backend._cache = None
+    yield backend
+    backend.close()
+
+
+class TestS3StorageExecutor:
+    """S3専用スレッドプールのテスト"""
+
+    @pytest.mark.unit
+    async def test_calls_run_on_dedicated_executor(self, backend):
+        """boto3 呼び出しは既定のスレッドプールではなく S3 専用スレッドで実行する"""
+        threads = []
+
+        def delete_object(**kwargs):
+            threads.append(threading.current_thread().name)
+
+        backend.client.delete_object = delete_object
+
+        assert await backend.delete("t1", "s1", "a.txt") is True
+        assert threads[0].startswith("s3-transfer")
+
+    @pytest.mark.unit
+    async def test_operation_concurrency_is_limited(self, backend):
+        """操作別の上限を超える呼び出しは待機し、所要時間を操作ごとに記録する"""
+        backend._concurrency = {"delete": 2}
+        active = 0
+        peak = 0
+        lock = threading.Lock()
+
+        def delete_object(**kwargs):
+            nonlocal active, peak
+            with lock:
+                active += 1
+                peak = max(peak, active)
+            time.sleep(0.05)
+            with lock:
+                active -= 1
+
+        backend.client.delete_object = delete_object
+        histogram = get_s3_operation_duration()
+        key = ("delete",)
+        before = histogram._totals.get(key, 0)
+
+        await asyncio.gather(*(backend.delete("t1", "s1", f"{i}.txt") for i in range(6)))
+
+        assert peak == 2
+        assert histogram._totals.get(key, 0) - before == 6
+
+    @pytest.mark.unit
+    def test_instance_is_shared(self):
+        """get_s3_storage はプロセス内で同じインスタンスを返す"""
+        try:
+            assert get_s3_storage() is get_s3_storage()
+        finally:
+            close_s3_storage()
+
+
+class TestS3PrefixDelete:
+    """DeleteObjects による一括削除のテスト"""
+
+    @staticmethod
+    def _stub_listing(backend, count: int) -> None:
+        prefix = backend.get_prefix("t1", "s1")
+
+        class _Paginator:
+            def paginate(self, **kwargs):
+                for start in range(0, count, 1000):
+                    yield {
+                        "Contents": [
+                            {"Key": f"{prefix}f{i}.txt", "Size": 1, "LastModified": None}
+                            for i in range(start, min(start + 1000, count))
+                        ]
+                    }
+
+        backend.client.get_paginator = lambda name: _Paginator()
+
+    @pytest.mark.unit
+    async def test_keys_are_deleted_in_batches_of_1000(self, backend):
+        """1000件ずつの DeleteObjects を並行実行し、全件を削除する"""
+        self._stub_listing(backend, 2500)
+        batches = []
+
+        def delete_objects(Bucket, Delete):
+            batches.append(len(Delete["Objects"]))
+            return {}
+
+        backend.client.delete_objects = delete_objects
+
+        assert await backend.delete_prefix("t1", "s1") == 2500
+        assert sorted(batches) == [500, 1000, 1000]
+
+    @pytest.mark.unit
+    async def test_partial_failure_raises_after_all_batches(self, backend):
+        """一部のキーを削除できなかった場合は、全バッチの完了後に例外を送出する"""
+        self._stub_listing(backend, 1500)
+        calls = []
+
+        def delete_objects(Bucket, Delete):
+            calls.append(Delete["Objects"])
+            first = Delete["Objects"][0]["Key"]
+            return {"Errors": [{"Key": first, "Code": "AccessDenied", "Message": "denied"}]}
+
+        backend.client.delete_objects = delete_objects
+
+        with pytest.raises(RuntimeError):
+            await backend.delete_prefix("t1", "s1")
+        assert len(calls) == 2
+
+
+class TestS3WorkspaceSync:
+    """ワークスペース同期の並行転送のテスト"""
+
+    @pytest.fixture
+    def s3_backend(self, tmp_path):
+        with mock_aws():
+            boto3.client("s3", region_name="us-east-1").create_bucket(Bucket="sync-test")
+            backend = S3StorageBackend()
+            backend.bucket = "sync-test"
+            backend._cache = S3ObjectCache(str(tmp_path / "cache"), max_bytes=64 * 1024 * 1024)
+            # マルチパートの最小パートサイズ（5MB）で分割されるよう閾値を下げる
+            backend._sync_small_file_size = 1024
+            backend._transfer_config = TransferConfig(
+                multipart_threshold=5 * 1024 * 1024,
+                multipart_chunksize=5 * 1024 * 1024,
+                max_concurrency=4,
+            )
+            yield backend
+            backend.close()
+
+    @pytest.mark.unit
+    def test_small_files_are_batched(self, backend):
+        """小さいファイルは件数上限までまとめ、大きいファイルは単独で先に転送する"""
+        backend._sync_small_file_size = 100
+        items = [
+            _SyncItem(f"f{i}", f"k{i}", f"/tmp/f{i}", 10)
+            for i in range(SYNC_BATCH_MAX_FILES + 1)
+        ] + [_SyncItem("big", "kbig", "/tmp/big", 100)]
+
+        batches = backend._sync_batches(items)
+
+        assert [len(batch) for batch in batches] == [1, SYNC_BATCH_MAX_FILES, 1]
+        assert batches[0][0].file_path == "big"
+
+    @pytest.mark.unit
+    async def test_round_trip_with_multipart(self, s3_backend, tmp_path):
+        """小さいファイルと大きいファイルを並行転送し、転送バイト数を記録する"""
+        source = tmp_path / "src"
+        (source / "sub").mkdir(parents=True)
+        files = {f"sub/small{i}.txt": f"content {i}".encode() for i in range(40)}
+        files["large.bin"] = os.urandom(11 * 1024 * 1024)
+        for path, content in files.items():
+            (source / path).write_bytes(content)
+        counter = get_s3_transfer_bytes()
+        before = counter.get(operation="sync_from_local")
+
+        uploaded = await s3_backend.sync_from_local("t1", "s1", str(source))
+
+        assert sorted(uploaded) == sorted(files)
+        assert counter.get(operation="sync_from_local") - before == sum(
+            len(content) for content in files.values()
+        )
+        head = s3_backend.client.head_object(
+            Bucket="sync-test", Key=s3_backend.get_key("t1", "s1", "large.bin")
+        )
+        assert head["ETag"].endswith('-3"')
+
+        target = tmp_path / "dst"
+        downloaded = await s3_backend.sync_to_local("t1", "s1", str(target))
+
+        assert sorted(downloaded) == sorted(files)
+        for path, content in files.items():
+            assert (target / path).read_bytes() == content
+
+        # 2回目の同期はS3から取得せずキャッシュから復元する
+        s3_backend.client.get_object = None
+        again = await s3_backend.sync_to_local("t1", "s1", str(tmp_path / "again"))
+
+        assert sorted(again) == sorted(files)
+        assert (tmp_path / "again" / "large.bin").read_bytes() == files["large.bin"]
+
+    @pytest.mark.unit
+    async def test_download_reads_through_cache(self, s3_backend):
+        """同じ版は2回目以降キャッシュから返し、上書き後は新しい内容を取得する"""
+        await s3_backend.upload("t1", "s1", "a.txt", b"v1", "text/plain")
+        requests = get_s3_object_cache_requests()
+        hits_before = requests.get(result="hit")
+        get_object = s3_backend.client.get_object
+        gets = []
+
+        def counting_get_object(**kwargs):
+            gets.append(kwargs["Key"])
+            return get_object(**kwargs)
+
+        s3_backend.client.get_object = counting_get_object
+
+        assert await s3_backend.download("t1", "s1", "a.txt") == (b"v1", "text/plain")
+        assert await s3_backend.download("t1", "s1", "a.txt") == (b"v1", "text/plain")
+        streamed = b"".join([c async for c in s3_backend.download_stream("t1", "s1", "a.txt")])
+        assert streamed == b"v1"
+        assert len(gets) == 1
+        assert requests.get(result="hit") - hits_before == 2
+
+        await s3_backend.upload("t1", "s1", "a.txt", b"v2", "text/plain")
+        assert (await s3_backend.download("t1", "s1", "a.txt"))[0] == b"v2"
+
+        with pytest.raises(FileNotFoundError):
+            await s3_backend.download("t1", "s1", "missing.txt")
+
+    @pytest.mark.unit
+    async def test_delete_prefix_purges_cached_objects(self, s3_backend):
+        """プレフィックス削除でキャッシュ済みのエントリもディスクから削除する"""
+        await s3_backend.upload("t1", "s1", "a.txt", b"secret", "text/plain")
+        await s3_backend.upload("t1", "s2", "b.txt", b"other", "text/plain")
+        await s3_backend.download("t1", "s1", "a.txt")
+        await s3_backend.download("t1", "s2", "b.txt")
+        cache_root = s3_backend._cache._root
+
+        def cached_files() -> list[bytes]:
+            return sorted(
+                f.read_bytes()
+                for d in cache_root.iterdir()
+                if d.is_dir() and d.name != "tmp"
+                for f in d.iterdir()
+            )
+
+        assert cached_files() == [b"other", b"secret"]
+
+        assert await s3_backend.delete_prefix("t1", "s1") == 1
+
+        assert cached_files() == [b"other"]
+
+    @pytest.mark.unit
+    async def test_failure_is_raised_after_all_transfers(self, backend, tmp_path):
+        """1件の失敗で他の転送を中断せず、完了後に最初の例外を送出する"""
+        for i in range(3):
+            (tmp_path / f"f{i}.txt").write_bytes(b"x")
+        uploaded = []
+
+        def put_object(Bucket, Key, Body, ContentType):
+            if Key.endswith("f1.txt"):
+                raise OSError("boom")
+            uploaded.append(Key)
+
+        backend.client.put_object = put_object
+        backend._sync_small_file_size = 1024
+        backend.chunk_size = 1  # 1ファイルずつのバッチにする
+
+        with pytest.raises(OSError):
+            await backend.sync_from_local("t1", "s1", str(tmp_path))
+        assert len(uploaded) == 2
+
+
+class TestS3ChecksumUpload:
+    """チェックサム付きマルチパートアップロードのテスト"""
+
+    @pytest.mark.unit
+    async def test_sha256_is_computed_while_uploading_parts(self):
+        """パートを並列アップロードしつつ、オブジェクト全体の SHA-256 とサイズを返す"""
+        content = os.urandom(11 * 1024 * 1024)
+        with mock_aws():
+            boto3.client("s3", region_name="us-east-1").create_bucket(Bucket="upload-test")
+            backend = S3StorageBackend()
+            backend.bucket = "upload-test"
+            backend._cache = None
+            backend._transfer_config = TransferConfig(
+                multipart_threshold=5 * 1024 * 1024,
+                multipart_chunksize=5 * 1024 * 1024,
+                max_concurrency=4,
+            )
+            try:
+                with tempfile.SpooledTemporaryFile(max_size=1024) as f:
+                    f.write(content)
+                    f.seek(0)
+                    checksum, size = await backend.upload_stream_with_checksum(
+                        "t1", "s1", "uploads/big.bin", f, "application/octet-stream"
+                    )
+                key = backend.get_key("t1", "s1", "uploads/big.bin")
+                head = backend.client.head_object(
+                    Bucket="upload-test", Key=key, ChecksumMode="ENABLED"
+                )
+                # moto はマルチパートの複合チェックサムを全体チェックサムとして返すため検証しない
+                raw = boto3.client(
+                    "s3",
+                    region_name="us-east-1",
+                    config=Config(response_checksum_validation="when_required"),
+                )
+                stored = raw.get_object(Bucket="upload-test", Key=key)["Body"].read()
+            finally:
+                backend.close()
+
+        assert checksum == hashlib.sha256(content).hexdigest()
+        assert size == len(content)
+        assert stored == content
+        assert head["ETag"].endswith('-3"')
+        assert "ChecksumSHA256" in head
+
+    @pytest.mark.unit
+    async def test_seekable_stream_is_passed_through(self):
+        """s3transfer がパートを位置指定で読めるよう、シーク可能な元のストリームを渡す"""
+        content = b"x" * 4096
+        backend = S3StorageBackend()
+        backend._cache = None
+        passed = []
+
+        def upload_fileobj(fileobj, bucket, key, ExtraArgs=None, Config=None):
+            passed.append((fileobj, fileobj.tell()))
+            fileobj.read()
+
+        backend.client.upload_fileobj = upload_fileobj
+        try:
+            with tempfile.SpooledTemporaryFile(max_size=1024) as f:
+                f.write(content)
+                f.seek(0)
+                checksum, size = await backend.upload_stream_with_checksum(
+                    "t1", "s1", "uploads/a.bin", f
+                )
+                assert passed == [(f, 0)]
+        finally:
+            backend.close()
+
+        assert checksum == hashlib.sha256(content).hexdigest()
+        assert size == len(content)
@@ -0,0 +1,64 @@
+"""
+Skills S3バックアップの単体テスト
+"""
+import pytest
+
+from app.infrastructure.metrics import get_s3_operations
+from app.services.skill_s3_backup import SkillS3Backup
+
+
+class _Paginator:
+    def __init__(self, keys: list[str]):
+        self._keys = keys
+
+    def paginate(self, Bucket, Prefix):
+        for i in range(0, len(self._keys), 1000):
+            yield {"Contents": [{"Key": key} for key in self._keys[i:i + 1000]]}
+
+
+def _backup(count: int) -> SkillS3Backup:
+    backup = SkillS3Backup()
+    keys = [f"skills/tenant_t1/.claude/skills/s1/f{i}" for i in range(count)]
+    backup.client.get_paginator = lambda name: _Paginator(keys)
+    return backup
+
+
+class TestDeleteSkillFiles:
+    """スキルファイル一括削除のテスト"""
+
+    @pytest.mark.unit
+    async def test_deletes_in_batches(self):
+        """1000件ずつのバッチで全件を削除する"""
+        backup = _backup(2500)
+        batches = []
+
+        def delete_objects(Bucket, Delete):
+            batches.append(len(Delete["Objects"]))
+            return {}
+
+        backup.client.delete_objects = delete_objects
+
+        assert await backup.delete_skill_files("t1", "s1") == 2500
+        assert sorted(batches) == [500, 1000, 1000]
+
+    @pytest.mark.unit
+    async def test_partial_failure_raises_after_all_batches(self):
+        """一部を削除できなかった場合は全バッチの完了後に例外を送出し、エラーとして記録する"""
+        backup = _backup(1500)
+        calls = []
+        operations = get_s3_operations()
+        errors_before = operations.get(operation="skill_delete", status="error")
+
+        def delete_objects(Bucket, Delete):
+            calls.append(Delete["Objects"])
+            if len(calls) == 1:
+                raise OSError("boom")
+            first = Delete["Objects"][0]["Key"]
+            return {"Errors": [{"Key": first, "Code": "AccessDenied", "Message": "denied"}]}
+
+        backup.client.delete_objects = delete_objects
+
+        with pytest.raises(RuntimeError):
+            await backup.delete_skill_files("t1", "s1")
+        assert len(calls) == 2
+        assert operations.get(operation="skill_delete", status="error") - errors_before == 1
@@ -0,0 +1,298 @@
+"""
+Bedrock トークン計量の単体テスト
+"""
+import asyncio
+import base64
+import binascii
+import json
+import struct
+
+import pytest
+
+from app.services.proxy.credential_proxy import CredentialInjectionProxy, ProxyConfig
+from app.services.proxy.sigv4 import AWSCredentials
+from app.services.proxy.token_meter import BedrockUsageMeter, TokenLedger, TokenUsage
+from app.services.proxy.upstream_pool import get_upstream_pool
+
+_STREAM_PATH = "/model/us.anthropic.claude-sonnet-4-20250514-v1%3A0/invoke-with-response-stream"
+
+
+def _frame(event: dict, event_type: str = "chunk") -> bytes:
+    """イベントを Bedrock のイベントストリームメッセージに包む（chunk は Anthropic のイベント）"""
+    headers = b""
+    for name, value in ((":event-type", event_type), (":message-type", "event")):
+        headers += bytes([len(name)]) + name.encode() + b"\x07"
+        headers += struct.pack(">H", len(value)) + value.encode()
+    if event_type == "chunk":
+        event = {"bytes": base64.b64encode(json.dumps(event).encode()).decode()}
+    payload = json.dumps(event).encode()
+    total = 12 + len(headers) + len(payload) + 4
+    prelude = struct.pack(">II", total, len(headers))
+    prelude += struct.pack(">I", binascii.crc32(prelude))
+    message = prelude + headers + payload
+    return message + struct.pack(">I", binascii.crc32(message))
+
+
+def _stream_response() -> bytes:
+    return b"".join(
+        [
+            _frame(
+                {
+                    "type": "message_start",
+                    "message": {
+                        "usage": {
+                            "input_tokens": 12,
+                            "output_tokens": 1,
+                            "cache_creation_input_tokens": 300,
+                            "cache_read_input_tokens": 4000,
+                        }
+                    },
+                }
+            ),
+            _frame({"type": "content_block_delta", "delta": {"text": "hello"}}),
+            _frame({"type": "message_delta", "usage": {"output_tokens": 25}}),
+            _frame({"type": "message_stop"}),
+        ]
+    )
+
+
+class _FakePipeline:
+    def __init__(self, redis: "_FakeRedis") -> None:
+        self._redis = redis
+        self._commands: list[tuple[str, tuple]] = []
+
+    async def __aenter__(self) -> "_FakePipeline":
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        return None
+
+    def hincrby(self, key: str, field: str, amount: int) -> None:
+        self._commands.append(("hincrby", (key, field, amount)))
+
+    def expire(self, key: str, ttl: int) -> None:
+        self._commands.append(("expire", (key, ttl)))
+
+    async def execute(self) -> list:
+        results = []
+        for name, args in self._commands:
+            if name == "hincrby":
+                key, field, amount = args
+                bucket = self._redis.hashes.setdefault(key, {})
+                bucket[field] = bucket.get(field, 0) + amount
+                results.append(bucket[field])
+            else:
+                self._redis.ttls[args[0]] = args[1]
+                results.append(True)
+        return results
+
+
+class _FakeRedis:
+    """TokenLedger が使うコマンドのみのインメモリRedis"""
+
+    def __init__(self) -> None:
+        self.hashes: dict[str, dict[str, int]] = {}
+        self.ttls: dict[str, int] = {}
+
+    def pipeline(self, transaction: bool = True) -> _FakePipeline:
+        return _FakePipeline(self)
+
+    async def hget(self, key: str, field: str) -> str | None:
+        value = self.hashes.get(key, {}).get(field)
+        return None if value is None else str(value)
+
+
+class TestBedrockUsageMeter:
+    """レスポンスからのトークン使用量抽出のテスト"""
+
+    @pytest.mark.unit
+    def test_stream_usage_survives_arbitrary_chunking(self):
+        """イベントストリームを細かく分割して受け取っても使用量を取り出せる"""
+        meter = BedrockUsageMeter(_STREAM_PATH)
+        data = _stream_response()
+        for i in range(0, len(data), 7):
+            meter.feed(data[i : i + 7])
+
+        usage = meter.finish()
+
+        assert meter.model_id == "us.anthropic.claude-sonnet-4-20250514-v1:0"
+        assert usage == TokenUsage(
+            input_tokens=12,
+            output_tokens=25,
+            cache_creation_input_tokens=300,
+            cache_read_input_tokens=4000,
+        )
+        assert usage.total == 4337
+
+    @pytest.mark.unit
+    def test_converse_stream_usage_and_first_token(self):
+        """converse-stream は metadata イベントの usage を読み、最初の差分の時刻を記録する"""
+        meter = BedrockUsageMeter("/model/m/converse-stream")
+        meter.feed(_frame({"role": "assistant"}, event_type="messageStart"))
+        assert meter.first_token_at is None
+        meter.feed(_frame({"delta": {"text": "hi"}}, event_type="contentBlockDelta"))
+        meter.feed(
+            _frame(
+                {"usage": {"inputTokens": 3, "outputTokens": 9, "cacheReadInputTokens": 2048}},
+                event_type="metadata",
+            )
+        )
+
+        assert meter.first_token_at is not None
+        assert meter.finish() == TokenUsage(
+            input_tokens=3, output_tokens=9, cache_read_input_tokens=2048
+        )
+
+    @pytest.mark.unit
+    def test_invoke_json_usage(self):
+        """非ストリームの invoke はレスポンスJSONの usage を読む"""
+        meter = BedrockUsageMeter("/model/m/invoke")
+        body = json.dumps({"content": [], "usage": {"input_tokens": 5, "output_tokens": 7}})
+        meter.feed(body[:10].encode())
+        meter.feed(body[10:].encode())
+
+        assert meter.finish() == TokenUsage(input_tokens=5, output_tokens=7)
+
+    @pytest.mark.unit
+    def test_malformed_stream_stops_metering_without_raising(self):
+        """解析できないデータでは例外を出さずに計量を止める"""
+        meter = BedrockUsageMeter(_STREAM_PATH)
+        meter.feed(struct.pack(">III", 4, 0, 0))
+        meter.feed(_stream_response())
+
+        assert meter.finish().total == 0
+
+
+class TestTokenLedger:
+    """Redis台帳と予算判定のテスト"""
+
+    @pytest.mark.unit
+    async def test_record_accumulates_per_tenant_and_container(self):
+        """テナント（日単位）とコンテナの両方に積算し、テナントの合計を返す"""
+        redis = _FakeRedis()
+        ledger = TokenLedger(redis, daily_budget=100)
+        usage = TokenUsage(input_tokens=30, output_tokens=20)
+
+        assert await ledger.record("t1", "c1", usage) == 50
+        assert await ledger.record("t1", "c2", usage) == 100
+
+        container_usage = next(v for k, v in redis.hashes.items() if k.endswith(":c1"))
+        assert container_usage == {"total": 50, "input_tokens": 30, "output_tokens": 20}
+        assert await ledger.is_over_budget("t1")
+        assert not await ledger.is_over_budget("t2")
+
+    @pytest.mark.unit
+    async def test_tenant_override_and_unlimited(self):
+        """テナント別の予算が優先され、0 は無制限"""
+        redis = _FakeRedis()
+        ledger = TokenLedger(redis, daily_budget=0, tenant_budgets={"small": 10})
+        await ledger.record("small", "c1", TokenUsage(output_tokens=10))
+        await ledger.record("other", "c2", TokenUsage(output_tokens=10**9))
+
+        assert await ledger.is_over_budget("small")
+        assert not await ledger.is_over_budget("other")
+
+    @pytest.mark.unit
+    async def test_redis_failure_fails_open(self):
+        """Redis 障害時は呼び出しを拒否しない"""
+
+        class _BrokenRedis:
+            async def hget(self, key, field):
+                raise ConnectionError("down")
+
+        assert not await TokenLedger(_BrokenRedis(), daily_budget=1).is_over_budget("t1")
+
+
+class TestProxyTokenBudget:
+    """Proxy での予算超過時の拒否テスト"""
+
+    @pytest.mark.unit
+    async def test_over_budget_tenant_gets_429_without_upstream_call(self, tmp_path):
+        """予算を使い切ったテナントの呼び出しは上流に送らず 429 を返す"""
+        ledger = TokenLedger(_FakeRedis(), daily_budget=10)
+        await ledger.record("t1", "c1", TokenUsage(input_tokens=10))
+        config = ProxyConfig(
+            whitelist_domains=[],
+            aws_credentials=AWSCredentials("test", "test"),
+            log_all_requests=False,
+            token_ledger=ledger,
+            container_id="c1",
+        )
+        proxy = CredentialInjectionProxy(config, str(tmp_path / "proxy.sock"))
+        await proxy.start()
+        proxy.update_tenant("t1")
+        try:
+            reader, writer = await asyncio.open_unix_connection(proxy.socket_path)
+            writer.write(
+                f"POST {_STREAM_PATH} HTTP/1.1\r\nContent-Length: 2\r\n"
+                "Connection: close\r\n\r\n{}".encode()
+            )
+            await writer.drain()
+            response = await reader.read()
+            writer.close()
+        finally:
+            await proxy.stop()
+            await get_upstream_pool().close()
+
+        assert response.startswith(b"HTTP/1.1 429 ")
+        assert b"x-should-retry: false" in response
+        assert json.loads(response.split(b"\r\n\r\n", 1)[1]) == {
+            "message": "Token budget exceeded for tenant"
+        }
+
+    @pytest.mark.unit
+    async def test_absolute_bedrock_url_is_budgeted(self, tmp_path):
+        """絶対URLで bedrock-runtime を指定しても予算チェックを迂回できない"""
+        ledger = TokenLedger(_FakeRedis(), daily_budget=10)
+        await ledger.record("t1", "c1", TokenUsage(input_tokens=10))
+        config = ProxyConfig(
+            whitelist_domains=["bedrock-runtime.us-west-2.amazonaws.com"],
+            aws_credentials=AWSCredentials("test", "test"),
+            log_all_requests=False,
+            token_ledger=ledger,
+            container_id="c1",
+        )
+        proxy = CredentialInjectionProxy(config, str(tmp_path / "proxy.sock"))
+        await proxy.start()
+        proxy.update_tenant("t1")
+        try:
+            reader, writer = await asyncio.open_unix_connection(proxy.socket_path)
+            writer.write(
+                f"POST https://bedrock-runtime.us-west-2.amazonaws.com{_STREAM_PATH} HTTP/1.1\r\n"
+                "Content-Length: 2\r\nConnection: close\r\n\r\n{}".encode()
+            )
+            await writer.drain()
+            response = await reader.read()
+            writer.close()
+        finally:
+            await proxy.stop()
+            await get_upstream_pool().close()
+
+        assert response.startswith(b"HTTP/1.1 429 ")
+        assert b"Token budget exceeded" in response
+
+    @pytest.mark.unit
+    async def test_unsupported_bedrock_endpoint_is_rejected(self, tmp_path):
+        """計量経路に載せられない bedrock-runtime 系ホストは転送せず拒否する"""
+        host = "bedrock-runtime-fips.us-east-1.amazonaws.com"
+        config = ProxyConfig(
+            whitelist_domains=[host],
+            aws_credentials=AWSCredentials("test", "test"),
+            log_all_requests=False,
+        )
+        proxy = CredentialInjectionProxy(config, str(tmp_path / "proxy.sock"))
+        await proxy.start()
+        try:
+            reader, writer = await asyncio.open_unix_connection(proxy.socket_path)
+            writer.write(
+                f"POST https://{host}{_STREAM_PATH} HTTP/1.1\r\n"
+                "Content-Length: 2\r\nConnection: close\r\n\r\n{}".encode()
+            )
+            await writer.drain()
+            response = await reader.read()
+            writer.close()
+        finally:
+            await proxy.stop()
+            await get_upstream_pool().close()
+
+        assert response.startswith(b"HTTP/1.1 403 ")
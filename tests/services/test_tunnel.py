@@ -0,0 +1,180 @@
+"""
+CONNECT トンネル中継の単体テスト
+"""
+import asyncio
+import socket
+import time
+
+import pytest
+
+from app.services.proxy.egress import TokenBucket
+from app.services.proxy.tunnel import TunnelStats, relay, splice_available
+
+_MODES = [
+    pytest.param(True, marks=pytest.mark.skipif(not splice_available(), reason="Linux only")),
+    False,
+]
+
+
+async def _stream_pair() -> tuple[
+    tuple[asyncio.StreamReader, asyncio.StreamWriter],
+    tuple[asyncio.StreamReader, asyncio.StreamWriter],
+]:
+    """socketpair の両端をストリームとして開く（一方をProxy側、他方を相手側として使う）"""
+    left, right = socket.socketpair()
+    return await asyncio.open_connection(sock=left), await asyncio.open_connection(sock=right)
+
+
+class _Tunnel:
+    """クライアント ⇄ [relay] ⇄ 接続先 の構成"""
+
+    async def open(
+        self, idle_timeout: float, use_splice: bool, on_transfer=None
+    ) -> "_Tunnel":
+        (self.client, proxy_client) = await _stream_pair()
+        (proxy_remote, self.remote) = await _stream_pair()
+        self._proxy_writers = (proxy_client[1], proxy_remote[1])
+        self.task = asyncio.create_task(
+            relay(
+                *proxy_client,
+                *proxy_remote,
+                idle_timeout=idle_timeout,
+                use_splice=use_splice,
+                on_transfer=on_transfer,
+            )
+        )
+        return self
+
+    async def close(self) -> TunnelStats:
+        stats = await asyncio.wait_for(self.task, timeout=5)
+        for writer in (*self._proxy_writers, self.client[1], self.remote[1]):
+            writer.close()
+        return stats
+
+
+class TestTunnelRelay:
+    """splice / ストリーム両方式の中継テスト"""
+
+    @pytest.mark.unit
+    @pytest.mark.parametrize("use_splice", _MODES)
+    async def test_bidirectional_relay_with_half_close(self, use_splice):
+        """両方向のデータを中継し、片側の EOF を相手に伝えてから残りの方向を中継する"""
+        tunnel = await _Tunnel().open(idle_timeout=5, use_splice=use_splice)
+        request = b"client-hello" * 10_000
+
+        tunnel.client[1].write(request)
+        tunnel.client[1].write_eof()
+        assert await tunnel.remote[0].readexactly(len(request)) == request
+        assert await tunnel.remote[0].read() == b""
+
+        tunnel.remote[1].write(b"server-response")
+        tunnel.remote[1].write_eof()
+        assert await tunnel.client[0].read() == b"server-response"
+
+        stats = await tunnel.close()
+        assert stats.mode == ("splice" if use_splice else "stream")
+        assert (stats.bytes_up, stats.bytes_down) == (len(request), len(b"server-response"))
+        assert not stats.timed_out
+
+    @pytest.mark.unit
+    @pytest.mark.parametrize("use_splice", _MODES)
+    async def test_idle_timeout_closes_tunnel(self, use_splice):
+        """両方向とも無通信の状態が続くとトンネルを閉じる"""
+        tunnel = await _Tunnel().open(idle_timeout=0.2, use_splice=use_splice)
+        tunnel.client[1].write(b"ping")
+        assert await tunnel.remote[0].readexactly(4) == b"ping"
+
+        stats = await tunnel.close()
+
+        assert stats.timed_out
+        assert stats.bytes_up == 4
+
+    @pytest.mark.unit
+    @pytest.mark.parametrize("use_splice", _MODES)
+    async def test_on_transfer_delay_shapes_bandwidth(self, use_splice):
+        """on_transfer が返す待ち時間の間は読み取りを止め、帯域を制限する"""
+        bucket = TokenBucket(rate=400_000, burst=400_000)
+        transferred = []
+
+        def on_transfer(upstream: bool, size: int) -> float:
+            transferred.append((upstream, size))
+            return bucket.reserve(size)
+
+        tunnel = await _Tunnel().open(idle_timeout=5, use_splice=use_splice, on_transfer=on_transfer)
+        payload = b"x" * 1_000_000
+
+        start = time.monotonic()
+        tunnel.remote[1].write(payload)
+        tunnel.remote[1].write_eof()
+        assert len(await tunnel.client[0].read()) == len(payload)
+        elapsed = time.monotonic() - start
+        tunnel.client[1].write_eof()
+        await tunnel.close()
+
+        # バースト 400KB を超えた 600KB は 400KB/s で転送される（最後のチャンク分は待たない）
+        assert elapsed >= 0.4
+        assert sum(size for upstream, size in transferred if not upstream) == len(payload)
+
+    @pytest.mark.unit
+    @pytest.mark.skipif(not splice_available(), reason="Linux only")
+    async def test_buffered_bytes_are_forwarded_before_splice(self):
+        """relay 開始前に StreamReader が読み込み済みのデータも失わずに転送する"""
+        (client, proxy_client) = await _stream_pair()
+        (proxy_remote, remote) = await _stream_pair()
+        client[1].write(b"early-bytes")
+        await client[1].drain()
+        # Proxy側の StreamReader に読み込ませる
+        await asyncio.sleep(0.05)
+        assert len(proxy_client[0]._buffer) == len(b"early-bytes")
+
+        task = asyncio.create_task(relay(*proxy_client, *proxy_remote, idle_timeout=0.3))
+        assert await remote[0].readexactly(11) == b"early-bytes"
+        stats = await asyncio.wait_for(task, timeout=5)
+
+        assert stats.mode == "splice"
+        assert stats.bytes_up == 11
+        for writer in (client[1], proxy_client[1], proxy_remote[1], remote[1]):
+            writer.close()
+
+
+class TestTunnelBenchmark:
+    """トンネルのスループット比較（pytest -m slow -s で結果を表示）"""
+
+    @pytest.mark.slow
+    @pytest.mark.skipif(not splice_available(), reason="Linux only")
+    async def test_throughput(self):
+        """splice 中継はストリーム中継よりプロセスのCPU時間あたりの転送量が多い"""
+        payload = b"x" * (1024 * 1024)
+        total = 512 * len(payload)
+
+        async def measure(use_splice: bool) -> tuple[float, float]:
+            tunnel = await _Tunnel().open(idle_timeout=30, use_splice=use_splice)
+
+            async def send() -> None:
+                for _ in range(total // len(payload)):
+                    tunnel.remote[1].write(payload)
+                    await tunnel.remote[1].drain()
+                tunnel.remote[1].write_eof()
+
+            async def receive() -> None:
+                received = 0
+                while chunk := await tunnel.client[0].read(1024 * 1024):
+                    received += len(chunk)
+                assert received == total
+
+            wall, cpu = time.perf_counter(), time.process_time()
+            await asyncio.gather(send(), receive())
+            wall, cpu = time.perf_counter() - wall, time.process_time() - cpu
+            tunnel.client[1].write_eof()
+            await tunnel.close()
+            return total / wall / 1e6, total / cpu / 1e6
+
+        stream_wall, stream_cpu = await measure(use_splice=False)
+        splice_wall, splice_cpu = await measure(use_splice=True)
+        print(
+            f"\nTunnel MB/s (wall): stream={stream_wall:,.0f} splice={splice_wall:,.0f}"
+            f"\nTunnel MB per CPU-second: stream={stream_cpu:,.0f} splice={splice_cpu:,.0f}"
+            f" ({splice_cpu / stream_cpu:.1f}x)"
+        )
+
+        assert splice_cpu > stream_cpu
@@ -0,0 +1,93 @@
+"""
+共有上流クライアントの単体テスト
+"""
+import asyncio
+
+import pytest
+
+from app.services.proxy.upstream_pool import UpstreamClientPool, UpstreamSlotTimeoutError
+
+
+class TestUpstreamClientPool:
+    """ホスト単位の同時リクエスト制限とクライアント共有のテスト"""
+
+    @pytest.mark.unit
+    async def test_per_host_limit(self):
+        """同一ホストの同時リクエストは max_per_host までに制限され、他ホストは影響を受けない"""
+        pool = UpstreamClientPool(max_per_host=1)
+        release = asyncio.Event()
+
+        async def hold(host: str) -> None:
+            async with pool._host_slot(host):
+                await release.wait()
+
+        first = asyncio.create_task(hold("a.example.com"))
+        await asyncio.sleep(0)
+        second = asyncio.create_task(hold("a.example.com"))
+        other = asyncio.create_task(hold("b.example.com"))
+        await asyncio.sleep(0.01)
+
+        assert pool._host_slots["a.example.com"].users == 2
+        assert pool._host_slots["a.example.com"].semaphore.locked()
+        assert pool._host_slots["b.example.com"].users == 1
+
+        release.set()
+        await asyncio.wait_for(asyncio.gather(first, second, other), timeout=1)
+        assert pool._host_slots == {}
+
+    @pytest.mark.unit
+    async def test_client_is_shared_and_recreated_after_close(self):
+        """クライアントは共有され、close() 後の利用時に作り直される"""
+        pool = UpstreamClientPool(http2=False)
+        client = pool.client
+        assert pool.client is client
+
+        await pool.close()
+
+        assert client.is_closed
+        assert pool.client is not client
+        await pool.close()
+
+    @pytest.mark.unit
+    async def test_slot_wait_times_out(self):
+        """枠を slot_timeout 内に確保できなければ UpstreamSlotTimeoutError"""
+        pool = UpstreamClientPool(max_per_host=1, slot_timeout=0.05)
+        release = asyncio.Event()
+
+        async def hold() -> None:
+            async with pool._host_slot("a.example.com"):
+                await release.wait()
+
+        holder = asyncio.create_task(hold())
+        await asyncio.sleep(0)
+
+        with pytest.raises(UpstreamSlotTimeoutError):
+            async with pool._host_slot("a.example.com"):
+                pass
+
+        assert pool._host_slots["a.example.com"].users == 1
+        release.set()
+        await holder
+        assert pool._host_slots == {}
+
+    @pytest.mark.unit
+    async def test_bedrock_runtime_is_exempt(self):
+        """bedrock-runtime は分散同時実行制限で制御するためホスト枠を適用しない"""
+        pool = UpstreamClientPool(max_per_host=1, slot_timeout=0.05)
+        host = "bedrock-runtime.us-east-1.amazonaws.com"
+        release = asyncio.Event()
+        entered = 0
+
+        async def hold() -> None:
+            nonlocal entered
+            async with pool._host_slot(host):
+                entered += 1
+                await release.wait()
+
+        tasks = [asyncio.create_task(hold()) for _ in range(3)]
+        await asyncio.sleep(0.01)
+
+        assert entered == 3
+        assert pool._host_slots == {}
+        release.set()
+        await asyncio.gather(*tasks)